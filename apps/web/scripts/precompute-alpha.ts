@@ -9,9 +9,11 @@
  *
  * Strategy: fixed params (entry >1%, exit <0.25%), ranked by current ML × Sharpe.
  *
+ * Trades come from the Python ML service (POST /signals/simulate at ML_SERVICE_URL).
+ *
  * Usage:
  *   npx tsx scripts/precompute-alpha.ts
- *   DATABASE_URL=... NODE_TLS_REJECT_UNAUTHORIZED=0 npx tsx scripts/precompute-alpha.ts
+ *   DATABASE_URL=... ML_SERVICE_URL=... NODE_TLS_REJECT_UNAUTHORIZED=0 npx tsx scripts/precompute-alpha.ts
  *
  * Schedule: nightly at 02:00 UTC (after ML pipeline at 01:00 UTC)
  */
@@ -173,7 +175,7 @@ async function computeBestStocks() {
     const currentPred = currentPredMap.get(ticker) ?? 0;
     const currentPredPct = currentPred * 100;
 
-    const result = runMLSimulation(input, FIXED_PARAMS);
+    const result = await runMLSimulation(input, FIXED_PARAMS);
 
     results.push({
       rank: 0, ticker,
@@ -894,17 +894,21 @@ export default function AlphaPage() {
     setTickerHistory({ ticker: simData.ticker, sector: simData.sector, signals, actualReturns } as TickerSignalHistory);
   }, [simData]);
 
-  // Parameter sweep — runs all combinations client-side
-  // Run engine client-side (instant on param change)
-  const simResult: SimResult | null = useMemo(() => {
-    if (!simData?.input?.length) return null;
-    return runMLSimulation(simData.input, {
+  // Run engine on the ML service (POST /signals/simulate) on param change
+  const [simResult, setSimResult] = useState<SimResult | null>(null);
+  useEffect(() => {
+    if (!simData?.input?.length) { setSimResult(null); return; }
+    const ctrl = new AbortController();
+    runMLSimulation(simData.input, {
       entryThreshold: simEntry, exitThreshold: simExit, stopLossPct: simStop,
       takeProfitPct: simTP, positionSizePct: simPosSize, minHoldDays: simMinHold,
       maxHoldDays: simMaxHold, cooldownBars: simCooldown, costBps: simCost,
       momentumFilter: simMom, volGate: simVolGate, sma200Require: simSma200,
       sma50Require: simSma50, smaExitOnCross: simSmaExit, valuationFilter: simValFilter,
-    });
+    }, { signal: ctrl.signal })
+      .then(setSimResult)
+      .catch(err => { if (err?.name !== "AbortError") { console.error(err); setSimResult(null); } });
+    return () => ctrl.abort();
   }, [simData, simEntry, simExit, simStop, simTP, simPosSize, simMinHold, simMaxHold,
       simCooldown, simCost, simMom, simVolGate, simSma200, simSma50, simSmaExit, simValFilter]);
 
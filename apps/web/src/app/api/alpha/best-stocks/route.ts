@@ -182,7 +182,7 @@ async function computeAndCache(days: ValidDays, cacheKey: string): Promise<objec
     const currentPred = currentPredMap.get(ticker) ?? 0;
     const currentPredPct = currentPred * 100;
 
-    const result = runMLSimulation(input, FIXED_PARAMS);
+    const result = await runMLSimulation(input, FIXED_PARAMS);
 
     results.push({
       rank: 0, ticker,
@@ -4,7 +4,7 @@ import { requireAlphaAuth, safeErrorResponse, secureJsonResponse } from '@/lib/s
 
 /**
  * GET /api/alpha/simulator/[ticker]?days=1260
- * Returns SimInputBar[] for client-side ML trading simulation.
+ * Returns SimInputBar[] for the ML trading simulation (lib/mlTradingEngine.ts → ML service).
  * Signal: 21-day rolling forward return from prices (daily, continuous).
  * This matches the original yggdrasil_v7 fwd_ret_medium signal.
  * Fetches: prices + SMAs + forward return signal + momentum + fundamentals + OBX.
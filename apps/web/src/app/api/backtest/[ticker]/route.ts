@@ -224,7 +224,7 @@ export async function GET(
     }
 
     // Run simulation
-    const result = runMLSimulation(input, simParams);
+    const result = await runMLSimulation(input, simParams);
 
     // Thin the series for transfer — only keep points needed for equity curve
     // (every bar is too much data for 1260 bars)
@@ -557,12 +557,21 @@ export async function POST(req: NextRequest) {
     let cnnSignals: Record<string, number> | null = null;
     try {
       const mlServiceUrl3 = process.env.ML_SERVICE_URL || 'http://localhost:8000';
-      const cnnResponse = await fetch(`${mlServiceUrl3}/signals/cnn`, {
+      // Score with the stored model; only train when the store is empty (404)
+      let cnnResponse = await fetch(`${mlServiceUrl3}/signals/cnn/predict`, {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ tickers, lookback_days: 504, epochs: 20, window: 60 }),
-        signal: AbortSignal.timeout(90000), // CNN training takes ~30-60s with 20 epochs
+        body: JSON.stringify({ tickers }),
+        signal: AbortSignal.timeout(15000),
       });
+      if (cnnResponse.status === 404) {
+        cnnResponse = await fetch(`${mlServiceUrl3}/signals/cnn`, {
+          method: 'POST',
+          headers: { 'Content-Type': 'application/json' },
+          body: JSON.stringify({ tickers, lookback_days: 504, epochs: 20, window: 60 }),
+          signal: AbortSignal.timeout(90000), // CNN training takes ~30-60s with 20 epochs
+        });
+      }
       if (cnnResponse.ok) {
         const cnnResult = await cnnResponse.json();
         if (cnnResult.signals) {
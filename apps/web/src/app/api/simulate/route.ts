@@ -0,0 +1,67 @@
+/**
+ * Browser proxy to the Python ML trade simulator.
+ *
+ * POST /api/simulate
+ *   body: POST /signals/simulate request with explicit `bars`
+ *   (built by buildSimulateRequest in lib/mlTradingEngine.ts)
+ *   → the service's response, status passed through
+ */
+
+import { NextRequest, NextResponse } from "next/server";
+
+const ML_SERVICE_URL = process.env.ML_SERVICE_URL || "http://localhost:8000";
+const MAX_BARS = 5000;
+const MAX_RULES = 50;
+// Same bounds as RULE_LIMITS in ml-service/app/models/trade_simulator.py (bars)
+const RULE_LIMITS: Record<string, number> = { entry_lag: 21, min_hold: 252, max_hold: 252, cooldown: 252 };
+
+export const dynamic = "force-dynamic";
+
+export async function POST(req: NextRequest) {
+  let body: any;
+  try {
+    body = await req.json();
+  } catch {
+    return NextResponse.json({ error: "Invalid JSON body" }, { status: 400 });
+  }
+
+  // Bars only: ticker lookups stay with the authenticated server routes
+  if (!Array.isArray(body?.bars) || body.bars.length === 0 || body.bars.length > MAX_BARS) {
+    return NextResponse.json({ error: `Need 1-${MAX_BARS} bars` }, { status: 400 });
+  }
+  if (!Array.isArray(body.rules) || body.rules.length === 0 || body.rules.length > MAX_RULES) {
+    return NextResponse.json({ error: `Need 1-${MAX_RULES} rules` }, { status: 400 });
+  }
+  for (const rule of body.rules) {
+    if (rule === null || typeof rule !== "object" || Array.isArray(rule)) {
+      return NextResponse.json({ error: "Each rule must be an object" }, { status: 400 });
+    }
+    for (const [key, limit] of Object.entries(RULE_LIMITS)) {
+      const value = rule[key];
+      if (value !== undefined && !(Number.isInteger(value) && value >= 0 && value <= limit)) {
+        return NextResponse.json({ error: `${key} must be an integer from 0 to ${limit}` }, { status: 400 });
+      }
+    }
+  }
+  for (const key of ["entry_signal", "exit_signal", "entry_dates"]) {
+    if (body[key] != null && (!Array.isArray(body[key]) || body[key].length > MAX_BARS)) {
+      return NextResponse.json({ error: `${key} must be an array of at most ${MAX_BARS}` }, { status: 400 });
+    }
+  }
+
+  try {
+    const res = await fetch(`${ML_SERVICE_URL}/signals/simulate`, {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({ ...body, ticker: null }),
+    });
+    const data = await res.json().catch(() => ({ error: "Invalid response from ML service" }));
+    return NextResponse.json(data, { status: res.status });
+  } catch (error: any) {
+    console.error("Simulate proxy error:", error);
+    return NextResponse.json(
+      { error: "ML service unreachable", hint: "cd ml-service && uvicorn app.main:app --port 8000" },
+      { status: 503 }
+    );
+  }
+}
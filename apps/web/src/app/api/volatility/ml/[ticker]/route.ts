@@ -140,7 +140,9 @@ export async function GET(
     }
 
     const data = await res.json();
-    return NextResponse.json(data);
+    // Pass the ML service's stage breakdown (db_fetch, fit, forecast, serialize) through to the browser
+    const serverTiming = res.headers.get("server-timing");
+    return NextResponse.json(data, serverTiming ? { headers: { "Server-Timing": serverTiming } } : undefined);
   } catch (e: any) {
     if (e?.name === "AbortError" || e?.name === "TimeoutError") {
       return NextResponse.json(
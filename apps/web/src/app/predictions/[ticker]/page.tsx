@@ -127,9 +127,14 @@ export default function PredictionsPage() {
       .catch(() => setBtLoading(false));
   }, [btInput, btLoading, ticker]);
 
-  const btResult: SimResult | null = useMemo(() => {
-    if (!btInput || btInput.length < 50) return null;
-    return runMLSimulation(btInput, BACKTEST_PARAMS);
+  const [btResult, setBtResult] = useState<SimResult | null>(null);
+  useEffect(() => {
+    if (!btInput || btInput.length < 50) { setBtResult(null); return; }
+    const ctrl = new AbortController();
+    runMLSimulation(btInput, BACKTEST_PARAMS, { signal: ctrl.signal })
+      .then(setBtResult)
+      .catch(err => { if (err?.name !== "AbortError") { console.error(err); setBtResult(null); } });
+    return () => ctrl.abort();
   }, [btInput, BACKTEST_PARAMS]);
 
   // Fetch optimizer config on mount
@@ -1,6 +1,9 @@
 // ============================================================================
-// ML TRADING ENGINE — Pure simulation engine for Alpha Engine Simulator tab
-// Pattern: same as fxKalmanPairs.ts — pure TS, no side effects, no DB calls
+// ML TRADING ENGINE — Alpha Engine Simulator client
+// Trades are computed by the ML service (POST /signals/simulate, the same
+// vectorized simulator the trainers use). This module turns SimParams into
+// per-bar entry / exit signals plus one exit rule, and the returned trades
+// back into the chart series and stats. Browsers go through /api/simulate.
 // ============================================================================
 
 // ── Interfaces ──────────────────────────────────────────────────────────────
@@ -134,49 +137,185 @@ export const SIM_DEFAULTS: SimParams = {
   valuationFilter: false,
 };
 
-// ── Core Engine ─────────────────────────────────────────────────────────────
+// ── Request ─────────────────────────────────────────────────────────────────
 
-export function runMLSimulation(input: SimInputBar[], params: SimParams): SimResult {
-  const series: SimSeriesBar[] = [];
-  const trades: SimTrade[] = [];
+const ML_SERVICE_URL = process.env.ML_SERVICE_URL || 'http://localhost:8000';
 
-  if (input.length < 2) return { series: [], trades: [], stats: emptyStats() };
+/** Trade as returned by POST /signals/simulate */
+interface ServiceTrade {
+  signal_date: string;
+  entry_date: string;
+  exit_date: string;
+  entry_price: number;
+  exit_price: number;
+  return: number;              // net of costs
+  days_held: number;
+  exit_reason: 'take_profit' | 'stop_loss' | 'signal_flip' | 'time_stop';
+}
 
-  // State
-  let inPosition = false;
-  let entryBar = -1;
-  let entryPrice = 0;
-  let entryPrediction = 0;
-  let entryMomScore = 0;
-  let entryVolRegime: string | null = null;
-  let cooldownUntil = -1;
-  let equityValue = 100;
-  let peakEquity = 100;
-  let maxDrawdown = 0;
-  let tradeMinPrice = Infinity;
+export interface SimulateOptions {
+  url?: string;                        // default: ML service on the server, /api/simulate in the browser
+  headers?: Record<string, string>;
+  signal?: AbortSignal;
+}
+
+interface PreparedBar {
+  predPct: number | null;              // step-held prediction, %
+  confidence: number | null;
+  momScore: 0 | 1 | 2 | 3;
+  enter: boolean;                      // prediction above entry threshold
+  blockReason: string | null;          // filter that blocks the entry
+  exitFlag: boolean;                   // signal flip, SMA cross or hard vol gate
+}
 
-  // Step-hold ML predictions (monthly → daily)
+function prepareBars(input: SimInputBar[], params: SimParams): PreparedBar[] {
   let heldPrediction: number | null = null;
   let heldConfidence: number | null = null;
-  // OBX benchmark start
-  const obxStart = input.find(b => b.benchmarkClose != null)?.benchmarkClose ?? null;
 
-  for (let i = 0; i < input.length; i++) {
-    const bar = input[i];
-
-    // Step-hold: carry forward last known prediction
+  return input.map(bar => {
+    // Step-hold: carry forward last known prediction (monthly → daily)
     if (bar.mlPrediction != null) {
       heldPrediction = bar.mlPrediction;
       heldConfidence = bar.mlConfidence;
     }
-
-    // Momentum score: count positive momentum windows
+    const predPct = heldPrediction != null ? heldPrediction * 100 : null;
     const momScore = [bar.mom1m, bar.mom6m, bar.mom11m]
       .filter(v => v != null && v > 0).length as 0 | 1 | 2 | 3;
 
-    const predPct = heldPrediction != null ? heldPrediction * 100 : null;
+    let blockReason: string | null = null;
+    if (params.momentumFilter > 0 && momScore < params.momentumFilter) blockReason = 'momentum';
+    else if (params.volGate === 'hard' && bar.volRegime === 'high') blockReason = 'volRegime';
+    else if (params.sma200Require && (bar.sma200 == null || bar.close < bar.sma200)) blockReason = 'sma200';
+    else if (params.sma50Require && (bar.sma50 == null || bar.close < bar.sma50)) blockReason = 'sma50';
+    else if (params.valuationFilter && bar.epSectorZ != null && bar.epSectorZ < -2) blockReason = 'valuation';
+
+    return {
+      predPct,
+      confidence: heldConfidence,
+      momScore,
+      enter: predPct != null && predPct >= params.entryThreshold,
+      blockReason,
+      exitFlag: (predPct != null && predPct <= params.exitThreshold)
+        || smaCross(bar, params) || volExit(bar, params),
+    };
+  });
+}
+
+function smaCross(bar: SimInputBar, params: SimParams): boolean {
+  return params.smaExitOnCross && bar.sma200 != null && bar.close < bar.sma200;
+}
+
+function volExit(bar: SimInputBar, params: SimParams): boolean {
+  return params.volGate === 'hard' && bar.volRegime === 'high';
+}
+
+/** Body of POST /signals/simulate for these bars and params (one close-touch exit rule). */
+export function buildSimulateRequest(input: SimInputBar[], params: SimParams) {
+  const prepared = prepareBars(input, params);
+  return {
+    bars: input.map(b => ({ date: b.date, open: b.open, high: b.high, low: b.low, close: b.close })),
+    entry_signal: prepared.map(p => p.enter && p.blockReason == null),
+    exit_signal: prepared.map(p => p.exitFlag),
+    rules: [{
+      entry_lag: 0,                    // signal at close t → fill at CLOSE of same bar (matches Explorer)
+      stop_pct: params.stopLossPct / 100,
+      target_pct: params.takeProfitPct / 100,
+      min_hold: params.minHoldDays,
+      max_hold: params.maxHoldDays,
+      cooldown: params.cooldownBars,
+      cost_bps: params.costBps,
+      touch: 'close',
+      one_position: true,
+    }],
+    include_trades: true,
+  };
+}
+
+function simulateUrl(): string {
+  return typeof window === 'undefined' ? `${ML_SERVICE_URL}/signals/simulate` : '/api/simulate';
+}
+
+// ── Engine ──────────────────────────────────────────────────────────────────
+
+export async function runMLSimulation(
+  input: SimInputBar[],
+  params: SimParams,
+  options: SimulateOptions = {},
+): Promise<SimResult> {
+  if (input.length < 2) return { series: [], trades: [], stats: emptyStats() };
+
+  const res = await fetch(options.url ?? simulateUrl(), {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json', ...options.headers },
+    body: JSON.stringify(buildSimulateRequest(input, params)),
+    signal: options.signal,
+  });
+  if (!res.ok) {
+    const detail = await res.json().then(d => d.detail ?? d.error).catch(() => null);
+    throw new Error(`Simulation failed (${res.status})${detail ? `: ${detail}` : ''}`);
+  }
+  const data = await res.json();
+  return buildSimResult(input, params, data.results?.[0]?.trades ?? []);
+}
+
+/** Chart series, trades and stats of the service's trades on these bars. */
+export function buildSimResult(input: SimInputBar[], params: SimParams, serviceTrades: ServiceTrade[]): SimResult {
+  const prepared = prepareBars(input, params);
+  const barIndex = new Map(input.map((b, i) => [b.date.slice(0, 10), i]));
+  const last = input.length - 1;
+
+  const byEntry = new Map<number, { entryBar: number; exitBar: number; trade: SimTrade; openAtEnd: boolean }>();
+  const trades: SimTrade[] = [];
+  for (const t of serviceTrades) {
+    const entryBar = barIndex.get(t.entry_date.slice(0, 10));
+    const exitBar = barIndex.get(t.exit_date.slice(0, 10));
+    if (entryBar == null || exitBar == null) continue;
+
+    let minPrice = t.entry_price;
+    for (let i = entryBar + 1; i <= exitBar; i++) minPrice = Math.min(minPrice, input[i].close);
+
+    // The service reports every flagged exit as signal_flip; name the condition that fired
+    let exitReason: SimTrade['exitReason'] = t.exit_reason;
+    const exitPred = prepared[exitBar].predPct;
+    if (exitReason === 'signal_flip' && !(exitPred != null && exitPred <= params.exitThreshold)) {
+      exitReason = t.days_held >= params.maxHoldDays ? 'time_stop'
+        : smaCross(input[exitBar], params) ? 'sma_cross' : 'vol_regime';
+    }
+
+    const entry = prepared[entryBar];
+    const trade: SimTrade = {
+      entryDate: input[entryBar].date,
+      exitDate: input[exitBar].date,
+      entryPrice: t.entry_price,
+      exitPrice: t.exit_price,
+      predictedReturn: (entry.predPct ?? 0) / 100,
+      actualReturn: (t.exit_price - t.entry_price) / t.entry_price,
+      pnlPct: t.return,
+      daysHeld: t.days_held,
+      exitReason,
+      maxDrawdown: (minPrice - t.entry_price) / t.entry_price,
+      momAtEntry: entry.momScore,
+      volAtEntry: input[entryBar].volRegime,
+      predAtEntry: entry.predPct ?? 0,
+    };
+    trades.push(trade);
+    // Still open at the last bar: closed out for the stats, not marked as an exit
+    const openAtEnd = exitBar === last && exitReason === 'time_stop' && t.days_held < params.maxHoldDays;
+    byEntry.set(entryBar, { entryBar, exitBar, trade, openAtEnd });
+  }
+
+  const series: SimSeriesBar[] = [];
+  let open: { entryBar: number; exitBar: number; trade: SimTrade; openAtEnd: boolean } | null = null;
+  let cooldownUntil = -1;
+  let equityValue = 100;
+  let peakEquity = 100;
+  let maxDrawdown = 0;
+  const obxStart = input.find(b => b.benchmarkClose != null)?.benchmarkClose ?? null;
+
+  for (let i = 0; i < input.length; i++) {
+    const bar = input[i];
+    const p = prepared[i];
 
-    // Benchmark
     const benchmarkValue = (obxStart != null && bar.benchmarkClose != null)
       ? (bar.benchmarkClose / obxStart) * 100
       : series.length > 0 ? series[series.length - 1].benchmarkValue : 100;
@@ -185,144 +324,27 @@ export function runMLSimulation(input: SimInputBar[], params: SimParams): SimRes
     let exitMarker = false;
     let exitWin: boolean | null = null;
 
-    // ── EXIT LOGIC (check before entry) ──
-    if (inPosition && i > entryBar) {
-      const daysHeld = i - entryBar;
-      const currentReturn = (bar.close - entryPrice) / entryPrice;
-      if (bar.close < tradeMinPrice) tradeMinPrice = bar.close;
-      const tradeMaxDD = (tradeMinPrice - entryPrice) / entryPrice;
-
-      let exitReason: SimTrade['exitReason'] | null = null;
-
-      // Stop loss — always checked, ignores minHold
-      if (currentReturn <= -(params.stopLossPct / 100)) {
-        exitReason = 'stop_loss';
-      } else if (daysHeld >= params.minHoldDays) {
-        // Take profit
-        if (currentReturn >= params.takeProfitPct / 100) {
-          exitReason = 'take_profit';
-        }
-        // Signal flip — level-based: exit whenever prediction drops to/below exit threshold
-        else if (predPct != null && predPct <= params.exitThreshold) {
-          exitReason = 'signal_flip';
-        }
-        // Time stop
-        else if (daysHeld >= params.maxHoldDays) {
-          exitReason = 'time_stop';
-        }
-        // SMA cross exit
-        else if (params.smaExitOnCross && bar.sma200 != null && bar.close < bar.sma200) {
-          exitReason = 'sma_cross';
-        }
-        // Vol regime exit (hard gate only)
-        else if (params.volGate === 'hard' && bar.volRegime === 'high') {
-          exitReason = 'vol_regime';
-        }
-      }
-
-      if (exitReason) {
-        const rawReturn = (bar.close - entryPrice) / entryPrice;
-        const costAdj = params.costBps / 10000;
-        const pnlPct = rawReturn - costAdj;
-
-        trades.push({
-          entryDate: input[entryBar].date,
-          exitDate: bar.date,
-          entryPrice,
-          exitPrice: bar.close,
-          predictedReturn: entryPrediction,
-          actualReturn: rawReturn,
-          pnlPct,
-          daysHeld,
-          exitReason,
-          maxDrawdown: tradeMaxDD,
-          momAtEntry: entryMomScore,
-          volAtEntry: entryVolRegime,
-          predAtEntry: entryPrediction * 100,
-        });
-
-        equityValue *= (1 + pnlPct);
-        if (equityValue > peakEquity) peakEquity = equityValue;
-        const dd = (equityValue - peakEquity) / peakEquity;
-        if (dd < maxDrawdown) maxDrawdown = dd;
-
-        inPosition = false;
-        cooldownUntil = i + params.cooldownBars;
-        exitMarker = true;
-        exitWin = rawReturn > 0;
-      }
+    if (open && i === open.exitBar && !open.openAtEnd) {
+      equityValue *= (1 + open.trade.pnlPct);
+      if (equityValue > peakEquity) peakEquity = equityValue;
+      const dd = (equityValue - peakEquity) / peakEquity;
+      if (dd < maxDrawdown) maxDrawdown = dd;
+      cooldownUntil = i + params.cooldownBars;
+      exitMarker = true;
+      exitWin = open.trade.actualReturn > 0;
+      open = null;
     }
 
-    // ── ENTRY LOGIC ──
-    let signalActive = false;
-    let signalBlocked = false;
-    let blockReason: string | null = null;
-
-    if (!inPosition && predPct != null && i > cooldownUntil) {
-      // Level-based entry: enter any bar where signal is above threshold and flat (maximizes compounding)
-      if (predPct >= params.entryThreshold) {
-        signalActive = true;
-
-        // Check filters
-        if (i <= cooldownUntil) {
-          signalBlocked = true;
-          blockReason = 'cooldown';
-        }
-
-        if (!signalBlocked && params.momentumFilter > 0 && momScore < params.momentumFilter) {
-          signalBlocked = true;
-          blockReason = 'momentum';
-        }
-
-        if (!signalBlocked && params.volGate !== 'off' && bar.volRegime === 'high') {
-          if (params.volGate === 'hard') {
-            signalBlocked = true;
-            blockReason = 'volRegime';
-          }
-          // 'soft' doesn't block, just noted
-        }
-
-        if (!signalBlocked && params.sma200Require) {
-          if (bar.sma200 == null || bar.close < bar.sma200) {
-            signalBlocked = true;
-            blockReason = 'sma200';
-          }
-        }
-
-        if (!signalBlocked && params.sma50Require) {
-          if (bar.sma50 == null || bar.close < bar.sma50) {
-            signalBlocked = true;
-            blockReason = 'sma50';
-          }
-        }
-
-        if (!signalBlocked && params.valuationFilter) {
-          if (bar.epSectorZ != null && bar.epSectorZ < -2) {
-            signalBlocked = true;
-            blockReason = 'valuation';
-          }
-        }
-
-        // ENTER: signal at close t → fill at CLOSE of same bar (matches Explorer)
-        if (signalActive && !signalBlocked) {
-          inPosition = true;
-          entryBar = i;
-          entryPrice = bar.close;
-          entryPrediction = heldPrediction!;
-          entryMomScore = momScore;
-          entryVolRegime = bar.volRegime;
-          tradeMinPrice = bar.close;
-          entryMarker = true;
-        }
-      }
+    const flat = !open && i > cooldownUntil;
+    const signalActive = flat && p.enter;
+    const signalBlocked = signalActive && p.blockReason != null;
+    const entered = byEntry.get(i);
+    if (entered && !open) {
+      open = entered;
+      entryMarker = true;
     }
 
-    // ── BUILD SERIES POINT ──
-    const isInPos = inPosition && i >= entryBar;
-    const unrealizedPnl = isInPos
-      ? (bar.close - entryPrice) / entryPrice
-      : null;
-
+    const unrealizedPnl = open ? (bar.close - open.trade.entryPrice) / open.trade.entryPrice : null;
     series.push({
       date: bar.date,
       price: bar.close,
@@ -332,9 +354,9 @@ export function runMLSimulation(input: SimInputBar[], params: SimParams): SimRes
       volume: bar.volume,
       sma200: bar.sma200,
       sma50: bar.sma50,
-      mlPrediction: predPct,
-      mlConfidence: heldConfidence,
-      momScore,
+      mlPrediction: p.predPct,
+      mlConfidence: p.confidence,
+      momScore: p.momScore,
       volRegime: bar.volRegime,
       ep: bar.ep,
       bm: bar.bm,
@@ -342,42 +364,20 @@ export function runMLSimulation(input: SimInputBar[], params: SimParams): SimRes
       bmSectorZ: bar.bmSectorZ,
       signalActive,
       signalBlocked,
-      blockReason,
-      inPosition: isInPos,
+      blockReason: signalBlocked ? p.blockReason : null,
+      inPosition: open != null,
       unrealizedPnl,
-      positionDaysHeld: isInPos ? i - entryBar : null,
+      positionDaysHeld: open ? i - open.entryBar : null,
       entryMarker,
       exitMarker,
       exitWin,
       equityValue: unrealizedPnl != null ? equityValue * (1 + unrealizedPnl) : equityValue,
       benchmarkValue,
     });
-
   }
 
-  // Close out any open position at last bar (for stats)
-  if (inPosition && series.length > 0) {
-    const lastBar = input[input.length - 1];
-    const daysHeld = input.length - 1 - entryBar;
-    const rawReturn = (lastBar.close - entryPrice) / entryPrice;
-    const pnlPct = rawReturn - params.costBps / 10000;
-    trades.push({
-      entryDate: input[entryBar].date,
-      exitDate: lastBar.date,
-      entryPrice,
-      exitPrice: lastBar.close,
-      predictedReturn: entryPrediction,
-      actualReturn: rawReturn,
-      pnlPct,
-      daysHeld,
-      exitReason: 'time_stop',
-      maxDrawdown: (tradeMinPrice - entryPrice) / entryPrice,
-      momAtEntry: entryMomScore,
-      volAtEntry: entryVolRegime,
-      predAtEntry: entryPrediction * 100,
-    });
-    equityValue *= (1 + pnlPct);
-  }
+  // Close out the position still open at the last bar (for stats)
+  if (open) equityValue *= (1 + open.trade.pnlPct);
 
   const stats = computeStats(trades, equityValue, maxDrawdown, series, params);
   return { series, trades, stats };
@@ -16,6 +16,7 @@ Usage:
   python alpha_trainer.py              # Full run (all stocks)
   python alpha_trainer.py --test       # Test on 15 liquid stocks
   python alpha_trainer.py --evaluate-only  # Evaluate only
+  python alpha_trainer.py --tree-backend compiled  # NumPy tree evaluator for batches of <= 16 rows
 """
 
 import os
@@ -32,12 +33,30 @@ from typing import Optional, List
 import numpy as np
 import pandas as pd
 import psycopg2
-from psycopg2.extras import execute_values
 import xgboost as xgb
 import lightgbm as lgbm
 from sklearn.metrics import mean_absolute_error
 from scipy import stats
 
+try:  # run as app.alpha_trainer or as a script from app/
+    from .models.tree_inference import select_tree_backend, TREE_BACKENDS
+    from .utils.feature_store import (
+        FeatureStore, cached_features, feature_group, feature_version, latest_price_date,
+    )
+    from .utils.parallel import FEATURE_JOBS, TickerFrames, map_tickers
+    from .utils.bulk_write import copy_upsert
+    from .utils.bulk_read import load_table
+    from .utils.snapshot import DATA_BACKENDS, data_backend, set_data_backend
+except ImportError:
+    from models.tree_inference import select_tree_backend, TREE_BACKENDS
+    from utils.feature_store import (
+        FeatureStore, cached_features, feature_group, feature_version, latest_price_date,
+    )
+    from utils.parallel import FEATURE_JOBS, TickerFrames, map_tickers
+    from utils.bulk_write import copy_upsert
+    from utils.bulk_read import load_table
+    from utils.snapshot import DATA_BACKENDS, data_backend, set_data_backend
+
 warnings.filterwarnings("ignore", category=FutureWarning)
 warnings.filterwarnings("ignore", category=UserWarning)
 
@@ -101,20 +120,14 @@ def load_all_data(conn, test_mode=False) -> dict:
     print("\n[1/6] LOADING DATA")
     print("=" * 60)
 
-    ticker_filter = ""
+    test_tickers = TEST_TICKERS if test_mode else None
     if test_mode:
-        tickers_str = ",".join(f"'{t}'" for t in TEST_TICKERS + ['OBX'])
-        ticker_filter = f"AND ticker IN ({tickers_str})"
         print(f"  TEST MODE: {len(TEST_TICKERS)} tickers")
 
     # Prices
     print("  Loading prices...")
-    prices = pd.read_sql(f"""
-        SELECT ticker, date, open, high, low, close, volume
-        FROM prices_daily
-        WHERE close > 0 {ticker_filter}
-        ORDER BY ticker, date
-    """, conn, parse_dates=['date'])
+    prices = load_table(conn, 'prices_daily', ['ticker', 'date', 'open', 'high', 'low', 'close', 'volume'],
+                        tickers=TEST_TICKERS + ['OBX'] if test_mode else None, filters=[('close', '>', 0)])
     print(f"    → {len(prices):,} price rows, {prices.ticker.nunique()} tickers")
 
     # Filter to stocks with enough history
@@ -124,68 +137,41 @@ def load_all_data(conn, test_mode=False) -> dict:
     print(f"    → {len(good_tickers)} tickers with ≥1yr data")
 
     # Stocks metadata
-    stocks = pd.read_sql("SELECT ticker, name, sector FROM stocks", conn)
+    stocks = load_table(conn, 'stocks', ['ticker', 'name', 'sector'])
 
     # Fundamentals
     print("  Loading fundamentals...")
-    fund_filter = ""
-    if test_mode:
-        fund_tickers = ",".join(f"'{t}'" for t in TEST_TICKERS)
-        fund_filter = f"AND ticker IN ({fund_tickers})"
-    fundamentals = pd.read_sql(f"""
-        SELECT ticker, date, bm, ep, dy, sp, mktcap
-        FROM factor_fundamentals
-        WHERE date IS NOT NULL {fund_filter}
-        ORDER BY ticker, date
-    """, conn, parse_dates=['date'])
+    fundamentals = load_table(conn, 'factor_fundamentals', ['ticker', 'date', 'bm', 'ep', 'dy', 'sp', 'mktcap'],
+                              tickers=test_tickers, filters=[('date', 'not null')])
     print(f"    → {len(fundamentals):,} fundamental rows")
 
     # Commodity prices
     print("  Loading commodities...")
-    commodities = pd.read_sql("""
-        SELECT symbol, date, close FROM commodity_prices
-        WHERE close > 0
-        ORDER BY symbol, date
-    """, conn, parse_dates=['date'])
+    commodities = load_table(conn, 'commodity_prices', ['symbol', 'date', 'close'],
+                             filters=[('close', '>', 0)], order_by='symbol, date')
     print(f"    → {len(commodities):,} commodity rows, {commodities.symbol.nunique()} symbols")
 
     # Commodity sensitivities
-    sensitivities = pd.read_sql("""
-        SELECT ticker, commodity_symbol, beta, r_squared, correlation_252d
-        FROM commodity_stock_sensitivity
-    """, conn)
+    sensitivities = load_table(conn, 'commodity_stock_sensitivity',
+                               ['ticker', 'commodity_symbol', 'beta', 'r_squared', 'correlation_252d'])
     print(f"    → {len(sensitivities):,} sensitivity rows")
 
     # Short positions
     print("  Loading shorts...")
-    short_filter = ""
-    if test_mode:
-        short_tickers = ",".join(f"'{t}'" for t in TEST_TICKERS)
-        short_filter = f"AND ticker IN ({short_tickers})"
-    shorts = pd.read_sql(f"""
-        SELECT ticker, date, short_pct, change_pct, active_positions
-        FROM short_positions
-        WHERE TRUE {short_filter}
-        ORDER BY ticker, date
-    """, conn, parse_dates=['date'])
+    shorts = load_table(conn, 'short_positions', ['ticker', 'date', 'short_pct', 'change_pct', 'active_positions'],
+                        tickers=test_tickers)
     print(f"    → {len(shorts):,} short position rows")
 
     # Shipping rates (BDI etc.)
     print("  Loading market rates...")
-    rates = pd.read_sql("""
-        SELECT index_name, rate_date AS date, rate_value AS value FROM shipping_market_rates
-        WHERE index_name IN ('BDI', 'BDTI', 'BCTI')
-        ORDER BY rate_date
-    """, conn, parse_dates=['date'])
+    rates = load_table(conn, 'shipping_market_rates', ['index_name', 'rate_date AS date', 'rate_value AS value'],
+                       filters=[('index_name', 'in', ['BDI', 'BDTI', 'BCTI'])], order_by='rate_date')
     print(f"    → {len(rates):,} market rate rows")
 
     # FX rates (NOK sensitivity)
     print("  Loading FX rates...")
-    fx = pd.read_sql("""
-        SELECT currency_pair AS pair, date, spot_rate AS rate FROM fx_spot_rates
-        WHERE currency_pair IN ('NOKUSD', 'NOKEUR')
-        ORDER BY date
-    """, conn, parse_dates=['date'])
+    fx = load_table(conn, 'fx_spot_rates', ['currency_pair AS pair', 'date', 'spot_rate AS rate'],
+                    filters=[('currency_pair', 'in', ['NOKUSD', 'NOKEUR'])])
     print(f"    → {len(fx):,} FX rate rows")
 
     # OBX index
@@ -209,7 +195,105 @@ def load_all_data(conn, test_mode=False) -> dict:
 # Feature Engineering — Focused & Effective
 # ============================================================================
 
-def engineer_features(data: dict) -> pd.DataFrame:
+def ticker_features(ticker: str, df: pd.DataFrame):
+    """Base features of one ticker's price rows (None with under 260 days of history)."""
+    df = df.sort_values('date').reset_index(drop=True)
+    if len(df) < 260:
+        return None
+
+    c = df['close'].values.astype(float)
+    h = df['high'].values.astype(float)
+    l = df['low'].values.astype(float)
+    v = df['volume'].values.astype(float)
+    dates = df['date'].values
+
+    # ---- Returns at multiple horizons ----
+    ret1d = np.concatenate([[np.nan], np.diff(np.log(np.maximum(c, 1e-8)))])
+    ret5d = pd.Series(c).pct_change(5).values
+    ret10d = pd.Series(c).pct_change(10).values
+    ret21d = pd.Series(c).pct_change(21).values
+    ret63d = pd.Series(c).pct_change(63).values
+    ret126d = pd.Series(c).pct_change(126).values
+    ret252d = pd.Series(c).pct_change(252).values
+
+    # ---- Volatility ----
+    vol5d = pd.Series(ret1d).rolling(5).std().values * np.sqrt(252)
+    vol21d = pd.Series(ret1d).rolling(21).std().values * np.sqrt(252)
+    vol63d = pd.Series(ret1d).rolling(63).std().values * np.sqrt(252)
+    vol_ratio = np.where(vol63d > 0, vol5d / vol63d, np.nan)
+
+    # ---- RSI 14 ----
+    delta = np.diff(c, prepend=c[0])
+    gains = np.where(delta > 0, delta, 0)
+    losses = np.where(delta < 0, -delta, 0)
+    avg_gain = pd.Series(gains).ewm(span=14, adjust=False).mean().values
+    avg_loss = pd.Series(losses).ewm(span=14, adjust=False).mean().values
+    rs = np.where(avg_loss > 1e-10, avg_gain / avg_loss, 100.0)
+    rsi14 = 100 - (100 / (1 + rs))
+
+    # ---- Bollinger position ----
+    sma20 = pd.Series(c).rolling(20).mean().values
+    std20 = pd.Series(c).rolling(20).std().values
+    bb_position = np.where(std20 > 1e-10, (c - sma20) / (2 * std20), 0)
+
+    # ---- Price vs SMAs ----
+    sma50 = pd.Series(c).rolling(50).mean().values
+    sma200 = pd.Series(c).rolling(200).mean().values
+    price_sma20 = np.where(sma20 > 0, c / sma20 - 1, 0)
+    price_sma50 = np.where(sma50 > 0, c / sma50 - 1, 0)
+    price_sma200 = np.where(sma200 > 0, c / sma200 - 1, 0)
+
+    # ---- 52-week position ----
+    high_52w = pd.Series(h).rolling(252).max().values
+    low_52w = pd.Series(l).rolling(252).min().values
+    dist_52w_high = np.where(high_52w > 0, c / high_52w - 1, 0)
+
+    # ---- Volume features ----
+    vol_avg20 = pd.Series(v).rolling(20).mean().values
+    vol_ratio_20d = np.where(vol_avg20 > 1e-5, v / vol_avg20, 1)
+
+    # ---- Amihud illiquidity ----
+    dollar_vol = v * c / 1e6
+    amihud = np.where(dollar_vol > 1e-8, np.abs(ret1d) / dollar_vol, np.nan)
+    amihud_21d = pd.Series(amihud).rolling(21).mean().values
+
+    # ---- MACD normalized ----
+    ema12 = pd.Series(c).ewm(span=12).mean().values
+    ema26 = pd.Series(c).ewm(span=26).mean().values
+    macd = ema12 - ema26
+    macd_signal = pd.Series(macd).ewm(span=9).mean().values
+    macd_hist = macd - macd_signal
+    macd_norm = np.where(c > 0, macd_hist / c, 0)
+
+    # ---- Short-term reversal (strong on small exchanges) ----
+    reversal_5d = -ret5d
+
+    # ---- Skewness (21d) ----
+    skew_21d = pd.Series(ret1d).rolling(21).skew().values
+
+    feat = pd.DataFrame({
+        'date': dates,
+        'ticker': ticker,
+        'close': c,
+        # Returns (7 horizons)
+        'ret_1d': ret1d, 'ret_5d': ret5d, 'ret_10d': ret10d,
+        'ret_21d': ret21d, 'ret_63d': ret63d, 'ret_126d': ret126d, 'ret_252d': ret252d,
+        # Volatility
+        'vol_5d': vol5d, 'vol_21d': vol21d, 'vol_63d': vol63d, 'vol_ratio': vol_ratio,
+        # Technical
+        'rsi_14': rsi14, 'bb_position': bb_position,
+        'price_sma20': price_sma20, 'price_sma50': price_sma50, 'price_sma200': price_sma200,
+        'dist_52w_high': dist_52w_high,
+        'macd_norm': macd_norm,
+        # Volume & liquidity
+        'vol_ratio_20d': vol_ratio_20d, 'amihud_21d': amihud_21d,
+        # Reversal & distribution
+        'reversal_5d': reversal_5d, 'skew_21d': skew_21d,
+    })
+    return feat
+
+
+def engineer_features(data: dict, jobs: int = 1) -> pd.DataFrame:
     """Build feature matrix — focused on features that actually predict."""
     print("\n[2/6] ENGINEERING FEATURES")
     print("=" * 60)
@@ -243,105 +327,12 @@ def engineer_features(data: dict) -> pd.DataFrame:
     tickers = [t for t in data['good_tickers'] if t != 'OBX']
     print(f"  Processing {len(tickers)} tickers...")
 
-    for i, ticker in enumerate(tickers):
+    prices_by_ticker = TickerFrames(prices)
+    for i, feat in enumerate(map_tickers(ticker_features, prices_by_ticker, tickers, jobs=jobs)):
         if (i + 1) % 25 == 0:
             print(f"    → {i+1}/{len(tickers)}")
-
-        df = prices[prices.ticker == ticker].copy().sort_values('date').reset_index(drop=True)
-        if len(df) < 260:
-            continue
-
-        c = df['close'].values.astype(float)
-        h = df['high'].values.astype(float)
-        l = df['low'].values.astype(float)
-        v = df['volume'].values.astype(float)
-        dates = df['date'].values
-
-        # ---- Returns at multiple horizons ----
-        ret1d = np.concatenate([[np.nan], np.diff(np.log(np.maximum(c, 1e-8)))])
-        ret5d = pd.Series(c).pct_change(5).values
-        ret10d = pd.Series(c).pct_change(10).values
-        ret21d = pd.Series(c).pct_change(21).values
-        ret63d = pd.Series(c).pct_change(63).values
-        ret126d = pd.Series(c).pct_change(126).values
-        ret252d = pd.Series(c).pct_change(252).values
-
-        # ---- Volatility ----
-        vol5d = pd.Series(ret1d).rolling(5).std().values * np.sqrt(252)
-        vol21d = pd.Series(ret1d).rolling(21).std().values * np.sqrt(252)
-        vol63d = pd.Series(ret1d).rolling(63).std().values * np.sqrt(252)
-        vol_ratio = np.where(vol63d > 0, vol5d / vol63d, np.nan)
-
-        # ---- RSI 14 ----
-        delta = np.diff(c, prepend=c[0])
-        gains = np.where(delta > 0, delta, 0)
-        losses = np.where(delta < 0, -delta, 0)
-        avg_gain = pd.Series(gains).ewm(span=14, adjust=False).mean().values
-        avg_loss = pd.Series(losses).ewm(span=14, adjust=False).mean().values
-        rs = np.where(avg_loss > 1e-10, avg_gain / avg_loss, 100.0)
-        rsi14 = 100 - (100 / (1 + rs))
-
-        # ---- Bollinger position ----
-        sma20 = pd.Series(c).rolling(20).mean().values
-        std20 = pd.Series(c).rolling(20).std().values
-        bb_position = np.where(std20 > 1e-10, (c - sma20) / (2 * std20), 0)
-
-        # ---- Price vs SMAs ----
-        sma50 = pd.Series(c).rolling(50).mean().values
-        sma200 = pd.Series(c).rolling(200).mean().values
-        price_sma20 = np.where(sma20 > 0, c / sma20 - 1, 0)
-        price_sma50 = np.where(sma50 > 0, c / sma50 - 1, 0)
-        price_sma200 = np.where(sma200 > 0, c / sma200 - 1, 0)
-
-        # ---- 52-week position ----
-        high_52w = pd.Series(h).rolling(252).max().values
-        low_52w = pd.Series(l).rolling(252).min().values
-        dist_52w_high = np.where(high_52w > 0, c / high_52w - 1, 0)
-
-        # ---- Volume features ----
-        vol_avg20 = pd.Series(v).rolling(20).mean().values
-        vol_ratio_20d = np.where(vol_avg20 > 1e-5, v / vol_avg20, 1)
-
-        # ---- Amihud illiquidity ----
-        dollar_vol = v * c / 1e6
-        amihud = np.where(dollar_vol > 1e-8, np.abs(ret1d) / dollar_vol, np.nan)
-        amihud_21d = pd.Series(amihud).rolling(21).mean().values
-
-        # ---- MACD normalized ----
-        ema12 = pd.Series(c).ewm(span=12).mean().values
-        ema26 = pd.Series(c).ewm(span=26).mean().values
-        macd = ema12 - ema26
-        macd_signal = pd.Series(macd).ewm(span=9).mean().values
-        macd_hist = macd - macd_signal
-        macd_norm = np.where(c > 0, macd_hist / c, 0)
-
-        # ---- Short-term reversal (strong on small exchanges) ----
-        reversal_5d = -ret5d
-
-        # ---- Skewness (21d) ----
-        skew_21d = pd.Series(ret1d).rolling(21).skew().values
-
-        feat = pd.DataFrame({
-            'date': dates,
-            'ticker': ticker,
-            'close': c,
-            # Returns (7 horizons)
-            'ret_1d': ret1d, 'ret_5d': ret5d, 'ret_10d': ret10d,
-            'ret_21d': ret21d, 'ret_63d': ret63d, 'ret_126d': ret126d, 'ret_252d': ret252d,
-            # Volatility
-            'vol_5d': vol5d, 'vol_21d': vol21d, 'vol_63d': vol63d, 'vol_ratio': vol_ratio,
-            # Technical
-            'rsi_14': rsi14, 'bb_position': bb_position,
-            'price_sma20': price_sma20, 'price_sma50': price_sma50, 'price_sma200': price_sma200,
-            'dist_52w_high': dist_52w_high,
-            'macd_norm': macd_norm,
-            # Volume & liquidity
-            'vol_ratio_20d': vol_ratio_20d, 'amihud_21d': amihud_21d,
-            # Reversal & distribution
-            'reversal_5d': reversal_5d, 'skew_21d': skew_21d,
-        })
-
-        all_features.append(feat)
+        if feat is not None:
+            all_features.append(feat)
 
     features = pd.concat(all_features, ignore_index=True)
     features['date'] = pd.to_datetime(features['date'])
@@ -656,6 +647,7 @@ def train_walk_forward(features: pd.DataFrame, feature_cols: List[str],
                 random_seed=42,
                 verbose=0,
                 early_stopping_rounds=30,
+                allow_writing_files=False,
             )
             cat_model.fit(X_tr, y_tr, eval_set=(X_val, y_val), verbose=False)
             cat_pred = cat_model.predict(X_test)
@@ -814,19 +806,22 @@ def evaluate(results: dict):
 # Generate Signals for Latest Date
 # ============================================================================
 
-def generate_signals(features: pd.DataFrame, results: dict, conn, horizon='21d'):
+def generate_signals(features: pd.DataFrame, results: dict, conn, horizon='21d', tree_backend='native'):
     """Generate and store signals for the most recent dates."""
     print(f"\n[5/6] GENERATING SIGNALS ({horizon})")
     print("=" * 60)
 
     feature_cols = results['feature_cols']
-    xgb_model = results['last_xgb_model']
-    lgbm_model = results['last_lgbm_model']
     cat_model = results.get('last_cat_model')
 
     # Latest 5 dates with features
     latest_dates = sorted(features['date'].unique())[-5:]
 
+    # Compile once; scoring below is ~one small batch per date
+    check = features.loc[features['date'].isin(latest_dates), feature_cols].fillna(0).values
+    xgb_model = select_tree_backend(results['last_xgb_model'], tree_backend, check=check)
+    lgbm_model = select_tree_backend(results['last_lgbm_model'], tree_backend, check=check)
+
     all_signals = []
     for date in latest_dates:
         day_data = features[features['date'] == date].copy()
@@ -937,19 +932,9 @@ def generate_signals(features: pd.DataFrame, results: dict, conn, horizon='21d')
     # Only delete signals for this horizon version
     cur.execute("DELETE FROM alpha_signals WHERE model_id LIKE %s", (f'%v4_{horizon}',))
 
-    execute_values(
-        cur,
-        """INSERT INTO alpha_signals (ticker, signal_date, model_id, signal_value, predicted_return, confidence, horizon)
-           VALUES %s
-           ON CONFLICT (ticker, signal_date, model_id, horizon) DO UPDATE SET
-             signal_value = EXCLUDED.signal_value,
-             predicted_return = EXCLUDED.predicted_return,
-             confidence = EXCLUDED.confidence""",
-        unique,
-        page_size=500,
-    )
-    conn.commit()
-    print(f"  → Signals written to database")
+    copy_upsert(conn, 'alpha_signals',
+                ['ticker', 'signal_date', 'model_id', 'signal_value', 'predicted_return', 'confidence', 'horizon'],
+                unique, key=['ticker', 'signal_date', 'model_id', 'horizon'], label='signals')
 
     return len(unique)
 
@@ -974,7 +959,7 @@ def write_performance(results: dict, conn, horizon='21d'):
     if 'cat_pred' in pred_df.columns:
         model_cols.append(('cat_pred', f'cat_v4_{horizon}'))
 
-    records = 0
+    perf_rows = []
     for model_col, model_id in model_cols:
         dates = sorted(pred_df['date'].unique())
 
@@ -1011,20 +996,13 @@ def write_performance(results: dict, conn, horizon='21d'):
                 sharpe = (np.mean(ls_rets) / np.std(ls_rets) * np.sqrt(12)) if ls_rets and len(ls_rets) > 1 and np.std(ls_rets) > 1e-10 else 0
 
                 eval_date_str = str(eval_date)[:10]
-                cur.execute("""
-                    INSERT INTO alpha_model_performance
-                      (model_id, evaluation_date, window_days, hit_rate, ic, mae, sharpe, long_short_return, n_predictions)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-                    ON CONFLICT (model_id, evaluation_date, window_days) DO UPDATE SET
-                      hit_rate = EXCLUDED.hit_rate, ic = EXCLUDED.ic, mae = EXCLUDED.mae,
-                      sharpe = EXCLUDED.sharpe, long_short_return = EXCLUDED.long_short_return,
-                      n_predictions = EXCLUDED.n_predictions
-                """, (model_id, eval_date_str, window_days, float(hits), float(ic),
-                      float(mae), float(sharpe), float(ls_ret_avg), len(window_data)))
-                records += 1
-
-    conn.commit()
-    print(f"  → {records} performance records written")
+                perf_rows.append((model_id, eval_date_str, window_days, float(hits), float(ic),
+                                  float(mae), float(sharpe), float(ls_ret_avg), len(window_data)))
+
+    copy_upsert(conn, 'alpha_model_performance',
+                ['model_id', 'evaluation_date', 'window_days', 'hit_rate', 'ic', 'mae', 'sharpe',
+                 'long_short_return', 'n_predictions'],
+                perf_rows, key=['model_id', 'evaluation_date', 'window_days'], label='performance records')
 
 
 # ============================================================================
@@ -1036,7 +1014,20 @@ def main():
     parser.add_argument('--test', action='store_true', help='Run on 15 liquid stocks only')
     parser.add_argument('--evaluate-only', action='store_true')
     parser.add_argument('--max-features', type=int, default=40, help='Max features after selection')
+    parser.add_argument('--tree-backend', choices=TREE_BACKENDS, default='native',
+                        help='Scoring backend for signal generation (compiled = NumPy tree evaluator for '
+                             'batches up to COMPILED_TREE_MAX_ROWS rows, native above)')
+    parser.add_argument('--feature-store', action='store_true',
+                        help='Read the feature panel from FEATURE_STORE_DIR when prices are unchanged')
+    parser.add_argument('--rebuild-features', action='store_true',
+                        help='With --feature-store, rebuild the stored panel from scratch')
+    parser.add_argument('--data-backend', choices=DATA_BACKENDS, default=data_backend(),
+                        help='Read market data from Postgres or the local Arrow snapshot '
+                             '(synced by python -m app.sync_snapshot)')
+    parser.add_argument('--jobs', type=int, default=FEATURE_JOBS,
+                        help='Worker processes for the per-ticker feature stage (0 = one per CPU)')
     args = parser.parse_args()
+    set_data_backend(args.data_backend)
 
     print("=" * 60)
     print("  ALPHA ENGINE — ML TRAINING PIPELINE v4")
@@ -1054,11 +1045,17 @@ def main():
 
     conn = get_connection()
 
-    # Load data
-    data = load_all_data(conn, test_mode=args.test)
-
-    # Engineer features
-    features = engineer_features(data)
+    # Load data + engineer features (stored panel with --feature-store). Features are
+    # winsorised with full-history quantiles, so new prices rebuild the whole panel.
+    store = FeatureStore() if args.feature_store else None
+    features = cached_features(
+        store, feature_group('v4', args.test),
+        feature_version(load_all_data, engineer_features, ticker_features, test=args.test),
+        latest_price_date(conn) if store else None,
+        load=lambda: load_all_data(conn, test_mode=args.test),
+        build=lambda data: engineer_features(data, jobs=args.jobs),
+        targets=['fwd_ret_5d', 'fwd_ret_21d'], rebuild=args.rebuild_features, incremental=False,
+    )
 
     # Feature selection
     selected_21d = select_features(features, target='fwd_ret_21d_rank', max_features=args.max_features)
@@ -1080,8 +1077,8 @@ def main():
         conn.commit()
 
         # Generate signals for both horizons
-        n_21d = generate_signals(features, results_21d, conn, horizon='21d')
-        n_5d = generate_signals(features, results_5d, conn, horizon='5d')
+        n_21d = generate_signals(features, results_21d, conn, horizon='21d', tree_backend=args.tree_backend)
+        n_5d = generate_signals(features, results_5d, conn, horizon='5d', tree_backend=args.tree_backend)
 
         # Write performance
         write_performance(results_21d, conn, horizon='21d')
@@ -29,7 +29,6 @@ sys.stdout = os.fdopen(sys.stdout.fileno(), 'w', 1)
 import numpy as np
 import pandas as pd
 import psycopg2
-from psycopg2.extras import execute_values
 import xgboost as xgb
 import lightgbm as lgbm
 from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score
@@ -41,6 +40,23 @@ try:
 except ImportError:
     HAS_CATBOOST = False
 
+try:  # run as app.alpha_trainer_v5 or as a script from app/
+    from .utils.feature_store import (
+        FeatureStore, cached_features, feature_group, feature_version, latest_price_date,
+    )
+    from .utils.parallel import FEATURE_JOBS, TickerFrames, map_tickers
+    from .utils.bulk_write import copy_upsert
+    from .utils.bulk_read import copy_select, load_table
+    from .utils.snapshot import DATA_BACKENDS, data_backend, set_data_backend
+except ImportError:
+    from utils.feature_store import (
+        FeatureStore, cached_features, feature_group, feature_version, latest_price_date,
+    )
+    from utils.parallel import FEATURE_JOBS, TickerFrames, map_tickers
+    from utils.bulk_write import copy_upsert
+    from utils.bulk_read import copy_select, load_table
+    from utils.snapshot import DATA_BACKENDS, data_backend, set_data_backend
+
 warnings.filterwarnings("ignore")
 
 TEST_TICKERS = [
@@ -84,56 +100,36 @@ def load_data(conn, test_mode=False) -> dict:
     print("\n[1/7] LOADING DATA")
     print("=" * 60)
 
-    ticker_filter = ""
-    if test_mode:
-        tickers_str = ",".join(f"'{t}'" for t in TEST_TICKERS + ['OBX'])
-        ticker_filter = f"AND ticker IN ({tickers_str})"
+    test_tickers = TEST_TICKERS if test_mode else None
 
-    prices = pd.read_sql(f"""
-        SELECT ticker, date, open, high, low, close, volume
-        FROM prices_daily WHERE close > 0 {ticker_filter}
-        ORDER BY ticker, date
-    """, conn, parse_dates=['date'])
+    prices = load_table(conn, 'prices_daily', ['ticker', 'date', 'open', 'high', 'low', 'close', 'volume'],
+                        tickers=TEST_TICKERS + ['OBX'] if test_mode else None, filters=[('close', '>', 0)])
     print(f"  Prices: {len(prices):,} rows, {prices.ticker.nunique()} tickers")
 
     good_tickers = prices.groupby('ticker').size()
     good_tickers = good_tickers[good_tickers >= 252].index.tolist()
     prices = prices[prices.ticker.isin(good_tickers)]
 
-    stocks = pd.read_sql("SELECT ticker, name, sector FROM stocks", conn)
+    stocks = load_table(conn, 'stocks', ['ticker', 'name', 'sector'])
 
-    fund_filter = f"AND ticker IN ({','.join(repr(t) for t in TEST_TICKERS)})" if test_mode else ""
-    fundamentals = pd.read_sql(f"""
-        SELECT ticker, date, bm, ep, dy, sp, mktcap
-        FROM factor_fundamentals WHERE date IS NOT NULL {fund_filter}
-        ORDER BY ticker, date
-    """, conn, parse_dates=['date'])
+    fundamentals = load_table(conn, 'factor_fundamentals', ['ticker', 'date', 'bm', 'ep', 'dy', 'sp', 'mktcap'],
+                              tickers=test_tickers, filters=[('date', 'not null')])
     print(f"  Fundamentals: {len(fundamentals):,}")
 
-    commodities = pd.read_sql("""
-        SELECT symbol, date, close FROM commodity_prices
-        WHERE close > 0 ORDER BY symbol, date
-    """, conn, parse_dates=['date'])
+    commodities = load_table(conn, 'commodity_prices', ['symbol', 'date', 'close'],
+                             filters=[('close', '>', 0)], order_by='symbol, date')
     print(f"  Commodities: {len(commodities):,}")
 
-    short_filter = f"AND ticker IN ({','.join(repr(t) for t in TEST_TICKERS)})" if test_mode else ""
-    shorts = pd.read_sql(f"""
-        SELECT ticker, date, short_pct, change_pct
-        FROM short_positions WHERE TRUE {short_filter}
-        ORDER BY ticker, date
-    """, conn, parse_dates=['date'])
+    shorts = load_table(conn, 'short_positions', ['ticker', 'date', 'short_pct', 'change_pct'], tickers=test_tickers)
     print(f"  Shorts: {len(shorts):,}")
 
-    fx = pd.read_sql("""
-        SELECT currency_pair AS pair, date, spot_rate AS rate FROM fx_spot_rates
-        WHERE currency_pair IN ('NOKUSD', 'NOKEUR')
-        ORDER BY date
-    """, conn, parse_dates=['date'])
+    fx = load_table(conn, 'fx_spot_rates', ['currency_pair AS pair', 'date', 'spot_rate AS rate'],
+                    filters=[('currency_pair', 'in', ['NOKUSD', 'NOKEUR'])])
     print(f"  FX: {len(fx):,}")
 
     # Insider transactions (strongest single predictor per academic lit)
     try:
-        insider = pd.read_sql("""
+        insider = copy_select(conn, """
             SELECT ticker, transaction_date AS date,
                    SUM(CASE WHEN transaction_type IN ('Buy', 'Kjøp', 'Purchase') THEN total_value_nok ELSE 0 END) AS insider_buy_value,
                    SUM(CASE WHEN transaction_type IN ('Sell', 'Salg', 'Sale') THEN total_value_nok ELSE 0 END) AS insider_sell_value,
@@ -142,9 +138,10 @@ def load_data(conn, test_mode=False) -> dict:
             WHERE transaction_date IS NOT NULL AND total_value_nok > 0
             GROUP BY ticker, transaction_date
             ORDER BY ticker, transaction_date
-        """, conn, parse_dates=['date'])
+        """, columns=['ticker', 'date', 'insider_buy_value', 'insider_sell_value', 'insider_tx_count'])
     except Exception as e:
         print(f"  Insider query failed ({e}), using empty DataFrame")
+        conn.rollback()
         insider = pd.DataFrame(columns=['ticker', 'date', 'insider_buy_value', 'insider_sell_value', 'insider_tx_count'])
     print(f"  Insider transactions: {len(insider):,}")
 
@@ -161,7 +158,95 @@ def load_data(conn, test_mode=False) -> dict:
 # Feature Engineering
 # ============================================================================
 
-def engineer_features(data: dict) -> pd.DataFrame:
+def ticker_features(ticker: str, df: pd.DataFrame):
+    """Base features of one ticker's price rows (None with under 300 days of history)."""
+    df = df.sort_values('date').reset_index(drop=True)
+    if len(df) < 300:
+        return None
+
+    c = df['close'].values.astype(float)
+    h = df['high'].values.astype(float)
+    l = df['low'].values.astype(float)
+    v = df['volume'].values.astype(float)
+    dates = df['date'].values
+
+    # Returns
+    ret1d = np.concatenate([[np.nan], np.diff(np.log(np.maximum(c, 1e-8)))])
+    ret5d = pd.Series(c).pct_change(5).values
+    ret21d = pd.Series(c).pct_change(21).values
+    ret63d = pd.Series(c).pct_change(63).values
+    ret252d = pd.Series(c).pct_change(252).values
+
+    # Volatility
+    vol21d = pd.Series(ret1d).rolling(21).std().values * np.sqrt(252)
+    vol63d = pd.Series(ret1d).rolling(63).std().values * np.sqrt(252)
+
+    # RSI
+    delta = np.diff(c, prepend=c[0])
+    gains = np.where(delta > 0, delta, 0)
+    losses = np.where(delta < 0, -delta, 0)
+    avg_gain = pd.Series(gains).ewm(span=14, adjust=False).mean().values
+    avg_loss = pd.Series(losses).ewm(span=14, adjust=False).mean().values
+    rs = np.where(avg_loss > 1e-10, avg_gain / avg_loss, 100.0)
+    rsi14 = 100 - (100 / (1 + rs))
+
+    # Bollinger
+    sma20 = pd.Series(c).rolling(20).mean().values
+    std20 = pd.Series(c).rolling(20).std().values
+    bb_pos = np.where(std20 > 1e-10, (c - sma20) / (2 * std20), 0)
+
+    # Price vs SMAs (TREND INDICATORS — key for hit rate)
+    sma50 = pd.Series(c).rolling(50).mean().values
+    sma200 = pd.Series(c).rolling(200).mean().values
+    above_sma20 = (c > sma20).astype(int)
+    above_sma50 = (c > sma50).astype(int)
+    above_sma200 = (c > sma200).astype(int)
+    trend_score = above_sma20 + above_sma50 + above_sma200  # 0-3
+
+    price_sma50 = np.where(sma50 > 0, c / sma50 - 1, 0)
+    price_sma200 = np.where(sma200 > 0, c / sma200 - 1, 0)
+
+    # Distance to 52w high
+    high_52w = pd.Series(h).rolling(252).max().values
+    dist_52w = np.where(high_52w > 0, c / high_52w - 1, 0)
+
+    # MACD
+    ema12 = pd.Series(c).ewm(span=12).mean().values
+    ema26 = pd.Series(c).ewm(span=26).mean().values
+    macd = ema12 - ema26
+    macd_signal = pd.Series(macd).ewm(span=9).mean().values
+    macd_above = (macd > macd_signal).astype(int)
+
+    # Volume
+    vol_avg20 = pd.Series(v).rolling(20).mean().values
+    vol_ratio = np.where(vol_avg20 > 1e-5, v / vol_avg20, 1)
+
+    # Reversal
+    reversal_5d = -ret5d
+
+    # Momentum alignment (how many timeframes agree on direction)
+    mom_align = ((ret5d > 0).astype(int) + (ret21d > 0).astype(int) +
+                 (ret63d > 0).astype(int))  # 0-3
+
+    feat = pd.DataFrame({
+        'date': dates, 'ticker': ticker, 'close': c,
+        'ret_1d': ret1d, 'ret_5d': ret5d, 'ret_21d': ret21d,
+        'ret_63d': ret63d, 'ret_252d': ret252d,
+        'vol_21d': vol21d, 'vol_63d': vol63d,
+        'rsi_14': rsi14, 'bb_pos': bb_pos,
+        'above_sma20': above_sma20, 'above_sma50': above_sma50,
+        'above_sma200': above_sma200, 'trend_score': trend_score,
+        'price_sma50': price_sma50, 'price_sma200': price_sma200,
+        'dist_52w': dist_52w,
+        'macd_above': macd_above,
+        'vol_ratio': vol_ratio,
+        'reversal_5d': reversal_5d,
+        'mom_align': mom_align,
+    })
+    return feat
+
+
+def engineer_features(data: dict, jobs: int = 1) -> pd.DataFrame:
     print("\n[2/7] ENGINEERING FEATURES")
     print("=" * 60)
 
@@ -194,94 +279,12 @@ def engineer_features(data: dict) -> pd.DataFrame:
     print(f"  Processing {len(tickers)} tickers...")
 
     all_features = []
-    for i, ticker in enumerate(tickers):
+    prices_by_ticker = TickerFrames(prices)
+    for i, feat in enumerate(map_tickers(ticker_features, prices_by_ticker, tickers, jobs=jobs)):
         if (i + 1) % 50 == 0:
             print(f"    → {i+1}/{len(tickers)}")
-
-        df = prices[prices.ticker == ticker].sort_values('date').reset_index(drop=True)
-        if len(df) < 300:
-            continue
-
-        c = df['close'].values.astype(float)
-        h = df['high'].values.astype(float)
-        l = df['low'].values.astype(float)
-        v = df['volume'].values.astype(float)
-        dates = df['date'].values
-
-        # Returns
-        ret1d = np.concatenate([[np.nan], np.diff(np.log(np.maximum(c, 1e-8)))])
-        ret5d = pd.Series(c).pct_change(5).values
-        ret21d = pd.Series(c).pct_change(21).values
-        ret63d = pd.Series(c).pct_change(63).values
-        ret252d = pd.Series(c).pct_change(252).values
-
-        # Volatility
-        vol21d = pd.Series(ret1d).rolling(21).std().values * np.sqrt(252)
-        vol63d = pd.Series(ret1d).rolling(63).std().values * np.sqrt(252)
-
-        # RSI
-        delta = np.diff(c, prepend=c[0])
-        gains = np.where(delta > 0, delta, 0)
-        losses = np.where(delta < 0, -delta, 0)
-        avg_gain = pd.Series(gains).ewm(span=14, adjust=False).mean().values
-        avg_loss = pd.Series(losses).ewm(span=14, adjust=False).mean().values
-        rs = np.where(avg_loss > 1e-10, avg_gain / avg_loss, 100.0)
-        rsi14 = 100 - (100 / (1 + rs))
-
-        # Bollinger
-        sma20 = pd.Series(c).rolling(20).mean().values
-        std20 = pd.Series(c).rolling(20).std().values
-        bb_pos = np.where(std20 > 1e-10, (c - sma20) / (2 * std20), 0)
-
-        # Price vs SMAs (TREND INDICATORS — key for hit rate)
-        sma50 = pd.Series(c).rolling(50).mean().values
-        sma200 = pd.Series(c).rolling(200).mean().values
-        above_sma20 = (c > sma20).astype(int)
-        above_sma50 = (c > sma50).astype(int)
-        above_sma200 = (c > sma200).astype(int)
-        trend_score = above_sma20 + above_sma50 + above_sma200  # 0-3
-
-        price_sma50 = np.where(sma50 > 0, c / sma50 - 1, 0)
-        price_sma200 = np.where(sma200 > 0, c / sma200 - 1, 0)
-
-        # Distance to 52w high
-        high_52w = pd.Series(h).rolling(252).max().values
-        dist_52w = np.where(high_52w > 0, c / high_52w - 1, 0)
-
-        # MACD
-        ema12 = pd.Series(c).ewm(span=12).mean().values
-        ema26 = pd.Series(c).ewm(span=26).mean().values
-        macd = ema12 - ema26
-        macd_signal = pd.Series(macd).ewm(span=9).mean().values
-        macd_above = (macd > macd_signal).astype(int)
-
-        # Volume
-        vol_avg20 = pd.Series(v).rolling(20).mean().values
-        vol_ratio = np.where(vol_avg20 > 1e-5, v / vol_avg20, 1)
-
-        # Reversal
-        reversal_5d = -ret5d
-
-        # Momentum alignment (how many timeframes agree on direction)
-        mom_align = ((ret5d > 0).astype(int) + (ret21d > 0).astype(int) +
-                     (ret63d > 0).astype(int))  # 0-3
-
-        feat = pd.DataFrame({
-            'date': dates, 'ticker': ticker, 'close': c,
-            'ret_1d': ret1d, 'ret_5d': ret5d, 'ret_21d': ret21d,
-            'ret_63d': ret63d, 'ret_252d': ret252d,
-            'vol_21d': vol21d, 'vol_63d': vol63d,
-            'rsi_14': rsi14, 'bb_pos': bb_pos,
-            'above_sma20': above_sma20, 'above_sma50': above_sma50,
-            'above_sma200': above_sma200, 'trend_score': trend_score,
-            'price_sma50': price_sma50, 'price_sma200': price_sma200,
-            'dist_52w': dist_52w,
-            'macd_above': macd_above,
-            'vol_ratio': vol_ratio,
-            'reversal_5d': reversal_5d,
-            'mom_align': mom_align,
-        })
-        all_features.append(feat)
+        if feat is not None:
+            all_features.append(feat)
 
     features = pd.concat(all_features, ignore_index=True)
     features['date'] = pd.to_datetime(features['date'])
@@ -534,7 +537,7 @@ def train_classifier(features: pd.DataFrame, feature_cols: List[str],
                 iterations=500, depth=3, learning_rate=0.02,
                 l2_leaf_reg=5.0, subsample=0.7,
                 random_seed=42, verbose=0,
-                early_stopping_rounds=30,
+                early_stopping_rounds=30, allow_writing_files=False,
             )
             cat_model.fit(X_tr, y_tr, eval_set=(X_val, y_val), verbose=False)
             cat_prob = cat_model.predict_proba(X_test)[:, 1]
@@ -783,22 +786,9 @@ def generate_signals(features, results, conn, horizon='21d', eval_results=None):
     cur = conn.cursor()
     cur.execute("DELETE FROM alpha_signals WHERE model_id LIKE %s", (f'%v5_{horizon}',))
 
-    # Batch insert
-    BATCH = 2000
-    for i in range(0, len(unique), BATCH):
-        batch = unique[i:i+BATCH]
-        execute_values(
-            cur,
-            """INSERT INTO alpha_signals (ticker, signal_date, model_id, signal_value, predicted_return, confidence, horizon)
-               VALUES %s
-               ON CONFLICT (ticker, signal_date, model_id, horizon) DO UPDATE SET
-                 signal_value = EXCLUDED.signal_value,
-                 predicted_return = EXCLUDED.predicted_return,
-                 confidence = EXCLUDED.confidence""",
-            batch, page_size=500,
-        )
-    conn.commit()
-    print(f"  → Written to database")
+    copy_upsert(conn, 'alpha_signals',
+                ['ticker', 'signal_date', 'model_id', 'signal_value', 'predicted_return', 'confidence', 'horizon'],
+                unique, key=['ticker', 'signal_date', 'model_id', 'horizon'], label='signals')
     return len(unique)
 
 
@@ -819,7 +809,7 @@ def write_performance(results, conn, horizon='21d'):
     if 'cat_prob' in pred_df.columns:
         model_cols.append(('cat_prob', f'cat_v5_{horizon}'))
 
-    records = 0
+    perf_rows = []
     for model_col, model_id in model_cols:
         dates = sorted(pred_df['date'].unique())
         for window_days in [21, 63]:
@@ -853,21 +843,14 @@ def write_performance(results, conn, horizon='21d'):
                 ls_ret = np.mean(ls_rets) if ls_rets else 0
                 sharpe = (np.mean(ls_rets) / np.std(ls_rets) * np.sqrt(12)) if len(ls_rets) > 1 and np.std(ls_rets) > 1e-10 else 0
 
-                cur.execute("""
-                    INSERT INTO alpha_model_performance
-                      (model_id, evaluation_date, window_days, hit_rate, ic, mae, sharpe, long_short_return, n_predictions)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-                    ON CONFLICT (model_id, evaluation_date, window_days) DO UPDATE SET
-                      hit_rate = EXCLUDED.hit_rate, ic = EXCLUDED.ic, mae = EXCLUDED.mae,
-                      sharpe = EXCLUDED.sharpe, long_short_return = EXCLUDED.long_short_return,
-                      n_predictions = EXCLUDED.n_predictions
-                """, (model_id, str(eval_date)[:10], window_days,
-                      float(hit_rate), float(ic), float(mae), float(sharpe),
-                      float(ls_ret), len(window_data)))
-                records += 1
+                perf_rows.append((model_id, str(eval_date)[:10], window_days,
+                                  float(hit_rate), float(ic), float(mae), float(sharpe),
+                                  float(ls_ret), len(window_data)))
 
-    conn.commit()
-    print(f"  → {records} records written")
+    copy_upsert(conn, 'alpha_model_performance',
+                ['model_id', 'evaluation_date', 'window_days', 'hit_rate', 'ic', 'mae', 'sharpe',
+                 'long_short_return', 'n_predictions'],
+                perf_rows, key=['model_id', 'evaluation_date', 'window_days'], label='records')
 
 
 # ============================================================================
@@ -878,7 +861,17 @@ def main():
     parser = argparse.ArgumentParser(description='Alpha Engine v5 — High Hit-Rate')
     parser.add_argument('--test', action='store_true')
     parser.add_argument('--evaluate-only', action='store_true')
+    parser.add_argument('--feature-store', action='store_true',
+                        help='Read the feature panel from FEATURE_STORE_DIR when prices are unchanged')
+    parser.add_argument('--rebuild-features', action='store_true',
+                        help='With --feature-store, rebuild the stored panel from scratch')
+    parser.add_argument('--data-backend', choices=DATA_BACKENDS, default=data_backend(),
+                        help='Read market data from Postgres or the local Arrow snapshot '
+                             '(synced by python -m app.sync_snapshot)')
+    parser.add_argument('--jobs', type=int, default=FEATURE_JOBS,
+                        help='Worker processes for the per-ticker feature stage (0 = one per CPU)')
     args = parser.parse_args()
+    set_data_backend(args.data_backend)
 
     print("=" * 60)
     print("  ALPHA ENGINE v5 — HIGH HIT-RATE CLASSIFIER")
@@ -892,8 +885,16 @@ def main():
     print("=" * 60)
 
     conn = get_connection()
-    data = load_data(conn, test_mode=args.test)
-    features = engineer_features(data)
+    # Features are winsorised with full-history quantiles, so new prices rebuild the stored panel
+    store = FeatureStore() if args.feature_store else None
+    features = cached_features(
+        store, feature_group('v5', args.test),
+        feature_version(load_data, engineer_features, ticker_features, test=args.test),
+        latest_price_date(conn) if store else None,
+        load=lambda: load_data(conn, test_mode=args.test),
+        build=lambda data: engineer_features(data, jobs=args.jobs),
+        targets=['fwd_ret_5d', 'fwd_ret_21d'], rebuild=args.rebuild_features, incremental=False,
+    )
 
     # 21D classifier
     selected_21d = select_features(features, target='target_dir_21d', max_features=35)
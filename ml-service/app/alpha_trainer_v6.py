@@ -29,6 +29,7 @@ Usage:
   python alpha_trainer_v6.py --test     # 15 liquid stocks, fast iteration
   python alpha_trainer_v6.py            # Full universe
   python alpha_trainer_v6.py --no-write # Evaluate only, don't write signals
+  python alpha_trainer_v6.py --memory-budget 8  # float32 panel, peak RSS per stage
 """
 
 import argparse
@@ -53,6 +54,43 @@ import xgboost as xgb
 import lightgbm as lgb
 import catboost as cb
 
+try:  # run as app.alpha_trainer_v6 or as a script from app/
+    from .utils.feature_store import (
+        FeatureStore, cached_features, feature_group, feature_version, latest_price_date,
+    )
+    from .utils.parallel import FEATURE_JOBS, TickerFrames, map_tasks, map_tickers, resolve_jobs
+    from .utils.folds import FOLD_JOBS, DateSlicer, fold_threads, take_rows, with_threads
+    from .utils.bulk_write import copy_upsert
+    from .utils.bulk_read import load_table
+    from .utils.memory import MEMORY_BUDGET_GB, MemoryLog
+    from .utils.panel import Panel, downcast, plain
+    from .utils.snapshot import DATA_BACKENDS, data_backend, set_data_backend
+    from .utils.feature_engine import (
+        FeatureState, Lag, RollingMean, RollingVar, RollingMax, RollingMin, RollingApply, EWMMean,
+        StateStore, advance, pending_bars,
+    )
+    from .utils.window_features import (
+        rolling_approx_entropy, rolling_hurst, rolling_ou_halflife, rolling_spectral_entropy, trailing_apply,
+    )
+except ImportError:
+    from utils.feature_store import (
+        FeatureStore, cached_features, feature_group, feature_version, latest_price_date,
+    )
+    from utils.parallel import FEATURE_JOBS, TickerFrames, map_tasks, map_tickers, resolve_jobs
+    from utils.folds import FOLD_JOBS, DateSlicer, fold_threads, take_rows, with_threads
+    from utils.bulk_write import copy_upsert
+    from utils.bulk_read import load_table
+    from utils.memory import MEMORY_BUDGET_GB, MemoryLog
+    from utils.panel import Panel, downcast, plain
+    from utils.snapshot import DATA_BACKENDS, data_backend, set_data_backend
+    from utils.feature_engine import (
+        FeatureState, Lag, RollingMean, RollingVar, RollingMax, RollingMin, RollingApply, EWMMean,
+        StateStore, advance, pending_bars,
+    )
+    from utils.window_features import (
+        rolling_approx_entropy, rolling_hurst, rolling_ou_halflife, rolling_spectral_entropy, trailing_apply,
+    )
+
 warnings.filterwarnings('ignore')
 sys.stdout = os.fdopen(sys.stdout.fileno(), 'w', 1)  # unbuffered
 
@@ -113,6 +151,7 @@ CAT_PARAMS = {
     'verbose': 0,
     'loss_function': 'Logloss',
     'auto_class_weights': 'Balanced',
+    'allow_writing_files': False,  # no catboost_info/ from every fold worker
 }
 
 
@@ -138,22 +177,12 @@ def load_data(conn, test_mode=False):
     print("\n[1/8] LOADING DATA")
     print("=" * 60)
 
-    ticker_filter = ""
-    if test_mode:
-        tickers_sql = ",".join(f"'{t}'" for t in TEST_TICKERS)
-        ticker_filter = f"AND ticker IN ({tickers_sql})"
+    test_tickers = TEST_TICKERS if test_mode else None
 
     # Include OBX for market features
-    obx_filter = f"OR ticker = 'OBX'" if ticker_filter else ""
-
-    prices = pd.read_sql(f"""
-        SELECT ticker, date, open, high, low, close, volume
-        FROM prices_daily
-        WHERE close > 0 AND volume >= 0
-          AND date >= '2018-01-01'
-          {f"AND (ticker IN ({tickers_sql}) {obx_filter})" if test_mode else ""}
-        ORDER BY ticker, date
-    """, conn, parse_dates=['date'])
+    prices = load_table(conn, 'prices_daily', ['ticker', 'date', 'open', 'high', 'low', 'close', 'volume'],
+                        since='2018-01-01', tickers=TEST_TICKERS + ['OBX'] if test_mode else None,
+                        filters=[('close', '>', 0), ('volume', '>=', 0)])
     print(f"  Prices: {len(prices):,} rows, {prices.ticker.nunique()} tickers")
 
     # Good tickers: enough history
@@ -162,48 +191,30 @@ def load_data(conn, test_mode=False):
     good_tickers = [t for t in good_tickers if t != 'OBX']
     print(f"  Good tickers (≥504 days): {len(good_tickers)}")
 
-    fundamentals = pd.read_sql(f"""
-        SELECT ticker, date, bm, ep, dy, sp, sg, mktcap, ev_ebitda
-        FROM factor_fundamentals
-        WHERE TRUE {ticker_filter.replace('ticker', 'ticker')}
-        ORDER BY ticker, date
-    """, conn, parse_dates=['date'])
+    fundamentals = load_table(conn, 'factor_fundamentals',
+                              ['ticker', 'date', 'bm', 'ep', 'dy', 'sp', 'sg', 'mktcap', 'ev_ebitda'],
+                              tickers=test_tickers)
     print(f"  Fundamentals: {len(fundamentals):,}")
 
-    commodities = pd.read_sql("""
-        SELECT symbol AS ticker, date, close
-        FROM commodity_prices
-        WHERE symbol IN ('BZ=F', 'CL=F', 'GC=F', 'ALI=F', 'NG=F', 'HG=F')
-        ORDER BY symbol, date
-    """, conn, parse_dates=['date'])
+    commodities = load_table(conn, 'commodity_prices', ['symbol AS ticker', 'date', 'close'],
+                             filters=[('symbol', 'in', ['BZ=F', 'CL=F', 'GC=F', 'ALI=F', 'NG=F', 'HG=F'])],
+                             order_by='symbol, date')
     print(f"  Commodities: {len(commodities):,}")
 
-    shorts = pd.read_sql(f"""
-        SELECT ticker, date, short_pct, change_pct
-        FROM short_positions WHERE TRUE {ticker_filter}
-        ORDER BY ticker, date
-    """, conn, parse_dates=['date'])
+    shorts = load_table(conn, 'short_positions', ['ticker', 'date', 'short_pct', 'change_pct'], tickers=test_tickers)
     print(f"  Shorts: {len(shorts):,}")
 
-    fx = pd.read_sql("""
-        SELECT currency_pair AS pair, date, spot_rate AS rate FROM fx_spot_rates
-        WHERE currency_pair IN ('NOKUSD', 'NOKEUR')
-        ORDER BY date
-    """, conn, parse_dates=['date'])
+    fx = load_table(conn, 'fx_spot_rates', ['currency_pair AS pair', 'date', 'spot_rate AS rate'],
+                    filters=[('currency_pair', 'in', ['NOKUSD', 'NOKEUR'])])
     print(f"  FX: {len(fx):,}")
 
-    shipping = pd.read_sql("""
-        SELECT index_name AS rate_name, rate_date AS date, rate_value AS value
-        FROM shipping_market_rates
-        WHERE index_name IN ('BDI', 'BDTI')
-        ORDER BY rate_date
-    """, conn, parse_dates=['date'])
+    shipping = load_table(conn, 'shipping_market_rates',
+                          ['index_name AS rate_name', 'rate_date AS date', 'rate_value AS value'],
+                          filters=[('index_name', 'in', ['BDI', 'BDTI'])], order_by='rate_date')
     print(f"  Shipping rates: {len(shipping):,}")
 
     # Sector data for cross-sectional features
-    stocks_info = pd.read_sql("""
-        SELECT ticker, sector FROM stocks WHERE sector IS NOT NULL
-    """, conn)
+    stocks_info = load_table(conn, 'stocks', ['ticker', 'sector'], filters=[('sector', 'not null')])
     sector_map = dict(zip(stocks_info.ticker, stocks_info.sector))
 
     obx = prices[prices.ticker == 'OBX'][['date', 'close']].rename(columns={'close': 'obx_close'})
@@ -388,247 +399,451 @@ def variance_ratio(returns, short=5, long=20):
 # Feature Engineering (90+ features, 11 groups)
 # ============================================================================
 
-def engineer_features(data: dict) -> pd.DataFrame:
-    print("\n[2/8] ENGINEERING 90+ FEATURES")
-    print("=" * 60)
-
-    prices = data['prices'].copy()
-    obx = data['obx'].copy()
-    sector_map = data['sector_map']
-    good_tickers = data['good_tickers']
-
-    all_dfs = []
-    n_tickers = len(good_tickers)
-
-    for idx, ticker in enumerate(good_tickers):
-        if (idx + 1) % 25 == 0 or idx == 0:
-            print(f"  Processing {idx + 1}/{n_tickers}: {ticker}")
-
-        df = prices[prices.ticker == ticker].copy().sort_values('date').reset_index(drop=True)
-        if len(df) < MIN_TRAIN:
-            continue
-
-        close = df['close'].values
-        high = df['high'].values
-        low = df['low'].values
-        volume = df['volume'].values.astype(float)
-        returns = np.diff(np.log(close + 1e-10))
-        returns = np.insert(returns, 0, 0)
-        df['ret'] = returns
-
-        # ---- GROUP 1: MOMENTUM (12 features) ----
-        for w in [1, 2, 3, 5, 10, 21, 63, 126, 252]:
-            df[f'ret_{w}d'] = df['close'].pct_change(w)
-
-        # Skip-month momentum (Jegadeesh & Titman 1993)
-        # Use 12-month return but skip most recent month
-        df['mom_12_1'] = df['close'].pct_change(252) - df['close'].pct_change(21)
-
-        # Momentum quality: long-term minus short-term (strip reversal)
-        df['mom_quality'] = df['ret_252d'] - df['ret_21d']
-
-        # Acceleration: change in momentum
-        df['mom_accel'] = df['ret_63d'] - df['ret_63d'].shift(21)
-
-        # ---- GROUP 2: MEAN REVERSION / CONTRARIAN (8 features) ----
-        for w in [20, 50, 200]:
-            sma = df['close'].rolling(w, min_periods=w).mean()
-            df[f'dist_sma{w}'] = (df['close'] - sma) / (sma + 1e-10)
-
-        std20 = df['close'].rolling(20).std()
-        sma20 = df['close'].rolling(20).mean()
-        df['z_score_20d'] = (df['close'] - sma20) / (std20 + 1e-10)
-
-        std60 = df['close'].rolling(60).std()
-        sma60 = df['close'].rolling(60).mean()
-        df['z_score_60d'] = (df['close'] - sma60) / (std60 + 1e-10)
-
-        # Distance to 52-week high/low
-        roll_max = df['close'].rolling(252, min_periods=63).max()
-        roll_min = df['close'].rolling(252, min_periods=63).min()
-        df['dist_52w_high'] = (df['close'] - roll_max) / (roll_max + 1e-10)
-        df['dist_52w_low'] = (df['close'] - roll_min) / (roll_min + 1e-10)
-
-        # OU half-life (rolling 63d)
-        df['ou_halflife'] = np.nan
-        for i in range(63, len(df)):
-            df.iloc[i, df.columns.get_loc('ou_halflife')] = ou_halflife(
-                close[i - 63:i], max_hl=252
-            )
+def ticker_features(df: pd.DataFrame, obx: pd.DataFrame, sector: str) -> pd.DataFrame:
+    """Per-ticker technical features of one ticker's price history (sorted by date)."""
+    close = df['close'].values
+    high = df['high'].values
+    low = df['low'].values
+    volume = df['volume'].values.astype(float)
+    returns = np.diff(np.log(close + 1e-10))
+    returns = np.insert(returns, 0, 0)
+    df['ret'] = returns
+
+    # ---- GROUP 1: MOMENTUM (12 features) ----
+    for w in [1, 2, 3, 5, 10, 21, 63, 126, 252]:
+        df[f'ret_{w}d'] = df['close'].pct_change(w)
+
+    # Skip-month momentum (Jegadeesh & Titman 1993)
+    # Use 12-month return but skip most recent month
+    df['mom_12_1'] = df['close'].pct_change(252) - df['close'].pct_change(21)
+
+    # Momentum quality: long-term minus short-term (strip reversal)
+    df['mom_quality'] = df['ret_252d'] - df['ret_21d']
+
+    # Acceleration: change in momentum
+    df['mom_accel'] = df['ret_63d'] - df['ret_63d'].shift(21)
+
+    # ---- GROUP 2: MEAN REVERSION / CONTRARIAN (8 features) ----
+    for w in [20, 50, 200]:
+        sma = df['close'].rolling(w, min_periods=w).mean()
+        df[f'dist_sma{w}'] = (df['close'] - sma) / (sma + 1e-10)
+
+    std20 = df['close'].rolling(20).std()
+    sma20 = df['close'].rolling(20).mean()
+    df['z_score_20d'] = (df['close'] - sma20) / (std20 + 1e-10)
+
+    std60 = df['close'].rolling(60).std()
+    sma60 = df['close'].rolling(60).mean()
+    df['z_score_60d'] = (df['close'] - sma60) / (std60 + 1e-10)
+
+    # Distance to 52-week high/low
+    roll_max = df['close'].rolling(252, min_periods=63).max()
+    roll_min = df['close'].rolling(252, min_periods=63).min()
+    df['dist_52w_high'] = (df['close'] - roll_max) / (roll_max + 1e-10)
+    df['dist_52w_low'] = (df['close'] - roll_min) / (roll_min + 1e-10)
+
+    # OU half-life (rolling 63d)
+    df['ou_halflife'] = trailing_apply(close, 63, rolling_ou_halflife, max_hl=252)
+
+    # ---- GROUP 3: VOLATILITY & HIGHER MOMENTS (12 features) ----
+    for w in [5, 21, 63]:
+        df[f'vol_{w}d'] = df['ret'].rolling(w).std() * np.sqrt(252)
+
+    # Volatility ratios (regime change detection)
+    df['vol_ratio_5_21'] = df['vol_5d'] / (df['vol_21d'] + 1e-10)
+    df['vol_ratio_21_63'] = df['vol_21d'] / (df['vol_63d'] + 1e-10)
+
+    # Volatility of volatility (GARCH-like instability measure)
+    df['vol_of_vol'] = df['vol_21d'].rolling(63).std()
+
+    # Higher moments (skewness, kurtosis)
+    df['skew_21d'] = df['ret'].rolling(21).apply(
+        lambda x: scipy_stats.skew(x) if len(x) >= 10 else 0, raw=True
+    )
+    df['kurt_21d'] = df['ret'].rolling(21).apply(
+        lambda x: scipy_stats.kurtosis(x) if len(x) >= 10 else 0, raw=True
+    )
 
-        # ---- GROUP 3: VOLATILITY & HIGHER MOMENTS (12 features) ----
-        for w in [5, 21, 63]:
-            df[f'vol_{w}d'] = df['ret'].rolling(w).std() * np.sqrt(252)
+    # Downside volatility (semi-variance)
+    df['downside_vol_21d'] = df['ret'].rolling(21).apply(
+        lambda x: np.sqrt(np.mean(np.minimum(x, 0) ** 2)) * np.sqrt(252), raw=True
+    )
 
-        # Volatility ratios (regime change detection)
-        df['vol_ratio_5_21'] = df['vol_5d'] / (df['vol_21d'] + 1e-10)
-        df['vol_ratio_21_63'] = df['vol_21d'] / (df['vol_63d'] + 1e-10)
+    # Max drawdown (21d rolling)
+    df['max_dd_21d'] = df['close'].rolling(21).apply(
+        lambda x: (x[-1] / x.max() - 1) if x.max() > 0 else 0, raw=True
+    )
 
-        # Volatility of volatility (GARCH-like instability measure)
-        df['vol_of_vol'] = df['vol_21d'].rolling(63).std()
+    # Garman-Klass volatility estimator (uses OHLC — more efficient than close-close)
+    log_hl = np.log(high / (low + 1e-10)) ** 2
+    log_co = np.log(close / (df['open'].values + 1e-10)) ** 2
+    gk = 0.5 * log_hl - (2 * np.log(2) - 1) * log_co
+    df['gk_vol_21d'] = pd.Series(gk).rolling(21).mean().apply(lambda x: np.sqrt(abs(x) * 252))
 
-        # Higher moments (skewness, kurtosis)
-        df['skew_21d'] = df['ret'].rolling(21).apply(
-            lambda x: scipy_stats.skew(x) if len(x) >= 10 else 0, raw=True
-        )
-        df['kurt_21d'] = df['ret'].rolling(21).apply(
-            lambda x: scipy_stats.kurtosis(x) if len(x) >= 10 else 0, raw=True
-        )
+    # ---- GROUP 4: MICROSTRUCTURE & LIQUIDITY (8 features) ----
+    dollar_volume = close * volume
 
-        # Downside volatility (semi-variance)
-        df['downside_vol_21d'] = df['ret'].rolling(21).apply(
-            lambda x: np.sqrt(np.mean(np.minimum(x, 0) ** 2)) * np.sqrt(252), raw=True
+    # Amihud illiquidity (rolling 21d)
+    df['amihud_21d'] = np.nan
+    for i in range(21, len(df)):
+        df.iloc[i, df.columns.get_loc('amihud_21d')] = amihud_illiquidity(
+            returns[i - 21:i], volume[i - 21:i], 21
         )
 
-        # Max drawdown (21d rolling)
-        df['max_dd_21d'] = df['close'].rolling(21).apply(
-            lambda x: (x[-1] / x.max() - 1) if x.max() > 0 else 0, raw=True
-        )
-
-        # Garman-Klass volatility estimator (uses OHLC — more efficient than close-close)
-        log_hl = np.log(high / (low + 1e-10)) ** 2
-        log_co = np.log(close / (df['open'].values + 1e-10)) ** 2
-        gk = 0.5 * log_hl - (2 * np.log(2) - 1) * log_co
-        df['gk_vol_21d'] = pd.Series(gk).rolling(21).mean().apply(lambda x: np.sqrt(abs(x) * 252))
+    # Log dollar volume (size/liquidity proxy)
+    df['log_dollar_vol'] = np.log(dollar_volume + 1)
 
-        # ---- GROUP 4: MICROSTRUCTURE & LIQUIDITY (8 features) ----
-        dollar_volume = close * volume
+    # Volume ratio (unusual activity detection)
+    vol_sma20 = pd.Series(volume).rolling(20).mean()
+    df['volume_ratio'] = volume / (vol_sma20.values + 1)
 
-        # Amihud illiquidity (rolling 21d)
-        df['amihud_21d'] = np.nan
-        for i in range(21, len(df)):
-            df.iloc[i, df.columns.get_loc('amihud_21d')] = amihud_illiquidity(
-                returns[i - 21:i], volume[i - 21:i], 21
-            )
+    # Turnover trend
+    vol_sma5 = pd.Series(volume).rolling(5).mean()
+    df['vol_trend'] = vol_sma5.values / (vol_sma20.values + 1)
 
-        # Log dollar volume (size/liquidity proxy)
-        df['log_dollar_vol'] = np.log(dollar_volume + 1)
+    # Roll (1984) implied spread
+    df['roll_spread'] = np.nan
+    for i in range(22, len(df)):
+        df.iloc[i, df.columns.get_loc('roll_spread')] = roll_spread(returns[i - 21:i])
 
-        # Volume ratio (unusual activity detection)
-        vol_sma20 = pd.Series(volume).rolling(20).mean()
-        df['volume_ratio'] = volume / (vol_sma20.values + 1)
+    # Serial correlation (return autocorrelation — Kyle's lambda proxy)
+    df['autocorr_1d'] = df['ret'].rolling(21).apply(
+        lambda x: np.corrcoef(x[1:], x[:-1])[0, 1] if len(x) > 5 else 0, raw=True
+    )
+    df['autocorr_5d'] = df['ret'].rolling(63).apply(
+        lambda x: np.corrcoef(x[5:], x[:-5])[0, 1] if len(x) > 10 else 0, raw=True
+    )
 
-        # Turnover trend
-        vol_sma5 = pd.Series(volume).rolling(5).mean()
-        df['vol_trend'] = vol_sma5.values / (vol_sma20.values + 1)
+    # Variance ratio (Lo-MacKinlay random walk test)
+    df['var_ratio'] = np.nan
+    for i in range(63, len(df)):
+        df.iloc[i, df.columns.get_loc('var_ratio')] = variance_ratio(returns[i - 63:i])
+
+    # ---- GROUP 5: ENTROPY & COMPLEXITY (4 features) ----
+    # Batched over all 63d windows at once (utils.window_features), every day
+    df['hurst'] = trailing_apply(returns, 63, rolling_hurst)
+    df['approx_ent'] = trailing_apply(returns, 63, rolling_approx_entropy)
+    df['spec_ent'] = trailing_apply(returns, 63, rolling_spectral_entropy)
+
+    # Complexity-volatility interaction
+    df['complexity_vol'] = df['approx_ent'] * df['vol_21d']
+
+    # ---- GROUP 6: CROSS-ASSET BETAS (8 features) ----
+    # Merge OBX for market features
+    df = df.merge(obx, on='date', how='left')
+    df['obx_close'] = df['obx_close'].ffill()
+    df['obx_ret'] = df['obx_close'].pct_change()
+
+    # Rolling beta to market (63d)
+    df['beta_63d'] = df['ret'].rolling(63).apply(
+        lambda x: np.nan, raw=True  # placeholder
+    )
+    # Compute beta properly
+    for i in range(63, len(df)):
+        stock_r = returns[i - 63:i]
+        mkt_r = df['obx_ret'].values[i - 63:i]
+        valid = ~(np.isnan(stock_r) | np.isnan(mkt_r))
+        if valid.sum() > 20:
+            cov = np.cov(stock_r[valid], mkt_r[valid])
+            if cov[1, 1] > 1e-15:
+                df.iloc[i, df.columns.get_loc('beta_63d')] = cov[0, 1] / cov[1, 1]
+
+    # Idiosyncratic volatility (residual from market model)
+    df['ivol_63d'] = np.nan
+    for i in range(63, len(df)):
+        stock_r = returns[i - 63:i]
+        mkt_r = df['obx_ret'].values[i - 63:i]
+        valid = ~(np.isnan(stock_r) | np.isnan(mkt_r))
+        if valid.sum() > 20:
+            beta = df.iloc[i].get('beta_63d', 1.0)
+            if np.isnan(beta):
+                beta = 1.0
+            resid = stock_r[valid] - beta * mkt_r[valid]
+            df.iloc[i, df.columns.get_loc('ivol_63d')] = np.std(resid) * np.sqrt(252)
+
+    # Excess return vs market
+    df['excess_ret_21d'] = df['ret_21d'] - df['obx_ret'].rolling(21).apply(
+        lambda x: (1 + x).prod() - 1 if len(x) >= 5 else 0, raw=True
+    )
 
-        # Roll (1984) implied spread
-        df['roll_spread'] = np.nan
-        for i in range(22, len(df)):
-            df.iloc[i, df.columns.get_loc('roll_spread')] = roll_spread(returns[i - 21:i])
+    # ---- GROUP 7: TREND STRUCTURE (6 features) ----
+    sma20v = df['close'].rolling(20).mean()
+    sma50v = df['close'].rolling(50).mean()
+    sma200v = df['close'].rolling(200).mean()
+
+    df['above_sma20'] = (df['close'] > sma20v).astype(float)
+    df['above_sma50'] = (df['close'] > sma50v).astype(float)
+    df['above_sma200'] = (df['close'] > sma200v).astype(float)
+    df['trend_score'] = df['above_sma20'] + df['above_sma50'] + df['above_sma200']
+
+    # MACD signal
+    ema12 = df['close'].ewm(span=12).mean()
+    ema26 = df['close'].ewm(span=26).mean()
+    macd = ema12 - ema26
+    signal_line = macd.ewm(span=9).mean()
+    df['macd_above'] = (macd > signal_line).astype(float)
+
+    # Momentum alignment (1m/3m/6m all same sign)
+    df['mom_align'] = (
+        (df['ret_21d'] > 0).astype(float) +
+        (df['ret_63d'] > 0).astype(float) +
+        (df['ret_126d'] > 0).astype(float)
+    )
 
-        # Serial correlation (return autocorrelation — Kyle's lambda proxy)
-        df['autocorr_1d'] = df['ret'].rolling(21).apply(
-            lambda x: np.corrcoef(x[1:], x[:-1])[0, 1] if len(x) > 5 else 0, raw=True
-        )
-        df['autocorr_5d'] = df['ret'].rolling(63).apply(
-            lambda x: np.corrcoef(x[5:], x[:-5])[0, 1] if len(x) > 10 else 0, raw=True
-        )
+    # ---- GROUP 8: CALENDAR & SEASONALITY (5 features) ----
+    df['is_january'] = (df['date'].dt.month == 1).astype(float)
+    df['is_turn_of_month'] = (
+        (df['date'].dt.day <= 3) | (df['date'].dt.day >= 28)
+    ).astype(float)
+    df['is_end_of_quarter'] = (
+        df['date'].dt.month.isin([3, 6, 9, 12]) &
+        (df['date'].dt.day >= 25)
+    ).astype(float)
+    # Cyclical month encoding
+    df['month_sin'] = np.sin(2 * np.pi * df['date'].dt.month / 12)
+    df['month_cos'] = np.cos(2 * np.pi * df['date'].dt.month / 12)
+
+    # Store sector
+    df['sector'] = sector
+    return df
+
+
+class TickerFeatureState(FeatureState):
+    """ticker_features one bar at a time, for the daily signal job.
+
+    Streaming a ticker's bars from its first row gives exactly the columns
+    ticker_features computes (see utils.feature_engine). Bars carry date,
+    open, high, low, close, volume and obx_close (NaN on dates without an
+    OBX price, forward-filled here as in the batch merge).
+    """
 
-        # Variance ratio (Lo-MacKinlay random walk test)
-        df['var_ratio'] = np.nan
-        for i in range(63, len(df)):
-            df.iloc[i, df.columns.get_loc('var_ratio')] = variance_ratio(returns[i - 63:i])
-
-        # ---- GROUP 5: ENTROPY & COMPLEXITY (4 features) ----
-        # These are computationally expensive — compute every 5 days, ffill
-        df['hurst'] = np.nan
-        df['approx_ent'] = np.nan
-        df['spec_ent'] = np.nan
-
-        for i in range(63, len(df), 5):  # Every 5 days for speed
-            window_rets = returns[max(0, i - 63):i]
-            if len(window_rets) >= 20:
-                df.iloc[i, df.columns.get_loc('hurst')] = hurst_exponent(window_rets)
-                df.iloc[i, df.columns.get_loc('approx_ent')] = approx_entropy(window_rets)
-                df.iloc[i, df.columns.get_loc('spec_ent')] = spectral_entropy(window_rets)
-
-        df['hurst'] = df['hurst'].ffill()
-        df['approx_ent'] = df['approx_ent'].ffill()
-        df['spec_ent'] = df['spec_ent'].ffill()
-
-        # Complexity-volatility interaction
-        df['complexity_vol'] = df['approx_ent'] * df['vol_21d']
-
-        # ---- GROUP 6: CROSS-ASSET BETAS (8 features) ----
-        # Merge OBX for market features
-        df = df.merge(obx, on='date', how='left')
-        df['obx_close'] = df['obx_close'].ffill()
-        df['obx_ret'] = df['obx_close'].pct_change()
-
-        # Rolling beta to market (63d)
-        df['beta_63d'] = df['ret'].rolling(63).apply(
-            lambda x: np.nan, raw=True  # placeholder
-        )
-        # Compute beta properly
-        for i in range(63, len(df)):
-            stock_r = returns[i - 63:i]
-            mkt_r = df['obx_ret'].values[i - 63:i]
+    def __init__(self, sector='Unknown'):
+        super().__init__()
+        self.sector = sector
+        self.close = Lag(252)
+        self.log_close = np.nan
+        self.returns = Lag(63)
+        self.volume = Lag(21)
+        self.ret_63d = Lag(21)
+        self.obx_close = np.nan
+        self.obx_ret = Lag(63)
+
+        self.sma = {w: RollingMean(w) for w in [20, 50, 200]}
+        self.std20 = RollingVar(20)
+        self.sma60 = RollingMean(60)
+        self.std60 = RollingVar(60)
+        self.roll_max = RollingMax(252, 63)
+        self.roll_min = RollingMin(252, 63)
+
+        self.vol = {w: RollingVar(w) for w in [5, 21, 63]}
+        self.vol_of_vol = RollingVar(63)
+        self.skew = RollingApply(21, lambda x: scipy_stats.skew(x) if len(x) >= 10 else 0)
+        self.kurt = RollingApply(21, lambda x: scipy_stats.kurtosis(x) if len(x) >= 10 else 0)
+        self.downside_vol = RollingApply(21, lambda x: np.sqrt(np.mean(np.minimum(x, 0) ** 2)) * np.sqrt(252))
+        self.max_dd = RollingApply(21, lambda x: (x[-1] / x.max() - 1) if x.max() > 0 else 0)
+        self.gk = RollingMean(21)
+
+        self.vol_sma20 = RollingMean(20)
+        self.vol_sma5 = RollingMean(5)
+        self.autocorr_1d = RollingApply(21, lambda x: np.corrcoef(x[1:], x[:-1])[0, 1] if len(x) > 5 else 0)
+        self.autocorr_5d = RollingApply(63, lambda x: np.corrcoef(x[5:], x[:-5])[0, 1] if len(x) > 10 else 0)
+        self.obx_cum_21 = RollingApply(21, lambda x: (1 + x).prod() - 1 if len(x) >= 5 else 0)
+
+        self.ema12 = EWMMean(12)
+        self.ema26 = EWMMean(26)
+        self.signal_line = EWMMean(9)
+
+    def update(self, bar):
+        i = self.n
+        c = np.float64(bar['close'])
+        v = np.float64(bar['volume'])
+        log_close = np.log(c + 1e-10)
+        ret = np.float64(0.0) if i == 0 else log_close - self.log_close
+        self.log_close = float(log_close)
+        self.close.push(float(c))
+        self.returns.push(float(ret))
+        self.volume.push(float(v))
+        f = {'ret': ret}
+
+        # ---- GROUP 1: MOMENTUM ----
+        for w in [1, 2, 3, 5, 10, 21, 63, 126, 252]:
+            f[f'ret_{w}d'] = self.close.pct_change(w)
+        f['mom_12_1'] = f['ret_252d'] - f['ret_21d']
+        f['mom_quality'] = f['ret_252d'] - f['ret_21d']
+        self.ret_63d.push(float(f['ret_63d']))
+        f['mom_accel'] = f['ret_63d'] - self.ret_63d.get(21)
+
+        # ---- GROUP 2: MEAN REVERSION ----
+        sma = {w: self.sma[w].update(c) for w in [20, 50, 200]}
+        for w in [20, 50, 200]:
+            f[f'dist_sma{w}'] = (c - sma[w]) / (sma[w] + 1e-10)
+        f['z_score_20d'] = (c - sma[20]) / (self.std20.update(c) + 1e-10)
+        sma60 = self.sma60.update(c)
+        f['z_score_60d'] = (c - sma60) / (self.std60.update(c) + 1e-10)
+        roll_max = self.roll_max.update(c)
+        roll_min = self.roll_min.update(c)
+        f['dist_52w_high'] = (c - roll_max) / (roll_max + 1e-10)
+        f['dist_52w_low'] = (c - roll_min) / (roll_min + 1e-10)
+        f['ou_halflife'] = rolling_ou_halflife(self.close.window(63)[None, :], max_hl=252)[0] \
+            if i >= 63 else np.nan
+
+        # ---- GROUP 3: VOLATILITY & HIGHER MOMENTS ----
+        for w in [5, 21, 63]:
+            f[f'vol_{w}d'] = self.vol[w].update(ret) * np.sqrt(252)
+        f['vol_ratio_5_21'] = f['vol_5d'] / (f['vol_21d'] + 1e-10)
+        f['vol_ratio_21_63'] = f['vol_21d'] / (f['vol_63d'] + 1e-10)
+        f['vol_of_vol'] = self.vol_of_vol.update(f['vol_21d'])
+        f['skew_21d'] = self.skew.update(ret)
+        f['kurt_21d'] = self.kurt.update(ret)
+        f['downside_vol_21d'] = self.downside_vol.update(ret)
+        f['max_dd_21d'] = self.max_dd.update(c)
+        log_hl = np.log(np.float64(bar['high']) / (np.float64(bar['low']) + 1e-10))
+        log_co = np.log(c / (np.float64(bar['open']) + 1e-10))
+        gk = 0.5 * (log_hl * log_hl) - (2 * np.log(2) - 1) * (log_co * log_co)
+        f['gk_vol_21d'] = np.sqrt(abs(float(self.gk.update(gk))) * 252)
+
+        # ---- GROUP 4: MICROSTRUCTURE & LIQUIDITY ----
+        f['amihud_21d'] = amihud_illiquidity(self.returns.window(21), self.volume.window(21), 21) \
+            if i >= 21 else np.nan
+        f['log_dollar_vol'] = np.log(c * v + 1)
+        vol_sma20 = self.vol_sma20.update(v)
+        f['volume_ratio'] = v / (vol_sma20 + 1)
+        f['vol_trend'] = self.vol_sma5.update(v) / (vol_sma20 + 1)
+        f['roll_spread'] = roll_spread(self.returns.window(21)) if i >= 22 else np.nan
+        f['autocorr_1d'] = self.autocorr_1d.update(ret)
+        f['autocorr_5d'] = self.autocorr_5d.update(ret)
+        f['var_ratio'] = variance_ratio(self.returns.window(63)) if i >= 63 else np.nan
+
+        # ---- GROUP 5: ENTROPY & COMPLEXITY ----
+        window_rets = self.returns.window(63)[None, :]
+        for name, fn in [('hurst', rolling_hurst), ('approx_ent', rolling_approx_entropy),
+                         ('spec_ent', rolling_spectral_entropy)]:
+            f[name] = fn(window_rets)[0] if i >= 63 else np.nan
+        f['complexity_vol'] = f['approx_ent'] * f['vol_21d']
+
+        # ---- GROUP 6: CROSS-ASSET BETAS ----
+        obx_close = np.float64(bar.get('obx_close', np.nan))
+        prev_obx = np.float64(self.obx_close)
+        if obx_close == obx_close:
+            self.obx_close = float(obx_close)
+        f['obx_close'] = np.float64(self.obx_close)
+        f['obx_ret'] = f['obx_close'] / prev_obx - 1
+        self.obx_ret.push(float(f['obx_ret']))
+
+        f['beta_63d'] = np.nan
+        f['ivol_63d'] = np.nan
+        if i >= 63:
+            stock_r = self.returns.window(63)
+            mkt_r = self.obx_ret.window(63)
             valid = ~(np.isnan(stock_r) | np.isnan(mkt_r))
             if valid.sum() > 20:
                 cov = np.cov(stock_r[valid], mkt_r[valid])
                 if cov[1, 1] > 1e-15:
-                    df.iloc[i, df.columns.get_loc('beta_63d')] = cov[0, 1] / cov[1, 1]
-
-        # Idiosyncratic volatility (residual from market model)
-        df['ivol_63d'] = np.nan
-        for i in range(63, len(df)):
-            stock_r = returns[i - 63:i]
-            mkt_r = df['obx_ret'].values[i - 63:i]
-            valid = ~(np.isnan(stock_r) | np.isnan(mkt_r))
-            if valid.sum() > 20:
-                beta = df.iloc[i].get('beta_63d', 1.0)
+                    f['beta_63d'] = cov[0, 1] / cov[1, 1]
+                beta = f['beta_63d']
                 if np.isnan(beta):
                     beta = 1.0
                 resid = stock_r[valid] - beta * mkt_r[valid]
-                df.iloc[i, df.columns.get_loc('ivol_63d')] = np.std(resid) * np.sqrt(252)
+                f['ivol_63d'] = np.std(resid) * np.sqrt(252)
+        f['excess_ret_21d'] = f['ret_21d'] - self.obx_cum_21.update(f['obx_ret'])
+
+        # ---- GROUP 7: TREND STRUCTURE ----
+        f['above_sma20'] = float(c > sma[20])
+        f['above_sma50'] = float(c > sma[50])
+        f['above_sma200'] = float(c > sma[200])
+        f['trend_score'] = f['above_sma20'] + f['above_sma50'] + f['above_sma200']
+        macd = self.ema12.update(c) - self.ema26.update(c)
+        f['macd_above'] = float(macd > self.signal_line.update(macd))
+        f['mom_align'] = float(f['ret_21d'] > 0) + float(f['ret_63d'] > 0) + float(f['ret_126d'] > 0)
+
+        # ---- GROUP 8: CALENDAR & SEASONALITY ----
+        date = pd.Timestamp(bar['date'])
+        f['is_january'] = float(date.month == 1)
+        f['is_turn_of_month'] = float(date.day <= 3 or date.day >= 28)
+        f['is_end_of_quarter'] = float(date.month in (3, 6, 9, 12) and date.day >= 25)
+        f['month_sin'] = np.sin(2 * np.pi * date.month / 12)
+        f['month_cos'] = np.cos(2 * np.pi * date.month / 12)
+        f['sector'] = self.sector
+        return f
+
+
+def feature_bars(df: pd.DataFrame, obx: pd.DataFrame) -> pd.DataFrame:
+    """One ticker's bars for TickerFeatureState: prices plus the OBX close of each date."""
+    return df[['date', 'open', 'high', 'low', 'close', 'volume']].merge(obx, on='date', how='left')
+
+
+def advance_feature_states(conn, test_mode=False, store=None):
+    """Latest ticker_features row of every ticker from checkpointed TickerFeatureState.
+
+    The daily feature step (--advance-features): only the bars after each
+    ticker's checkpoint are loaded and streamed, plus the full history from
+    2018-01-01 (load_data's start) for tickers without one. One ticker's
+    streamed row is checked against ticker_features over that ticker's full
+    history, which also serves every row when pandas is not 2.2 (see
+    utils.feature_engine).
+    """
+    store = store or StateStore()
+    group = feature_group('v6', test_mode)
+    version = feature_version(ticker_features, TickerFeatureState, since='2018-01-01')
 
-        # Excess return vs market
-        df['excess_ret_21d'] = df['ret_21d'] - df['obx_ret'].rolling(21).apply(
-            lambda x: (1 + x).prod() - 1 if len(x) >= 5 else 0, raw=True
-        )
+    def load(since, tickers):
+        return load_table(conn, 'prices_daily', ['ticker', 'date', 'open', 'high', 'low', 'close', 'volume'],
+                          since=since, tickers=tickers or (TEST_TICKERS if test_mode else None),
+                          filters=[('close', '>', 0), ('volume', '>=', 0)])
+
+    obx = load('2018-01-01', ['OBX'])[['date', 'close']].rename(columns={'close': 'obx_close'})
+    stocks_info = load_table(conn, 'stocks', ['ticker', 'sector'], filters=[('sector', 'not null')])
+    sector_map = dict(zip(stocks_info.ticker, stocks_info.sector))
+    prices = pending_bars(store, group, version, load, '2018-01-01')
+    prices.pop('OBX', None)
+    bars = {ticker: feature_bars(df_t, obx) for ticker, df_t in prices.items()}
+    batch = lambda ticker: ticker_features(load('2018-01-01', [ticker]), obx, sector_map.get(ticker, 'Unknown'))
+    return advance(store, group, version, lambda ticker: TickerFeatureState(sector_map.get(ticker, 'Unknown')),
+                   bars, batch=batch)
+
+
+def run_advance_features(args):
+    """--advance-features: bring the feature checkpoints up to the latest bar and store the latest rows."""
+    t0 = time.time()
+    conn = psycopg2.connect(get_db_url())
+    store = StateStore()
+    rows = advance_feature_states(conn, test_mode=args.test, store=store)
+    conn.close()
+    if rows.empty:
+        print("  No new bars since the last checkpoints")
+        return
+    path = store.save_rows(feature_group('v6', args.test), rows)
+    print(f"  Advanced {len(rows)} tickers to {rows['date'].max().date()} in {time.time() - t0:.1f}s -> {path}")
 
-        # ---- GROUP 7: TREND STRUCTURE (6 features) ----
-        sma20v = df['close'].rolling(20).mean()
-        sma50v = df['close'].rolling(50).mean()
-        sma200v = df['close'].rolling(200).mean()
-
-        df['above_sma20'] = (df['close'] > sma20v).astype(float)
-        df['above_sma50'] = (df['close'] > sma50v).astype(float)
-        df['above_sma200'] = (df['close'] > sma200v).astype(float)
-        df['trend_score'] = df['above_sma20'] + df['above_sma50'] + df['above_sma200']
-
-        # MACD signal
-        ema12 = df['close'].ewm(span=12).mean()
-        ema26 = df['close'].ewm(span=26).mean()
-        macd = ema12 - ema26
-        signal_line = macd.ewm(span=9).mean()
-        df['macd_above'] = (macd > signal_line).astype(float)
-
-        # Momentum alignment (1m/3m/6m all same sign)
-        df['mom_align'] = (
-            (df['ret_21d'] > 0).astype(float) +
-            (df['ret_63d'] > 0).astype(float) +
-            (df['ret_126d'] > 0).astype(float)
-        )
 
-        # ---- GROUP 8: CALENDAR & SEASONALITY (5 features) ----
-        df['is_january'] = (df['date'].dt.month == 1).astype(float)
-        df['is_turn_of_month'] = (
-            (df['date'].dt.day <= 3) | (df['date'].dt.day >= 28)
-        ).astype(float)
-        df['is_end_of_quarter'] = (
-            df['date'].dt.month.isin([3, 6, 9, 12]) &
-            (df['date'].dt.day >= 25)
-        ).astype(float)
-        # Cyclical month encoding
-        df['month_sin'] = np.sin(2 * np.pi * df['date'].dt.month / 12)
-        df['month_cos'] = np.cos(2 * np.pi * df['date'].dt.month / 12)
+def engineer_ticker(ticker: str, df: pd.DataFrame, obx: pd.DataFrame, sector_map: dict):
+    """ticker_features of one ticker's price rows (None below MIN_TRAIN rows)."""
+    df = df.sort_values('date').reset_index(drop=True)
+    if len(df) < MIN_TRAIN:
+        return None
+    return ticker_features(df, obx, sector_map.get(ticker, 'Unknown'))
 
-        # Store sector
-        df['sector'] = sector_map.get(ticker, 'Unknown')
 
-        all_dfs.append(df)
+def engineer_features(data: dict, jobs: int = 1, dtype=None) -> pd.DataFrame:
+    """The feature panel; with dtype (np.float32) each ticker's features are downcast before the concat."""
+    print("\n[2/8] ENGINEERING 90+ FEATURES")
+    print("=" * 60)
+
+    prices = data['prices'].copy()
+    obx = data['obx'].copy()
+    sector_map = data['sector_map']
+    good_tickers = data['good_tickers']
+
+    all_dfs = []
+    n_tickers = len(good_tickers)
+
+    results = map_tickers(engineer_ticker, TickerFrames(prices), good_tickers, jobs=jobs,
+                          shared={'obx': obx, 'sector_map': sector_map})
+    for idx, (ticker, df) in enumerate(zip(good_tickers, results)):
+        if (idx + 1) % 25 == 0 or idx == 0:
+            print(f"  Processing {idx + 1}/{n_tickers}: {ticker}")
+        if df is not None:
+            all_dfs.append(df if dtype is None else downcast(df, dtype))
 
     features = pd.concat(all_dfs, ignore_index=True)
     print(f"  → {len(features):,} rows from {features.ticker.nunique()} tickers (before merges)")
@@ -776,7 +991,7 @@ def engineer_features(data: dict) -> pd.DataFrame:
 # ============================================================================
 
 def select_features(X, y, feature_cols, max_features=60):
-    """Quick feature importance via LightGBM, keep top features."""
+    """Quick feature importance via LightGBM, keep top features (X: the frame, or a compact panel's matrix)."""
     print(f"\n  Feature selection ({len(feature_cols)} → max {max_features})...")
 
     model = lgb.LGBMClassifier(
@@ -784,7 +999,7 @@ def select_features(X, y, feature_cols, max_features=60):
         learning_rate=0.1, verbose=-1, random_state=42,
         subsample=0.5, colsample_bytree=0.5,
     )
-    model.fit(X[feature_cols].values, y.values)
+    model.fit(X if isinstance(X, np.ndarray) else X[feature_cols].values, y.values)
 
     importance = pd.Series(model.feature_importances_, index=feature_cols)
     importance = importance.sort_values(ascending=False)
@@ -834,15 +1049,16 @@ def walk_forward_splits(dates, train_window=TRAIN_WINDOW, test_window=TEST_WINDO
 # Model Training — 5-Model Diverse Stack
 # ============================================================================
 
-def train_model_stack(X_train, y_train, X_val, y_val, feature_cols):
+def train_model_stack(X_train, y_train, X_val, y_val, feature_cols, threads=None):
     """Train 5 diverse models: XGB, LGBM, CatBoost, Ridge LR, MLP.
     Diversity is key — ensemble of correlated models adds no value.
     Trees capture interactions, LR captures linear patterns, MLP captures non-linearity.
+    threads caps the tree models' threads (a parallel fold's budget).
     """
     models = {}
 
     # 1. XGBoost
-    xgb_model = xgb.XGBClassifier(**XGB_PARAMS)
+    xgb_model = xgb.XGBClassifier(**with_threads(XGB_PARAMS, threads))
     xgb_model.fit(
         X_train, y_train,
         eval_set=[(X_val, y_val)],
@@ -852,7 +1068,7 @@ def train_model_stack(X_train, y_train, X_val, y_val, feature_cols):
     models['xgb'] = xgb_model
 
     # 2. LightGBM
-    lgbm_model = lgb.LGBMClassifier(**LGBM_PARAMS)
+    lgbm_model = lgb.LGBMClassifier(**with_threads(LGBM_PARAMS, threads))
     lgbm_model.fit(
         X_train, y_train,
         eval_set=[(X_val, y_val)],
@@ -861,7 +1077,7 @@ def train_model_stack(X_train, y_train, X_val, y_val, feature_cols):
     models['lgbm'] = lgbm_model
 
     # 3. CatBoost
-    cat_model = cb.CatBoostClassifier(**CAT_PARAMS)
+    cat_model = cb.CatBoostClassifier(**with_threads(CAT_PARAMS, threads, key='thread_count'))
     cat_model.fit(
         X_train, y_train,
         eval_set=(X_val, y_val),
@@ -987,95 +1203,128 @@ def predict_meta(meta_model, base_probs_dict):
 # Walk-Forward Training & Evaluation
 # ============================================================================
 
-def run_walk_forward(features, feature_cols, target_col='target_dir_21d'):
+def run_fold(task, meta, X, slicer, feature_cols, target_col, threads=None):
+    """
+    Train the stack on one walk-forward split and score its test block.
+
+    Returns None when the split is too small or single-class, {'error': msg}
+    when training failed, else {'preds': test rows, 'importance': XGB
+    feature importances}.
+    """
+    fold_idx, (train_start, train_end, test_start, test_end) = task
+
+    # Split data
+    train_rows = slicer.rows(train_start, train_end)
+    test_rows = slicer.rows(test_start, test_end)
+
+    y = meta[target_col].values
+    X_train, y_train = take_rows(X, train_rows), y[train_rows]
+    X_test = take_rows(X, test_rows)
+
+    if len(X_train) < 100 or len(X_test) < 10:
+        return None
+
+    # Validation split from train (last 20%)
+    val_size = max(int(len(X_train) * 0.2), 20)
+    X_val = X_train[-val_size:]
+    y_val = y_train[-val_size:]
+    X_train_sub = X_train[:-val_size]
+    y_train_sub = y_train[:-val_size]
+
+    if len(np.unique(y_train_sub)) < 2 or len(np.unique(y_val)) < 2:
+        return None
+
+    try:
+        # Train 5-model stack
+        models = train_model_stack(X_train_sub, y_train_sub, X_val, y_val, feature_cols, threads=threads)
+
+        # Get predictions on test
+        test_probs = predict_stack(models, X_test, return_individual=True)
+        ensemble_prob = test_probs['ensemble']
+        agreement = test_probs['agreement']
+
+        # Calibrate on validation set
+        val_probs = predict_stack(models, X_val, return_individual=True)
+        calibrator = calibrate_probabilities(val_probs['ensemble'], y_val)
+        calibrated_test = calibrator.predict(ensemble_prob)
+
+        # Train meta-learner on validation
+        meta_model = train_meta_learner(val_probs, y_val)
+        meta_prob = predict_meta(meta_model, test_probs)
+
+        # Store predictions
+        test_df = meta.iloc[test_rows][['ticker', 'date', 'fwd_ret_21d', target_col]].copy()
+        test_df['raw_prob'] = ensemble_prob
+        test_df['calibrated_prob'] = calibrated_test
+        test_df['meta_prob'] = meta_prob
+        test_df['agreement'] = agreement
+        test_df['fold'] = fold_idx
+
+        # Individual model probs for analysis
+        for model_name in ['xgb', 'lgbm', 'cat', 'lr', 'mlp']:
+            test_df[f'prob_{model_name}'] = test_probs[model_name]
+
+        return {'preds': test_df, 'importance': models['xgb'].feature_importances_}
+
+    except Exception as e:
+        return {'error': str(e)}
+
+
+def run_walk_forward(features, feature_cols, target_col='target_dir_21d', jobs=1, threads=None):
     print(f"\n[3/8] WALK-FORWARD TRAINING (5-model stack)")
     print("=" * 60)
     print(f"  Features: {len(feature_cols)}, Target: {target_col}")
 
-    splits = walk_forward_splits(features['date'])
+    if isinstance(features, Panel):
+        # Compact mode: folds are row blocks of the panel's float32 matrix (views, not copies)
+        X = features.matrix(feature_cols)
+        meta, slicer = features.frame(['fwd_ret_21d', target_col]), features.slicer()
+    else:
+        X, meta, slicer = features[feature_cols].values, features, DateSlicer(features['date'])
+
+    splits = walk_forward_splits(meta['date'])
     print(f"  Walk-forward splits: {len(splits)}")
 
+    jobs = resolve_jobs(jobs)
+    threads = fold_threads(jobs, threads)
+    shared = {
+        'meta': meta[['ticker', 'date', 'fwd_ret_21d', target_col]],
+        'X': X,
+        'slicer': slicer,
+        'feature_cols': feature_cols,
+        'target_col': target_col,
+        'threads': threads,
+    }
+
     all_predictions = []
-    all_meta_probs = []
-    fold_calibrators = []
     feature_importance_sum = np.zeros(len(feature_cols))
     n_folds = 0
 
-    for fold_idx, (train_start, train_end, test_start, test_end) in enumerate(splits):
-        # Split data
-        train_mask = (features['date'] >= train_start) & (features['date'] <= train_end)
-        test_mask = (features['date'] >= test_start) & (features['date'] <= test_end)
-
-        X_train = features.loc[train_mask, feature_cols].values
-        y_train = features.loc[train_mask, target_col].values
-        X_test = features.loc[test_mask, feature_cols].values
-        y_test = features.loc[test_mask, target_col].values
-
-        if len(X_train) < 100 or len(X_test) < 10:
+    results = map_tasks(run_fold, enumerate(splits), jobs=jobs, shared=shared, threads=threads)
+    for fold_idx, result in enumerate(results):
+        if result is None:
             continue
-
-        # Validation split from train (last 20%)
-        val_size = max(int(len(X_train) * 0.2), 20)
-        X_val = X_train[-val_size:]
-        y_val = y_train[-val_size:]
-        X_train_sub = X_train[:-val_size]
-        y_train_sub = y_train[:-val_size]
-
-        if len(np.unique(y_train_sub)) < 2 or len(np.unique(y_val)) < 2:
+        if 'error' in result:
+            if fold_idx < 5:
+                print(f"    Fold {fold_idx}: Error: {result['error']}")
             continue
 
-        try:
-            # Train 5-model stack
-            models = train_model_stack(X_train_sub, y_train_sub, X_val, y_val, feature_cols)
-
-            # Get predictions on test
-            test_probs = predict_stack(models, X_test, return_individual=True)
-            ensemble_prob = test_probs['ensemble']
-            agreement = test_probs['agreement']
-
-            # Calibrate on validation set
-            val_probs = predict_stack(models, X_val, return_individual=True)
-            calibrator = calibrate_probabilities(val_probs['ensemble'], y_val)
-            calibrated_test = calibrator.predict(ensemble_prob)
-
-            # Train meta-learner on validation
-            meta_model = train_meta_learner(val_probs, y_val)
-            meta_prob = predict_meta(meta_model, test_probs)
-
-            # Accumulate feature importance (from XGB)
-            feature_importance_sum += models['xgb'].feature_importances_
-
-            # Store predictions
-            test_df = features.loc[test_mask, ['ticker', 'date', 'fwd_ret_21d', target_col]].copy()
-            test_df['raw_prob'] = ensemble_prob
-            test_df['calibrated_prob'] = calibrated_test
-            test_df['meta_prob'] = meta_prob
-            test_df['agreement'] = agreement
-            test_df['fold'] = fold_idx
-
-            # Individual model probs for analysis
-            for model_name in ['xgb', 'lgbm', 'cat', 'lr', 'mlp']:
-                test_df[f'prob_{model_name}'] = test_probs[model_name]
-
-            all_predictions.append(test_df)
-            n_folds += 1
-
-            if (fold_idx + 1) % 25 == 0:
-                recent = pd.concat(all_predictions[-25:])
-                acc = (recent['meta_prob'] > 0.5).astype(int).eq(recent[target_col]).mean()
-                print(f"    Fold {fold_idx + 1}/{len(splits)}: "
-                      f"Meta Acc={acc:.1%}, N={len(recent)}")
+        # Accumulate feature importance (from XGB)
+        feature_importance_sum += result['importance']
+        all_predictions.append(result['preds'])
+        n_folds += 1
 
-        except Exception as e:
-            if fold_idx < 5:
-                print(f"    Fold {fold_idx}: Error: {e}")
-            continue
+        if (fold_idx + 1) % 25 == 0:
+            recent = pd.concat(all_predictions[-25:])
+            acc = (recent['meta_prob'] > 0.5).astype(int).eq(recent[target_col]).mean()
+            print(f"    Fold {fold_idx + 1}/{len(splits)}: "
+                  f"Meta Acc={acc:.1%}, N={len(recent)}")
 
     if not all_predictions:
         print("  ERROR: No successful folds!")
         return None, None, None
 
-    predictions = pd.concat(all_predictions, ignore_index=True)
+    predictions = plain(pd.concat(all_predictions, ignore_index=True))
     print(f"\n  → {len(predictions):,} predictions, {n_folds} folds")
 
     # Feature importance
@@ -1407,39 +1656,10 @@ def write_signals_to_db(signals_df, conn):
         """)
         conn.commit()
 
-        # Write signals in batches
-        batch_size = 500
-        total = len(signals_df)
-        written = 0
-
-        for start in range(0, total, batch_size):
-            batch = signals_df.iloc[start:start + batch_size]
-            values = []
-            for _, row in batch.iterrows():
-                values.append(cur.mogrify(
-                    "(%s, %s, %s, %s, %s, %s)",
-                    (row['ticker'], row['signal_date'], row['model_id'],
-                     row['signal_value'], row['predicted_return'], row['confidence'])
-                ).decode())
-
-            if values:
-                sql = f"""
-                    INSERT INTO alpha_signals (ticker, signal_date, model_id, signal_value, predicted_return, confidence)
-                    VALUES {','.join(values)}
-                    ON CONFLICT (ticker, signal_date, model_id) DO UPDATE SET
-                        signal_value = EXCLUDED.signal_value,
-                        predicted_return = EXCLUDED.predicted_return,
-                        confidence = EXCLUDED.confidence
-                """
-                cur.execute(sql)
-                written += len(batch)
-
-            if written % 2000 == 0 and written > 0:
-                conn.commit()
-                print(f"    Written {written:,} / {total:,}")
-
-        conn.commit()
-        print(f"  → {written:,} signals written to database")
+        columns = ['ticker', 'signal_date', 'model_id', 'signal_value', 'predicted_return', 'confidence']
+        copy_upsert(conn, 'alpha_signals', columns,
+                    signals_df[columns].itertuples(index=False, name=None),
+                    key=['ticker', 'signal_date', 'model_id'], label='signals')
 
     except Exception as e:
         print(f"  DB write error: {e}")
@@ -1459,7 +1679,32 @@ def main():
     parser.add_argument('--no-write', action='store_true', help='Skip DB write')
     parser.add_argument('--target-hr', type=float, default=0.65,
                         help='Target hit rate for per-stock thresholds (default 0.65)')
+    parser.add_argument('--feature-store', action='store_true',
+                        help='Read/extend the feature panel in FEATURE_STORE_DIR instead of recomputing it')
+    parser.add_argument('--rebuild-features', action='store_true',
+                        help='With --feature-store, rebuild the stored panel from scratch')
+    parser.add_argument('--data-backend', choices=DATA_BACKENDS, default=data_backend(),
+                        help='Read market data from Postgres or the local Arrow snapshot '
+                             '(synced by python -m app.sync_snapshot)')
+    parser.add_argument('--jobs', type=int, default=FEATURE_JOBS,
+                        help='Worker processes for the per-ticker feature stage (0 = one per CPU)')
+    parser.add_argument('--fold-jobs', type=int, default=FOLD_JOBS,
+                        help='Worker processes for the walk-forward folds (0 = one per CPU)')
+    parser.add_argument('--fold-threads', type=int, default=None,
+                        help='Model threads per fold (default: CPUs / --fold-jobs when parallel)')
+    parser.add_argument('--memory-budget', type=float, default=MEMORY_BUDGET_GB,
+                        help='Memory budget in GB: train on a compact float32 panel and report '
+                             'peak RSS per stage (0 = off)')
+    parser.add_argument('--advance-features', action='store_true',
+                        help='Only advance the incremental feature checkpoints (FEATURE_STATE_DIR) to the '
+                             'latest bar and write the latest row per ticker, then exit')
     args = parser.parse_args()
+    set_data_backend(args.data_backend)
+    if args.advance_features:
+        run_advance_features(args)
+        return
+    compact = args.memory_budget > 0
+    mem = MemoryLog(args.memory_budget)
 
     print("=" * 60)
     print(f"  ALPHA ENGINE v6 — BIFROST")
@@ -1475,20 +1720,44 @@ def main():
     # Load data
     db_url = get_db_url()
     conn = psycopg2.connect(db_url)
-    data = load_data(conn, test_mode=args.test)
 
-    # Feature engineering
-    features, feature_cols = engineer_features(data)
+    # Load data + feature engineering (stored panel with --feature-store)
+    store = FeatureStore() if args.feature_store else None
+    with mem.stage('features'):
+        features, feature_cols = cached_features(
+            store, feature_group('v6', args.test),
+            feature_version(load_data, engineer_features, engineer_ticker, ticker_features, rolling_hurst,
+                            rolling_approx_entropy, rolling_spectral_entropy, roll_spread, amihud_illiquidity,
+                            rolling_ou_halflife, variance_ratio,
+                            horizon=HORIZON, min_train=MIN_TRAIN, test=args.test,
+                            **({'dtype': 'float32'} if compact else {})),
+            latest_price_date(conn) if store else None,
+            load=lambda: load_data(conn, test_mode=args.test),
+            build=lambda data: engineer_features(data, jobs=args.jobs, dtype=np.float32 if compact else None),
+            targets=['fwd_ret_21d'], rebuild=args.rebuild_features,
+        )
+    n_tickers = features.ticker.nunique()
+    if compact:
+        with mem.stage('panel'):
+            features = Panel.from_frame(features, feature_cols, keep=['fwd_ret_21d', 'target_dir_21d'])
+        print(f"  Compact panel: {len(features):,} rows x {len(feature_cols)} features, "
+              f"{features.nbytes / 2**20:,.0f} MB")
+    target = features.meta['target_dir_21d'] if compact else features['target_dir_21d']
 
     # Feature selection
-    selected_features = select_features(
-        features, features['target_dir_21d'], feature_cols, max_features=60
-    )
+    with mem.stage('select'):
+        selected_features = select_features(
+            features.X if compact else features, target, feature_cols, max_features=60
+        )
+        if compact:
+            features.keep(selected_features)
 
     # Walk-forward training
-    predictions, feature_importance, n_folds = run_walk_forward(
-        features, selected_features, target_col='target_dir_21d'
-    )
+    with mem.stage('walk_forward'):
+        predictions, feature_importance, n_folds = run_walk_forward(
+            features, selected_features, target_col='target_dir_21d',
+            jobs=args.fold_jobs, threads=args.fold_threads,
+        )
 
     if predictions is None:
         print("\nFATAL: No predictions generated. Check data.")
@@ -1526,7 +1795,7 @@ def main():
     print(f"\n[8/8] SUMMARY")
     print("=" * 60)
     print(f"  Total time: {elapsed / 60:.1f} minutes")
-    print(f"  Tickers processed: {features.ticker.nunique()}")
+    print(f"  Tickers processed: {n_tickers}")
     print(f"  Features engineered: {len(feature_cols)} → {len(selected_features)} selected")
     print(f"  Walk-forward folds: {n_folds}")
     print(f"  Total predictions: {len(predictions):,}")
@@ -1541,6 +1810,7 @@ def main():
     if len(good_stocks) > 0:
         print(f"  Stocks meeting ≥{args.target_hr:.0%} HR target: {len(good_stocks)}/{len(threshold_results)}")
         print(f"    {', '.join(good_stocks['ticker'].values)}")
+    mem.report()
 
     conn.close()
     print("\nDone.")
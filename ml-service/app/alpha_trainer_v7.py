@@ -39,6 +39,8 @@ Usage:
   python alpha_trainer_v7.py --test     # 15 liquid stocks
   python alpha_trainer_v7.py            # Full universe
   python alpha_trainer_v7.py --no-write # Evaluate only
+  python alpha_trainer_v7.py --warm-start  # Continue boosting across folds, full retrain yearly
+  python alpha_trainer_v7.py --memory-budget 8  # float32 panel, peak RSS per stage
 """
 
 import argparse
@@ -61,6 +63,45 @@ import xgboost as xgb
 import lightgbm as lgb
 import catboost as cb
 
+try:  # run as app.alpha_trainer_v7 or as a script from app/
+    from .utils.feature_store import (
+        FeatureStore, cached_features, feature_group, feature_version, latest_price_date,
+    )
+    from .utils.parallel import FEATURE_JOBS, TickerFrames, map_tasks, map_tickers, resolve_jobs
+    from .utils.folds import FOLD_JOBS, DateSlicer, fold_threads, take_rows, with_threads
+    from .utils.bulk_write import copy_upsert
+    from .utils.bulk_read import load_table
+    from .utils.memory import MEMORY_BUDGET_GB, MemoryLog
+    from .utils.panel import Panel, downcast, plain
+    from .utils.snapshot import DATA_BACKENDS, data_backend, set_data_backend
+    from .utils.warm_start import WARM_ROUNDS, fold_chains, lgb_init, run_chain, warm_params, xgb_init
+    from .utils.feature_engine import (
+        FeatureState, Lag, RollingMean, RollingVar, RollingMax, RollingMin, RollingApply, EWMMean,
+        StateStore, advance, pending_bars,
+    )
+    from .utils.window_features import (
+        rolling_approx_entropy, rolling_hurst, rolling_ou_halflife, rolling_spectral_entropy, trailing_apply,
+    )
+except ImportError:
+    from utils.feature_store import (
+        FeatureStore, cached_features, feature_group, feature_version, latest_price_date,
+    )
+    from utils.parallel import FEATURE_JOBS, TickerFrames, map_tasks, map_tickers, resolve_jobs
+    from utils.folds import FOLD_JOBS, DateSlicer, fold_threads, take_rows, with_threads
+    from utils.bulk_write import copy_upsert
+    from utils.bulk_read import load_table
+    from utils.memory import MEMORY_BUDGET_GB, MemoryLog
+    from utils.panel import Panel, downcast, plain
+    from utils.snapshot import DATA_BACKENDS, data_backend, set_data_backend
+    from utils.warm_start import WARM_ROUNDS, fold_chains, lgb_init, run_chain, warm_params, xgb_init
+    from utils.feature_engine import (
+        FeatureState, Lag, RollingMean, RollingVar, RollingMax, RollingMin, RollingApply, EWMMean,
+        StateStore, advance, pending_bars,
+    )
+    from utils.window_features import (
+        rolling_approx_entropy, rolling_hurst, rolling_ou_halflife, rolling_spectral_entropy, trailing_apply,
+    )
+
 warnings.filterwarnings('ignore')
 sys.stdout = os.fdopen(sys.stdout.fileno(), 'w', 1)
 
@@ -83,6 +124,7 @@ HORIZONS = {
 MIN_TRAIN = 504      # 2 years minimum training
 PURGE_GAP = 5        # 5-day purge between train/test
 REBAL_PERIOD = 21    # Monthly rebalancing for backtest
+RETRAIN_EVERY = 12   # --warm-start: full retrain every 12th fold (yearly)
 
 # Regime-dependent signal weights
 # Key insight: different time-scale signals work in different regimes
@@ -113,6 +155,7 @@ TREE_PARAMS = {
         'l2_leaf_reg': 5.0, 'subsample': 0.7,
         'random_seed': 42, 'verbose': 0,
         'loss_function': 'RMSE',
+        'allow_writing_files': False,  # no catboost_info/ from every fold worker
     },
 }
 
@@ -356,21 +399,12 @@ def load_data(conn, test_mode=False):
     print("\n[1/8] LOADING DATA")
     print("=" * 60)
 
-    ticker_filter = ""
-    if test_mode:
-        tickers_sql = ",".join(f"'{t}'" for t in TEST_TICKERS)
-        ticker_filter = f"AND ticker IN ({tickers_sql})"
-
-    obx_clause = f"OR ticker = 'OBX'" if ticker_filter else ""
-
-    prices = pd.read_sql(f"""
-        SELECT ticker, date, open, high, low, close, volume
-        FROM prices_daily
-        WHERE close > 0 AND volume >= 0
-          AND date >= '2018-01-01'
-          {f"AND (ticker IN ({tickers_sql}) {obx_clause})" if test_mode else ""}
-        ORDER BY ticker, date
-    """, conn, parse_dates=['date'])
+    test_tickers = TEST_TICKERS if test_mode else None
+
+    # Include OBX for market features
+    prices = load_table(conn, 'prices_daily', ['ticker', 'date', 'open', 'high', 'low', 'close', 'volume'],
+                        since='2018-01-01', tickers=TEST_TICKERS + ['OBX'] if test_mode else None,
+                        filters=[('close', '>', 0), ('volume', '>=', 0)])
     print(f"  Prices: {len(prices):,} rows, {prices.ticker.nunique()} tickers")
 
     ticker_counts = prices.groupby('ticker').size()
@@ -378,47 +412,29 @@ def load_data(conn, test_mode=False):
     good_tickers = [t for t in good_tickers if t != 'OBX']
     print(f"  Good tickers (≥{MIN_TRAIN} days): {len(good_tickers)}")
 
-    fundamentals = pd.read_sql(f"""
-        SELECT ticker, date, bm, ep, dy, sp, sg, mktcap, ev_ebitda
-        FROM factor_fundamentals
-        WHERE TRUE {ticker_filter}
-        ORDER BY ticker, date
-    """, conn, parse_dates=['date'])
+    fundamentals = load_table(conn, 'factor_fundamentals',
+                              ['ticker', 'date', 'bm', 'ep', 'dy', 'sp', 'sg', 'mktcap', 'ev_ebitda'],
+                              tickers=test_tickers)
     print(f"  Fundamentals: {len(fundamentals):,}")
 
-    commodities = pd.read_sql("""
-        SELECT symbol AS ticker, date, close
-        FROM commodity_prices
-        WHERE symbol IN ('BZ=F', 'CL=F', 'GC=F', 'ALI=F', 'NG=F', 'HG=F')
-        ORDER BY symbol, date
-    """, conn, parse_dates=['date'])
+    commodities = load_table(conn, 'commodity_prices', ['symbol AS ticker', 'date', 'close'],
+                             filters=[('symbol', 'in', ['BZ=F', 'CL=F', 'GC=F', 'ALI=F', 'NG=F', 'HG=F'])],
+                             order_by='symbol, date')
     print(f"  Commodities: {len(commodities):,}")
 
-    shorts = pd.read_sql(f"""
-        SELECT ticker, date, short_pct, change_pct
-        FROM short_positions WHERE TRUE {ticker_filter}
-        ORDER BY ticker, date
-    """, conn, parse_dates=['date'])
+    shorts = load_table(conn, 'short_positions', ['ticker', 'date', 'short_pct', 'change_pct'], tickers=test_tickers)
     print(f"  Shorts: {len(shorts):,}")
 
-    fx = pd.read_sql("""
-        SELECT currency_pair AS pair, date, spot_rate AS rate FROM fx_spot_rates
-        WHERE currency_pair IN ('NOKUSD', 'NOKEUR')
-        ORDER BY date
-    """, conn, parse_dates=['date'])
+    fx = load_table(conn, 'fx_spot_rates', ['currency_pair AS pair', 'date', 'spot_rate AS rate'],
+                    filters=[('currency_pair', 'in', ['NOKUSD', 'NOKEUR'])])
     print(f"  FX: {len(fx):,}")
 
-    shipping = pd.read_sql("""
-        SELECT index_name AS rate_name, rate_date AS date, rate_value AS value
-        FROM shipping_market_rates
-        WHERE index_name IN ('BDI', 'BDTI')
-        ORDER BY rate_date
-    """, conn, parse_dates=['date'])
+    shipping = load_table(conn, 'shipping_market_rates',
+                          ['index_name AS rate_name', 'rate_date AS date', 'rate_value AS value'],
+                          filters=[('index_name', 'in', ['BDI', 'BDTI'])], order_by='rate_date')
     print(f"  Shipping rates: {len(shipping):,}")
 
-    stocks_info = pd.read_sql("""
-        SELECT ticker, sector FROM stocks WHERE sector IS NOT NULL
-    """, conn)
+    stocks_info = load_table(conn, 'stocks', ['ticker', 'sector'], filters=[('sector', 'not null')])
     sector_map = dict(zip(stocks_info.ticker, stocks_info.sector))
 
     obx = prices[prices.ticker == 'OBX'][['date', 'close']].rename(columns={'close': 'obx_close'})
@@ -435,166 +451,360 @@ def load_data(conn, test_mode=False):
 # Feature Engineering (100+ features)
 # ============================================================================
 
-def engineer_features(data: dict) -> pd.DataFrame:
-    print("\n[2/8] ENGINEERING 100+ FEATURES")
-    print("=" * 60)
+def ticker_features(df: pd.DataFrame, obx: pd.DataFrame, sector: str) -> pd.DataFrame:
+    """Per-ticker technical features of one ticker's price history (sorted by date)."""
+    close = df['close'].values
+    high = df['high'].values
+    low = df['low'].values
+    volume = df['volume'].values.astype(float)
+    returns = np.diff(np.log(close + 1e-10))
+    returns = np.insert(returns, 0, 0)
+    df['ret'] = returns
+
+    # ── MOMENTUM (multi-scale) ──
+    for w in [1, 2, 3, 5, 10, 21, 63, 126, 252]:
+        df[f'ret_{w}d'] = df['close'].pct_change(w)
+
+    # Skip-month momentum (Jegadeesh & Titman 1993)
+    df['mom_12_1'] = df['close'].pct_change(252) - df['close'].pct_change(21)
+    df['mom_quality'] = df['ret_252d'] - df['ret_21d']
+    df['mom_accel'] = df['ret_63d'] - df['ret_63d'].shift(21)
+
+    # ── MEAN REVERSION ──
+    for w in [20, 50, 200]:
+        sma = df['close'].rolling(w, min_periods=w).mean()
+        df[f'dist_sma{w}'] = (df['close'] - sma) / (sma + 1e-10)
+
+    std20 = df['close'].rolling(20).std()
+    sma20 = df['close'].rolling(20).mean()
+    df['z_score_20d'] = (df['close'] - sma20) / (std20 + 1e-10)
+
+    roll_max = df['close'].rolling(252, min_periods=63).max()
+    roll_min = df['close'].rolling(252, min_periods=63).min()
+    df['dist_52w_high'] = (df['close'] - roll_max) / (roll_max + 1e-10)
+    df['dist_52w_low'] = (df['close'] - roll_min) / (roll_min + 1e-10)
+
+    # OU half-life (rolling 63d)
+    df['ou_halflife'] = trailing_apply(close, 63, rolling_ou_halflife)
+
+    # ── VOLATILITY & HIGHER MOMENTS ──
+    for w in [5, 21, 63]:
+        df[f'vol_{w}d'] = df['ret'].rolling(w).std() * np.sqrt(252)
+
+    df['vol_ratio_5_21'] = df['vol_5d'] / (df['vol_21d'] + 1e-10)
+    df['vol_ratio_21_63'] = df['vol_21d'] / (df['vol_63d'] + 1e-10)
+    df['vol_of_vol'] = df['vol_21d'].rolling(63).std()
+
+    df['skew_21d'] = df['ret'].rolling(21).apply(
+        lambda x: scipy_stats.skew(x) if len(x) >= 10 else 0, raw=True)
+    df['kurt_21d'] = df['ret'].rolling(21).apply(
+        lambda x: scipy_stats.kurtosis(x) if len(x) >= 10 else 0, raw=True)
+    df['downside_vol'] = df['ret'].rolling(21).apply(
+        lambda x: np.sqrt(np.mean(np.minimum(x, 0) ** 2)) * np.sqrt(252), raw=True)
+    df['max_dd_21d'] = df['close'].rolling(21).apply(
+        lambda x: (x[-1] / x.max() - 1) if x.max() > 0 else 0, raw=True)
+
+    # Garman-Klass vol (uses OHLC — 5x more efficient than close-close)
+    log_hl = np.log(high / (low + 1e-10)) ** 2
+    log_co = np.log(close / (df['open'].values + 1e-10)) ** 2
+    gk = 0.5 * log_hl - (2 * np.log(2) - 1) * log_co
+    df['gk_vol'] = pd.Series(gk).rolling(21).mean().apply(lambda x: np.sqrt(abs(x) * 252))
+
+    # ── MICROSTRUCTURE ──
+    df['amihud'] = np.nan
+    for i in range(21, len(df)):
+        df.iloc[i, df.columns.get_loc('amihud')] = amihud_illiquidity(
+            returns[i - 21:i], volume[i - 21:i])
+
+    df['log_dollar_vol'] = np.log(close * volume + 1)
+    vol_sma20 = pd.Series(volume).rolling(20).mean()
+    df['volume_ratio'] = volume / (vol_sma20.values + 1)
+    df['vol_trend'] = pd.Series(volume).rolling(5).mean().values / (vol_sma20.values + 1)
+
+    # Serial correlation (Kyle's lambda proxy)
+    df['autocorr_1d'] = df['ret'].rolling(21).apply(
+        lambda x: np.corrcoef(x[1:], x[:-1])[0, 1] if len(x) > 5 else 0, raw=True)
+
+    # ── ENTROPY & COMPLEXITY (batched over all 63d windows, every day) ──
+    df['hurst'] = trailing_apply(returns, 63, rolling_hurst)
+    df['approx_ent'] = trailing_apply(returns, 63, rolling_approx_entropy)
+    df['spec_ent'] = trailing_apply(returns, 63, rolling_spectral_entropy)
+
+    # ── MARKET BETA & IDIOSYNCRATIC VOL ──
+    df = df.merge(obx, on='date', how='left')
+    df['obx_close'] = df['obx_close'].ffill()
+    df['obx_ret'] = df['obx_close'].pct_change()
+
+    df['beta_63d'] = np.nan
+    df['ivol_63d'] = np.nan
+    for i in range(63, len(df)):
+        sr = returns[i - 63:i]
+        mr = df['obx_ret'].values[i - 63:i]
+        valid = ~(np.isnan(sr) | np.isnan(mr))
+        if valid.sum() > 20:
+            cov_mat = np.cov(sr[valid], mr[valid])
+            if cov_mat[1, 1] > 1e-15:
+                beta = cov_mat[0, 1] / cov_mat[1, 1]
+                df.iloc[i, df.columns.get_loc('beta_63d')] = beta
+                resid = sr[valid] - beta * mr[valid]
+                df.iloc[i, df.columns.get_loc('ivol_63d')] = np.std(resid) * np.sqrt(252)
+
+    # Excess return
+    obx_cum_21 = df['obx_ret'].rolling(21).apply(
+        lambda x: (1 + x).prod() - 1 if len(x) >= 5 else 0, raw=True)
+    df['excess_ret_21d'] = df['ret_21d'] - obx_cum_21
+
+    # ── TREND STRUCTURE ──
+    sma20v = df['close'].rolling(20).mean()
+    sma50v = df['close'].rolling(50).mean()
+    sma200v = df['close'].rolling(200).mean()
+    df['above_sma20'] = (df['close'] > sma20v).astype(float)
+    df['above_sma50'] = (df['close'] > sma50v).astype(float)
+    df['above_sma200'] = (df['close'] > sma200v).astype(float)
+    df['trend_score'] = df['above_sma20'] + df['above_sma50'] + df['above_sma200']
+
+    ema12 = df['close'].ewm(span=12).mean()
+    ema26 = df['close'].ewm(span=26).mean()
+    df['macd_above'] = ((ema12 - ema26) > (ema12 - ema26).ewm(span=9).mean()).astype(float)
+    df['mom_align'] = (
+        (df['ret_21d'] > 0).astype(float) +
+        (df['ret_63d'] > 0).astype(float) +
+        (df['ret_126d'] > 0).astype(float)
+    )
 
-    prices = data['prices'].copy()
-    obx = data['obx'].copy()
-    sector_map = data['sector_map']
-    good_tickers = data['good_tickers']
+    # ── CALENDAR ──
+    df['is_january'] = (df['date'].dt.month == 1).astype(float)
+    df['is_turn_of_month'] = ((df['date'].dt.day <= 3) | (df['date'].dt.day >= 28)).astype(float)
+    df['month_sin'] = np.sin(2 * np.pi * df['date'].dt.month / 12)
+    df['month_cos'] = np.cos(2 * np.pi * df['date'].dt.month / 12)
 
-    all_dfs = []
-    n_tickers = len(good_tickers)
+    df['sector'] = sector
+    return df
 
-    for idx, ticker in enumerate(good_tickers):
-        if (idx + 1) % 25 == 0 or idx == 0:
-            print(f"  Processing {idx + 1}/{n_tickers}: {ticker}")
 
-        df = prices[prices.ticker == ticker].copy().sort_values('date').reset_index(drop=True)
-        if len(df) < MIN_TRAIN:
-            continue
+class TickerFeatureState(FeatureState):
+    """ticker_features one bar at a time, for the daily signal job.
 
-        close = df['close'].values
-        high = df['high'].values
-        low = df['low'].values
-        volume = df['volume'].values.astype(float)
-        returns = np.diff(np.log(close + 1e-10))
-        returns = np.insert(returns, 0, 0)
-        df['ret'] = returns
+    Streaming a ticker's bars from its first row gives exactly the columns
+    ticker_features computes (see utils.feature_engine). Bars carry date,
+    open, high, low, close, volume and obx_close (NaN on dates without an
+    OBX price, forward-filled here as in the batch merge).
+    """
 
-        # ── MOMENTUM (multi-scale) ──
+    def __init__(self, sector='Unknown'):
+        super().__init__()
+        self.sector = sector
+        self.close = Lag(252)
+        self.log_close = np.nan
+        self.returns = Lag(63)
+        self.volume = Lag(21)
+        self.ret_63d = Lag(21)
+        self.obx_close = np.nan
+        self.obx_ret = Lag(63)
+
+        self.sma = {w: RollingMean(w) for w in [20, 50, 200]}
+        self.std20 = RollingVar(20)
+        self.roll_max = RollingMax(252, 63)
+        self.roll_min = RollingMin(252, 63)
+
+        self.vol = {w: RollingVar(w) for w in [5, 21, 63]}
+        self.vol_of_vol = RollingVar(63)
+        self.skew = RollingApply(21, lambda x: scipy_stats.skew(x) if len(x) >= 10 else 0)
+        self.kurt = RollingApply(21, lambda x: scipy_stats.kurtosis(x) if len(x) >= 10 else 0)
+        self.downside_vol = RollingApply(21, lambda x: np.sqrt(np.mean(np.minimum(x, 0) ** 2)) * np.sqrt(252))
+        self.max_dd = RollingApply(21, lambda x: (x[-1] / x.max() - 1) if x.max() > 0 else 0)
+        self.gk = RollingMean(21)
+
+        self.vol_sma20 = RollingMean(20)
+        self.vol_sma5 = RollingMean(5)
+        self.autocorr_1d = RollingApply(21, lambda x: np.corrcoef(x[1:], x[:-1])[0, 1] if len(x) > 5 else 0)
+        self.obx_cum_21 = RollingApply(21, lambda x: (1 + x).prod() - 1 if len(x) >= 5 else 0)
+
+        self.ema12 = EWMMean(12)
+        self.ema26 = EWMMean(26)
+        self.signal_line = EWMMean(9)
+
+    def update(self, bar):
+        i = self.n
+        c = np.float64(bar['close'])
+        v = np.float64(bar['volume'])
+        log_close = np.log(c + 1e-10)
+        ret = np.float64(0.0) if i == 0 else log_close - self.log_close
+        self.log_close = float(log_close)
+        self.close.push(float(c))
+        self.returns.push(float(ret))
+        self.volume.push(float(v))
+        f = {'ret': ret}
+
+        # ── MOMENTUM ──
         for w in [1, 2, 3, 5, 10, 21, 63, 126, 252]:
-            df[f'ret_{w}d'] = df['close'].pct_change(w)
-
-        # Skip-month momentum (Jegadeesh & Titman 1993)
-        df['mom_12_1'] = df['close'].pct_change(252) - df['close'].pct_change(21)
-        df['mom_quality'] = df['ret_252d'] - df['ret_21d']
-        df['mom_accel'] = df['ret_63d'] - df['ret_63d'].shift(21)
+            f[f'ret_{w}d'] = self.close.pct_change(w)
+        f['mom_12_1'] = f['ret_252d'] - f['ret_21d']
+        f['mom_quality'] = f['ret_252d'] - f['ret_21d']
+        self.ret_63d.push(float(f['ret_63d']))
+        f['mom_accel'] = f['ret_63d'] - self.ret_63d.get(21)
 
         # ── MEAN REVERSION ──
+        sma = {w: self.sma[w].update(c) for w in [20, 50, 200]}
         for w in [20, 50, 200]:
-            sma = df['close'].rolling(w, min_periods=w).mean()
-            df[f'dist_sma{w}'] = (df['close'] - sma) / (sma + 1e-10)
+            f[f'dist_sma{w}'] = (c - sma[w]) / (sma[w] + 1e-10)
+        f['z_score_20d'] = (c - sma[20]) / (self.std20.update(c) + 1e-10)
+        roll_max = self.roll_max.update(c)
+        roll_min = self.roll_min.update(c)
+        f['dist_52w_high'] = (c - roll_max) / (roll_max + 1e-10)
+        f['dist_52w_low'] = (c - roll_min) / (roll_min + 1e-10)
 
-        std20 = df['close'].rolling(20).std()
-        sma20 = df['close'].rolling(20).mean()
-        df['z_score_20d'] = (df['close'] - sma20) / (std20 + 1e-10)
-
-        roll_max = df['close'].rolling(252, min_periods=63).max()
-        roll_min = df['close'].rolling(252, min_periods=63).min()
-        df['dist_52w_high'] = (df['close'] - roll_max) / (roll_max + 1e-10)
-        df['dist_52w_low'] = (df['close'] - roll_min) / (roll_min + 1e-10)
-
-        # OU half-life (rolling 63d, every 5 days for speed)
-        df['ou_halflife'] = np.nan
-        for i in range(63, len(df), 5):
-            df.iloc[i, df.columns.get_loc('ou_halflife')] = ou_halflife(close[i - 63:i])
-        df['ou_halflife'] = df['ou_halflife'].ffill()
+        f['ou_halflife'] = rolling_ou_halflife(self.close.window(63)[None, :])[0] if i >= 63 else np.nan
 
         # ── VOLATILITY & HIGHER MOMENTS ──
         for w in [5, 21, 63]:
-            df[f'vol_{w}d'] = df['ret'].rolling(w).std() * np.sqrt(252)
-
-        df['vol_ratio_5_21'] = df['vol_5d'] / (df['vol_21d'] + 1e-10)
-        df['vol_ratio_21_63'] = df['vol_21d'] / (df['vol_63d'] + 1e-10)
-        df['vol_of_vol'] = df['vol_21d'].rolling(63).std()
-
-        df['skew_21d'] = df['ret'].rolling(21).apply(
-            lambda x: scipy_stats.skew(x) if len(x) >= 10 else 0, raw=True)
-        df['kurt_21d'] = df['ret'].rolling(21).apply(
-            lambda x: scipy_stats.kurtosis(x) if len(x) >= 10 else 0, raw=True)
-        df['downside_vol'] = df['ret'].rolling(21).apply(
-            lambda x: np.sqrt(np.mean(np.minimum(x, 0) ** 2)) * np.sqrt(252), raw=True)
-        df['max_dd_21d'] = df['close'].rolling(21).apply(
-            lambda x: (x[-1] / x.max() - 1) if x.max() > 0 else 0, raw=True)
-
-        # Garman-Klass vol (uses OHLC — 5x more efficient than close-close)
-        log_hl = np.log(high / (low + 1e-10)) ** 2
-        log_co = np.log(close / (df['open'].values + 1e-10)) ** 2
-        gk = 0.5 * log_hl - (2 * np.log(2) - 1) * log_co
-        df['gk_vol'] = pd.Series(gk).rolling(21).mean().apply(lambda x: np.sqrt(abs(x) * 252))
+            f[f'vol_{w}d'] = self.vol[w].update(ret) * np.sqrt(252)
+        f['vol_ratio_5_21'] = f['vol_5d'] / (f['vol_21d'] + 1e-10)
+        f['vol_ratio_21_63'] = f['vol_21d'] / (f['vol_63d'] + 1e-10)
+        f['vol_of_vol'] = self.vol_of_vol.update(f['vol_21d'])
+        f['skew_21d'] = self.skew.update(ret)
+        f['kurt_21d'] = self.kurt.update(ret)
+        f['downside_vol'] = self.downside_vol.update(ret)
+        f['max_dd_21d'] = self.max_dd.update(c)
+        log_hl = np.log(np.float64(bar['high']) / (np.float64(bar['low']) + 1e-10))
+        log_co = np.log(c / (np.float64(bar['open']) + 1e-10))
+        gk = 0.5 * (log_hl * log_hl) - (2 * np.log(2) - 1) * (log_co * log_co)
+        f['gk_vol'] = np.sqrt(abs(float(self.gk.update(gk))) * 252)
 
         # ── MICROSTRUCTURE ──
-        df['amihud'] = np.nan
-        for i in range(21, len(df)):
-            df.iloc[i, df.columns.get_loc('amihud')] = amihud_illiquidity(
-                returns[i - 21:i], volume[i - 21:i])
-
-        df['log_dollar_vol'] = np.log(close * volume + 1)
-        vol_sma20 = pd.Series(volume).rolling(20).mean()
-        df['volume_ratio'] = volume / (vol_sma20.values + 1)
-        df['vol_trend'] = pd.Series(volume).rolling(5).mean().values / (vol_sma20.values + 1)
-
-        # Serial correlation (Kyle's lambda proxy)
-        df['autocorr_1d'] = df['ret'].rolling(21).apply(
-            lambda x: np.corrcoef(x[1:], x[:-1])[0, 1] if len(x) > 5 else 0, raw=True)
-
-        # ── ENTROPY & COMPLEXITY (every 5 days, ffill) ──
-        df['hurst'] = np.nan
-        df['approx_ent'] = np.nan
-        df['spec_ent'] = np.nan
-
-        for i in range(63, len(df), 5):
-            wr = returns[max(0, i - 63):i]
-            if len(wr) >= 20:
-                df.iloc[i, df.columns.get_loc('hurst')] = hurst_exponent(wr)
-                df.iloc[i, df.columns.get_loc('approx_ent')] = approx_entropy(wr)
-                df.iloc[i, df.columns.get_loc('spec_ent')] = spectral_entropy(wr)
-
-        for col in ['hurst', 'approx_ent', 'spec_ent']:
-            df[col] = df[col].ffill()
+        f['amihud'] = amihud_illiquidity(self.returns.window(21), self.volume.window(21)) if i >= 21 else np.nan
+        f['log_dollar_vol'] = np.log(c * v + 1)
+        vol_sma20 = self.vol_sma20.update(v)
+        f['volume_ratio'] = v / (vol_sma20 + 1)
+        f['vol_trend'] = self.vol_sma5.update(v) / (vol_sma20 + 1)
+        f['autocorr_1d'] = self.autocorr_1d.update(ret)
+
+        # ── ENTROPY & COMPLEXITY ──
+        wr = self.returns.window(63)[None, :]
+        for name, fn in [('hurst', rolling_hurst), ('approx_ent', rolling_approx_entropy),
+                         ('spec_ent', rolling_spectral_entropy)]:
+            f[name] = fn(wr)[0] if i >= 63 else np.nan
 
         # ── MARKET BETA & IDIOSYNCRATIC VOL ──
-        df = df.merge(obx, on='date', how='left')
-        df['obx_close'] = df['obx_close'].ffill()
-        df['obx_ret'] = df['obx_close'].pct_change()
-
-        df['beta_63d'] = np.nan
-        df['ivol_63d'] = np.nan
-        for i in range(63, len(df)):
-            sr = returns[i - 63:i]
-            mr = df['obx_ret'].values[i - 63:i]
+        obx_close = np.float64(bar.get('obx_close', np.nan))
+        prev_obx = np.float64(self.obx_close)
+        if obx_close == obx_close:
+            self.obx_close = float(obx_close)
+        f['obx_close'] = np.float64(self.obx_close)
+        f['obx_ret'] = f['obx_close'] / prev_obx - 1
+        self.obx_ret.push(float(f['obx_ret']))
+
+        f['beta_63d'] = np.nan
+        f['ivol_63d'] = np.nan
+        if i >= 63:
+            sr = self.returns.window(63)
+            mr = self.obx_ret.window(63)
             valid = ~(np.isnan(sr) | np.isnan(mr))
             if valid.sum() > 20:
                 cov_mat = np.cov(sr[valid], mr[valid])
                 if cov_mat[1, 1] > 1e-15:
                     beta = cov_mat[0, 1] / cov_mat[1, 1]
-                    df.iloc[i, df.columns.get_loc('beta_63d')] = beta
+                    f['beta_63d'] = beta
                     resid = sr[valid] - beta * mr[valid]
-                    df.iloc[i, df.columns.get_loc('ivol_63d')] = np.std(resid) * np.sqrt(252)
-
-        # Excess return
-        obx_cum_21 = df['obx_ret'].rolling(21).apply(
-            lambda x: (1 + x).prod() - 1 if len(x) >= 5 else 0, raw=True)
-        df['excess_ret_21d'] = df['ret_21d'] - obx_cum_21
+                    f['ivol_63d'] = np.std(resid) * np.sqrt(252)
+        f['excess_ret_21d'] = f['ret_21d'] - self.obx_cum_21.update(f['obx_ret'])
 
         # ── TREND STRUCTURE ──
-        sma20v = df['close'].rolling(20).mean()
-        sma50v = df['close'].rolling(50).mean()
-        sma200v = df['close'].rolling(200).mean()
-        df['above_sma20'] = (df['close'] > sma20v).astype(float)
-        df['above_sma50'] = (df['close'] > sma50v).astype(float)
-        df['above_sma200'] = (df['close'] > sma200v).astype(float)
-        df['trend_score'] = df['above_sma20'] + df['above_sma50'] + df['above_sma200']
-
-        ema12 = df['close'].ewm(span=12).mean()
-        ema26 = df['close'].ewm(span=26).mean()
-        df['macd_above'] = ((ema12 - ema26) > (ema12 - ema26).ewm(span=9).mean()).astype(float)
-        df['mom_align'] = (
-            (df['ret_21d'] > 0).astype(float) +
-            (df['ret_63d'] > 0).astype(float) +
-            (df['ret_126d'] > 0).astype(float)
-        )
+        f['above_sma20'] = float(c > sma[20])
+        f['above_sma50'] = float(c > sma[50])
+        f['above_sma200'] = float(c > sma[200])
+        f['trend_score'] = f['above_sma20'] + f['above_sma50'] + f['above_sma200']
+        macd = self.ema12.update(c) - self.ema26.update(c)
+        f['macd_above'] = float(macd > self.signal_line.update(macd))
+        f['mom_align'] = float(f['ret_21d'] > 0) + float(f['ret_63d'] > 0) + float(f['ret_126d'] > 0)
 
         # ── CALENDAR ──
-        df['is_january'] = (df['date'].dt.month == 1).astype(float)
-        df['is_turn_of_month'] = ((df['date'].dt.day <= 3) | (df['date'].dt.day >= 28)).astype(float)
-        df['month_sin'] = np.sin(2 * np.pi * df['date'].dt.month / 12)
-        df['month_cos'] = np.cos(2 * np.pi * df['date'].dt.month / 12)
+        date = pd.Timestamp(bar['date'])
+        f['is_january'] = float(date.month == 1)
+        f['is_turn_of_month'] = float(date.day <= 3 or date.day >= 28)
+        f['month_sin'] = np.sin(2 * np.pi * date.month / 12)
+        f['month_cos'] = np.cos(2 * np.pi * date.month / 12)
+        f['sector'] = self.sector
+        return f
+
+
+def feature_bars(df: pd.DataFrame, obx: pd.DataFrame) -> pd.DataFrame:
+    """One ticker's bars for TickerFeatureState: prices plus the OBX close of each date."""
+    return df[['date', 'open', 'high', 'low', 'close', 'volume']].merge(obx, on='date', how='left')
+
+
+def advance_feature_states(conn, test_mode=False, store=None):
+    """Latest ticker_features row of every ticker from checkpointed TickerFeatureState.
+
+    The daily feature step (--advance-features): only the bars after each
+    ticker's checkpoint are loaded and streamed, plus the full history from
+    2018-01-01 (load_data's start) for tickers without one. One ticker's
+    streamed row is checked against ticker_features over that ticker's full
+    history, which also serves every row when pandas is not 2.2 (see
+    utils.feature_engine).
+    """
+    store = store or StateStore()
+    group = feature_group('v7', test_mode)
+    version = feature_version(ticker_features, TickerFeatureState, since='2018-01-01')
+
+    def load(since, tickers):
+        return load_table(conn, 'prices_daily', ['ticker', 'date', 'open', 'high', 'low', 'close', 'volume'],
+                          since=since, tickers=tickers or (TEST_TICKERS if test_mode else None),
+                          filters=[('close', '>', 0), ('volume', '>=', 0)])
+
+    obx = load('2018-01-01', ['OBX'])[['date', 'close']].rename(columns={'close': 'obx_close'})
+    stocks_info = load_table(conn, 'stocks', ['ticker', 'sector'], filters=[('sector', 'not null')])
+    sector_map = dict(zip(stocks_info.ticker, stocks_info.sector))
+    prices = pending_bars(store, group, version, load, '2018-01-01')
+    prices.pop('OBX', None)
+    bars = {ticker: feature_bars(df_t, obx) for ticker, df_t in prices.items()}
+    batch = lambda ticker: ticker_features(load('2018-01-01', [ticker]), obx, sector_map.get(ticker, 'Unknown'))
+    return advance(store, group, version, lambda ticker: TickerFeatureState(sector_map.get(ticker, 'Unknown')),
+                   bars, batch=batch)
+
+
+def run_advance_features(args):
+    """--advance-features: bring the feature checkpoints up to the latest bar and store the latest rows."""
+    t0 = time.time()
+    conn = psycopg2.connect(get_db_url())
+    store = StateStore()
+    rows = advance_feature_states(conn, test_mode=args.test, store=store)
+    conn.close()
+    if rows.empty:
+        print("  No new bars since the last checkpoints")
+        return
+    path = store.save_rows(feature_group('v7', args.test), rows)
+    print(f"  Advanced {len(rows)} tickers to {rows['date'].max().date()} in {time.time() - t0:.1f}s -> {path}")
+
+
+def engineer_ticker(ticker: str, df: pd.DataFrame, obx: pd.DataFrame, sector_map: dict):
+    """ticker_features of one ticker's price rows (None below MIN_TRAIN rows)."""
+    df = df.sort_values('date').reset_index(drop=True)
+    if len(df) < MIN_TRAIN:
+        return None
+    return ticker_features(df, obx, sector_map.get(ticker, 'Unknown'))
+
+
+def engineer_features(data: dict, jobs: int = 1, dtype=None) -> pd.DataFrame:
+    """The feature panel; with dtype (np.float32) each ticker's features are downcast before the concat."""
+    print("\n[2/8] ENGINEERING 100+ FEATURES")
+    print("=" * 60)
+
+    prices = data['prices'].copy()
+    obx = data['obx'].copy()
+    sector_map = data['sector_map']
+    good_tickers = data['good_tickers']
+
+    all_dfs = []
+    n_tickers = len(good_tickers)
 
-        df['sector'] = sector_map.get(ticker, 'Unknown')
-        all_dfs.append(df)
+    results = map_tickers(engineer_ticker, TickerFrames(prices), good_tickers, jobs=jobs,
+                          shared={'obx': obx, 'sector_map': sector_map})
+    for idx, (ticker, df) in enumerate(zip(good_tickers, results)):
+        if (idx + 1) % 25 == 0 or idx == 0:
+            print(f"  Processing {idx + 1}/{n_tickers}: {ticker}")
+        if df is not None:
+            all_dfs.append(df if dtype is None else downcast(df, dtype))
 
     features = pd.concat(all_dfs, ignore_index=True)
     print(f"  → {len(features):,} rows from {features.ticker.nunique()} tickers")
@@ -730,13 +940,13 @@ def engineer_features(data: dict) -> pd.DataFrame:
 # ============================================================================
 
 def select_features(X, y, feature_cols, max_features=60):
-    """Quick feature importance via LightGBM for a given target."""
+    """Quick feature importance via LightGBM for a given target (X: the frame, or a compact panel's matrix)."""
     model = lgb.LGBMRegressor(
         n_estimators=100, max_depth=3, num_leaves=8,
         learning_rate=0.1, verbose=-1, random_state=42,
         subsample=0.5, colsample_bytree=0.5,
     )
-    model.fit(X[feature_cols].values, y.values)
+    model.fit(X if isinstance(X, np.ndarray) else X[feature_cols].values, y.values)
     importance = pd.Series(model.feature_importances_, index=feature_cols)
     importance = importance.sort_values(ascending=False)
     selected = list(importance[importance > 0].head(max_features).index)
@@ -747,26 +957,35 @@ def select_features(X, y, feature_cols, max_features=60):
 # Walk-Forward Training (Multi-Horizon)
 # ============================================================================
 
-def train_horizon_model(X_train, y_train, X_val, y_val, horizon_name):
+def train_horizon_model(X_train, y_train, X_val, y_val, horizon_name, threads=None, init=None, warm_rounds=0):
     """Train XGB + LGBM + CatBoost regressor stack for one horizon.
     Predict RANK (0-1), not direction. Regression is the right approach
     for rank prediction — it preserves ordering information.
+    threads caps each model's threads (a parallel fold's budget).
+    With `init` (the previous fold's models for this horizon) XGB and LGBM
+    continue boosting for at most warm_rounds rounds; CatBoost retrains.
     """
     models = {}
+    xgb_params = with_threads(TREE_PARAMS['xgb'], threads)
+    lgbm_params = with_threads(TREE_PARAMS['lgbm'], threads)
+    init_xgb = init_lgbm = None
+    if init is not None and warm_rounds > 0:
+        xgb_params, lgbm_params = warm_params(xgb_params, warm_rounds), warm_params(lgbm_params, warm_rounds)
+        init_xgb, init_lgbm = xgb_init(init['xgb']), lgb_init(init['lgbm'])
 
     # XGBoost
-    xgb_model = xgb.XGBRegressor(**TREE_PARAMS['xgb'])
-    xgb_model.fit(X_train, y_train, eval_set=[(X_val, y_val)], verbose=False)
+    xgb_model = xgb.XGBRegressor(**xgb_params)
+    xgb_model.fit(X_train, y_train, eval_set=[(X_val, y_val)], verbose=False, xgb_model=init_xgb)
     models['xgb'] = xgb_model
 
     # LightGBM
-    lgbm_model = lgb.LGBMRegressor(**TREE_PARAMS['lgbm'])
-    lgbm_model.fit(X_train, y_train, eval_set=[(X_val, y_val)],
+    lgbm_model = lgb.LGBMRegressor(**lgbm_params)
+    lgbm_model.fit(X_train, y_train, eval_set=[(X_val, y_val)], init_model=init_lgbm,
                    callbacks=[lgb.early_stopping(30, verbose=False), lgb.log_evaluation(0)])
     models['lgbm'] = lgbm_model
 
     # CatBoost
-    cat_model = cb.CatBoostRegressor(**TREE_PARAMS['cat'])
+    cat_model = cb.CatBoostRegressor(**with_threads(TREE_PARAMS['cat'], threads, key='thread_count'))
     cat_model.fit(X_train, y_train, eval_set=(X_val, y_val), early_stopping_rounds=30)
     models['cat'] = cat_model
 
@@ -781,128 +1000,208 @@ def predict_horizon(models, X):
     return (p_xgb + p_lgbm + p_cat) / 3.0
 
 
-def run_walk_forward(features, feature_cols):
+def run_fold(task, meta, X, columns, slicer, horizon_features, threads=None, init=None, warm_rounds=0):
+    """
+    Train the per-horizon models on one expanding-window fold and score its test block.
+
+    With `init` (the previous fold's 'state') and warm_rounds > 0 each
+    horizon continues the previous fold's boosters (see train_horizon_model).
+
+    Returns None when the fold is too small, else {'preds': test rows with
+    fused_signal, or None when training failed, 'error': message,
+    'importance': XGB importances per horizon trained before any error,
+    'val_ic': validation IC per horizon, 'warm', 'state': the horizons'
+    models for the next fold}.
+    """
+    train_end, test_start, test_end = task
+
+    train_rows = slicer.rows(end=train_end)
+    test_rows = slicer.rows(test_start, test_end)
+
+    if len(train_rows) < 200 or len(test_rows) < 10:
+        return None
+
+    # Validation: last 20% of training
+    val_size = max(int(len(train_rows) * 0.15), 50)
+    fit_rows = train_rows[:-val_size]
+    val_rows = train_rows[-val_size:]
+
+    test_pred = meta.iloc[test_rows][['ticker', 'date', 'regime']].copy()
+    for name in HORIZONS:
+        test_pred[f'fwd_ret_{name}'] = meta[f'fwd_ret_{name}'].values[test_rows]
+        test_pred[f'target_rank_{name}'] = meta[f'target_rank_{name}'].values[test_rows]
+
+    warm = init is not None and warm_rounds > 0
+    importance, val_ic, state = {}, {}, dict(init or {})
+    scores = {'importance': importance, 'val_ic': val_ic, 'warm': warm, 'state': state}
+    try:
+        # Train per-horizon models
+        for name in HORIZONS:
+            if name not in horizon_features:
+                continue
+            cols = columns[name]
+            target = meta[f'target_rank_{name}'].values
+
+            Xtr = take_rows(X, fit_rows, cols)
+            ytr = target[fit_rows]
+            Xv = take_rows(X, val_rows, cols)
+            yv = target[val_rows]
+            Xt = take_rows(X, test_rows, cols)
+
+            valid_train = ~np.isnan(ytr)
+            valid_val = ~np.isnan(yv)
+            if valid_train.sum() < 100 or valid_val.sum() < 20:
+                test_pred[f'pred_{name}'] = 0.5
+                continue
+            # Boolean indexing copies; only drop rows when a target is actually missing
+            if not valid_train.all():
+                Xtr, ytr = Xtr[valid_train], ytr[valid_train]
+            if not valid_val.all():
+                Xv, yv = Xv[valid_val], yv[valid_val]
+
+            models = train_horizon_model(
+                Xtr, ytr, Xv, yv, name, threads=threads,
+                init=state.get(name) if warm else None, warm_rounds=warm_rounds)
+            state[name] = models
+
+            pred = predict_horizon(models, Xt)
+            test_pred[f'pred_{name}'] = pred
+
+            importance[name] = models['xgb'].feature_importances_
+            val_ic[name] = scipy_stats.spearmanr(predict_horizon(models, Xv), yv)[0]
+
+        # Regime-weighted fusion
+        regime = test_pred['regime'].values
+        fused = np.zeros(len(test_pred))
+        for i in range(len(test_pred)):
+            r = regime[i] if isinstance(regime[i], str) else 'normal'
+            weights = REGIME_WEIGHTS.get(r, REGIME_WEIGHTS['normal'])
+            for name in HORIZONS:
+                if f'pred_{name}' in test_pred.columns:
+                    fused[i] += weights[name] * test_pred[f'pred_{name}'].values[i]
+
+        test_pred['fused_signal'] = fused
+        return {'preds': test_pred, **scores}
+
+    except Exception as e:
+        return {'preds': None, 'error': str(e), **scores}
+
+
+def run_fold_chain(chain, **shared):
+    """run_fold over a chain of folds, each continuing the previous one's boosters (see utils.warm_start)."""
+    return run_chain(run_fold, chain, **shared)
+
+
+def run_walk_forward(features, feature_cols, jobs=1, threads=None, warm_rounds=0, retrain_every=RETRAIN_EVERY):
     print(f"\n[3/8] WALK-FORWARD TRAINING (3 horizons × 3 models)")
     print("=" * 60)
 
     # Feature selection per horizon
+    compact = isinstance(features, Panel)
     horizon_features = {}
     for name in HORIZONS:
         target_col = f'target_rank_{name}'
-        if target_col not in features.columns:
+        if target_col not in (features.meta if compact else features).columns:
             continue
-        mask = features[target_col].notna()
-        selected, importance = select_features(
-            features.loc[mask], features.loc[mask, target_col], feature_cols, max_features=50)
+        if compact:
+            mask = features.meta[target_col].notna().to_numpy()
+            X, y = features.matrix(rows=None if mask.all() else mask), features.meta.loc[mask, target_col]
+        else:
+            mask = features[target_col].notna()
+            X, y = features.loc[mask], features.loc[mask, target_col]
+        selected, importance = select_features(X, y, feature_cols, max_features=50)
+        del X
         horizon_features[name] = selected
         print(f"\n  {name.upper()} horizon: {len(selected)} features selected")
         print(f"    Top 10: {', '.join(selected[:10])}")
 
     # Walk-forward splits (monthly rebalance)
-    unique_dates = sorted(features['date'].unique())
+    unique_dates = [pd.Timestamp(d) for d in features.dates] if compact else sorted(features['date'].unique())
     n_dates = len(unique_dates)
 
-    all_predictions = []
-    feature_importance_sum = {name: np.zeros(len(horizon_features.get(name, [])))
-                              for name in HORIZONS if name in horizon_features}
-    n_folds = 0
-
     # Expanding window with monthly steps
+    folds = []
     for test_start_idx in range(MIN_TRAIN + PURGE_GAP, n_dates - REBAL_PERIOD, REBAL_PERIOD):
         train_end_idx = test_start_idx - PURGE_GAP
         test_end_idx = min(test_start_idx + REBAL_PERIOD, n_dates)
+        folds.append((unique_dates[train_end_idx], unique_dates[test_start_idx], unique_dates[test_end_idx - 1]))
+
+    meta_cols = ['regime'] + [f'{kind}_{name}' for name in HORIZONS for kind in ('fwd_ret', 'target_rank')]
+    if compact:
+        # Each horizon's features as its own column block of the float32 matrix, so a fold's
+        # rows x horizon block is a view. Narrows the caller's panel: the other columns are freed.
+        bounds = np.cumsum([0] + [len(feats) for feats in horizon_features.values()]).tolist()
+        columns = {name: slice(lo, hi) for name, lo, hi in zip(horizon_features, bounds[:-1], bounds[1:])}
+        features.keep([f for feats in horizon_features.values() for f in feats])
+        X, meta, slicer = features.X, features.frame(meta_cols), features.slicer()
+    else:
+        # One matrix over every horizon's features; each horizon takes its columns
+        design_cols = list(dict.fromkeys(f for feats in horizon_features.values() for f in feats))
+        position = {f: i for i, f in enumerate(design_cols)}
+        columns = {name: [position[f] for f in feats] for name, feats in horizon_features.items()}
+        X = features[design_cols].values
+        meta, slicer = features[['ticker', 'date'] + meta_cols], DateSlicer(features['date'])
+    jobs = resolve_jobs(jobs)
+    threads = fold_threads(jobs, threads)
+    shared = {
+        'meta': meta,
+        'X': X,
+        'columns': columns,
+        'slicer': slicer,
+        'horizon_features': horizon_features,
+        'threads': threads,
+        'warm_rounds': warm_rounds,
+    }
 
-        train_end = unique_dates[train_end_idx]
-        test_start = unique_dates[test_start_idx]
-        test_end = unique_dates[test_end_idx - 1]
-
-        train_mask = features['date'] <= train_end
-        test_mask = (features['date'] >= test_start) & (features['date'] <= test_end)
-
-        X_train_full = features.loc[train_mask]
-        X_test_full = features.loc[test_mask]
+    all_predictions = []
+    feature_importance_sum = {name: np.zeros(len(horizon_features.get(name, [])))
+                              for name in HORIZONS if name in horizon_features}
+    val_ics = {False: [], True: []}  # per-horizon validation IC of full / warm folds
+    n_folds = 0
 
-        if len(X_train_full) < 200 or len(X_test_full) < 10:
+    chains = fold_chains(folds, retrain_every if warm_rounds else 1)
+    results = (result for chain in map_tasks(run_fold_chain, chains, jobs=jobs, shared=shared, threads=threads)
+               for result in chain)
+    for result in results:
+        if result is None:
             continue
 
-        # Validation: last 20% of training
-        val_size = max(int(len(X_train_full) * 0.15), 50)
-        train_data = X_train_full.iloc[:-val_size]
-        val_data = X_train_full.iloc[-val_size:]
-
-        test_pred = X_test_full[['ticker', 'date', 'regime']].copy()
-        for name in HORIZONS:
-            test_pred[f'fwd_ret_{name}'] = X_test_full[f'fwd_ret_{name}'].values
-            test_pred[f'target_rank_{name}'] = X_test_full[f'target_rank_{name}'].values
+        # Accumulate importance
+        for name, imp in result['importance'].items():
+            feature_importance_sum[name][:len(imp)] += imp
+        val_ics[result['warm']].append(result['val_ic'])
 
-        try:
-            # Train per-horizon models
-            for name in HORIZONS:
-                if name not in horizon_features:
-                    continue
-                feats = horizon_features[name]
-                target = f'target_rank_{name}'
-
-                Xtr = train_data[feats].values
-                ytr = train_data[target].values
-                Xv = val_data[feats].values
-                yv = val_data[target].values
-                Xt = X_test_full[feats].values
-
-                valid_train = ~np.isnan(ytr)
-                valid_val = ~np.isnan(yv)
-                if valid_train.sum() < 100 or valid_val.sum() < 20:
-                    test_pred[f'pred_{name}'] = 0.5
-                    continue
-
-                models = train_horizon_model(
-                    Xtr[valid_train], ytr[valid_train],
-                    Xv[valid_val], yv[valid_val], name)
-
-                pred = predict_horizon(models, Xt)
-                test_pred[f'pred_{name}'] = pred
-
-                # Accumulate importance
-                imp = models['xgb'].feature_importances_
-                feature_importance_sum[name][:len(imp)] += imp
-
-            # Regime-weighted fusion
-            regime = test_pred['regime'].values
-            fused = np.zeros(len(test_pred))
-            for i in range(len(test_pred)):
-                r = regime[i] if isinstance(regime[i], str) else 'normal'
-                weights = REGIME_WEIGHTS.get(r, REGIME_WEIGHTS['normal'])
-                for name in HORIZONS:
-                    if f'pred_{name}' in test_pred.columns:
-                        fused[i] += weights[name] * test_pred[f'pred_{name}'].values[i]
-
-            test_pred['fused_signal'] = fused
-            test_pred['fold'] = n_folds
-
-            all_predictions.append(test_pred)
-            n_folds += 1
-
-            if n_folds % 10 == 0:
-                recent = pd.concat(all_predictions[-10:])
-                valid = recent['target_rank_medium'].notna()
-                if valid.sum() > 0:
-                    ic = scipy_stats.spearmanr(
-                        recent.loc[valid, 'fused_signal'],
-                        recent.loc[valid, 'target_rank_medium']
-                    )[0]
-                    print(f"    Fold {n_folds}: IC={ic:+.3f}, N={valid.sum()}")
-
-        except Exception as e:
+        if result['preds'] is None:
             if n_folds < 3:
-                print(f"    Fold error: {e}")
+                print(f"    Fold error: {result['error']}")
             continue
 
+        test_pred = result['preds']
+        test_pred['fold'] = n_folds
+        all_predictions.append(test_pred)
+        n_folds += 1
+
+        if n_folds % 10 == 0:
+            recent = pd.concat(all_predictions[-10:])
+            valid = recent['target_rank_medium'].notna()
+            if valid.sum() > 0:
+                ic = scipy_stats.spearmanr(
+                    recent.loc[valid, 'fused_signal'],
+                    recent.loc[valid, 'target_rank_medium']
+                )[0]
+                print(f"    Fold {n_folds}: IC={ic:+.3f}, N={valid.sum()}")
+
     if not all_predictions:
         print("  ERROR: No successful folds!")
         return None, None, 0
 
-    predictions = pd.concat(all_predictions, ignore_index=True)
+    predictions = plain(pd.concat(all_predictions, ignore_index=True))
     print(f"\n  → {len(predictions):,} predictions, {n_folds} folds")
+    for warm, label in ((False, 'full retrain'), (True, 'warm start')):
+        if val_ics[warm]:
+            ics = ', '.join(f"{name}={np.nanmean([ic.get(name, np.nan) for ic in val_ics[warm]]):+.3f}"
+                            for name in HORIZONS if name in horizon_features)
+            print(f"    {label}: {len(val_ics[warm])} folds, mean validation IC {ics}")
 
     # Feature importance per horizon
     print(f"\n  Feature importance summary:")
@@ -1213,40 +1512,14 @@ def generate_and_write_signals(predictions, conn, no_write=False):
         """)
         write_conn.commit()
 
-        # Write signals in batches
-        batch_size = 500
-        written = 0
-        for start in range(0, len(all_signals), batch_size):
-            batch = all_signals.iloc[start:start + batch_size]
-            values = []
-            for _, row in batch.iterrows():
-                values.append(cur.mogrify(
-                    "(%s, %s, %s, %s, %s, %s, %s)",
-                    (row['ticker'], row['date'], row['model_id'], '21d',
-                     round(float(row['signal_value']), 4),
-                     round(float(row['predicted_return']), 4),
-                     round(float(row['confidence']), 4))
-                ).decode())
-
-            if values:
-                sql = f"""
-                    INSERT INTO alpha_signals (ticker, signal_date, model_id, horizon,
-                                              signal_value, predicted_return, confidence)
-                    VALUES {','.join(values)}
-                    ON CONFLICT (ticker, signal_date, model_id, horizon) DO UPDATE SET
-                        signal_value = EXCLUDED.signal_value,
-                        predicted_return = EXCLUDED.predicted_return,
-                        confidence = EXCLUDED.confidence
-                """
-                cur.execute(sql)
-                written += len(batch)
-
-            if written % 5000 == 0 and written > 0:
-                write_conn.commit()
-                print(f"    Written {written:,} / {len(all_signals):,}")
-
-        write_conn.commit()
-        print(f"  → {written:,} signals written to database")
+        rows = (
+            (row.ticker, row.date, row.model_id, '21d', round(float(row.signal_value), 4),
+             round(float(row.predicted_return), 4), round(float(row.confidence), 4))
+            for row in all_signals.itertuples(index=False)
+        )
+        copy_upsert(write_conn, 'alpha_signals',
+                    ['ticker', 'signal_date', 'model_id', 'horizon', 'signal_value', 'predicted_return', 'confidence'],
+                    rows, key=['ticker', 'signal_date', 'model_id', 'horizon'], label='signals')
         write_conn.close()
 
     except Exception as e:
@@ -1261,7 +1534,38 @@ def main():
     parser = argparse.ArgumentParser(description='Alpha Engine v7 — Yggdrasil')
     parser.add_argument('--test', action='store_true', help='Test mode (15 tickers)')
     parser.add_argument('--no-write', action='store_true', help='Skip DB write')
+    parser.add_argument('--feature-store', action='store_true',
+                        help='Read/extend the feature panel in FEATURE_STORE_DIR instead of recomputing it')
+    parser.add_argument('--rebuild-features', action='store_true',
+                        help='With --feature-store, rebuild the stored panel from scratch')
+    parser.add_argument('--data-backend', choices=DATA_BACKENDS, default=data_backend(),
+                        help='Read market data from Postgres or the local Arrow snapshot '
+                             '(synced by python -m app.sync_snapshot)')
+    parser.add_argument('--jobs', type=int, default=FEATURE_JOBS,
+                        help='Worker processes for the per-ticker feature stage (0 = one per CPU)')
+    parser.add_argument('--fold-jobs', type=int, default=FOLD_JOBS,
+                        help='Worker processes for the walk-forward folds (0 = one per CPU)')
+    parser.add_argument('--fold-threads', type=int, default=None,
+                        help='Model threads per fold (default: CPUs / --fold-jobs when parallel)')
+    parser.add_argument('--warm-start', action='store_true',
+                        help='Continue the previous fold\'s XGB/LGBM boosters instead of training each fold from zero')
+    parser.add_argument('--warm-rounds', type=int, default=WARM_ROUNDS,
+                        help='With --warm-start, max boosting rounds added per warm fold')
+    parser.add_argument('--retrain-every', type=int, default=RETRAIN_EVERY,
+                        help='With --warm-start, train from zero every N folds (guards against drift)')
+    parser.add_argument('--memory-budget', type=float, default=MEMORY_BUDGET_GB,
+                        help='Memory budget in GB: train on a compact float32 panel and report '
+                             'peak RSS per stage (0 = off)')
+    parser.add_argument('--advance-features', action='store_true',
+                        help='Only advance the incremental feature checkpoints (FEATURE_STATE_DIR) to the '
+                             'latest bar and write the latest row per ticker, then exit')
     args = parser.parse_args()
+    set_data_backend(args.data_backend)
+    if args.advance_features:
+        run_advance_features(args)
+        return
+    compact = args.memory_budget > 0
+    mem = MemoryLog(args.memory_budget)
 
     print("=" * 60)
     print(f"  ALPHA ENGINE v7 — YGGDRASIL")
@@ -1276,11 +1580,34 @@ def main():
 
     db_url = get_db_url()
     conn = psycopg2.connect(db_url)
-    data = load_data(conn, test_mode=args.test)
-
-    features, feature_cols = engineer_features(data)
 
-    predictions, horizon_features, n_folds = run_walk_forward(features, feature_cols)
+    # Load data + feature engineering (stored panel with --feature-store)
+    store = FeatureStore() if args.feature_store else None
+    with mem.stage('features'):
+        features, feature_cols = cached_features(
+            store, feature_group('v7', args.test),
+            feature_version(load_data, engineer_features, engineer_ticker, ticker_features, rolling_hurst,
+                            rolling_approx_entropy, rolling_spectral_entropy, amihud_illiquidity, rolling_ou_halflife,
+                            clean_correlation_rmt, transfer_entropy, detect_regime,
+                            horizons=HORIZONS, min_train=MIN_TRAIN, test=args.test,
+                            **({'dtype': 'float32'} if compact else {})),
+            latest_price_date(conn) if store else None,
+            load=lambda: load_data(conn, test_mode=args.test),
+            build=lambda data: engineer_features(data, jobs=args.jobs, dtype=np.float32 if compact else None),
+            targets=[f'fwd_ret_{name}' for name in HORIZONS], rebuild=args.rebuild_features,
+        )
+    n_tickers = features.ticker.nunique()
+    if compact:
+        with mem.stage('panel'):
+            features = Panel.from_frame(features, feature_cols, keep=['regime'] + [
+                f'{kind}_{name}' for name in HORIZONS for kind in ('fwd_ret', 'target_rank')])
+        print(f"  Compact panel: {len(features):,} rows x {len(feature_cols)} features, "
+              f"{features.nbytes / 2**20:,.0f} MB")
+
+    with mem.stage('walk_forward'):
+        predictions, horizon_features, n_folds = run_walk_forward(
+            features, feature_cols, jobs=args.fold_jobs, threads=args.fold_threads,
+            warm_rounds=args.warm_rounds if args.warm_start else 0, retrain_every=args.retrain_every)
 
     if predictions is None:
         print("\nFATAL: No predictions generated.")
@@ -1315,10 +1642,11 @@ def main():
     print(f"\n[8/8] SUMMARY")
     print("=" * 60)
     print(f"  Total time: {elapsed / 60:.1f} minutes")
-    print(f"  Tickers: {features.ticker.nunique()}")
+    print(f"  Tickers: {n_tickers}")
     print(f"  Features: {len(feature_cols)} → {sum(len(v) for v in horizon_features.values())} selected across horizons")
     print(f"  Walk-forward folds: {n_folds}")
     print(f"  Total predictions: {len(predictions):,}")
+    mem.report()
 
     conn.close()
     print("\nDone.")
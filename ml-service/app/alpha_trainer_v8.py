@@ -30,6 +30,11 @@ Usage:
   python alpha_trainer_v8.py             # Full universe
   python alpha_trainer_v8.py --no-write  # Evaluate only, don't write to DB
   python alpha_trainer_v8.py --short     # Enable short signals (below 200MA)
+  python alpha_trainer_v8.py --tree-backend compiled  # NumPy tree evaluator for batches of <= 16 rows
+  python alpha_trainer_v8.py --feature-store  # Reuse/extend the stored feature panel
+  python alpha_trainer_v8.py --bins first-fold  # Fixed bin edges for all folds (same speed as per-fold)
+  python alpha_trainer_v8.py --warm-start  # Continue boosting across folds, full retrain yearly
+  python alpha_trainer_v8.py --data-backend snapshot  # Read market data from the local Arrow snapshot
 """
 
 import argparse
@@ -53,6 +58,41 @@ from sklearn.metrics import (
 import xgboost as xgb
 import lightgbm as lgb
 
+try:  # run as app.alpha_trainer_v8 or as a script from app/
+    from .models.tree_inference import select_tree_backend, TREE_BACKENDS
+    from .models.trade_simulator import average_true_range, entry_rows, exit_rule, simulate_trades, trade_stats
+    from .utils.feature_store import (
+        FeatureStore, cached_features, feature_group, feature_version, latest_price_date,
+    )
+    from .utils.parallel import FEATURE_JOBS, TickerFrames, map_tasks, map_tickers, resolve_jobs
+    from .utils.folds import FOLD_JOBS, DateSlicer, fold_threads, take_rows, with_threads
+    from .utils.binning import BIN_MODES, FoldBins, fit_lgbm, fit_xgb
+    from .utils.warm_start import WARM_ROUNDS, fold_chains, lgb_init, run_chain, warm_params, xgb_init
+    from .utils.bulk_write import copy_upsert
+    from .utils.bulk_read import load_table
+    from .utils.snapshot import DATA_BACKENDS, data_backend, set_data_backend
+    from .utils.feature_engine import (
+        FeatureState, Lag, RollingSum, RollingMean, RollingVar, RollingMax, RollingMin,
+        RollingCov, RollingApply, EWMMean, StateStore, advance, pending_bars,
+    )
+except ImportError:
+    from models.tree_inference import select_tree_backend, TREE_BACKENDS
+    from models.trade_simulator import average_true_range, entry_rows, exit_rule, simulate_trades, trade_stats
+    from utils.feature_store import (
+        FeatureStore, cached_features, feature_group, feature_version, latest_price_date,
+    )
+    from utils.parallel import FEATURE_JOBS, TickerFrames, map_tasks, map_tickers, resolve_jobs
+    from utils.folds import FOLD_JOBS, DateSlicer, fold_threads, take_rows, with_threads
+    from utils.binning import BIN_MODES, FoldBins, fit_lgbm, fit_xgb
+    from utils.warm_start import WARM_ROUNDS, fold_chains, lgb_init, run_chain, warm_params, xgb_init
+    from utils.bulk_write import copy_upsert
+    from utils.bulk_read import load_table
+    from utils.snapshot import DATA_BACKENDS, data_backend, set_data_backend
+    from utils.feature_engine import (
+        FeatureState, Lag, RollingSum, RollingMean, RollingVar, RollingMax, RollingMin,
+        RollingCov, RollingApply, EWMMean, StateStore, advance, pending_bars,
+    )
+
 warnings.filterwarnings('ignore')
 sys.stdout = os.fdopen(sys.stdout.fileno(), 'w', 1)
 
@@ -73,6 +113,7 @@ WIN_THRESHOLD = 0.05       # 5% gain = "win" (positive class) — selective
 MIN_TRAIN_DAYS = 756       # 3 years minimum training window
 PURGE_GAP = 5              # 5-day gap between train and test
 STEP_SIZE = 63             # Retrain every quarter
+RETRAIN_EVERY = 4          # --warm-start: full retrain every 4th fold (yearly)
 
 # Signal thresholds
 MIN_CONFIDENCE = 0.55      # Minimum raw probability to generate signal
@@ -124,6 +165,27 @@ LGBM_PARAMS = {
 # Feature Engineering
 # ============================================================================
 
+def ols_slope(windows):
+    """OLS slope of each row of `windows` on x = 0..n-1.
+
+    Closed form sum((x - x̄)·y) / sum((x - x̄)²). x - x̄ is a grid of
+    (half-)integers, so only the products and the row sums round; the result
+    agrees with np.polyfit(x, y, 1)[0] to ~1e-12 relative, not bit for bit.
+    """
+    n = windows.shape[-1]
+    xc = np.arange(n) - (n - 1) / 2
+    return (windows * xc).sum(axis=-1) / (xc * xc).sum()
+
+
+def obv_slope(obv, window=21):
+    """Rolling OLS slope of OBV scaled by its mean absolute level (NaN until the window fills)."""
+    out = np.full(len(obv), np.nan)
+    if len(obv) >= window:
+        windows = np.lib.stride_tricks.sliding_window_view(obv, window)
+        out[window - 1:] = ols_slope(windows) / (np.abs(windows).mean(axis=-1) + 1)
+    return out
+
+
 def compute_features(df_ticker, obx_returns=None, sector_returns=None):
     """Compute all features for a single ticker's price history.
 
@@ -163,11 +225,9 @@ def compute_features(df_ticker, obx_returns=None, sector_returns=None):
     feats['mom_12_1'] = pd.Series(close, index=df.index).pct_change(252) - \
                         pd.Series(close, index=df.index).pct_change(21)
 
-    # Momentum quality: consistency of gains
+    # Momentum quality: consistency of gains (share of up days)
     ret_s = pd.Series(ret, index=df.index)
-    feats['mom_quality'] = ret_s.rolling(63).apply(
-        lambda x: np.mean(x > 0) if len(x) > 0 else 0.5, raw=True
-    )
+    feats['mom_quality'] = (ret_s > 0).astype(float).rolling(63).mean()
 
     # Momentum acceleration
     mom_21 = pd.Series(close, index=df.index).pct_change(21)
@@ -224,19 +284,18 @@ def compute_features(df_ticker, obx_returns=None, sector_returns=None):
 
     # Garman-Klass volatility (uses OHLC — more efficient than close-to-close)
     gk_var = 0.5 * np.log(high / low) ** 2 - (2 * np.log(2) - 1) * np.log(close / opn) ** 2
-    feats['gk_vol'] = pd.Series(gk_var, index=df.index).rolling(21).mean().apply(
-        lambda x: np.sqrt(x * 252) if x > 0 else 0
-    )
+    gk_mean = pd.Series(gk_var, index=df.index).rolling(21).mean().values
+    with np.errstate(invalid='ignore'):
+        feats['gk_vol'] = np.where(gk_mean > 0, np.sqrt(gk_mean * 252), 0.0)
 
     # Downside volatility
     neg_rets = ret_s.where(ret_s < 0, 0)
     feats['downside_vol'] = neg_rets.rolling(63).std() * np.sqrt(252)
 
-    # Max drawdown (21d rolling)
-    feats['max_dd_21d'] = close_s.rolling(21).apply(
-        lambda x: (x[-1] / x.max() - 1) if len(x) > 0 and x.max() > 0 else 0,
-        raw=True
-    )
+    # Max drawdown (21d rolling) from the 21d high
+    max_dd = close_s / price_21h - 1
+    max_dd[price_21h <= 0] = 0
+    feats['max_dd_21d'] = max_dd
 
     # ATR (14-day) — normalized by price
     true_range = np.maximum(
@@ -265,11 +324,8 @@ def compute_features(df_ticker, obx_returns=None, sector_returns=None):
     feats['amihud'] = (ret_s_abs / (dollar_vol + 1)).rolling(21).mean()
 
     # On-Balance Volume slope (accumulation/distribution)
-    obv = (ret_s.apply(np.sign) * vol_s).cumsum()
-    feats['obv_slope'] = obv.rolling(21).apply(
-        lambda x: np.polyfit(range(len(x)), x, 1)[0] / (np.mean(np.abs(x)) + 1) if len(x) > 1 else 0,
-        raw=True
-    )
+    obv = (np.sign(ret) * volume).cumsum()
+    feats['obv_slope'] = obv_slope(obv, 21)
 
     # ---- TREND STRUCTURE ----
     feats['above_sma20'] = (close_s > sma20).astype(float)
@@ -351,54 +407,292 @@ def compute_features(df_ticker, obx_returns=None, sector_returns=None):
     return feats
 
 
+class V8FeatureState(FeatureState):
+    """compute_features one bar at a time, for the daily signal job.
+
+    Streaming a ticker's bars from the first row compute_features saw gives
+    exactly its rows (see utils.feature_engine). Bars are feature_bars() rows:
+    date, open, high, low, close, volume and obx_ret.
+    """
+
+    def __init__(self, market=True):
+        super().__init__()
+        self.market = market
+        self.close = Lag(252)
+        self.prev_high = np.nan
+        self.prev_low = np.nan
+        self.mom_21 = Lag(21)
+        self.mom_quality = RollingMean(63)
+
+        # close.rolling(20).mean() serves as sma20 and the z-score / Bollinger mean
+        self.sma20 = RollingMean(20)
+        self.sma50 = RollingMean(50)
+        self.sma200 = RollingMean(200)
+        self.std20 = RollingVar(20)
+        self.high_252 = RollingMax(252)
+        self.low_252 = RollingMin(252)
+
+        self.gain = RollingMean(14)
+        self.loss = RollingMean(14)
+        self.price_21h = RollingMax(21)
+        self.rsi_21h = RollingMax(21)
+
+        self.vol = {d: RollingVar(d) for d in [5, 21, 63]}
+        self.gk_var = RollingMean(21)
+        self.downside = RollingVar(63)
+        # true_range.rolling(14).mean(): ATR and the ADX denominator
+        self.atr_14 = RollingMean(14)
+
+        self.vol_sma20 = RollingMean(20)
+        self.vol_sma60 = RollingMean(60)
+        self.amihud = RollingMean(21)
+        self.obv = 0.0
+        self.obv_slope = RollingApply(21, lambda x: ols_slope(x) / (np.abs(x).mean(axis=-1) + 1))
+
+        self.ema12 = EWMMean(12)
+        self.ema26 = EWMMean(26)
+        self.macd_signal = EWMMean(9)
+        self.plus_dm = RollingMean(14)
+        self.minus_dm = RollingMean(14)
+        self.dx = RollingMean(14)
+
+        self.inside_bars = RollingSum(10)
+        self.gap = RollingMean(21)
+        self.band_width = RollingMean(126)
+
+        if market:
+            self.cov_rm = RollingCov(63)
+            self.var_m = RollingVar(63)
+            self.residual = RollingVar(63)
+            self.obx_21 = RollingSum(21)
+
+    def update(self, bar):
+        c = np.float64(bar['close'])
+        h = np.float64(bar['high'])
+        lo = np.float64(bar['low'])
+        o = np.float64(bar['open'])
+        v = np.float64(bar['volume'])
+        first = self.n == 0
+        prev_c = self.close.get(0)
+        prev_h, prev_l = np.float64(self.prev_high), np.float64(self.prev_low)
+        self.close.push(float(c))
+        self.prev_high, self.prev_low = float(h), float(lo)
+
+        ret = np.float64(0.0) if first else c / prev_c - 1
+        f = {}
+
+        # ---- MOMENTUM ----
+        for d in [5, 10, 21, 63, 126, 252]:
+            f[f'ret_{d}d'] = self.close.pct_change(d)
+        f['mom_12_1'] = f['ret_252d'] - f['ret_21d']
+        f['mom_quality'] = self.mom_quality.update(float(ret > 0))
+        self.mom_21.push(float(f['ret_21d']))
+        f['mom_accel'] = f['ret_21d'] - self.mom_21.get(21)
+
+        # ---- MEAN REVERSION ----
+        sma20 = self.sma20.update(c)
+        sma50 = self.sma50.update(c)
+        sma200 = self.sma200.update(c)
+        f['dist_sma20'] = c / sma20 - 1
+        f['dist_sma50'] = c / sma50 - 1
+        f['dist_sma200'] = c / sma200 - 1
+
+        roll_std = self.std20.update(c)
+        f['z_score_20d'] = (c - sma20) / (roll_std + 1e-8)
+        bb_upper = sma20 + 2 * roll_std
+        bb_lower = sma20 - 2 * roll_std
+        f['bb_position'] = (c - bb_lower) / (bb_upper - bb_lower + 1e-8)
+
+        high_252 = self.high_252.update(h)
+        low_252 = self.low_252.update(lo)
+        f['dist_52w_high'] = c / high_252 - 1
+        f['dist_52w_low'] = c / low_252 - 1
+        f['pct_52w_range'] = (c - low_252) / (high_252 - low_252 + 1e-8)
+
+        delta = c - prev_c
+        gain = self.gain.update(delta if delta > 0 else 0.0)
+        loss = self.loss.update(-(delta if delta < 0 else 0.0))
+        rs = gain / (loss + 1e-8)
+        rsi = 100 - 100 / (1 + rs)
+        f['rsi_14'] = rsi
+        price_21h = self.price_21h.update(c)
+        rsi_21h = self.rsi_21h.update(rsi)
+        f['rsi_divergence'] = (c / price_21h - 1) - (rsi / rsi_21h - 1)
+
+        # ---- VOLATILITY STRUCTURE ----
+        for d in [5, 21, 63]:
+            f[f'vol_{d}d'] = self.vol[d].update(ret) * np.sqrt(252)
+        f['vol_ratio_5_21'] = f['vol_5d'] / (f['vol_21d'] + 1e-8)
+        f['vol_ratio_21_63'] = f['vol_21d'] / (f['vol_63d'] + 1e-8)
+
+        log_hl = np.log(h / lo)
+        log_co = np.log(c / o)
+        gk_mean = float(self.gk_var.update(0.5 * (log_hl * log_hl) - (2 * np.log(2) - 1) * (log_co * log_co)))
+        f['gk_vol'] = np.float64(np.sqrt(gk_mean * 252) if gk_mean > 0 else 0)
+        f['downside_vol'] = self.downside.update(ret if ret < 0 else 0.0) * np.sqrt(252)
+        f['max_dd_21d'] = np.float64(0.0) if price_21h <= 0 else c / price_21h - 1
+
+        true_range = h - lo if first else np.maximum(h - lo, np.maximum(np.abs(h - prev_c), np.abs(lo - prev_c)))
+        atr_14 = self.atr_14.update(true_range)
+        f['atr_pct'] = atr_14 / c
+
+        # ---- VOLUME / MICROSTRUCTURE ----
+        vol_sma20 = self.vol_sma20.update(v)
+        f['volume_ratio'] = v / (vol_sma20 + 1)
+        f['log_dollar_vol'] = np.log1p(v * c)
+        f['vol_trend'] = vol_sma20 / (self.vol_sma60.update(v) + 1) - 1
+        f['amihud'] = self.amihud.update(np.abs(ret) / (v * c + 1))
+        obv_step = np.sign(float(ret)) * v
+        self.obv = float(obv_step) if first else self.obv + float(obv_step)
+        f['obv_slope'] = self.obv_slope.update(self.obv)
+
+        # ---- TREND STRUCTURE ----
+        f['above_sma20'] = float(c > sma20)
+        f['above_sma50'] = float(c > sma50)
+        f['above_sma200'] = float(c > sma200)
+        f['trend_score'] = f['above_sma20'] + f['above_sma50'] + f['above_sma200']
+        f['sma_align'] = float(sma20 > sma50 and sma50 > sma200) - float(sma200 > sma50 and sma50 > sma20)
+
+        macd = self.ema12.update(c) - self.ema26.update(c)
+        f['macd_hist'] = (macd - self.macd_signal.update(macd)) / c
+
+        up = h - prev_h
+        down = -(lo - prev_l)
+        plus_di = 100 * (self.plus_dm.update(up if up > 0 else 0.0) / (atr_14 + 1e-8))
+        minus_di = 100 * (self.minus_dm.update(down if down > 0 else 0.0) / (atr_14 + 1e-8))
+        f['adx'] = self.dx.update(100 * np.abs(plus_di - minus_di) / (plus_di + minus_di + 1e-8))
+
+        # ---- PATTERN FEATURES ----
+        f['inside_bar_count'] = self.inside_bars.update(float(h < prev_h and lo > prev_l))
+        gap = np.float64(0.0) if first else (o - prev_c) / (prev_c + 1e-8)
+        f['gap_magnitude'] = self.gap.update(np.abs(gap))
+        band_width = (bb_upper - bb_lower) / (sma20 + 1e-8)
+        f['bb_squeeze'] = band_width / (self.band_width.update(band_width) + 1e-8)
+
+        # ---- CALENDAR ----
+        date = pd.Timestamp(bar['date'])
+        f['is_january'] = float(date.month == 1)
+        f['month_sin'] = np.sin(2 * np.pi * date.month / 12)
+        f['month_cos'] = np.cos(2 * np.pi * date.month / 12)
+        f['is_monday'] = float(date.dayofweek == 0)
+        f['is_friday'] = float(date.dayofweek == 4)
+
+        # ---- MARKET CONTEXT ----
+        if self.market:
+            obx = np.float64(bar.get('obx_ret', 0.0))
+            obx = np.float64(0.0) if obx != obx else obx
+            cov_rm = self.cov_rm.update(ret, obx)
+            self.var_m.push(obx)
+            f['beta_63d'] = cov_rm / (self.var_m.var() + 1e-8)
+            f['ivol_63d'] = self.residual.update(ret - f['beta_63d'] * obx) * np.sqrt(252)
+            f['excess_ret_21d'] = f['ret_21d'] - self.obx_21.update(obx)
+
+        return f
+
+
+def feature_bars(df_ticker, obx_returns=None):
+    """One ticker's bars for V8FeatureState: prices plus the OBX return of each date."""
+    bars = df_ticker[['open', 'high', 'low', 'close', 'volume']].copy()
+    bars['obx_ret'] = obx_returns.reindex(df_ticker.index).fillna(0).values if obx_returns is not None else 0.0
+    bars['date'] = df_ticker.index
+    return bars.reset_index(drop=True)
+
+
+def advance_feature_states(conn, test_mode=False, store=None):
+    """Latest compute_features row of every ticker from checkpointed V8FeatureState.
+
+    The daily feature step (--advance-features): only the bars after each
+    ticker's checkpoint are loaded and streamed, plus the full history from
+    the training start date (2018-01-01) for tickers without one. One
+    ticker's streamed row is checked against compute_features over that
+    ticker's full history, which also serves every row when pandas is not
+    2.2 (see utils.feature_engine).
+    """
+    store = store or StateStore()
+    group = feature_group('v8', test_mode)
+    version = feature_version(compute_features, V8FeatureState, since='2018-01-01')
+
+    def load(since, tickers):
+        return load_table(conn, 'prices_daily', ['ticker', 'date', 'open', 'high', 'low', 'close', 'volume'],
+                          since=since, tickers=tickers or (TEST_TICKERS if test_mode else None),
+                          filters=[('volume', '>', 0), ('close', '>', 0)])
+
+    df_obx = load_table(conn, 'prices_daily', ['date', 'close'], tickers=['OBX'],
+                        filters=[('close', '>', 0)]).set_index('date')
+    obx_returns = df_obx['close'].pct_change().dropna()
+    prices = {ticker: df_t.set_index('date')
+              for ticker, df_t in pending_bars(store, group, version, load, '2018-01-01').items()}
+    bars = {ticker: feature_bars(df_t, obx_returns) for ticker, df_t in prices.items()}
+    batch = lambda ticker: compute_features(load('2018-01-01', [ticker]).set_index('date'), obx_returns=obx_returns)
+    return advance(store, group, version, lambda ticker: V8FeatureState(), bars, batch=batch)
+
+
+def run_advance_features(args):
+    """--advance-features: bring the feature checkpoints up to the latest bar and store the latest rows."""
+    db_url = os.environ.get('DATABASE_URL', '')
+    if not db_url:
+        print("[ERROR] DATABASE_URL not set")
+        return
+    t0 = time.time()
+    conn = psycopg2.connect(db_url)
+    store = StateStore()
+    rows = advance_feature_states(conn, test_mode=args.test, store=store)
+    conn.close()
+    if rows.empty:
+        print("  No new bars since the last checkpoints")
+        return
+    path = store.save_rows(feature_group('v8', args.test), rows)
+    print(f"  Advanced {len(rows)} tickers to {rows['date'].max().date()} in {time.time() - t0:.1f}s -> {path}")
+
+
 def add_cross_asset_features(feats_df, dates, conn):
-    """Add commodity, FX, and shipping features from DB."""
+    """Add commodity and FX features from DB (one query per table)."""
     try:
         # Commodities: Brent, WTI, Gold, Aluminium
         comm_symbols = ['BZ=F', 'CL=F', 'GC=F', 'ALI=F']
+        df_c = load_table(conn, 'commodity_prices', ['symbol', 'date', 'close'],
+                          tickers=comm_symbols, ticker_col='symbol', order_by='symbol, date')
+        closes = df_c.pivot_table(index='date', columns='symbol', values='close')
         for sym in comm_symbols:
-            df_c = pd.read_sql(f"""
-                SELECT date, close FROM commodity_prices
-                WHERE symbol = '{sym}' ORDER BY date
-            """, conn, parse_dates=['date']).set_index('date')
-            if len(df_c) > 0:
-                df_c = df_c.reindex(dates).ffill()
+            if sym in closes.columns:
+                close = closes[sym].reindex(dates).ffill()
                 for d in [5, 21]:
-                    col = f'c_{sym.replace("=", "")}_r{d}'
-                    feats_df[col] = df_c['close'].pct_change(d)
+                    feats_df[f'c_{sym.replace("=", "")}_r{d}'] = close.pct_change(d)
 
         # FX: NOK/USD, NOK/EUR
-        for pair in ['NOKUSD', 'NOKEUR']:
-            df_fx = pd.read_sql(f"""
-                SELECT date, rate FROM fx_spot_rates
-                WHERE pair = '{pair}' ORDER BY date
-            """, conn, parse_dates=['date']).set_index('date')
-            if len(df_fx) > 0:
-                df_fx = df_fx.reindex(dates).ffill()
+        fx_pairs = ['NOKUSD', 'NOKEUR']
+        df_fx = load_table(conn, 'fx_spot_rates', ['currency_pair', 'date', 'spot_rate'],
+                           tickers=fx_pairs, ticker_col='currency_pair', order_by='currency_pair, date')
+        rates = df_fx.pivot_table(index='date', columns='currency_pair', values='spot_rate')
+        for pair in fx_pairs:
+            if pair in rates.columns:
+                rate = rates[pair].reindex(dates).ffill()
                 for d in [5, 21]:
-                    feats_df[f'fx_{pair}_r{d}'] = df_fx['rate'].pct_change(d)
-
-        # Short positions
-        df_shorts = pd.read_sql("""
-            SELECT date, ticker, short_pct FROM short_positions ORDER BY date
-        """, conn, parse_dates=['date'])
-        # Will be merged per-ticker externally
+                    feats_df[f'fx_{pair}_r{d}'] = rate.pct_change(d)
 
     except Exception as e:
+        conn.rollback()
         print(f"  [WARN] Cross-asset feature fetch partial: {e}")
 
     return feats_df
 
 
-def add_fundamental_features(feats_df, ticker, dates, conn):
-    """Add fundamental features from factor_fundamentals table."""
+def load_fundamentals(conn):
+    """factor_fundamentals rows of every ticker, grouped by ticker for add_fundamental_features."""
+    try:
+        df_fund = load_table(conn, 'factor_fundamentals',
+                             ['ticker', 'date', 'ep', 'bm', 'dy', 'sp', 'ev_ebitda', 'mktcap'])
+    except Exception as e:
+        conn.rollback()
+        print(f"  [WARN] Fundamental features unavailable: {e}")
+        df_fund = pd.DataFrame(columns=['ticker', 'date', 'ep', 'bm', 'dy', 'sp', 'ev_ebitda', 'mktcap'])
+    return TickerFrames(df_fund)
+
+
+def add_fundamental_features(feats_df, ticker, dates, fundamentals):
+    """Add fundamental features from the ticker's factor_fundamentals rows (load_fundamentals)."""
     try:
-        df_fund = pd.read_sql(f"""
-            SELECT date, ep, bm, dy, sp, ev_ebitda, mktcap
-            FROM factor_fundamentals
-            WHERE ticker = '{ticker}'
-            ORDER BY date
-        """, conn, parse_dates=['date']).set_index('date')
+        df_fund = fundamentals.get(ticker).drop(columns='ticker').set_index('date')
 
         if len(df_fund) > 0:
             df_fund = df_fund.reindex(dates).ffill()
@@ -418,10 +712,6 @@ def add_fundamental_features(feats_df, ticker, dates, conn):
     return feats_df
 
 
-# ============================================================================
-# Walk-Forward Training
-# ============================================================================
-
 def add_cross_sectional_features(data):
     """Add cross-sectional rank features within each date.
 
@@ -446,150 +736,318 @@ def add_cross_sectional_features(data):
     return data
 
 
-def train_walk_forward(all_data, dates_index, feature_cols, args):
-    """
-    Purged walk-forward training — no isotonic calibration.
-    Uses raw ensemble probabilities with quality gate (skip weak folds).
+def ticker_panel(ticker, df_t, obx_returns, fundamentals):
+    """Features, fundamentals and targets of one ticker's price rows (None below 300 rows)."""
+    df_t = df_t.sort_values('date').set_index('date')
 
-    Returns list of predictions_df with:
-      - ticker, date, prob_win, forward_return, target, above_200ma
-    """
-    unique_dates = sorted(dates_index.unique())
-    n_dates = len(unique_dates)
+    if len(df_t) < 300:
+        return None
 
-    min_train_date_idx = MIN_TRAIN_DAYS
-    if min_train_date_idx >= n_dates - STEP_SIZE:
-        print(f"  [ERROR] Not enough data: {n_dates} dates, need {MIN_TRAIN_DAYS}")
-        return []
+    # Compute features
+    feats = compute_features(df_t, obx_returns=obx_returns)
+    if feats.empty:
+        return None
 
-    all_predictions = []
-    fold = 0
-    skipped_folds = 0
-    test_start_idx = min_train_date_idx
+    # Add fundamentals
+    feats = add_fundamental_features(feats, ticker, feats.index, fundamentals)
 
-    while test_start_idx + STEP_SIZE <= n_dates:
-        fold += 1
-        test_end_idx = min(test_start_idx + STEP_SIZE, n_dates)
+    # Target: forward return > threshold
+    close_s = df_t['close']
+    forward_return = close_s.shift(-HORIZON_DAYS) / close_s - 1
 
-        # Date boundaries with purge gap
-        train_end_date = unique_dates[test_start_idx - PURGE_GAP - 1]
-        test_start_date = unique_dates[test_start_idx]
-        test_end_date = unique_dates[test_end_idx - 1]
+    # 200MA filter
+    sma200 = close_s.rolling(200).mean()
+    above_200ma = (close_s > sma200).astype(float)
 
-        # Split data
-        train_mask = all_data['date'] <= train_end_date
-        test_mask = (all_data['date'] >= test_start_date) & (all_data['date'] <= test_end_date)
+    # Combine
+    feats['ticker'] = ticker
+    feats['date'] = feats.index
+    feats['forward_return'] = forward_return
+    feats['target'] = (forward_return > WIN_THRESHOLD).astype(int)
+    feats['above_200ma'] = above_200ma
 
-        train_data = all_data[train_mask].copy()
-        test_data = all_data[test_mask].copy()
+    # Drop rows without target (last HORIZON_DAYS rows)
+    return feats.dropna(subset=['forward_return'])
 
-        if len(train_data) < 500 or len(test_data) < 50:
-            test_start_idx += STEP_SIZE
-            continue
 
-        # Use last 15% of training as validation for early stopping
-        val_cutoff = train_data['date'].quantile(0.85)
-        val_mask = train_data['date'] >= val_cutoff
-        val_data = train_data[val_mask].copy()
-        pure_train = train_data[~val_mask].copy()
+def build_feature_panel(data, jobs=1):
+    """Feature panel for all tickers: per-ticker features, fundamentals, targets, ranks.
 
-        if len(pure_train) < 300 or len(val_data) < 50:
-            test_start_idx += STEP_SIZE
+    data: {'prices': prices_daily rows, 'obx_returns': OBX daily returns, 'conn': DB connection}
+    """
+    df_prices, obx_returns, conn = data['prices'], data['obx_returns'], data['conn']
+    tickers = sorted(df_prices['ticker'].unique())
+
+    all_features = []
+    results = map_tickers(ticker_panel, TickerFrames(df_prices), tickers, jobs=jobs,
+                          shared={'obx_returns': obx_returns, 'fundamentals': load_fundamentals(conn)})
+    for i, feats in enumerate(results):
+        if feats is None:
             continue
 
-        X_train = pure_train[feature_cols].values
-        y_train = pure_train['target'].values
-        X_val = val_data[feature_cols].values
-        y_val = val_data['target'].values
-        X_test = test_data[feature_cols].values
+        all_features.append(feats)
+
+        if (i + 1) % 10 == 0:
+            print(f"  {i+1}/{len(tickers)} tickers processed")
+
+    if not all_features:
+        return pd.DataFrame()
+
+    all_data = pd.concat(all_features, ignore_index=True)
+
+    # Add cross-sectional rank features (relative to peers on same date)
+    return add_cross_sectional_features(all_data)
+
+
+def v8_feature_version(args):
+    """Version hash of the v8 feature panel (see utils.feature_store)."""
+    return feature_version(
+        compute_features, load_fundamentals, add_fundamental_features, add_cross_sectional_features,
+        ticker_panel, build_feature_panel,
+        horizon=HORIZON_DAYS, win_threshold=WIN_THRESHOLD, since='2018-01-01',
+        tickers=TEST_TICKERS if args.test else 'all',
+    )
+
+
+def price_arrays(df_t):
+    """Sorted dates (datetime64[D]) and open / high / low / close / ATR(14) arrays of one ticker, for optimize_atr_per_stock."""
+    prices = {
+        'dates': df_t.index.values.astype('datetime64[D]'),
+        **{col: df_t[col].to_numpy(dtype=np.float64) for col in ('open', 'high', 'low', 'close') if col in df_t},
+    }
+    prices['atr'] = average_true_range(prices['high'], prices['low'], prices['close'])
+    return prices
+
+
+# ============================================================================
+# Walk-Forward Training
+# ============================================================================
+
+def walk_forward_folds(dates_index):
+    """Fold boundaries of the purged walk-forward: test blocks of STEP_SIZE dates from MIN_TRAIN_DAYS."""
+    unique_dates = sorted(dates_index.unique())
+    n_dates = len(unique_dates)
+
+    folds = []
+    test_start_idx = MIN_TRAIN_DAYS
+    while test_start_idx + STEP_SIZE <= n_dates:
+        test_end_idx = min(test_start_idx + STEP_SIZE, n_dates)
+        folds.append({
+            'fold': len(folds) + 1,
+            # Date boundaries with purge gap
+            'train_end_date': unique_dates[test_start_idx - PURGE_GAP - 1],
+            'test_start_date': unique_dates[test_start_idx],
+            'test_end_date': unique_dates[test_end_idx - 1],
+        })
+        test_start_idx += STEP_SIZE
+    return folds
+
+
+def train_fold(spec, data, X, slicer, feature_cols, tree_backend='native', threads=None, bins=None,
+               init=None, warm_rounds=0):
+    """
+    Train and score one walk-forward fold.
+
+    With `init` (the previous fold's 'state') and warm_rounds > 0 the fold
+    continues the previous boosters for at most warm_rounds rounds on its
+    expanded training rows, reusing that fold's scaler.
+
+    Returns None when the fold is skipped for size or class balance, else
+    {'line': progress line, 'preds': fold predictions, or None when the
+    quality gate rejected the fold, 'val_auc', 'test_auc', 'warm', 'state':
+    the fitted models for the next fold}.
+    """
+    warm = init is not None and warm_rounds > 0
+    fold, test_start_date = spec['fold'], spec['test_start_date']
+    period_str = test_start_date.strftime('%Y-%m') if hasattr(test_start_date, 'strftime') else str(test_start_date)[:7]
+
+    # Split data
+    train_rows = slicer.rows(end=spec['train_end_date'])
+    test_rows = slicer.rows(test_start_date, spec['test_end_date'])
+
+    if len(train_rows) < 500 or len(test_rows) < 50:
+        return None
+
+    # Use last 15% of training as validation for early stopping
+    val_cutoff = data['date'].iloc[train_rows].quantile(0.85)
+    val_rows = slicer.rows(val_cutoff, spec['train_end_date'])
+    pure_rows = slicer.rows(end=val_cutoff, end_inclusive=False)
+
+    if len(pure_rows) < 300 or len(val_rows) < 50:
+        return None
+
+    y = data['target'].values
+    # --bins first-fold/global: rows of the panel binned once for all folds (raw units)
+    panel = bins.panel(X, y) if bins is not None and bins.shared else None
+    if panel is not None:
+        y_train, y_val = y[pure_rows], y[val_rows]
+        X_val, X_test = take_rows(panel.X, val_rows), take_rows(panel.X, test_rows)
+    else:
+        X_train, y_train = take_rows(X, pure_rows), y[pure_rows]
+        X_val, y_val = take_rows(X, val_rows), y[val_rows]
+        X_test = take_rows(X, test_rows)
 
         # Handle NaN/Inf
         X_train = np.nan_to_num(X_train, nan=0, posinf=0, neginf=0)
         X_val = np.nan_to_num(X_val, nan=0, posinf=0, neginf=0)
         X_test = np.nan_to_num(X_test, nan=0, posinf=0, neginf=0)
 
-        # Scale features
-        scaler = StandardScaler()
-        X_train = scaler.fit_transform(X_train)
+        # Scale features (a warm fold keeps the scale its boosters' splits were learned in)
+        scaler = init['scaler'] if warm else StandardScaler().fit(X_train)
+        X_train = scaler.transform(X_train)
         X_val = scaler.transform(X_val)
         X_test = scaler.transform(X_test)
 
-        # Class balance
-        pos_rate = y_train.mean()
-        if pos_rate < 0.01 or pos_rate > 0.99:
-            test_start_idx += STEP_SIZE
-            continue
-        scale_pos = (1 - pos_rate) / pos_rate
-
+    # Class balance
+    pos_rate = y_train.mean()
+    if pos_rate < 0.01 or pos_rate > 0.99:
+        return None
+    scale_pos = (1 - pos_rate) / pos_rate
+
+    xgb_params = with_threads(XGB_PARAMS, threads)
+    xgb_params['scale_pos_weight'] = scale_pos
+    lgbm_params = with_threads(LGBM_PARAMS, threads)
+    init_xgb = init_lgbm = None
+    if warm:
+        xgb_params = warm_params(xgb_params, warm_rounds)
+        lgbm_params = warm_params(lgbm_params, warm_rounds)
+        init_xgb, init_lgbm = xgb_init(init['xgb']), lgb_init(init['lgbm'])
+    if panel is not None:
+        fitted_xgb = fit_xgb(panel, xgb_params, pure_rows, val_rows, init=init_xgb)
+        fitted_lgbm = fit_lgbm(panel, lgbm_params, pure_rows, val_rows, init=init_lgbm)
+    else:
         # Train XGBoost
-        xgb_params = XGB_PARAMS.copy()
-        xgb_params['scale_pos_weight'] = scale_pos
-        model_xgb = xgb.XGBClassifier(**xgb_params)
-        model_xgb.fit(X_train, y_train, eval_set=[(X_val, y_val)], verbose=False)
+        fitted_xgb = xgb.XGBClassifier(**xgb_params)
+        fitted_xgb.fit(X_train, y_train, eval_set=[(X_val, y_val)], verbose=False, xgb_model=init_xgb)
 
         # Train LightGBM
-        model_lgbm = lgb.LGBMClassifier(**LGBM_PARAMS)
-        model_lgbm.fit(X_train, y_train, eval_set=[(X_val, y_val)])
-
-        # Ensemble probabilities — raw, no calibration
-        prob_xgb = model_xgb.predict_proba(X_test)[:, 1]
-        prob_lgbm = model_lgbm.predict_proba(X_test)[:, 1]
-        prob_ensemble = 0.5 * prob_xgb + 0.5 * prob_lgbm
-
-        # Quality gate: check validation AUC before using this fold
-        test_y = test_data['target'].values
-        val_prob = 0.5 * model_xgb.predict_proba(X_val)[:, 1] + \
-                   0.5 * model_lgbm.predict_proba(X_val)[:, 1]
-
-        if len(np.unique(y_val)) > 1:
-            val_auc = roc_auc_score(y_val, val_prob)
-        else:
-            val_auc = 0.5
-
-        if len(np.unique(test_y)) > 1:
-            test_auc = roc_auc_score(test_y, prob_ensemble)
-        else:
-            test_auc = 0.5
-
-        # Quality gate: skip folds where model has no edge
-        if val_auc < MIN_FOLD_AUC:
-            skipped_folds += 1
-            period_str = test_start_date.strftime('%Y-%m') if hasattr(test_start_date, 'strftime') else str(test_start_date)[:7]
-            print(f"  Fold {fold:2d} [{period_str}]: SKIPPED (val AUC={val_auc:.3f} < {MIN_FOLD_AUC})")
-            test_start_idx += STEP_SIZE
-            continue
+        fitted_lgbm = lgb.LGBMClassifier(**lgbm_params)
+        fitted_lgbm.fit(X_train, y_train, eval_set=[(X_val, y_val)], init_model=init_lgbm)
+    state = {'xgb': fitted_xgb, 'lgbm': fitted_lgbm, 'scaler': None if panel is not None else scaler}
 
-        # Collect predictions
-        fold_preds = test_data[['ticker', 'date', 'forward_return', 'target', 'above_200ma']].copy()
-        fold_preds['prob_win'] = prob_ensemble
-        fold_preds['fold'] = fold
-
-        # Feature importance
-        fi_xgb = model_xgb.feature_importances_
-        fi_lgbm = model_lgbm.feature_importances_
-        fi_avg = (fi_xgb + fi_lgbm) / 2
-        top_features = sorted(zip(feature_cols, fi_avg), key=lambda x: -x[1])[:15]
-        fold_preds['top_features'] = json.dumps({f: round(float(v), 4) for f, v in top_features})
-
-        all_predictions.append(fold_preds)
-
-        # Signal stats
-        high_conf = (prob_ensemble >= MIN_CONFIDENCE).sum()
-        high_conf_win_rate = 0
-        if high_conf > 0:
-            hc_mask = prob_ensemble >= MIN_CONFIDENCE
-            high_conf_win_rate = test_y[hc_mask].mean()
-
-        period_str = test_start_date.strftime('%Y-%m') if hasattr(test_start_date, 'strftime') else str(test_start_date)[:7]
-        print(f"  Fold {fold:2d} [{period_str}]: "
-              f"train={len(pure_train):5d} test={len(test_data):4d} "
-              f"valAUC={val_auc:.3f} testAUC={test_auc:.3f} "
-              f"signals={high_conf:3d} win%={high_conf_win_rate:.1%} "
-              f"pos_rate={pos_rate:.1%}")
+    model_xgb = select_tree_backend(fitted_xgb, tree_backend, check=X_val)
+    model_lgbm = select_tree_backend(fitted_lgbm, tree_backend, check=X_val)
 
-        test_start_idx += STEP_SIZE
+    # Ensemble probabilities — raw, no calibration
+    prob_xgb = model_xgb.predict_proba(X_test)[:, 1]
+    prob_lgbm = model_lgbm.predict_proba(X_test)[:, 1]
+    prob_ensemble = 0.5 * prob_xgb + 0.5 * prob_lgbm
+
+    # Quality gate: check validation AUC before using this fold
+    test_y = y[test_rows]
+    val_prob = 0.5 * model_xgb.predict_proba(X_val)[:, 1] + \
+               0.5 * model_lgbm.predict_proba(X_val)[:, 1]
+
+    if len(np.unique(y_val)) > 1:
+        val_auc = roc_auc_score(y_val, val_prob)
+    else:
+        val_auc = 0.5
+
+    if len(np.unique(test_y)) > 1:
+        test_auc = roc_auc_score(test_y, prob_ensemble)
+    else:
+        test_auc = 0.5
+
+    scores = {'val_auc': val_auc, 'test_auc': test_auc, 'warm': warm, 'state': state}
+    mode = ' (warm)' if warm else ''
+
+    # Quality gate: skip folds where model has no edge
+    if val_auc < MIN_FOLD_AUC:
+        return {'line': f"  Fold {fold:2d} [{period_str}]: SKIPPED (val AUC={val_auc:.3f} < {MIN_FOLD_AUC}){mode}",
+                'preds': None, **scores}
+
+    # Collect predictions
+    fold_preds = data.iloc[test_rows][['ticker', 'date', 'forward_return', 'target', 'above_200ma']].copy()
+    fold_preds['prob_win'] = prob_ensemble
+    fold_preds['fold'] = fold
+
+    # Feature importance
+    fi_xgb = model_xgb.feature_importances_
+    fi_lgbm = model_lgbm.feature_importances_
+    fi_avg = (fi_xgb + fi_lgbm) / 2
+    top_features = sorted(zip(feature_cols, fi_avg), key=lambda x: -x[1])[:15]
+    fold_preds['top_features'] = json.dumps({f: round(float(v), 4) for f, v in top_features})
+
+    # Signal stats
+    high_conf = (prob_ensemble >= MIN_CONFIDENCE).sum()
+    high_conf_win_rate = 0
+    if high_conf > 0:
+        hc_mask = prob_ensemble >= MIN_CONFIDENCE
+        high_conf_win_rate = test_y[hc_mask].mean()
+
+    line = (f"  Fold {fold:2d} [{period_str}]: "
+            f"train={len(pure_rows):5d} test={len(test_rows):4d} "
+            f"valAUC={val_auc:.3f} testAUC={test_auc:.3f} "
+            f"signals={high_conf:3d} win%={high_conf_win_rate:.1%} "
+            f"pos_rate={pos_rate:.1%}{mode}")
+    return {'line': line, 'preds': fold_preds, **scores}
+
+
+def train_fold_chain(chain, **shared):
+    """train_fold over a chain of folds, each continuing the previous one's boosters (see utils.warm_start)."""
+    return run_chain(train_fold, chain, **shared)
+
+
+def train_walk_forward(all_data, dates_index, feature_cols, args):
+    """
+    Purged walk-forward training — no isotonic calibration.
+    Uses raw ensemble probabilities with quality gate (skip weak folds).
+
+    Folds run in --fold-jobs worker processes (serially by default); rows
+    are sliced by date with a DateSlicer instead of per-fold masks. With
+    --bins first-fold/global the bin edges are fixed once for all folds
+    (utils.binning; consistency, not speed). With --warm-start folds
+    continue the previous fold's boosters for at most --warm-rounds rounds,
+    with a full retrain every --retrain-every folds (utils.warm_start).
+
+    Returns list of predictions_df with:
+      - ticker, date, prob_win, forward_return, target, above_200ma
+    """
+    n_dates = dates_index.nunique()
+
+    min_train_date_idx = MIN_TRAIN_DAYS
+    if min_train_date_idx >= n_dates - STEP_SIZE:
+        print(f"  [ERROR] Not enough data: {n_dates} dates, need {MIN_TRAIN_DAYS}")
+        return []
+
+    jobs = resolve_jobs(getattr(args, 'fold_jobs', 1))
+    threads = fold_threads(jobs, getattr(args, 'fold_threads', None))
+    slicer = DateSlicer(all_data['date'])
+    folds = walk_forward_folds(dates_index)
+    bins = FoldBins(getattr(args, 'bins', 'fold'), slicer.rows(end=folds[0]['train_end_date']),
+                    threads=threads)
+    warm_rounds = getattr(args, 'warm_rounds', WARM_ROUNDS) if getattr(args, 'warm_start', False) else 0
+    shared = {
+        'data': all_data[['ticker', 'date', 'forward_return', 'target', 'above_200ma']],
+        'X': all_data[feature_cols].values,
+        'slicer': slicer,
+        'feature_cols': feature_cols,
+        'tree_backend': getattr(args, 'tree_backend', 'native'),
+        'threads': threads,
+        'bins': bins,
+        'warm_rounds': warm_rounds,
+    }
+
+    all_predictions = []
+    skipped_folds = 0
+    aucs = {False: [], True: []}  # (val, test) AUC of full / warm folds
+    chains = fold_chains(folds, getattr(args, 'retrain_every', RETRAIN_EVERY) if warm_rounds else 1)
+    for chain in map_tasks(train_fold_chain, chains, jobs=jobs, shared=shared, threads=threads):
+        for result in chain:
+            if result is None:
+                continue
+            print(result['line'])
+            aucs[result['warm']].append((result['val_auc'], result['test_auc']))
+            if result['preds'] is None:
+                skipped_folds += 1
+                continue
+            all_predictions.append(result['preds'])
 
     print(f"  ({skipped_folds} folds skipped by quality gate)")
+    for warm, label in ((False, 'full retrain'), (True, 'warm start')):
+        if aucs[warm]:
+            val_auc, test_auc = np.mean(aucs[warm], axis=0)
+            print(f"  {label}: {len(aucs[warm])} folds, mean valAUC={val_auc:.3f} testAUC={test_auc:.3f}")
     return all_predictions
 
 
@@ -597,23 +1055,52 @@ def train_walk_forward(all_data, dates_index, feature_cols, args):
 # ATR Optimization (Phase 2)
 # ============================================================================
 
+def atr_grid():
+    """(target_mult, stop_mult, max_hold) combos of the ATR grid, in search order."""
+    return [(tm, sm, mh) for tm in ATR_TARGET_GRID for sm in ATR_STOP_GRID
+            if tm / sm >= 1.2  # Skip bad risk/reward ratios
+            for mh in MAX_HOLD_GRID]
+
+
+def atr_rules(grid):
+    """
+    Exit rules of the ATR grid combos for models.trade_simulator.
+
+    Long at the signal bar's close; exits at the first day (up to max_hold)
+    whose low reaches the stop or whose high reaches the target — stop
+    first on the same day — else at the close after max_hold days. The
+    stop moves to breakeven from the first close more than 1 ATR in profit
+    (that day included). Costs 30bps per trade; signals may overlap.
+    """
+    return [exit_rule(target_atr=tm, stop_atr=sm, breakeven_atr=1.0, max_hold=mh,
+                      cost_bps=30, one_position=False)
+            for tm, sm, mh in grid]
+
+
+def simulate_atr_trades(prices, rows, grid):
+    """Trades of the signals entering at `rows` for every grid combo at once (simulate_trades arrays, one row per combo)."""
+    return simulate_trades(prices, rows, atr_rules(grid))
+
+
 def optimize_atr_per_stock(signals_df, prices_by_ticker, min_signals=MIN_SIGNALS_PER_STOCK):
     """
     Walk-forward ATR optimization per stock.
 
     For each stock with enough signals, find the best ATR target/stop multiples
-    using the first 60% of signals as train and last 40% as test.
+    using the first 60% of signals as train and last 40% as test. Every grid
+    combo is simulated in one vectorized pass (simulate_atr_trades).
 
     Returns dict: ticker -> {target_mult, stop_mult, max_hold, train_metrics, test_metrics}
     """
     results = {}
+    grid = atr_grid()
 
     for ticker, group in signals_df.groupby('ticker'):
         if len(group) < min_signals:
             continue
 
         prices = prices_by_ticker.get(ticker)
-        if prices is None or len(prices) < 100:
+        if prices is None or len(prices['dates']) < 100:
             continue
 
         # Sort by date
@@ -624,165 +1111,48 @@ def optimize_atr_per_stock(signals_df, prices_by_ticker, min_signals=MIN_SIGNALS
         if split_idx < 5 or len(group) - split_idx < 3:
             continue
 
-        train_signals = group.iloc[:split_idx]
-        test_signals = group.iloc[split_idx:]
-
-        # Build price lookup
-        price_dates = sorted(prices.keys())
-
-        def simulate_trades(sigs, target_mult, stop_mult, max_hold):
-            """Simulate ATR-based trades for a set of signals."""
-            trades = []
-
-            for _, sig in sigs.iterrows():
-                entry_date = sig['date']
-                if isinstance(entry_date, str):
-                    entry_date = pd.Timestamp(entry_date)
-
-                # Find entry price and ATR
-                entry_key = entry_date.strftime('%Y-%m-%d') if hasattr(entry_date, 'strftime') else str(entry_date)[:10]
-                if entry_key not in prices:
-                    # Try nearby dates
-                    found = False
-                    for offset in range(1, 4):
-                        for d in [(entry_date + pd.Timedelta(days=offset)),
-                                  (entry_date - pd.Timedelta(days=offset))]:
-                            dk = d.strftime('%Y-%m-%d')
-                            if dk in prices:
-                                entry_key = dk
-                                found = True
-                                break
-                        if found:
-                            break
-                    if not found:
-                        continue
-
-                entry_data = prices[entry_key]
-                entry_price = entry_data['close']
-                atr = entry_data.get('atr14', entry_price * 0.02)
-                if atr is None or atr <= 0:
-                    atr = entry_price * 0.02
-
-                target_price = entry_price + atr * target_mult
-                stop_price = entry_price - atr * stop_mult
-
-                # Walk forward through subsequent days
-                entry_idx = price_dates.index(entry_key) if entry_key in price_dates else -1
-                if entry_idx < 0:
-                    continue
-
-                exit_price = None
-                exit_reason = None
-                hold_days = 0
-                trailing_stop = stop_price
-
-                for i in range(entry_idx + 1, min(entry_idx + max_hold + 1, len(price_dates))):
-                    day_key = price_dates[i]
-                    day_data = prices[day_key]
-                    hold_days += 1
-
-                    # Trailing stop: move to breakeven when >1 ATR in profit
-                    if day_data['close'] > entry_price + atr and trailing_stop < entry_price:
-                        trailing_stop = entry_price
-
-                    # Check intraday high/low
-                    if day_data['low'] <= trailing_stop:
-                        exit_price = trailing_stop
-                        exit_reason = 'stop'
-                        break
-                    elif day_data['high'] >= target_price:
-                        exit_price = target_price
-                        exit_reason = 'target'
-                        break
-
-                if exit_price is None:
-                    # Max hold exit
-                    last_idx = min(entry_idx + max_hold, len(price_dates) - 1)
-                    exit_price = prices[price_dates[last_idx]]['close']
-                    exit_reason = 'max_hold'
-                    hold_days = last_idx - entry_idx
-
-                net_return = (exit_price - entry_price) / entry_price - 0.003  # 30bps cost
-                trades.append({
-                    'net_return': net_return,
-                    'exit_reason': exit_reason,
-                    'hold_days': hold_days,
-                })
-
-            return trades
+        rows = entry_rows(prices['dates'], group['date'].values)
+        train_rows, test_rows = rows[:split_idx], rows[split_idx:]
+        train_rows, test_rows = train_rows[train_rows >= 0], test_rows[test_rows >= 0]
 
         # Grid search on training signals
         best_score = -999
         best_params = None
         best_train_metrics = None
 
-        for tm in ATR_TARGET_GRID:
-            for sm in ATR_STOP_GRID:
-                if tm / sm < 1.2:  # Skip bad risk/reward ratios
-                    continue
-                for mh in MAX_HOLD_GRID:
-                    trades = simulate_trades(train_signals, tm, sm, mh)
-                    if len(trades) < 3:
-                        continue
-
-                    wins = [t for t in trades if t['net_return'] > 0]
-                    losses = [t for t in trades if t['net_return'] <= 0]
-                    win_rate = len(wins) / len(trades)
-
-                    gross_wins = sum(t['net_return'] for t in wins)
-                    gross_losses = abs(sum(t['net_return'] for t in losses))
-                    profit_factor = gross_wins / (gross_losses + 1e-8)
-                    avg_return = np.mean([t['net_return'] for t in trades])
-
-                    # Scoring: Profit Factor × Win Rate × sqrt(n_trades)
-                    # Penalize very few trades, reward consistency
-                    score = profit_factor * win_rate * np.sqrt(len(trades))
-
-                    if score > best_score:
-                        best_score = score
-                        best_params = (tm, sm, mh)
-                        best_train_metrics = {
-                            'trades': len(trades),
-                            'win_rate': win_rate,
-                            'profit_factor': profit_factor,
-                            'avg_return': avg_return,
-                            'targets': sum(1 for t in trades if t['exit_reason'] == 'target'),
-                            'stops': sum(1 for t in trades if t['exit_reason'] == 'stop'),
-                        }
+        if len(train_rows) >= 3:
+            trades = simulate_atr_trades(prices, train_rows, grid)
+            for g, params in enumerate(grid):
+                metrics = trade_stats(trades, g)
+
+                # Scoring: Profit Factor × Win Rate × sqrt(n_trades)
+                # Penalize very few trades, reward consistency
+                score = metrics['profit_factor'] * metrics['win_rate'] * np.sqrt(metrics['trades'])
+
+                if score > best_score:
+                    best_score = score
+                    best_params = params
+                    best_train_metrics = metrics
 
         if best_params is None:
             continue
 
         # Evaluate on test signals with best params
-        test_trades = simulate_trades(test_signals, *best_params)
-        if len(test_trades) < 2:
+        if len(test_rows) < 2:
             continue
-
-        test_wins = [t for t in test_trades if t['net_return'] > 0]
-        test_losses = [t for t in test_trades if t['net_return'] <= 0]
-        test_win_rate = len(test_wins) / len(test_trades)
-        test_gross_wins = sum(t['net_return'] for t in test_wins)
-        test_gross_losses = abs(sum(t['net_return'] for t in test_losses))
-        test_pf = test_gross_wins / (test_gross_losses + 1e-8)
+        test_metrics = trade_stats(simulate_atr_trades(prices, test_rows, [best_params]))
 
         results[ticker] = {
             'target_mult': best_params[0],
             'stop_mult': best_params[1],
             'max_hold': best_params[2],
             'train': best_train_metrics,
-            'test': {
-                'trades': len(test_trades),
-                'win_rate': test_win_rate,
-                'profit_factor': test_pf,
-                'avg_return': np.mean([t['net_return'] for t in test_trades]),
-                'targets': sum(1 for t in test_trades if t['exit_reason'] == 'target'),
-                'stops': sum(1 for t in test_trades if t['exit_reason'] == 'stop'),
-            },
+            'test': test_metrics,
         }
 
         print(f"  {ticker:8s}: TP={best_params[0]:.1f}x SL={best_params[1]:.1f}x Hold={best_params[2]:2d}d | "
               f"Train: {best_train_metrics['trades']:2d}t {best_train_metrics['win_rate']:.0%}wr {best_train_metrics['profit_factor']:.1f}pf | "
-              f"Test:  {len(test_trades):2d}t {test_win_rate:.0%}wr {test_pf:.1f}pf")
+              f"Test:  {test_metrics['trades']:2d}t {test_metrics['win_rate']:.0%}wr {test_metrics['profit_factor']:.1f}pf")
 
     return results
 
@@ -813,29 +1183,16 @@ def run(args):
     # ========================================================================
     print("\n[1/6] Loading price data...")
 
-    ticker_filter = ""
-    if args.test:
-        tickers_str = "','".join(TEST_TICKERS)
-        ticker_filter = f"AND ticker IN ('{tickers_str}')"
-
-    df_prices = pd.read_sql(f"""
-        SELECT ticker, date, open, high, low, close, volume
-        FROM prices_daily
-        WHERE volume > 0 AND close > 0
-          AND date >= '2018-01-01'
-          {ticker_filter}
-        ORDER BY ticker, date
-    """, conn, parse_dates=['date'])
+    df_prices = load_table(conn, 'prices_daily', ['ticker', 'date', 'open', 'high', 'low', 'close', 'volume'],
+                           since='2018-01-01', tickers=TEST_TICKERS if args.test else None,
+                           filters=[('volume', '>', 0), ('close', '>', 0)])
 
     tickers = sorted(df_prices['ticker'].unique())
     print(f"  Loaded {len(df_prices):,} rows for {len(tickers)} tickers")
 
     # Load OBX index for market returns
-    df_obx = pd.read_sql("""
-        SELECT date, close FROM prices_daily
-        WHERE ticker = 'OBX' AND close > 0
-        ORDER BY date
-    """, conn, parse_dates=['date']).set_index('date')
+    df_obx = load_table(conn, 'prices_daily', ['date', 'close'], tickers=['OBX'],
+                        filters=[('close', '>', 0)]).set_index('date')
 
     obx_returns = df_obx['close'].pct_change().dropna()
     print(f"  OBX benchmark: {len(obx_returns)} days")
@@ -845,80 +1202,26 @@ def run(args):
     # ========================================================================
     print("\n[2/6] Engineering features...")
 
-    all_features = []
-    prices_by_ticker = {}  # For ATR optimization
-
-    for i, ticker in enumerate(tickers):
-        df_t = df_prices[df_prices['ticker'] == ticker].copy()
-        df_t = df_t.sort_values('date').set_index('date')
-
-        if len(df_t) < 300:
-            continue
-
-        # Compute features
-        feats = compute_features(df_t, obx_returns=obx_returns)
-        if feats.empty:
-            continue
-
-        # Add fundamentals
-        feats = add_fundamental_features(feats, ticker, feats.index, conn)
-
-        # Target: forward return > threshold
-        close_s = df_t['close']
-        forward_return = close_s.shift(-HORIZON_DAYS) / close_s - 1
-
-        # 200MA filter
-        sma200 = close_s.rolling(200).mean()
-        above_200ma = (close_s > sma200).astype(float)
-
-        # ATR for later optimization
-        true_range = np.maximum(
-            df_t['high'].values - df_t['low'].values,
-            np.maximum(
-                np.abs(df_t['high'].values - np.roll(df_t['close'].values, 1)),
-                np.abs(df_t['low'].values - np.roll(df_t['close'].values, 1))
-            )
-        )
-        true_range[0] = df_t['high'].values[0] - df_t['low'].values[0]
-        atr14 = pd.Series(true_range, index=df_t.index).rolling(14).mean()
-
-        # Store price data for ATR optimization
-        price_dict = {}
-        for dt, row in df_t.iterrows():
-            dt_str = dt.strftime('%Y-%m-%d')
-            price_dict[dt_str] = {
-                'open': float(row['open']),
-                'high': float(row['high']),
-                'low': float(row['low']),
-                'close': float(row['close']),
-                'atr14': float(atr14.get(dt, row['close'] * 0.02)),
-            }
-        prices_by_ticker[ticker] = price_dict
-
-        # Combine
-        feats['ticker'] = ticker
-        feats['date'] = feats.index
-        feats['forward_return'] = forward_return
-        feats['target'] = (forward_return > WIN_THRESHOLD).astype(int)
-        feats['above_200ma'] = above_200ma
-
-        # Drop rows without target (last HORIZON_DAYS rows)
-        feats = feats.dropna(subset=['forward_return'])
-
-        all_features.append(feats)
-
-        if (i + 1) % 10 == 0:
-            print(f"  {i+1}/{len(tickers)} tickers processed")
+    store = FeatureStore() if args.feature_store else None
+    all_data = cached_features(
+        store, feature_group('v8', args.test), v8_feature_version(args),
+        latest_price_date(conn) if store else None,
+        load=lambda: {'prices': df_prices, 'obx_returns': obx_returns, 'conn': conn},
+        build=lambda data: build_feature_panel(data, jobs=args.jobs), targets=['forward_return'],
+        rebuild=args.rebuild_features, incremental=False,  # obv_slope's OBV is cumulative from the first bar
+    )
 
-    if not all_features:
+    if all_data.empty:
         print("[ERROR] No valid features generated")
         conn.close()
         return
 
-    all_data = pd.concat(all_features, ignore_index=True)
+    # Price history for ATR optimization
+    prices_by_ticker = {}
+    for ticker, df_t in df_prices.groupby('ticker'):
+        if len(df_t) >= 300:
+            prices_by_ticker[ticker] = price_arrays(df_t.sort_values('date').set_index('date'))
 
-    # Add cross-sectional rank features (relative to peers on same date)
-    all_data = add_cross_sectional_features(all_data)
     print(f"  Total samples: {len(all_data):,}")
     print(f"  Positive rate (>{WIN_THRESHOLD:.0%} gain): {all_data['target'].mean():.1%}")
 
@@ -1168,31 +1471,12 @@ def run(args):
                 json.dumps(metadata) if metadata else '{}',
             ))
 
-        # Batch insert
-        inserted = 0
-        for i in range(0, len(batch), 500):
-            chunk = batch[i:i+500]
-            args_str = ','.join(
-                cur.mogrify("(%s,%s,%s,%s,%s,%s,%s,%s::jsonb,%s::jsonb)", row).decode()
-                for row in chunk
-            )
-            if args_str:
-                cur.execute(f"""
-                    INSERT INTO alpha_signals
-                        (ticker, signal_date, model_id, horizon, signal_value,
-                         predicted_return, confidence, feature_importance, metadata)
-                    VALUES {args_str}
-                    ON CONFLICT (ticker, signal_date, model_id, horizon)
-                    DO UPDATE SET
-                        signal_value = EXCLUDED.signal_value,
-                        predicted_return = EXCLUDED.predicted_return,
-                        confidence = EXCLUDED.confidence,
-                        feature_importance = EXCLUDED.feature_importance,
-                        metadata = EXCLUDED.metadata
-                """)
-                inserted += len(chunk)
-
-        conn.commit()
+        inserted = copy_upsert(
+            conn, 'alpha_signals',
+            ['ticker', 'signal_date', 'model_id', 'horizon', 'signal_value',
+             'predicted_return', 'confidence', 'feature_importance', 'metadata'],
+            batch, key=['ticker', 'signal_date', 'model_id', 'horizon'], label='signals',
+        )
         print(f"  Wrote {inserted} signals as model '{model_id}'")
 
         # Write ATR optimization results to metadata
@@ -1232,6 +1516,38 @@ if __name__ == '__main__':
     parser.add_argument('--test', action='store_true', help='Use 15 test tickers only')
     parser.add_argument('--no-write', action='store_true', help='Evaluate only, no DB writes')
     parser.add_argument('--short', action='store_true', help='Enable short signals (below 200MA)')
+    parser.add_argument('--tree-backend', choices=TREE_BACKENDS, default='native',
+                        help='Fold scoring backend (compiled = NumPy tree evaluator for batches up to '
+                             'COMPILED_TREE_MAX_ROWS rows, native above)')
+    parser.add_argument('--feature-store', action='store_true',
+                        help='Read/extend the feature panel in FEATURE_STORE_DIR instead of recomputing it')
+    parser.add_argument('--rebuild-features', action='store_true',
+                        help='With --feature-store, rebuild the stored panel from scratch')
+    parser.add_argument('--data-backend', choices=DATA_BACKENDS, default=data_backend(),
+                        help='Read market data from Postgres or the local Arrow snapshot '
+                             '(synced by python -m app.sync_snapshot)')
+    parser.add_argument('--jobs', type=int, default=FEATURE_JOBS,
+                        help='Worker processes for the per-ticker feature stage (0 = one per CPU)')
+    parser.add_argument('--fold-jobs', type=int, default=FOLD_JOBS,
+                        help='Worker processes for the walk-forward folds (0 = one per CPU)')
+    parser.add_argument('--fold-threads', type=int, default=None,
+                        help='Model threads per fold (default: CPUs / --fold-jobs when parallel)')
+    parser.add_argument('--bins', choices=BIN_MODES, default='fold',
+                        help='Tree feature bins: per fold, or edges fixed once from the first fold / whole history '
+                             '(no speed-up: XGBoost still quantizes each fold)')
+    parser.add_argument('--warm-start', action='store_true',
+                        help='Continue the previous fold\'s boosters instead of training each fold from zero')
+    parser.add_argument('--warm-rounds', type=int, default=WARM_ROUNDS,
+                        help='With --warm-start, max boosting rounds added per warm fold')
+    parser.add_argument('--retrain-every', type=int, default=RETRAIN_EVERY,
+                        help='With --warm-start, train from zero every N folds (guards against drift)')
+    parser.add_argument('--advance-features', action='store_true',
+                        help='Only advance the incremental feature checkpoints (FEATURE_STATE_DIR) to the '
+                             'latest bar and write the latest row per ticker, then exit')
     args = parser.parse_args()
+    set_data_backend(args.data_backend)
 
-    run(args)
+    if args.advance_features:
+        run_advance_features(args)
+    else:
+        run(args)
@@ -0,0 +1,98 @@
+"""
+FastAPI router for background training jobs.
+
+Endpoints:
+    POST   /jobs/{kind}         — Submit a job (body = job params), returns job id
+    GET    /jobs                — Recent jobs + queue stats
+    GET    /jobs/{job_id}       — Job status, progress events and result
+    GET    /jobs/{job_id}/events — Server-Sent Events stream of progress
+    DELETE /jobs/{job_id}       — Cancel a queued or running job
+
+Job kinds are registered by the modules that own the work
+(e.g. 'train' in main.py, 'cnn_train' in signals_router.py).
+"""
+
+import asyncio
+import json
+
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+
+from .utils.jobs import get_job_manager, JOB_KINDS, TERMINAL_STATES, QueueFull
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+
+@router.post("/{kind}")
+async def submit_job(kind: str, params: dict, priority: int = Query(5, ge=0, le=9)):
+    """Submit a job. Lower priority value runs first."""
+    if kind not in JOB_KINDS:
+        raise HTTPException(status_code=404, detail=f"Unknown job kind '{kind}'. Available: {sorted(JOB_KINDS)}")
+
+    _, params_model = JOB_KINDS[kind]
+    if params_model is not None:
+        try:
+            params = params_model(**params).model_dump()
+        except ValidationError as e:
+            raise HTTPException(status_code=422, detail=e.errors())
+
+    try:
+        job = get_job_manager().submit(kind, params, priority=priority)
+    except QueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e))
+
+    return {"job_id": job["id"], "kind": kind, "status": job["status"], "priority": priority}
+
+
+@router.get("")
+async def list_jobs(limit: int = Query(50, ge=1, le=500)):
+    """Recent jobs (newest first) and queue statistics."""
+    manager = get_job_manager()
+    return {"queue": manager.stats(), "jobs": manager.list_jobs(limit=limit)}
+
+
+@router.get("/{job_id}")
+async def get_job(job_id: str):
+    """Poll job status, progress events and result."""
+    job = get_job_manager().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job
+
+
+@router.get("/{job_id}/events")
+async def stream_job_events(job_id: str):
+    """Stream progress events as Server-Sent Events until the job finishes."""
+    manager = get_job_manager()
+    if manager.get(job_id) is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+
+    async def event_stream():
+        last_seq = 0  # events are trimmed to the newest MAX_EVENTS, so track seq, not list position
+        while True:
+            job = manager.get(job_id)
+            if job is None:
+                return
+            for event in job["events"]:
+                seq = event.get("seq", 0)
+                if seq > last_seq:
+                    yield f"id: {seq}\nevent: progress\ndata: {json.dumps(event, default=str)}\n\n"
+                    last_seq = seq
+            if job["status"] in TERMINAL_STATES:
+                final = {"status": job["status"], "result": job["result"], "error": job["error"]}
+                yield f"event: {job['status']}\ndata: {json.dumps(final, default=str)}\n\n"
+                return
+            await asyncio.sleep(0.5)
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache"})
+
+
+@router.delete("/{job_id}")
+async def cancel_job(job_id: str):
+    """Cancel a queued or running job."""
+    job = get_job_manager().cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return {"job_id": job_id, "status": job["status"]}
@@ -7,34 +7,48 @@ Target: 1-month forward returns with probability distributions
 Includes: Multivariate HMM regime detection, spectral clustering, SHAP importance
 """
 
-# Prevent PyTorch OpenMP/MKL multi-threading from crashing uvicorn workers
+# Prevent PyTorch OpenMP/MKL multi-threading from crashing uvicorn workers.
+# torch itself is imported on first CNN use and picks these up then.
 import os
 os.environ.setdefault("OMP_NUM_THREADS", "1")
 os.environ.setdefault("MKL_NUM_THREADS", "1")
 
-try:
-    import torch
-    torch.set_num_threads(1)
-except ImportError:
-    pass
-
-from fastapi import FastAPI, HTTPException
+import asyncio
+import importlib
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, field_validator
 from typing import Dict, List, Optional
 import numpy as np
 import pandas as pd
-from sklearn.preprocessing import StandardScaler
-from sklearn.model_selection import train_test_split
-from .models.ml_models import create_xgb_model, create_lgbm_model, HAS_XGB, HAS_LGBM
-import joblib
+from .utils.jobs import register_job_kind, get_job_manager
+from .utils.artifacts import ModelCache, check_version, save_ensemble, load_ensemble
+from .models.tree_inference import select_tree_backend
+from .utils.serialization import NumpyJSONResponse
+from .utils.metrics import (
+    begin_request, observe_request, server_timing_header,
+    register_cache, register_gauge, render_metrics, stage, timed, HAS_PROMETHEUS,
+)
 import psycopg2
 from psycopg2.extras import RealDictCursor
 import os
 import json
+import time
 from datetime import datetime
 
-app = FastAPI(title="Oslo Børs ML Prediction Service", version="2.0.0")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Worker start: route asyncio.to_thread through the sized executor, then warm the active model."""
+    asyncio.get_running_loop().set_default_executor(executor)
+    await preload_active_model()
+    yield
+
+
+app = FastAPI(title="Oslo Børs ML Prediction Service", version="2.0.0",
+              default_response_class=NumpyJSONResponse, lifespan=lifespan)
 
 # Enable CORS for Next.js frontend
 app.add_middleware(
@@ -43,23 +57,53 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing"],
 )
 
-# Volatility models router (GARCH, MSGARCH, VaR, Jump Detection)
-from .volatility_router import router as volatility_router
-app.include_router(volatility_router)
-
-# Multivariate regime detection router (3-state HMM)
-from .regime_router import router as regime_router
-app.include_router(regime_router)
 
-# Spectral clustering + OU mean-reversion router
-from .clustering_router import router as clustering_router
-app.include_router(clustering_router)
-
-# CNN signals, signal combiner, and backtest router
-from .signals_router import router as signals_router
-app.include_router(signals_router)
+@app.middleware("http")
+async def timing_middleware(request: Request, call_next):
+    """Per-route latency histogram + Server-Timing header with the stage breakdown."""
+    timings = begin_request()
+    t0 = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+    finally:
+        elapsed = time.perf_counter() - t0
+        route = request.scope.get("route")
+        observe_request(request.method, route.path if route else "unmatched", status, elapsed)
+    response.headers["Server-Timing"] = server_timing_header(timings, elapsed)
+    return response
+
+# Optional routers, mounted according to ML_ROUTERS ("all", or a comma-separated
+# subset such as "volatility,regime"). /train, /predict and /health are always served.
+# Heavy libraries (torch, sklearn, arch, hmmlearn, xgboost, lightgbm) are imported
+# by the model modules on first use, so unmounted routers cost nothing at startup.
+ROUTERS = {
+    "volatility": ".volatility_router",  # GARCH, MSGARCH, VaR, jump detection
+    "regime": ".regime_router",          # multivariate 3-state HMM
+    "clustering": ".clustering_router",  # spectral clustering + OU mean reversion
+    "signals": ".signals_router",        # CNN signals, signal combiner, backtest
+    "jobs": ".jobs_router",              # background training jobs
+}
+ML_ROUTERS = os.environ.get("ML_ROUTERS", "all")
+
+
+def _enabled_routers(spec: str) -> List[str]:
+    names = [n.strip() for n in spec.split(",") if n.strip()]
+    if not names or names == ["all"]:
+        return list(ROUTERS)
+    unknown = sorted(set(names) - set(ROUTERS))
+    if unknown:
+        raise ValueError(f"Unknown router(s) in ML_ROUTERS: {unknown} (available: {list(ROUTERS)})")
+    return [n for n in ROUTERS if n in names]
+
+
+ENABLED_ROUTERS = _enabled_routers(ML_ROUTERS)
+for _name in ENABLED_ROUTERS:
+    app.include_router(importlib.import_module(ROUTERS[_name], __package__).router)
 
 # Feature columns (19 predictive factors)
 FEATURE_COLUMNS = [
@@ -69,8 +113,40 @@ FEATURE_COLUMNS = [
     'dum_jan'
 ]
 
-# Model cache
-models_cache = {}
+# Model cache (bounded LRU, MODEL_CACHE_SIZE versions per worker)
+models_cache = ModelCache()
+register_cache("ensemble_models", models_cache)
+
+# Thread pool behind asyncio.to_thread; its backlog is exported as a metric
+EXECUTOR_THREADS = int(os.environ.get("EXECUTOR_THREADS", str(min(32, (os.cpu_count() or 1) + 4))))
+executor = ThreadPoolExecutor(max_workers=EXECUTOR_THREADS, thread_name_prefix="ml-exec")
+register_gauge("ml_executor_queue_depth", "Calls waiting for a free executor thread",
+               lambda: executor._work_queue.qsize())
+register_gauge("ml_executor_threads", "Executor threads started", lambda: len(executor._threads))
+
+
+def _job_stats() -> Optional[dict]:
+    """JobManager stats; None without the jobs router, whose workers never start a dispatcher."""
+    return get_job_manager().stats() if "jobs" in ENABLED_ROUTERS else None
+
+
+register_gauge("ml_jobs_pending", "Background jobs waiting in the queue",
+               lambda: (_job_stats() or {}).get("pending", 0))
+register_gauge("ml_jobs_running", "Background jobs running", lambda: (_job_stats() or {}).get("running", 0))
+
+# Active model_version lookup cache (seconds)
+ACTIVE_MODEL_TTL = float(os.environ.get("ACTIVE_MODEL_TTL", "60"))
+_active_model = {'version': None, 'expires': 0.0}
+
+# Load the active ensemble (and xgboost/lightgbm with it) during worker startup;
+# set PRELOAD_ACTIVE_MODEL=0 for workers that mostly serve the other routers
+PRELOAD_ACTIVE_MODEL = os.environ.get("PRELOAD_ACTIVE_MODEL", "1") != "0"
+
+# Tree scoring backend per ensemble member: "native" (library predict) or
+# "compiled" (flattened NumPy evaluator, bit-identical; used for batches of up to
+# COMPILED_TREE_MAX_ROWS rows, where it is faster — larger batches still score natively)
+XGB_INFERENCE_BACKEND = os.environ.get("XGB_INFERENCE_BACKEND", "native")
+LGBM_INFERENCE_BACKEND = os.environ.get("LGBM_INFERENCE_BACKEND", "native")
 
 # ============================================================================
 # Request/Response Models
@@ -82,6 +158,11 @@ class TrainRequest(BaseModel):
     test_split_date: str
     model_version: str
 
+    @field_validator("model_version")
+    @classmethod
+    def _model_version(cls, v: str) -> str:
+        return check_version(v)  # rejected before training, not after
+
 class PredictRequest(BaseModel):
     ticker: str
     date: str
@@ -98,6 +179,13 @@ class PredictionResponse(BaseModel):
     feature_importance: Dict[str, float]
     confidence_score: float
 
+class BatchPredictRequest(BaseModel):
+    rows: List[PredictRequest] = Field(..., max_length=5000)
+
+class BatchPredictionResponse(BaseModel):
+    model_version: str
+    predictions: List[PredictionResponse]
+
 # ============================================================================
 # Database Connection
 # ============================================================================
@@ -153,156 +241,189 @@ def engineer_features(df: pd.DataFrame) -> pd.DataFrame:
 # Model Training
 # ============================================================================
 
-@app.post("/train")
-async def train_models(request: TrainRequest):
+def _train_job(params: dict, progress=None) -> dict:
     """
-    Train ensemble models and save to database
+    Train ensemble models and save them (job handler for kind 'train').
+
+    `progress`, when given, receives stage events and may raise JobCancelled.
+    Raises ValueError on insufficient data.
+    """
+    from sklearn.preprocessing import StandardScaler
+    from .models.ml_models import create_xgb_model, create_lgbm_model
+
+    request = TrainRequest(**params)
+    report = progress or (lambda event: None)
+
+    print(f"Loading training data from {request.start_date} to {request.end_date}")
+
+    # Load data from factor_combined_view using database URL directly
+    query = """
+    SELECT ticker, date::text as date,
+           mom1m, mom6m, mom11m, mom36m, chgmom,
+           vol1m, vol3m, vol12m, maxret, beta, ivol,
+           bm, nokvol, ep, dy, sp, sg, mktcap, dum_jan,
+           target_return_1m
+    FROM factor_combined_view
+    WHERE date BETWEEN %(start_date)s AND %(end_date)s
+      AND target_return_1m IS NOT NULL
+    ORDER BY date ASC
     """
-    try:
-        print(f"Loading training data from {request.start_date} to {request.end_date}")
-
-        # Load data from factor_combined_view using database URL directly
-        query = """
-        SELECT ticker, date::text as date,
-               mom1m, mom6m, mom11m, mom36m, chgmom,
-               vol1m, vol3m, vol12m, maxret, beta, ivol,
-               bm, nokvol, ep, dy, sp, sg, mktcap, dum_jan,
-               target_return_1m
-        FROM factor_combined_view
-        WHERE date BETWEEN %(start_date)s AND %(end_date)s
-          AND target_return_1m IS NOT NULL
-        ORDER BY date ASC
-        """
 
+    with stage("db_fetch", "train"):
         df = pd.read_sql(query, os.environ['DATABASE_URL'], params={'start_date': request.start_date, 'end_date': request.end_date})
 
-        print(f"Loaded {len(df)} samples")
-        print(f"Columns: {df.columns.tolist()}")
-        print(f"First date values: {df['date'].head()}")
-        print(f"Date dtype: {df['date'].dtype}")
+    print(f"Loaded {len(df)} samples")
+    print(f"Columns: {df.columns.tolist()}")
+    print(f"First date values: {df['date'].head()}")
+    print(f"Date dtype: {df['date'].dtype}")
+    report({"stage": "loaded", "samples": len(df)})
 
-        if len(df) < 100:
-            raise HTTPException(status_code=400, detail=f"Insufficient data: {len(df)} samples (need 100+)")
+    if len(df) < 100:
+        raise ValueError(f"Insufficient data: {len(df)} samples (need 100+)")
 
-        # Engineer features
-        df = engineer_features(df)
+    # Engineer features
+    df = engineer_features(df)
 
-        # Convert date column to string for comparison (extract just YYYY-MM-DD)
-        df['date'] = pd.to_datetime(df['date']).dt.strftime('%Y-%m-%d')
+    # Convert date column to string for comparison (extract just YYYY-MM-DD)
+    df['date'] = pd.to_datetime(df['date']).dt.strftime('%Y-%m-%d')
 
-        print(f"Date range in data: {df['date'].min()} to {df['date'].max()}")
-        print(f"Test split date: {request.test_split_date}")
+    print(f"Date range in data: {df['date'].min()} to {df['date'].max()}")
+    print(f"Test split date: {request.test_split_date}")
 
-        # Split train/test by date
-        train_df = df[df['date'] < request.test_split_date]
-        test_df = df[df['date'] >= request.test_split_date]
+    # Split train/test by date
+    train_df = df[df['date'] < request.test_split_date]
+    test_df = df[df['date'] >= request.test_split_date]
 
-        print(f"Train samples: {len(train_df)}, Test samples: {len(test_df)}")
+    print(f"Train samples: {len(train_df)}, Test samples: {len(test_df)}")
 
-        # Prepare features and target
-        feature_cols = [col for col in FEATURE_COLUMNS if col in df.columns]
-        feature_cols += ['log_mktcap', 'log_nokvol', 'mom1m_x_illiquid']
-        feature_cols = [col for col in feature_cols if col in df.columns]
+    # Prepare features and target
+    feature_cols = [col for col in FEATURE_COLUMNS if col in df.columns]
+    feature_cols += ['log_mktcap', 'log_nokvol', 'mom1m_x_illiquid']
+    feature_cols = [col for col in feature_cols if col in df.columns]
 
-        X_train = train_df[feature_cols].values
-        y_train = train_df['target_return_1m'].values
-        X_test = test_df[feature_cols].values
-        y_test = test_df['target_return_1m'].values
+    X_train = train_df[feature_cols].values
+    y_train = train_df['target_return_1m'].values
+    X_test = test_df[feature_cols].values
+    y_test = test_df['target_return_1m'].values
 
-        # Standardize features
-        scaler = StandardScaler()
-        X_train_scaled = scaler.fit_transform(X_train)
-        X_test_scaled = scaler.transform(X_test)
+    # Standardize features
+    scaler = StandardScaler()
+    X_train_scaled = scaler.fit_transform(X_train)
+    X_test_scaled = scaler.transform(X_test)
 
-        print("Training XGBoost model...")
-        xgb_model = create_xgb_model()
+    print("Training XGBoost model...")
+    report({"stage": "fit_xgb", "train_samples": len(train_df)})
+    xgb_model = create_xgb_model()
+    with stage("fit", "train_xgb"):
         xgb_model.fit(X_train_scaled, y_train)
 
-        print("Training LightGBM model...")
-        lgbm_model = create_lgbm_model()
+    print("Training LightGBM model...")
+    report({"stage": "fit_lgbm"})
+    lgbm_model = create_lgbm_model()
+    with stage("fit", "train_lgbm"):
         lgbm_model.fit(X_train_scaled, y_train)
 
-        # Evaluate
-        xgb_train_r2 = xgb_model.score(X_train_scaled, y_train)
-        xgb_test_r2 = xgb_model.score(X_test_scaled, y_test)
-        lgbm_train_r2 = lgbm_model.score(X_train_scaled, y_train)
-        lgbm_test_r2 = lgbm_model.score(X_test_scaled, y_test)
-
-        # Ensemble R² (50/50 blend)
-        xgb_pred_test = xgb_model.predict(X_test_scaled)
-        lgbm_pred_test = lgbm_model.predict(X_test_scaled)
-        ensemble_pred_test = 0.5 * xgb_pred_test + 0.5 * lgbm_pred_test
-
-        from sklearn.metrics import r2_score, mean_squared_error
-        ensemble_test_r2 = r2_score(y_test, ensemble_pred_test)
-        ensemble_test_mse = mean_squared_error(y_test, ensemble_pred_test)
-
-        # Alias for backward compat in model save
-        gb_model = xgb_model
-        rf_model = lgbm_model
-        gb_test_r2 = xgb_test_r2
-        rf_test_r2 = lgbm_test_r2
-        gb_train_r2 = xgb_train_r2
-        rf_train_r2 = lgbm_train_r2
-
-        print(f"XGB Test R²: {xgb_test_r2:.4f}, LGBM Test R²: {lgbm_test_r2:.4f}, Ensemble R²: {ensemble_test_r2:.4f}")
-
-        # Save models
-        model_dir = f'/tmp/models/{request.model_version}'
-        os.makedirs(model_dir, exist_ok=True)
-        joblib.dump(gb_model, f'{model_dir}/gb_model.joblib')
-        joblib.dump(rf_model, f'{model_dir}/rf_model.joblib')
-        joblib.dump(scaler, f'{model_dir}/scaler.joblib')
-        joblib.dump(feature_cols, f'{model_dir}/features.joblib')
-
-        # Cache in memory
-        models_cache[request.model_version] = {
-            'gb': gb_model,
-            'rf': rf_model,
-            'scaler': scaler,
-            'features': feature_cols
-        }
+    # Evaluate
+    xgb_train_r2 = xgb_model.score(X_train_scaled, y_train)
+    xgb_test_r2 = xgb_model.score(X_test_scaled, y_test)
+    lgbm_train_r2 = lgbm_model.score(X_train_scaled, y_train)
+    lgbm_test_r2 = lgbm_model.score(X_test_scaled, y_test)
+
+    # Ensemble R² (50/50 blend)
+    xgb_pred_test = xgb_model.predict(X_test_scaled)
+    lgbm_pred_test = lgbm_model.predict(X_test_scaled)
+    ensemble_pred_test = 0.5 * xgb_pred_test + 0.5 * lgbm_pred_test
+
+    from sklearn.metrics import r2_score, mean_squared_error
+    ensemble_test_r2 = r2_score(y_test, ensemble_pred_test)
+    ensemble_test_mse = mean_squared_error(y_test, ensemble_pred_test)
+
+    # Alias for backward compat in model save
+    gb_model = xgb_model
+    rf_model = lgbm_model
+    gb_test_r2 = xgb_test_r2
+    rf_test_r2 = lgbm_test_r2
+    gb_train_r2 = xgb_train_r2
+    rf_train_r2 = lgbm_train_r2
+
+    print(f"XGB Test R²: {xgb_test_r2:.4f}, LGBM Test R²: {lgbm_test_r2:.4f}, Ensemble R²: {ensemble_test_r2:.4f}")
+    report({"stage": "evaluated", "xgb_test_r2": float(xgb_test_r2),
+            "lgbm_test_r2": float(lgbm_test_r2), "ensemble_test_r2": float(ensemble_test_r2)})
+
+    # Save models (native XGBoost/LightGBM formats + manifest)
+    save_ensemble(request.model_version, gb_model, rf_model, scaler, feature_cols, metadata={
+        'training_start_date': request.start_date,
+        'training_end_date': request.end_date,
+        'test_split_date': request.test_split_date,
+        'train_samples': len(train_df),
+        'ensemble_test_r2': float(ensemble_test_r2),
+    })
+
+    # Cache in memory
+    models_cache.put(request.model_version, {
+        'gb': select_tree_backend(gb_model, XGB_INFERENCE_BACKEND, check=X_test_scaled),
+        'rf': select_tree_backend(rf_model, LGBM_INFERENCE_BACKEND, check=X_test_scaled),
+        'scaler': scaler,
+        'features': feature_cols,
+        'importance': _combined_importance(gb_model, rf_model, feature_cols),
+    })
+
+    # Save metadata to database
+    conn = get_db_connection()
+    cur = conn.cursor()
+    cur.execute("""
+        INSERT INTO ml_model_metadata (
+            model_version, trained_at, training_start_date, training_end_date,
+            n_training_samples, train_r2, test_r2,
+            gb_params, rf_params, ensemble_weights, is_active
+        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+        ON CONFLICT (model_version) DO UPDATE SET
+            trained_at = EXCLUDED.trained_at,
+            test_r2 = EXCLUDED.test_r2,
+            is_active = EXCLUDED.is_active
+    """, (
+        request.model_version,
+        datetime.now(),
+        request.start_date,
+        request.end_date,
+        len(train_df),
+        float((gb_train_r2 + rf_train_r2) / 2),
+        float(ensemble_test_r2),
+        json.dumps({'model': 'xgboost', 'n_estimators': 300, 'learning_rate': 0.05, 'max_depth': 6}),
+        json.dumps({'model': 'lightgbm', 'n_estimators': 300, 'learning_rate': 0.05, 'num_leaves': 31}),
+        json.dumps({'xgb': 0.5, 'lgbm': 0.5}),
+        True
+    ))
+    conn.commit()
+    conn.close()
+    invalidate_active_model()
 
-        # Save metadata to database
-        conn = get_db_connection()
-        cur = conn.cursor()
-        cur.execute("""
-            INSERT INTO ml_model_metadata (
-                model_version, trained_at, training_start_date, training_end_date,
-                n_training_samples, train_r2, test_r2,
-                gb_params, rf_params, ensemble_weights, is_active
-            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            ON CONFLICT (model_version) DO UPDATE SET
-                trained_at = EXCLUDED.trained_at,
-                test_r2 = EXCLUDED.test_r2,
-                is_active = EXCLUDED.is_active
-        """, (
-            request.model_version,
-            datetime.now(),
-            request.start_date,
-            request.end_date,
-            len(train_df),
-            float((gb_train_r2 + rf_train_r2) / 2),
-            float(ensemble_test_r2),
-            json.dumps({'model': 'xgboost', 'n_estimators': 300, 'learning_rate': 0.05, 'max_depth': 6}),
-            json.dumps({'model': 'lightgbm', 'n_estimators': 300, 'learning_rate': 0.05, 'num_leaves': 31}),
-            json.dumps({'xgb': 0.5, 'lgbm': 0.5}),
-            True
-        ))
-        conn.commit()
-        conn.close()
+    return {
+        'success': True,
+        'model_version': request.model_version,
+        'train_samples': len(train_df),
+        'test_samples': len(test_df),
+        'gb_test_r2': float(gb_test_r2),
+        'rf_test_r2': float(rf_test_r2),
+        'ensemble_test_r2': float(ensemble_test_r2),
+        'ensemble_test_mse': float(ensemble_test_mse)
+    }
 
-        return {
-            'success': True,
-            'model_version': request.model_version,
-            'train_samples': len(train_df),
-            'test_samples': len(test_df),
-            'gb_test_r2': float(gb_test_r2),
-            'rf_test_r2': float(rf_test_r2),
-            'ensemble_test_r2': float(ensemble_test_r2),
-            'ensemble_test_mse': float(ensemble_test_mse)
-        }
 
+register_job_kind("train", _train_job, TrainRequest)
+
+
+@app.post("/train")
+async def train_models(request: TrainRequest):
+    """
+    Train ensemble models and save to database.
+
+    Blocks until the fit completes — prefer POST /jobs/train for long fits.
+    """
+    try:
+        return await asyncio.to_thread(_train_job, request.model_dump())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         import traceback
         print(f"Training error: {str(e)}")
@@ -313,14 +434,19 @@ async def train_models(request: TrainRequest):
 # Inference
 # ============================================================================
 
-@app.post("/predict", response_model=PredictionResponse)
-async def predict(request: PredictRequest):
+def get_active_model_version() -> Optional[str]:
     """
-    Generate prediction for a single ticker/date
+    Latest active model_version from ml_model_metadata.
+
+    Cached for ACTIVE_MODEL_TTL seconds so /predict does not open a DB
+    connection per request; /train invalidates the cache.
     """
+    now = time.monotonic()
+    if now < _active_model['expires']:
+        return _active_model['version']
+
+    conn = get_db_connection()
     try:
-        # Load latest active model
-        conn = get_db_connection()
         cur = conn.cursor()
         cur.execute("""
             SELECT model_version FROM ml_model_metadata
@@ -329,105 +455,141 @@ async def predict(request: PredictRequest):
             LIMIT 1
         """)
         result = cur.fetchone()
+    finally:
         conn.close()
 
-        if not result:
-            raise HTTPException(status_code=404, detail="No active model found")
+    _active_model['version'] = result['model_version'] if result else None
+    _active_model['expires'] = now + ACTIVE_MODEL_TTL
+    return _active_model['version']
 
-        model_version = result['model_version']
 
-        # Load models (cache in memory)
-        if model_version not in models_cache:
-            model_dir = f'/tmp/models/{model_version}'
-            if not os.path.exists(model_dir):
-                raise HTTPException(status_code=404, detail=f"Model {model_version} not found")
+def invalidate_active_model():
+    """Force the next get_active_model_version() to re-query the database."""
+    _active_model['expires'] = 0.0
 
-            models_cache[model_version] = {
-                'gb': joblib.load(f'{model_dir}/gb_model.joblib'),
-                'rf': joblib.load(f'{model_dir}/rf_model.joblib'),
-                'scaler': joblib.load(f'{model_dir}/scaler.joblib'),
-                'features': joblib.load(f'{model_dir}/features.joblib')
-            }
 
-        models = models_cache[model_version]
-        feature_cols = models['features']
+def _combined_importance(gb_model, rf_model, feature_cols: List[str]) -> Dict[str, float]:
+    """Top-10 normalized 50/50 feature importance of both tree models."""
+    gb_importance = dict(zip(feature_cols, gb_model.feature_importances_))
+    rf_importance = dict(zip(feature_cols, rf_model.feature_importances_))
+    gb_total = sum(gb_importance.values()) or 1
+    rf_total = sum(rf_importance.values()) or 1
+    combined_importance = {
+        k: float(0.5 * gb_importance.get(k, 0) / gb_total + 0.5 * rf_importance.get(k, 0) / rf_total)
+        for k in feature_cols
+    }
 
-        # Prepare features
-        feature_dict = request.features.copy()
+    # Sort by importance and take top 10
+    return dict(sorted(combined_importance.items(), key=lambda x: x[1], reverse=True)[:10])
 
-        # Replace None with 0
-        feature_dict = {k: (v if v is not None else 0) for k, v in feature_dict.items()}
 
-        # Engineer features (same as training)
-        if 'mktcap' in feature_dict and feature_dict['mktcap'] and feature_dict['mktcap'] > 0:
-            feature_dict['log_mktcap'] = np.log(max(feature_dict['mktcap'], 1))
-        else:
-            feature_dict['log_mktcap'] = 0
+def load_models(model_version: str) -> dict:
+    """Load a model version into the LRU models_cache and return it."""
+    models = models_cache.get(model_version)
+    if models is None:
+        try:
+            with stage("load", "load_ensemble"):
+                models = load_ensemble(model_version)
+        except FileNotFoundError:
+            raise HTTPException(status_code=404, detail=f"Model {model_version} not found")
+        models['importance'] = _combined_importance(models['gb'], models['rf'], models['features'])
+        models['gb'] = select_tree_backend(models['gb'], XGB_INFERENCE_BACKEND)
+        models['rf'] = select_tree_backend(models['rf'], LGBM_INFERENCE_BACKEND)
+        models_cache.put(model_version, models)
 
-        if 'nokvol' in feature_dict and feature_dict['nokvol'] and feature_dict['nokvol'] > 0:
-            feature_dict['log_nokvol'] = np.log(max(feature_dict['nokvol'], 1))
-        else:
-            feature_dict['log_nokvol'] = 0
+    return models
 
-        # Interaction term
-        if 'mom1m' in feature_dict and 'nokvol' in feature_dict:
-            feature_dict['mom1m_x_illiquid'] = 0  # Can't compute without proper nokvol
 
-        # Create feature vector
-        X = np.array([[feature_dict.get(col, 0) for col in feature_cols]])
-        X_scaled = models['scaler'].transform(X)
+def _feature_row(features: Dict[str, Optional[float]], feature_cols: List[str]) -> list:
+    """Engineer one request's raw factors into a feature vector (same as training)."""
+    # Replace None with 0
+    feature_dict = {k: (v if v is not None else 0) for k, v in features.items()}
 
-        # Predict with both models
-        gb_pred = models['gb'].predict(X_scaled)[0]
-        rf_pred = models['rf'].predict(X_scaled)[0]
+    # Engineer features (same as training)
+    if 'mktcap' in feature_dict and feature_dict['mktcap'] and feature_dict['mktcap'] > 0:
+        feature_dict['log_mktcap'] = np.log(max(feature_dict['mktcap'], 1))
+    else:
+        feature_dict['log_mktcap'] = 0
 
-        # Ensemble (50/50 blend)
-        ensemble_pred = 0.5 * gb_pred + 0.5 * rf_pred
+    if 'nokvol' in feature_dict and feature_dict['nokvol'] and feature_dict['nokvol'] > 0:
+        feature_dict['log_nokvol'] = np.log(max(feature_dict['nokvol'], 1))
+    else:
+        feature_dict['log_nokvol'] = 0
 
-        # Estimate prediction uncertainty from model disagreement
-        pred_diff = abs(gb_pred - rf_pred)
-        pred_std = max(pred_diff / 2, 0.005)  # minimum uncertainty
+    # Interaction term
+    if 'mom1m' in feature_dict and 'nokvol' in feature_dict:
+        feature_dict['mom1m_x_illiquid'] = 0  # Can't compute without proper nokvol
 
-        # Generate percentiles (assume normal distribution)
-        percentiles = {
-            'p05': float(ensemble_pred - 1.645 * pred_std),
-            'p25': float(ensemble_pred - 0.674 * pred_std),
-            'p50': float(ensemble_pred),
-            'p75': float(ensemble_pred + 0.674 * pred_std),
-            'p95': float(ensemble_pred + 1.645 * pred_std)
-        }
+    return [feature_dict.get(col, 0) for col in feature_cols]
 
-        # Feature importance (normalized)
-        gb_importance = dict(zip(feature_cols, models['gb'].feature_importances_))
-        rf_importance = dict(zip(feature_cols, models['rf'].feature_importances_))
-        gb_total = sum(gb_importance.values()) or 1
-        rf_total = sum(rf_importance.values()) or 1
-        combined_importance = {
-            k: float(0.5 * gb_importance.get(k, 0) / gb_total + 0.5 * rf_importance.get(k, 0) / rf_total)
-            for k in feature_cols
-        }
 
-        # Sort by importance and take top 10
-        top_features = dict(sorted(combined_importance.items(), key=lambda x: x[1], reverse=True)[:10])
+@timed("predict")
+def _predict_rows(models: dict, rows: List[PredictRequest]) -> List[PredictionResponse]:
+    """Score many rows with one scaler transform and one predict call per model."""
+    from datetime import timedelta
+
+    X = np.array([_feature_row(r.features, models['features']) for r in rows], dtype=float)
+    X_scaled = models['scaler'].transform(X)
+
+    # Predict with both models
+    gb_pred = models['gb'].predict(X_scaled)
+    rf_pred = models['rf'].predict(X_scaled)
+
+    # Ensemble (50/50 blend)
+    ensemble_pred = 0.5 * gb_pred + 0.5 * rf_pred
+
+    # Estimate prediction uncertainty from model disagreement
+    pred_std = np.maximum(np.abs(gb_pred - rf_pred) / 2, 0.005)  # minimum uncertainty
 
-        # Confidence score (inverse of prediction std, normalized)
-        confidence = float(1 / (1 + pred_std * 10))  # Scale for 0-1 range
+    # Confidence score (inverse of prediction std, normalized)
+    confidence = 1 / (1 + pred_std * 10)  # Scale for 0-1 range
+
+    responses = []
+    for i, r in enumerate(rows):
+        ens, std = ensemble_pred[i], pred_std[i]
+
+        # Generate percentiles (assume normal distribution)
+        percentiles = {
+            'p05': float(ens - 1.645 * std),
+            'p25': float(ens - 0.674 * std),
+            'p50': float(ens),
+            'p75': float(ens + 0.674 * std),
+            'p95': float(ens + 1.645 * std)
+        }
 
         # Calculate target date (1 month forward = ~30 days)
-        from datetime import datetime, timedelta
-        target_date = datetime.strptime(request.date, '%Y-%m-%d') + timedelta(days=30)
+        target_date = datetime.strptime(r.date, '%Y-%m-%d') + timedelta(days=30)
 
-        return PredictionResponse(
-            ticker=request.ticker,
-            prediction_date=request.date,
+        responses.append(PredictionResponse(
+            ticker=r.ticker,
+            prediction_date=r.date,
             target_date=target_date.strftime('%Y-%m-%d'),
-            ensemble_prediction=float(ensemble_pred),
-            gb_prediction=float(gb_pred),
-            rf_prediction=float(rf_pred),
+            ensemble_prediction=float(ens),
+            gb_prediction=float(gb_pred[i]),
+            rf_prediction=float(rf_pred[i]),
             percentiles=percentiles,
-            feature_importance=top_features,
-            confidence_score=confidence
-        )
+            feature_importance=models['importance'],
+            confidence_score=float(confidence[i])
+        ))
+
+    return responses
+
+
+def _active_models() -> tuple:
+    model_version = get_active_model_version()
+    if not model_version:
+        raise HTTPException(status_code=404, detail="No active model found")
+    return model_version, load_models(model_version)
+
+
+@app.post("/predict", response_model=PredictionResponse)
+async def predict(request: PredictRequest):
+    """
+    Generate prediction for a single ticker/date
+    """
+    try:
+        _, models = _active_models()
+        return _predict_rows(models, [request])[0]
 
     except HTTPException:
         raise
@@ -435,6 +597,38 @@ async def predict(request: PredictRequest):
         print(f"Prediction error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+
+@app.post("/predict/batch", response_model=BatchPredictionResponse)
+async def predict_batch(request: BatchPredictRequest):
+    """
+    Generate predictions for many ticker/date rows in one call.
+    """
+    try:
+        if not request.rows:
+            raise HTTPException(status_code=400, detail="No rows to predict")
+
+        model_version, models = _active_models()
+        predictions = await asyncio.to_thread(_predict_rows, models, request.rows)
+        return BatchPredictionResponse(model_version=model_version, predictions=predictions)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Batch prediction error: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+async def preload_active_model():
+    """Load the active model at worker start so the first /predict is warm."""
+    if not PRELOAD_ACTIVE_MODEL:
+        return
+    try:
+        model_version, _ = await asyncio.to_thread(_active_models)
+        print(f"Preloaded active model {model_version}")
+    except HTTPException as e:
+        print(f"[WARN] No model preloaded: {e.detail}")
+    except Exception as e:
+        print(f"[WARN] Model preload failed: {e}")
+
 # ============================================================================
 # Health Check
 # ============================================================================
@@ -445,9 +639,20 @@ async def health_check():
     return {
         "status": "healthy",
         "service": "ml-prediction",
-        "models_cached": list(models_cache.keys())
+        "models_cached": models_cache.keys(),
+        "routers": ENABLED_ROUTERS,
+        "tree_backends": {"gb": XGB_INFERENCE_BACKEND, "rf": LGBM_INFERENCE_BACKEND},
+        "jobs": _job_stats() or "disabled",
     }
 
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics (latency histograms, stage timers, cache and queue gauges)"""
+    if not HAS_PROMETHEUS:
+        raise HTTPException(status_code=501, detail="prometheus_client not installed")
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
 @app.get("/")
 async def root():
     """Root endpoint"""
@@ -455,8 +660,12 @@ async def root():
         "service": "Oslo Børs ML Prediction Service",
         "version": "1.0.0",
         "endpoints": {
-            "/train": "POST - Train ensemble models",
+            "/train": "POST - Train ensemble models (blocking)",
+            "/jobs/{kind}": "POST - Submit background job (train, cnn_train)",
+            "/jobs/{id}": "GET - Job status, progress and result",
             "/predict": "POST - Generate prediction",
-            "/health": "GET - Health check"
+            "/predict/batch": "POST - Generate predictions for many rows",
+            "/health": "GET - Health check",
+            "/metrics": "GET - Prometheus metrics"
         }
     }
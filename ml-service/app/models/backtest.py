@@ -8,7 +8,10 @@ Evaluates signal quality with regime-conditional analysis.
 import numpy as np
 from typing import Optional, List, Dict
 
+from ..utils.metrics import timed
 
+
+@timed("backtest")
 def walkforward_backtest(
     returns_matrix: np.ndarray,
     signals_history: List[Dict[str, float]],
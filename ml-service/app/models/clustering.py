@@ -9,8 +9,8 @@ Spectral clustering on residual correlation matrices + OU mean-reversion z-score
 
 import numpy as np
 from typing import Optional, List
-from sklearn.cluster import SpectralClustering
-from sklearn.metrics import silhouette_score
+
+from ..utils.metrics import timed
 
 
 def _compute_residuals(returns_matrix: np.ndarray, benchmark_returns: np.ndarray) -> np.ndarray:
@@ -38,6 +38,9 @@ def _compute_residuals(returns_matrix: np.ndarray, benchmark_returns: np.ndarray
 
 def _select_n_clusters(corr_matrix: np.ndarray, min_k: int = 3, max_k: int = 8) -> int:
     """Select optimal cluster count by silhouette score."""
+    from sklearn.cluster import SpectralClustering
+    from sklearn.metrics import silhouette_score
+
     n = corr_matrix.shape[0]
     max_k = min(max_k, n - 1)
     if max_k < min_k:
@@ -112,6 +115,7 @@ def _fit_ou_process(spread: np.ndarray) -> dict:
     }
 
 
+@timed("fit")
 def fit_spectral_clusters(
     returns_matrix: np.ndarray,
     benchmark_returns: Optional[np.ndarray] = None,
@@ -159,7 +163,10 @@ def fit_spectral_clusters(
     if n_clusters is None:
         n_clusters = _select_n_clusters(resid_corr)
 
-    # Fit spectral clustering
+    # Fit spectral clustering (sklearn imported on first use, not at service start)
+    from sklearn.cluster import SpectralClustering
+    from sklearn.metrics import silhouette_score
+
     affinity = (resid_corr + 1) / 2
     np.fill_diagonal(affinity, 1.0)
 
@@ -8,10 +8,31 @@ Architecture:
     → Linear(64→1) → Tanh → signal ∈ [-1, 1]
 
 Training: Walk-forward, MSE loss on forward 5-day returns.
+
+Persistence: trained weights are saved to a versioned model store
+(CNN_MODEL_DIR, default $MODEL_STORE_DIR/cnn) as
+    {version}/model.pt        — state_dict
+    {version}/metadata.json   — training config + metrics
+    LATEST                    — name of the most recent version
 """
 
+import os
+import json
+import hashlib
+import time
+from datetime import datetime
+
 import numpy as np
-from typing import Optional, List, Dict
+from typing import Callable, Optional, List, Dict
+
+from ..utils.metrics import timed
+
+CNN_MODEL_DIR = os.environ.get(
+    "CNN_MODEL_DIR", os.path.join(os.environ.get("MODEL_STORE_DIR", "/tmp/models"), "cnn")
+)
+
+# Inference backends accepted by build_cnn_model
+INFERENCE_BACKENDS = ("eager", "torchscript", "int8")
 
 try:
     import torch
@@ -73,6 +94,13 @@ if HAS_TORCH:
             return self.head(x)  # (batch, 1)
 
 
+def _checkpoint_fingerprint(returns_matrix: np.ndarray, tickers, **params) -> str:
+    """Hash of the training data and the parameters a resumed run must share."""
+    h = hashlib.sha256(np.ascontiguousarray(returns_matrix, dtype=np.float64).tobytes())
+    h.update(repr((list(tickers) if tickers is not None else None, sorted(params.items()))).encode())
+    return h.hexdigest()
+
+
 def _create_windows(returns: np.ndarray, window: int = 60, forward: int = 5) -> tuple:
     """
     Create training windows from return series.
@@ -94,6 +122,7 @@ def _create_windows(returns: np.ndarray, window: int = 60, forward: int = 5) ->
     return np.array(X), np.array(y)
 
 
+@timed("fit")
 def train_cnn_model(
     returns_matrix: np.ndarray,
     tickers: Optional[List[str]] = None,
@@ -103,6 +132,14 @@ def train_cnn_model(
     epochs: int = 50,
     batch_size: int = 64,
     learning_rate: float = 1e-3,
+    progress_callback: Optional[Callable[[dict], None]] = None,
+    val_pct: float = 0.1,
+    patience: Optional[int] = 5,
+    min_delta: float = 1e-4,
+    time_budget: Optional[float] = None,
+    checkpoint_path: Optional[str] = None,
+    num_threads: Optional[int] = None,
+    loader_workers: int = 0,
 ) -> dict:
     """
     Train the CNN model on multiple asset return series.
@@ -119,8 +156,32 @@ def train_cnn_model(
     train_pct : float
         Train/test split ratio.
     epochs : int
+        Maximum number of epochs.
     batch_size : int
     learning_rate : float
+    progress_callback : callable, optional
+        Called after each epoch with {"epoch", "epochs", "train_loss", "val_loss"}.
+    val_pct : float
+        Fraction of the training rows held out for early stopping: the most
+        recent dates, with a window + forward_days gap before them so no
+        fitted window or target overlaps a validation window.
+    patience : int, optional
+        Stop after this many epochs without val-loss improvement (None = off).
+        The best-validation weights are restored at the end.
+    min_delta : float
+        Minimum val-loss decrease that counts as an improvement.
+    time_budget : float, optional
+        Stop after the epoch during which this many seconds have elapsed.
+    checkpoint_path : str, optional
+        Save model/optimizer/early-stopping state after every epoch and
+        resume from it if it exists. Removed once training completes. A
+        checkpoint written for other data or parameters raises ValueError.
+    num_threads : int, optional
+        torch.set_num_threads for the duration of training. The setting is
+        process-wide, so only pass it from a dedicated process (train_cnn.py,
+        a job process), not from a server thread.
+    loader_workers : int
+        DataLoader worker processes (0 = load in the training thread).
 
     Returns
     -------
@@ -129,6 +190,24 @@ def train_cnn_model(
     if not HAS_TORCH:
         raise ImportError("PyTorch not installed. Run: pip install torch --index-url https://download.pytorch.org/whl/cpu")
 
+    prev_threads = torch.get_num_threads()
+    if num_threads:
+        torch.set_num_threads(num_threads)
+    try:
+        return _train_cnn(
+            returns_matrix, tickers, window, forward_days, train_pct, epochs, batch_size,
+            learning_rate, progress_callback, val_pct, patience, min_delta, time_budget,
+            checkpoint_path, loader_workers,
+        )
+    finally:
+        torch.set_num_threads(prev_threads)
+
+
+def _train_cnn(returns_matrix, tickers, window, forward_days, train_pct, epochs, batch_size,
+               learning_rate, progress_callback, val_pct, patience, min_delta, time_budget,
+               checkpoint_path, loader_workers) -> dict:
+    """Training body of train_cnn_model (thread count already configured)."""
+    t_start = time.monotonic()
     n_obs, n_assets = returns_matrix.shape
 
     # Create pooled training data from all assets
@@ -145,6 +224,7 @@ def train_cnn_model(
 
     X_all = np.vstack(all_X)
     y_all = np.concatenate(all_y)
+    t_all = np.concatenate([np.arange(window, window + len(X)) for X in all_X])  # row index of each target start
 
     # Normalize targets to [-1, 1] range
     y_std = np.std(y_all)
@@ -160,31 +240,74 @@ def train_cnn_model(
     X_train, X_test = X_all[:n_train], X_all[n_train:]
     y_train, y_test = y_normalized[:n_train], y_normalized[n_train:]
 
+    # Hold out the most recent training dates for early stopping; overlapping
+    # windows would leak a random split, so fitting stops window + forward_days
+    # rows before the first validation date
+    t_train = t_all[:n_train]
+    n_val = int(n_train * val_pct) if patience is not None else 0
+    if n_val > 0:
+        t_cut = np.sort(t_train)[n_train - n_val]
+        val_idx = np.flatnonzero(t_train >= t_cut)
+        fit_idx = np.flatnonzero(t_train < t_cut - window - forward_days)
+        n_val = len(val_idx)
+    else:
+        val_idx, fit_idx = np.array([], dtype=int), np.arange(n_train)
+
     # Convert to tensors
-    X_train_t = torch.FloatTensor(X_train).unsqueeze(-1)  # (N, window, 1)
-    y_train_t = torch.FloatTensor(y_train).unsqueeze(-1)  # (N, 1)
+    X_fit_t = torch.FloatTensor(X_train[fit_idx]).unsqueeze(-1)  # (N, window, 1)
+    y_fit_t = torch.FloatTensor(y_train[fit_idx]).unsqueeze(-1)  # (N, 1)
+    X_val_t = torch.FloatTensor(X_train[val_idx]).unsqueeze(-1)
+    y_val_t = torch.FloatTensor(y_train[val_idx]).unsqueeze(-1)
     X_test_t = torch.FloatTensor(X_test).unsqueeze(-1)
     y_test_t = torch.FloatTensor(y_test).unsqueeze(-1)
 
+    loader = torch.utils.data.DataLoader(
+        torch.utils.data.TensorDataset(X_fit_t, y_fit_t),
+        batch_size=batch_size,
+        shuffle=True,
+        num_workers=loader_workers,
+        pin_memory=torch.cuda.is_available(),
+        prefetch_factor=2 if loader_workers > 0 else None,
+        persistent_workers=loader_workers > 0,
+    )
+
     # Create model
     model = ReturnCNN(window=window)
     optimizer = torch.optim.Adam(model.parameters(), lr=learning_rate, weight_decay=1e-4)
     criterion = nn.MSELoss()
 
-    # Training loop
-    model.train()
     train_losses = []
-    for epoch in range(epochs):
-        indices = torch.randperm(n_train)
+    val_losses = []
+    best_val = float("inf")
+    best_state = None
+    bad_epochs = 0
+    start_epoch = 0
+
+    fingerprint = _checkpoint_fingerprint(
+        returns_matrix, tickers, window=window, forward_days=forward_days, train_pct=train_pct,
+        batch_size=batch_size, learning_rate=learning_rate, val_pct=val_pct, patience=patience,
+        min_delta=min_delta,
+    )
+    if checkpoint_path and os.path.exists(checkpoint_path):
+        ckpt = torch.load(checkpoint_path, map_location="cpu", weights_only=True)
+        if ckpt.get("fingerprint") != fingerprint:
+            raise ValueError(f"Checkpoint {os.path.basename(checkpoint_path)} was written for other data or "
+                             "training parameters; delete it or use a new checkpoint name")
+        model.load_state_dict(ckpt["model"])
+        optimizer.load_state_dict(ckpt["optimizer"])
+        torch.set_rng_state(ckpt["rng_state"])
+        train_losses, val_losses = ckpt["train_losses"], ckpt["val_losses"]
+        best_val, best_state, bad_epochs = ckpt["best_val"], ckpt["best_state"], ckpt["bad_epochs"]
+        start_epoch = ckpt["epoch"]
+
+    # Training loop
+    stop_reason = "max_epochs"
+    for epoch in range(start_epoch, epochs):
+        model.train()
         epoch_loss = 0
         n_batches = 0
 
-        for start in range(0, n_train, batch_size):
-            end = min(start + batch_size, n_train)
-            batch_idx = indices[start:end]
-            batch_X = X_train_t[batch_idx]
-            batch_y = y_train_t[batch_idx]
-
+        for batch_X, batch_y in loader:
             optimizer.zero_grad()
             pred = model(batch_X)
             loss = criterion(pred, batch_y)
@@ -197,33 +320,75 @@ def train_cnn_model(
 
         train_losses.append(epoch_loss / n_batches if n_batches > 0 else 0)
 
+        val_loss = None
+        if n_val > 0:
+            model.eval()
+            with torch.inference_mode():
+                val_loss = criterion(model(X_val_t), y_val_t).item()
+            val_losses.append(val_loss)
+            if val_loss < best_val - min_delta:
+                best_val = val_loss
+                best_state = {k: v.detach().clone() for k, v in model.state_dict().items()}
+                bad_epochs = 0
+            else:
+                bad_epochs += 1
+
+        if checkpoint_path:
+            os.makedirs(os.path.dirname(checkpoint_path) or ".", exist_ok=True)
+            torch.save({
+                "fingerprint": fingerprint,
+                "epoch": epoch + 1,
+                "model": model.state_dict(),
+                "optimizer": optimizer.state_dict(),
+                "rng_state": torch.get_rng_state(),
+                "train_losses": train_losses,
+                "val_losses": val_losses,
+                "best_val": best_val,
+                "best_state": best_state,
+                "bad_epochs": bad_epochs,
+            }, checkpoint_path + ".tmp")
+            os.replace(checkpoint_path + ".tmp", checkpoint_path)
+
+        if progress_callback is not None:
+            progress_callback({"epoch": epoch + 1, "epochs": epochs,
+                               "train_loss": train_losses[-1], "val_loss": val_loss})
+
+        if patience is not None and n_val > 0 and bad_epochs >= patience:
+            stop_reason = "early_stopping"
+            break
+        if time_budget is not None and time.monotonic() - t_start >= time_budget:
+            stop_reason = "time_budget"
+            break
+
+    if best_state is not None:
+        model.load_state_dict(best_state)
+
     # Evaluate
     model.eval()
-    with torch.no_grad():
+    with torch.inference_mode():
         test_pred = model(X_test_t)
         test_loss = criterion(test_pred, y_test_t).item()
 
-    # Generate current signals for each asset
+    # Generate current signals for each asset (single batched forward pass)
     signals = {}
     if tickers is not None:
-        for j, ticker in enumerate(tickers):
-            rets = returns_matrix[:, j]
-            if len(rets) >= window:
-                last_window = rets[-window:]
-                x = torch.FloatTensor(last_window).unsqueeze(0).unsqueeze(-1)
-                with torch.no_grad():
-                    sig = model(x).item()
-                signals[ticker] = float(sig)
-            else:
-                signals[ticker] = 0.0
+        signals = score_cnn_windows(model, returns_matrix, tickers, window=window)
+
+    if checkpoint_path and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
 
     return {
         "model_state": model.state_dict(),
         "train_loss_final": train_losses[-1] if train_losses else 0,
         "test_loss": test_loss,
-        "n_train_samples": n_train,
+        "best_val_loss": best_val if best_state is not None else None,
+        "n_train_samples": len(fit_idx),
+        "n_val_samples": n_val,
         "n_test_samples": len(X_test),
         "epochs": epochs,
+        "epochs_run": len(train_losses),
+        "stop_reason": stop_reason,
+        "train_seconds": round(time.monotonic() - t_start, 2),
         "signals": signals,
         "y_mean": float(y_mean),
         "y_std": float(y_std),
@@ -235,25 +400,161 @@ def predict_cnn_signals(
     returns_matrix: np.ndarray,
     tickers: List[str],
     window: int = 60,
+    backend: str = "eager",
 ) -> Dict[str, float]:
     """Generate CNN signals for current portfolio using a trained model."""
     if not HAS_TORCH:
         return {t: 0.0 for t in tickers}
 
+    model = build_cnn_model(model_state, window=window, backend=backend)
+    return score_cnn_windows(model, returns_matrix, tickers, window=window)
+
+
+def build_cnn_model(model_state: dict, window: int = 60, backend: str = "eager"):
+    """
+    Instantiate a ReturnCNN from a state_dict, ready for inference.
+
+    backend:
+        'eager'       — plain eval-mode module
+        'torchscript' — traced TorchScript graph (lower per-call overhead)
+        'int8'        — dynamic int8 quantization of Linear layers (CPU)
+    """
+    if backend not in INFERENCE_BACKENDS:
+        raise ValueError(f"Unknown CNN inference backend '{backend}' (expected one of {INFERENCE_BACKENDS})")
+
     model = ReturnCNN(window=window)
     model.load_state_dict(model_state)
     model.eval()
 
-    signals = {}
-    for j, ticker in enumerate(tickers):
-        rets = returns_matrix[:, j]
-        if len(rets) >= window:
-            last_window = rets[-window:]
-            x = torch.FloatTensor(last_window).unsqueeze(0).unsqueeze(-1)
-            with torch.no_grad():
-                sig = model(x).item()
-            signals[ticker] = float(sig)
-        else:
-            signals[ticker] = 0.0
-
-    return signals
+    if backend == "int8":
+        model = torch.ao.quantization.quantize_dynamic(model, {nn.Linear}, dtype=torch.qint8)
+    elif backend == "torchscript":
+        with torch.inference_mode():
+            example = torch.zeros(1, window, 1)
+            model = torch.jit.freeze(torch.jit.trace(model, example))
+
+    return model
+
+
+@timed("predict")
+def score_cnn_windows(
+    model,
+    returns_matrix: np.ndarray,
+    tickers: List[str],
+    window: int = 60,
+) -> Dict[str, float]:
+    """
+    Score the latest `window` returns of each column with an eval-mode model.
+
+    All windows are stacked into one (N, window, 1) tensor and scored in a
+    single forward pass.
+    """
+    if len(returns_matrix) < window or not tickers:
+        return {t: 0.0 for t in tickers}
+
+    windows = np.ascontiguousarray(returns_matrix[-window:, :len(tickers)].T, dtype=np.float32)
+    x = torch.from_numpy(windows).unsqueeze(-1)  # (N, window, 1)
+    with torch.inference_mode():
+        sig = model(x).squeeze(-1).numpy()
+
+    return {ticker: float(sig[j]) for j, ticker in enumerate(tickers)}
+
+
+# ============================================================================
+# Model store
+# ============================================================================
+
+def save_cnn_model(result: dict, tickers: List[str], window: int = 60,
+                   lookback_days: Optional[int] = None, model_dir: str = CNN_MODEL_DIR) -> str:
+    """
+    Persist a trained CNN (output of train_cnn_model) as a new store version.
+
+    Returns the version string. The LATEST pointer is updated last, so readers
+    never see a partially written version.
+    """
+    if not HAS_TORCH:
+        raise ImportError("PyTorch not installed")
+
+    version = datetime.now().strftime("cnn_%Y%m%d_%H%M%S")
+    version_dir = os.path.join(model_dir, version)
+    os.makedirs(version_dir, exist_ok=True)
+
+    torch.save(result["model_state"], os.path.join(version_dir, "model.pt"))
+
+    metadata = {
+        "version": version,
+        "trained_at": datetime.now().isoformat(timespec="seconds"),
+        "tickers": list(tickers),
+        "window": window,
+        "lookback_days": lookback_days,
+        "epochs": result.get("epochs"),
+        "epochs_run": result.get("epochs_run"),
+        "stop_reason": result.get("stop_reason"),
+        "best_val_loss": result.get("best_val_loss"),
+        "train_loss_final": result.get("train_loss_final"),
+        "test_loss": result.get("test_loss"),
+        "n_train_samples": result.get("n_train_samples"),
+        "n_test_samples": result.get("n_test_samples"),
+        "y_mean": result.get("y_mean"),
+        "y_std": result.get("y_std"),
+    }
+    with open(os.path.join(version_dir, "metadata.json"), "w") as f:
+        json.dump(metadata, f, indent=2)
+
+    tmp_pointer = os.path.join(model_dir, "LATEST.tmp")
+    with open(tmp_pointer, "w") as f:
+        f.write(version)
+    os.replace(tmp_pointer, os.path.join(model_dir, "LATEST"))
+
+    return version
+
+
+def latest_cnn_version(model_dir: str = CNN_MODEL_DIR) -> Optional[str]:
+    """Return the most recently saved version, or None if the store is empty."""
+    pointer = os.path.join(model_dir, "LATEST")
+    if not os.path.exists(pointer):
+        return None
+    with open(pointer) as f:
+        version = f.read().strip()
+    return version or None
+
+
+def list_cnn_models(model_dir: str = CNN_MODEL_DIR) -> List[dict]:
+    """Metadata for every stored version, newest first."""
+    if not os.path.isdir(model_dir):
+        return []
+    models = []
+    for name in sorted(os.listdir(model_dir), reverse=True):
+        meta_path = os.path.join(model_dir, name, "metadata.json")
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                models.append(json.load(f))
+    return models
+
+
+def load_cnn_model(version: Optional[str] = None, model_dir: str = CNN_MODEL_DIR) -> tuple:
+    """
+    Load a stored CNN version (latest if not given).
+
+    Returns (model_state, metadata). Raises FileNotFoundError if missing —
+    including any version that is not one of list_cnn_models(), so a
+    caller-supplied name never reaches os.path.join / torch.load.
+    """
+    if not HAS_TORCH:
+        raise ImportError("PyTorch not installed")
+
+    version = version or latest_cnn_version(model_dir)
+    if version is None:
+        raise FileNotFoundError("No trained CNN model in store")
+    if version not in {m.get("version") for m in list_cnn_models(model_dir)}:
+        raise FileNotFoundError(f"CNN model {version} not found")
+
+    version_dir = os.path.join(model_dir, version)
+    if not os.path.exists(os.path.join(version_dir, "model.pt")):
+        raise FileNotFoundError(f"CNN model {version} not found")
+
+    with open(os.path.join(version_dir, "metadata.json")) as f:
+        metadata = json.load(f)
+    model_state = torch.load(os.path.join(version_dir, "model.pt"), map_location="cpu")
+
+    return model_state, metadata
@@ -11,7 +11,8 @@ Fits a standard GARCH(1,1) to log returns and returns:
 
 import numpy as np
 import pandas as pd
-from arch import arch_model
+
+from ..utils.metrics import stage
 
 
 def fit_garch(
@@ -47,11 +48,14 @@ def fit_garch(
         fit_stats: {log_likelihood, aic, bic, num_obs}
         dist_params: distribution parameters (df for t, etc.)
     """
+    from arch import arch_model  # deferred: arch pulls in scipy/statsmodels at import
+
     # arch expects returns scaled to percentage
     scaled = returns * 100.0
 
-    am = arch_model(scaled, vol="Garch", p=p, q=q, dist=dist, mean="Constant")
-    res = am.fit(disp="off", show_warning=False)
+    with stage("fit", "fit_garch"):
+        am = arch_model(scaled, vol="Garch", p=p, q=q, dist=dist, mean="Constant")
+        res = am.fit(disp="off", show_warning=False)
 
     # Extract parameters
     omega = res.params.get("omega", 0)
@@ -68,17 +72,18 @@ def fit_garch(
 
     # Conditional volatility series (annualized)
     cond_vol = res.conditional_volatility  # in % space
-    cond_vol_annual = (cond_vol * np.sqrt(252) / 100.0).tolist()
+    cond_vol_annual = np.asarray(cond_vol * np.sqrt(252) / 100.0)
 
     # Standardized residuals
     raw_resid = res.resid / cond_vol
     if hasattr(raw_resid, 'dropna'):
         raw_resid = raw_resid.dropna()
     std_resid = np.array(raw_resid)
-    std_resid = std_resid[~np.isnan(std_resid)].tolist()
+    std_resid = std_resid[~np.isnan(std_resid)]
 
     # Forecast
-    forecasts = res.forecast(horizon=horizon)
+    with stage("forecast", "fit_garch"):
+        forecasts = res.forecast(horizon=horizon)
     forecast_var = forecasts.variance.iloc[-1]  # last row = from last obs
     forecast_dict = {}
     for h in [1, 5, 10]:
@@ -109,9 +114,9 @@ def fit_garch(
             "half_life": float(half_life) if not np.isnan(half_life) else None,
             "unconditional_vol": float(uncond_vol_annual) if not np.isnan(uncond_vol_annual) else None,
         },
-        "conditional_vol": cond_vol_annual[-min(252, len(cond_vol_annual)):],
+        "conditional_vol": cond_vol_annual[-252:],
         "forecast": forecast_dict,
-        "residuals": std_resid[-min(252, len(std_resid)):],
+        "residuals": std_resid[-252:],
         "fit_stats": {
             "log_likelihood": float(res.loglikelihood),
             "aic": float(res.aic),
@@ -12,7 +12,10 @@ Output: list of jump events with dates, magnitudes, and classification.
 import numpy as np
 import pandas as pd
 
+from ..utils.metrics import timed
 
+
+@timed("fit")
 def detect_jumps(
     returns: np.ndarray,
     dates=None,
@@ -8,27 +8,17 @@ Features: Same 19 factors + engineered features as v2.
 Target: 1-month forward returns.
 """
 
+import importlib.util
+
 import numpy as np
 import pandas as pd
 from typing import Optional, List, Dict
 
-try:
-    from xgboost import XGBRegressor
-    HAS_XGB = True
-except ImportError:
-    HAS_XGB = False
-
-try:
-    from lightgbm import LGBMRegressor
-    HAS_LGBM = True
-except ImportError:
-    HAS_LGBM = False
-
-try:
-    import shap
-    HAS_SHAP = True
-except ImportError:
-    HAS_SHAP = False
+# Availability is checked without importing: xgboost, lightgbm and shap are
+# imported on first use so that service startup does not pay for them.
+HAS_XGB = importlib.util.find_spec("xgboost") is not None
+HAS_LGBM = importlib.util.find_spec("lightgbm") is not None
+HAS_SHAP = importlib.util.find_spec("shap") is not None
 
 
 def create_xgb_model(
@@ -42,6 +32,7 @@ def create_xgb_model(
     """Create XGBoost regressor with tuned hyperparameters."""
     if not HAS_XGB:
         raise ImportError("xgboost not installed. Run: pip install xgboost>=2.0")
+    from xgboost import XGBRegressor
 
     return XGBRegressor(
         max_depth=max_depth,
@@ -69,6 +60,7 @@ def create_lgbm_model(
     """Create LightGBM regressor with tuned hyperparameters."""
     if not HAS_LGBM:
         raise ImportError("lightgbm not installed. Run: pip install lightgbm>=4.0")
+    from lightgbm import LGBMRegressor
 
     return LGBMRegressor(
         num_leaves=num_leaves,
@@ -143,6 +135,8 @@ def train_ensemble(
     shap_values = None
     if HAS_SHAP:
         try:
+            import shap
+
             # Use a subsample for speed
             n_explain = min(100, len(X_test))
             X_explain = X_test[:n_explain]
@@ -204,6 +198,7 @@ def predict_ensemble(
     local_importance = None
     if HAS_SHAP:
         try:
+            import shap
             xgb_explainer = shap.TreeExplainer(xgb_model)
             xgb_shap = xgb_explainer.shap_values(X)
             lgbm_explainer = shap.TreeExplainer(lgbm_model)
@@ -19,10 +19,11 @@ Also provides:
 import warnings
 import numpy as np
 import pandas as pd
-from hmmlearn.hmm import GaussianHMM
-from arch import arch_model
 
+from ..utils.metrics import timed
 
+
+@timed("fit")
 def fit_regime_model(
     returns: np.ndarray,
     dates: object = None,
@@ -59,6 +60,8 @@ def fit_regime_model(
     X = returns.reshape(-1, 1)
     n = len(X)
 
+    from hmmlearn.hmm import GaussianHMM  # deferred: heavy import, only needed when fitting
+
     with warnings.catch_warnings():
         warnings.simplefilter("ignore")
         model = GaussianHMM(
@@ -117,8 +120,8 @@ def fit_regime_model(
 
     result = {
         "n_states": n_states,
-        "states": states_sorted.tolist(),
-        "state_probs": probs_sorted.tolist(),
+        "states": states_sorted,
+        "state_probs": probs_sorted,
         "transition_matrix": trans.tolist(),
         "state_stats": state_stats,
         "current_state": current_state,
@@ -134,6 +137,7 @@ def fit_regime_model(
     return result
 
 
+@timed("fit")
 def fit_msgarch(
     returns: np.ndarray,
     dates: object = None,
@@ -148,7 +152,7 @@ def fit_msgarch(
     # Step 1: Fit regime model
     regime_result = fit_regime_model(returns, dates, n_states)
 
-    states = np.array(regime_result["states"])
+    states = regime_result["states"]
     current_probs = regime_result["current_probs"]
 
     # Step 2: Fit GARCH per regime
@@ -171,6 +175,7 @@ def fit_msgarch(
 
         try:
             scaled = state_returns * 100.0
+            from arch import arch_model
             am = arch_model(scaled, vol="Garch", p=1, q=1, dist="normal", mean="Constant")
             res = am.fit(disp="off", show_warning=False)
 
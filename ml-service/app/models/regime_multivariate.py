@@ -13,7 +13,8 @@ classification rather than single-stock regime.
 import warnings
 import numpy as np
 from typing import Optional, List
-from hmmlearn.hmm import GaussianHMM
+
+from ..utils.metrics import timed
 
 
 def _rolling_vol(returns: np.ndarray, window: int = 20) -> np.ndarray:
@@ -68,6 +69,7 @@ def _avg_pairwise_correlation(returns_matrix: np.ndarray, window: int = 60) -> n
     return avg_corr
 
 
+@timed("fit")
 def fit_multivariate_regime(
     returns_matrix: np.ndarray,
     benchmark_returns: Optional[np.ndarray] = None,
@@ -136,6 +138,8 @@ def fit_multivariate_regime(
     X_scaled = (X - feat_mean) / feat_std
 
     # Fit HMM
+    from hmmlearn.hmm import GaussianHMM  # deferred: heavy import, only needed when fitting
+
     with warnings.catch_warnings():
         warnings.simplefilter("ignore")
         model = GaussianHMM(
@@ -0,0 +1,276 @@
+"""
+Event-driven long-trade simulator, vectorized over signals and exit rules.
+
+    exit_rule(**overrides)     a validated exit rule (dict) — levels, holds,
+                               entry lag, cooldown, costs; see RULE_DEFAULTS
+                               (holds and cooldown bounded by RULE_LIMITS)
+    simulate_trades(prices, signal_bars, rules, exit_signal=None)
+                               every signal under every rule at once: arrays
+                               of shape (len(rules), len(signal_bars))
+    trade_stats(trades, g)     win rate, profit factor, exit counts of rule g
+    average_true_range         ATR(14) as the trainers compute it
+    entry_rows                 price row of each signal date
+
+`prices` is a dict of aligned per-bar arrays: 'close' always, 'high' /
+'low' for intraday touches, 'open' for a lagged entry and 'atr' for levels
+in ATR multiples (all read at the signal bar, never after it).
+
+A signal on bar t enters at t's close (entry_lag=0) or at the open of bar
+t + entry_lag. Each trade then exits at the first bar that
+  - reaches the stop (any bar after entry; min_hold does not apply),
+  - reaches the target, or has the exit signal on (from min_hold bars),
+  - else at the close of bar entry + max_hold (or the last bar);
+stop first, then target, then exit signal when several fall on one bar.
+Intraday touches fill at the level, close touches at the close.
+
+The stop is the highest of the initial stop, the entry price once a close
+has cleared the breakeven level (that bar included) and, with trail_pct,
+the highest close up to the previous bar less trail_pct.
+
+Exits are found per rule on one (signals x bars) window per entry lag:
+every signal is simulated as if taken. With one_position (the default) a
+signal is then only taken when no trade is open and more than `cooldown`
+bars have passed since the last exit — a walk over the taken trades only.
+"""
+
+from typing import Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+EXIT_NONE, EXIT_TARGET, EXIT_STOP, EXIT_MAX_HOLD, EXIT_SIGNAL = -1, 0, 1, 2, 3  # exit_reason codes
+EXIT_REASONS = {
+    EXIT_NONE: "not_taken",
+    EXIT_TARGET: "take_profit",
+    EXIT_STOP: "stop_loss",
+    EXIT_MAX_HOLD: "time_stop",
+    EXIT_SIGNAL: "signal_flip",
+}
+
+TOUCH_MODES = ("intraday", "close")
+RULE_LIMITS = {"entry_lag": 21, "min_hold": 252, "max_hold": 252, "cooldown": 252}  # bars
+
+RULE_DEFAULTS = {
+    "entry_lag": 0,          # bars from signal to fill: 0 = signal bar's close, n = open of bar t+n
+    "target_pct": None,      # take profit at entry * (1 + target_pct)
+    "target_atr": None,      # ... or at entry + target_atr * ATR
+    "stop_pct": None,        # initial stop at entry * (1 - stop_pct)
+    "stop_atr": None,        # ... or at entry - stop_atr * ATR
+    "breakeven_pct": None,   # stop to entry once a close clears entry * (1 + breakeven_pct)
+    "breakeven_atr": None,   # ... or entry + breakeven_atr * ATR
+    "trail_pct": None,       # stop trails the highest close by trail_pct
+    "min_hold": 0,           # bars before target / exit signal may close the trade
+    "max_hold": 21,          # bars until the time stop
+    "cooldown": 0,           # bars after an exit before the next entry (one_position)
+    "one_position": True,    # False: every signal is a trade, overlapping allowed
+    "cost_bps": 0.0,         # round-trip cost
+    "touch": "intraday",     # levels touched by high / low, or only by the close
+}
+
+
+def exit_rule(**overrides) -> dict:
+    """RULE_DEFAULTS with `overrides`, checked (ValueError on unknown keys or bad values)."""
+    unknown = set(overrides) - set(RULE_DEFAULTS)
+    if unknown:
+        raise ValueError(f"Unknown exit rule fields: {sorted(unknown)}")
+    rule = {**RULE_DEFAULTS, **overrides}
+    if rule["touch"] not in TOUCH_MODES:
+        raise ValueError(f"Unknown touch mode '{rule['touch']}' (expected one of {TOUCH_MODES})")
+    for key, limit in RULE_LIMITS.items():
+        if int(rule[key]) != rule[key] or not 0 <= rule[key] <= limit:
+            raise ValueError(f"{key} must be an integer from 0 to {limit}, got {rule[key]}")
+        rule[key] = int(rule[key])
+    for level in ("target", "stop", "breakeven"):
+        if rule[f"{level}_pct"] is not None and rule[f"{level}_atr"] is not None:
+            raise ValueError(f"Give {level}_pct or {level}_atr, not both")
+    return rule
+
+
+def average_true_range(high: np.ndarray, low: np.ndarray, close: np.ndarray, window: int = 14) -> np.ndarray:
+    """Simple moving average of the true range (NaN for the first window - 1 bars)."""
+    prev_close = np.roll(close, 1)
+    true_range = np.maximum(high - low, np.maximum(np.abs(high - prev_close), np.abs(low - prev_close)))
+    true_range[0] = high[0] - low[0]
+    return pd.Series(true_range).rolling(window).mean().to_numpy(dtype=np.float64)
+
+
+def entry_rows(dates: np.ndarray, signal_dates: Iterable) -> np.ndarray:
+    """
+    Price row of each signal date (-1 when there is none).
+
+    The signal's own date, else the nearest trading date within 3 calendar
+    days (the later one first on ties).
+    """
+    signal_dates = np.asarray(signal_dates, dtype='datetime64[D]')
+    rows = np.full(len(signal_dates), -1, dtype=np.int64)
+    if len(dates) == 0:
+        return rows
+    for offset in (0, 1, -1, 2, -2, 3, -3):
+        cand = signal_dates + np.timedelta64(offset, 'D')
+        pos = np.minimum(np.searchsorted(dates, cand), len(dates) - 1)
+        hit = (rows < 0) & (dates[pos] == cand)
+        rows[hit] = pos[hit]
+    return rows
+
+
+def _level(entry, atr, pct, mult, sign):
+    """entry * (1 + sign * pct) or entry + sign * mult * ATR; out of reach (+-inf) when unset."""
+    if pct is not None:
+        return entry * (1 + sign * pct)
+    if mult is not None:
+        return entry + sign * atr * mult
+    return np.full_like(entry, sign * np.inf)
+
+
+def _first(hit: np.ndarray) -> np.ndarray:
+    """Column of the first True per row (the column count when there is none)."""
+    return np.where(hit.any(axis=1), hit.argmax(axis=1), hit.shape[1])
+
+
+def _one_position(signal_bars, ok, exit_bar, cooldown):
+    """Signals taken when one trade at a time is open and `cooldown` bars follow each exit."""
+    taken = np.zeros(len(signal_bars), dtype=bool)
+    after = np.searchsorted(signal_bars, exit_bar + cooldown, side='right')  # next signal past the cooldown
+    k = 0
+    while k < len(signal_bars):
+        if not ok[k]:
+            k += 1
+            continue
+        taken[k] = True
+        k = max(after[k], k + 1)
+    return taken
+
+
+def simulate_trades(prices: dict, signal_bars: np.ndarray, rules: List[dict],
+                    exit_signal: Optional[np.ndarray] = None) -> dict:
+    """
+    Trades of the signals on `signal_bars` (price rows) under every rule.
+
+    exit_signal is an optional per-bar bool array (e.g. prediction below the
+    exit threshold). With one_position, signal_bars must be ascending.
+
+    Returns a dict of (len(rules), len(signal_bars)) arrays: 'taken',
+    'entry_bar', 'exit_bar', 'entry_price', 'exit_price', 'net_return',
+    'hold' (bars from entry to exit) and 'reason' (EXIT_* codes). Signals
+    not taken have reason EXIT_NONE and NaN prices / returns.
+    """
+    rules = [exit_rule(**rule) for rule in rules]
+    signal_bars = np.asarray(signal_bars, dtype=np.int64)
+    n, S, G = len(prices['close']), len(signal_bars), len(rules)
+    if any(r["one_position"] for r in rules) and np.any(np.diff(signal_bars) < 0):
+        raise ValueError("signal_bars must be ascending for one_position rules")
+
+    out = {
+        'taken': np.zeros((G, S), dtype=bool),
+        'entry_bar': np.full((G, S), -1, dtype=np.int64),
+        'exit_bar': np.full((G, S), -1, dtype=np.int64),
+        'entry_price': np.full((G, S), np.nan),
+        'exit_price': np.full((G, S), np.nan),
+        'net_return': np.full((G, S), np.nan),
+        'hold': np.zeros((G, S), dtype=np.int64),
+        'reason': np.full((G, S), EXIT_NONE, dtype=np.int8),
+    }
+    if S == 0 or G == 0:
+        return out
+
+    for lag in sorted({r["entry_lag"] for r in rules}):
+        group = [g for g, r in enumerate(rules) if r["entry_lag"] == lag]
+        horizon = min(max(max(rules[g]["max_hold"], rules[g]["min_hold"]) for g in group), max(n - 1, 0))
+
+        # one window per signal: days 1..horizon after a close fill, 0..horizon after an open fill
+        entry_bar = signal_bars + lag
+        ok = (signal_bars >= 0) & (entry_bar < n)
+        entry_bar = np.where(ok, entry_bar, 0)
+        days = np.arange(1 if lag == 0 else 0, horizon + 1)
+        bars = entry_bar[:, None] + days
+        valid = bars < n
+        bars = np.minimum(bars, n - 1)
+        close = np.where(valid, prices['close'][bars], np.nan)
+        high = np.where(valid, prices['high'][bars], -np.inf) if 'high' in prices else close
+        low = np.where(valid, prices['low'][bars], np.inf) if 'low' in prices else close
+
+        signal_row = np.where(ok, signal_bars, 0)
+        entry = prices['close'][signal_row] if lag == 0 else prices['open'][entry_bar]
+        atr = None
+        if any(rules[g][f"{lv}_atr"] is not None for g in group for lv in ("target", "stop", "breakeven")):
+            if 'atr' not in prices:
+                raise ValueError("ATR levels need an 'atr' price array")
+            atr = prices['atr'][signal_row]
+            atr = np.where(atr <= 0, entry * 0.02, atr)  # NaN (no ATR yet) never touches a level
+        exit_hits = None
+        if exit_signal is not None:
+            exit_hits = valid & np.asarray(exit_signal, dtype=bool)[bars]
+
+        cleared_by = {}  # breakeven masks, shared by the rules with the same trigger
+        for g in group:
+            rule = rules[g]
+            limit = np.minimum(max(rule["max_hold"], rule["min_hold"]), n - 1 - entry_bar)
+            in_window = days <= limit[:, None]
+            past_min = in_window & (days >= rule["min_hold"])
+
+            target = _level(entry, atr, rule["target_pct"], rule["target_atr"], 1)
+            stop = _level(entry, atr, rule["stop_pct"], rule["stop_atr"], -1)
+            stop = np.broadcast_to(stop[:, None], close.shape)
+            if rule["breakeven_pct"] is not None or rule["breakeven_atr"] is not None:
+                key = (rule["breakeven_pct"], rule["breakeven_atr"])
+                if key not in cleared_by:
+                    trigger = _level(entry, atr, *key, 1)
+                    cleared_by[key] = np.logical_or.accumulate(close > trigger[:, None], axis=1)
+                cleared = cleared_by[key]
+                stop = np.maximum(stop, np.where(cleared, entry[:, None], -np.inf))
+            if rule["trail_pct"] is not None:
+                peak = np.fmax.accumulate(np.column_stack([entry, close[:, :-1]]), axis=1)
+                stop = np.fmax(stop, peak * (1 - rule["trail_pct"]))
+
+            intraday = rule["touch"] == "intraday"
+            stop_day = _first(((low if intraday else close) <= stop) & in_window)
+            target_day = _first(((high if intraday else close) >= target[:, None]) & past_min)
+            signal_day = _first(exit_hits & past_min) if exit_hits is not None else np.full(S, days.size)
+
+            exit_day = np.minimum(np.minimum(stop_day, target_day), signal_day)
+            touched = exit_day < days.size
+            col = np.minimum(exit_day, days.size - 1)
+            reason = np.where(
+                touched,
+                np.where(stop_day == exit_day, EXIT_STOP, np.where(target_day == exit_day, EXIT_TARGET, EXIT_SIGNAL)),
+                EXIT_MAX_HOLD,
+            )
+            exit_bar = np.where(touched, entry_bar + days[col], entry_bar + limit)
+            exit_price = prices['close'][exit_bar]
+            if intraday:
+                stop_fill = np.take_along_axis(stop, col[:, None], axis=1)[:, 0]
+                exit_price = np.where(reason == EXIT_STOP, stop_fill,
+                                      np.where(reason == EXIT_TARGET, target, exit_price))
+
+            taken = _one_position(signal_bars, ok, exit_bar, rule["cooldown"]) if rule["one_position"] else ok
+            out['taken'][g] = taken
+            out['entry_bar'][g] = np.where(taken, entry_bar, -1)
+            out['exit_bar'][g] = np.where(taken, exit_bar, -1)
+            out['entry_price'][g] = np.where(taken, entry, np.nan)
+            out['exit_price'][g] = np.where(taken, exit_price, np.nan)
+            out['net_return'][g] = np.where(taken, (exit_price - entry) / entry - rule["cost_bps"] / 1e4, np.nan)
+            out['hold'][g] = np.where(taken, exit_bar - entry_bar, 0)
+            out['reason'][g] = np.where(taken, reason, EXIT_NONE)
+    return out
+
+
+def trade_stats(trades: dict, g: int = 0) -> dict:
+    """Win rate, profit factor, average return / hold and exit counts of rule g's taken trades."""
+    taken = trades['taken'][g]
+    net, reason, hold = trades['net_return'][g][taken], trades['reason'][g][taken], trades['hold'][g][taken]
+    if len(net) == 0:
+        return {'trades': 0, 'win_rate': 0.0, 'profit_factor': 0.0, 'avg_return': 0.0, 'total_return': 0.0,
+                'avg_hold': 0.0, 'targets': 0, 'stops': 0, 'signal_exits': 0, 'time_stops': 0}
+    wins, losses = net[net > 0], net[net <= 0]
+    return {
+        'trades': len(net),
+        'win_rate': len(wins) / len(net),
+        'profit_factor': sum(wins.tolist()) / (abs(sum(losses.tolist())) + 1e-8),
+        'avg_return': float(np.mean(net)),
+        'total_return': float(np.prod(1 + net) - 1),  # compounded, one position at a time
+        'avg_hold': float(np.mean(hold)),
+        'targets': int((reason == EXIT_TARGET).sum()),
+        'stops': int((reason == EXIT_STOP).sum()),
+        'signal_exits': int((reason == EXIT_SIGNAL).sum()),
+        'time_stops': int((reason == EXIT_MAX_HOLD).sum()),
+    }
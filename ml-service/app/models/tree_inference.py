@@ -0,0 +1,410 @@
+"""
+Flattened NumPy evaluator for XGBoost and LightGBM tree ensembles.
+
+compile_tree_model() reads a fitted model's own JSON dump once and packs every
+tree into flat node arrays (feature, threshold, children, default direction,
+leaf value). Scoring advances one cursor per (row, tree) a level at a time with
+fancy indexing, so a batch costs `max_depth` vectorised steps and none of the
+sklearn-wrapper / DMatrix / thread-pool setup of the native predict path.
+That setup only dominates for a handful of rows: benchmarks/bench_tree_inference.py
+puts the crossover at about 16 rows (single /predict rows run 5-10x faster;
+a 60-ticker signal date already runs 2x slower, a 10k-row fold 2-7x slower).
+select_tree_backend() therefore hands out an evaluator that scores batches
+of up to COMPILED_MAX_ROWS rows itself and passes larger ones to the native
+model; compile_tree_model() alone always evaluates compiled.
+
+Predictions are bit-identical to the native libraries, not merely close:
+
+  XGBoost   float32 inputs, `x < split` (NaN -> default child), leaves summed
+            in float32 in tree order starting from the base margin
+  LightGBM  float64 inputs, `x <= threshold` with the per-node None/Zero/NaN
+            missing rules, leaves summed in float64 in tree order
+
+Binary objectives apply the libraries' own sigmoid formulas through the same
+libm calls: XGBoost's float32 logf (base margin) and expf (rounding the float64
+functions instead differs in the last bit for a few rows per thousand),
+LightGBM's double exp. Where the C library lacks expf / logf, XGBoost logistic
+models raise NotImplementedError.
+select_tree_backend() verifies equality on sample rows before handing out a
+compiled model and keeps the native model if it does not hold.
+
+Supported: gbtree boosters with numerical splits and a single output —
+XGBoost reg:squarederror / binary:logistic, LightGBM regression / binary.
+Anything else raises NotImplementedError.
+"""
+
+import ctypes
+import ctypes.util
+import json
+import math
+import os
+from typing import Optional
+
+import numpy as np
+
+TREE_BACKENDS = ("native", "compiled")
+
+CHUNK_CELLS = 1 << 20  # rows x trees evaluated per chunk (bounds temporary memory)
+CHECK_ROWS = 256       # rows used for the native-equality check
+COMPILED_MAX_ROWS = int(os.environ.get("COMPILED_TREE_MAX_ROWS", "16"))  # larger batches score natively
+
+_LGBM_ZERO = float(np.float32(1e-35))  # LightGBM kZeroThreshold
+_MISSING_TYPES = {"None": 0, "Zero": 1, "NaN": 2}
+_MISSING_ZERO, _MISSING_NAN = 1, 2
+
+_XGB_IDENTITY = ("reg:squarederror", "reg:absoluteerror", "reg:pseudohubererror")
+_XGB_LOGISTIC = ("binary:logistic", "reg:logistic")
+_LGBM_IDENTITY = ("regression", "regression_l1", "huber", "fair", "quantile")
+
+
+def _libm_exp(a: np.ndarray) -> np.ndarray:
+    """Element-wise exp through the C library, as the native predictors call it."""
+    def _exp(v):
+        try:
+            return math.exp(v)
+        except OverflowError:
+            return math.inf
+    return np.fromiter((_exp(v) for v in a.ravel().tolist()), dtype=np.float64, count=a.size).reshape(a.shape)
+
+
+def _libm_float(name: str):
+    """The C library's single-precision `name` (expf, logf) via ctypes, None if missing."""
+    for lib in (None, ctypes.util.find_library("m")):
+        try:
+            fn = getattr(ctypes.CDLL(lib), name)  # the process's own symbols first, libm included
+        except (OSError, AttributeError, TypeError):
+            continue
+        fn.restype, fn.argtypes = ctypes.c_float, [ctypes.c_float]
+        return fn
+    return None
+
+
+_EXPF = _libm_float("expf")
+_LOGF = _libm_float("logf")
+
+
+def _libm_expf(a: np.ndarray) -> np.ndarray:
+    """Element-wise float32 expf through the C library, as XGBoost's sigmoid calls it."""
+    return np.fromiter((_EXPF(v) for v in a.ravel().tolist()), dtype=np.float32, count=a.size).reshape(a.shape)
+
+
+class CompiledTreeEnsemble:
+    """Flat-array tree ensemble exposing the predict / predict_proba API of the source model."""
+
+    def __init__(self, source, library: str, trees: list, n_features: int,
+                 base: float, transform: str, sigmoid: float = 1.0, max_rows: Optional[int] = None):
+        self.source = source
+        self.max_rows = max_rows  # batches above this go to source (None: always compiled)
+        self.library = library
+        self.n_features = n_features
+        self.transform = transform
+        self.sigmoid = sigmoid
+        self.dtype = np.float32 if library == "xgboost" else np.float64
+        self.base = self.dtype(base)
+        self._pack(trees)
+
+    def _pack(self, trees: list):
+        """Concatenate per-tree node arrays; children become global node ids."""
+        feature, threshold, left, right, default_left, missing, value, roots = [], [], [], [], [], [], [], []
+        max_depth, offset = 0, 0
+        for t in trees:
+            n = len(t["feature"])
+            depth = np.zeros(n, dtype=np.int64)
+            for nid in range(n):
+                if not t["is_leaf"][nid]:
+                    depth[t["left"][nid]] = depth[t["right"][nid]] = depth[nid] + 1
+            max_depth = max(max_depth, int(depth.max()))
+
+            roots.append(offset)
+            feature.append(t["feature"])
+            threshold.append(t["threshold"])
+            left.append(t["left"] + offset)
+            right.append(t["right"] + offset)
+            default_left.append(t["default_left"])
+            missing.append(t["missing"])
+            value.append(t["value"])
+            offset += n
+
+        self.feature = np.concatenate(feature).astype(np.intp)
+        self.threshold = np.concatenate(threshold).astype(self.dtype)
+        self.left = np.concatenate(left).astype(np.intp)
+        self.right = np.concatenate(right).astype(np.intp)
+        self.default_left = np.concatenate(default_left).astype(bool)
+        self.missing = np.concatenate(missing).astype(np.int8)
+        self.value = np.concatenate(value).astype(self.dtype)
+        self.roots = np.asarray(roots, dtype=np.intp)
+        self.max_depth = max_depth
+        self._zero_rules = bool((self.missing == _MISSING_ZERO).any())
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    @property
+    def feature_importances_(self):
+        return self.source.feature_importances_
+
+    # -- evaluation ---------------------------------------------------------
+
+    def _prepare(self, X) -> np.ndarray:
+        X = np.asarray(X, dtype=self.dtype)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.shape[1] < self.n_features:
+            raise ValueError(f"Expected {self.n_features} features, got {X.shape[1]}")
+        if self.library == "lightgbm":
+            # LightGBM drops |x| <= kZeroThreshold from a dense row, i.e. reads it as 0.0
+            X = np.where(np.abs(X) <= _LGBM_ZERO, 0.0, X)
+        return X
+
+    def _go_left(self, x: np.ndarray, idx: np.ndarray, has_nan: bool) -> np.ndarray:
+        if self.library == "xgboost":
+            go_left = x < self.threshold[idx]
+            if has_nan:
+                go_left = np.where(np.isnan(x), self.default_left[idx], go_left)
+            return go_left
+
+        if not has_nan and not self._zero_rules:
+            return x <= self.threshold[idx]
+        missing = self.missing[idx]
+        nan = np.isnan(x)
+        x = np.where(nan, 0.0, x)
+        use_default = ((missing == _MISSING_ZERO) & (np.abs(x) <= _LGBM_ZERO)) | \
+                      ((missing == _MISSING_NAN) & nan)
+        return np.where(use_default, self.default_left[idx], x <= self.threshold[idx])
+
+    def _raw_chunk(self, X: np.ndarray, has_nan: bool) -> np.ndarray:
+        n = X.shape[0]
+        idx = np.repeat(self.roots[None, :], n, axis=0)
+        rows = np.arange(n)[:, None]
+        for _ in range(self.max_depth):  # leaves point at themselves, so extra steps are no-ops
+            go_left = self._go_left(X[rows, self.feature[idx]], idx, has_nan)
+            idx = np.where(go_left, self.left[idx], self.right[idx])
+
+        leaves = self.value[idx]
+        if self.library == "xgboost":
+            leaves = np.concatenate([np.full((n, 1), self.base, dtype=self.dtype), leaves], axis=1)
+        # cumsum accumulates strictly left to right, matching the native per-tree `+=`
+        return np.cumsum(leaves, axis=1, dtype=self.dtype)[:, -1]
+
+    def predict_raw(self, X) -> np.ndarray:
+        """Untransformed ensemble output (margin) for each row."""
+        X = self._prepare(X)
+        has_nan = bool(np.isnan(X).any())
+        out = np.empty(X.shape[0], dtype=self.dtype)
+        step = max(1, CHUNK_CELLS // max(1, self.n_trees))
+        for start in range(0, X.shape[0], step):
+            out[start:start + step] = self._raw_chunk(X[start:start + step], has_nan)
+        return out
+
+    def _output(self, X) -> np.ndarray:
+        raw = self.predict_raw(X)
+        if self.transform == "xgb_sigmoid":
+            x = np.minimum(-raw, np.float32(88.7))
+            denom = _libm_expf(x) + np.float32(1.0) + np.float32(1e-16)
+            return np.float32(1.0) / denom
+        if self.transform == "lgbm_sigmoid":
+            return 1.0 / (1.0 + _libm_exp(-self.sigmoid * raw))
+        return raw
+
+    def _native(self, X) -> bool:
+        if self.max_rows is None:
+            return False
+        shape = np.shape(X)
+        return (shape[0] if len(shape) > 1 else 1) > self.max_rows
+
+    def _predict(self, X) -> np.ndarray:
+        out = self._output(X)
+        if hasattr(self.source, "predict_proba"):
+            return self.source.classes_[(out > 0.5).astype(int)]
+        return out
+
+    def _predict_proba(self, X) -> np.ndarray:
+        if self.transform == "identity":
+            raise AttributeError("predict_proba is only available for binary objectives")
+        p = self._output(X)
+        return np.vstack((1.0 - p, p)).transpose()
+
+    def predict(self, X) -> np.ndarray:
+        return self.source.predict(X) if self._native(X) else self._predict(X)
+
+    def predict_proba(self, X) -> np.ndarray:
+        return self.source.predict_proba(X) if self._native(X) else self._predict_proba(X)
+
+    def verify(self, X) -> None:
+        """Raise ValueError unless compiled predictions on X equal the source model's exactly."""
+        method = "predict_proba" if hasattr(self.source, "predict_proba") else "predict"
+        X = np.asarray(X)[:CHECK_ROWS]
+        expected = np.asarray(getattr(self.source, method)(X))
+        got = getattr(self, "_" + method)(X)
+        if expected.dtype != got.dtype or not np.array_equal(expected, got, equal_nan=True):
+            diff = np.max(np.abs(expected.astype(np.float64) - got.astype(np.float64)))
+            raise ValueError(f"compiled {self.library} predictions differ from native (max |diff| {diff:.3e})")
+
+
+# ============================================================================
+# Model dumps -> per-tree node arrays
+# ============================================================================
+
+def _compile_xgboost(model) -> CompiledTreeEnsemble:
+    booster = model.get_booster() if hasattr(model, "get_booster") else model
+    learner = json.loads(booster.save_raw(raw_format="json"))["learner"]
+    gbm = learner["gradient_booster"]
+    if gbm["name"] != "gbtree":
+        raise NotImplementedError(f"XGBoost booster '{gbm['name']}' is not supported")
+
+    params = learner["learner_model_param"]
+    if int(params.get("num_class", 0)) > 1 or int(params.get("num_target", 1)) > 1:
+        raise NotImplementedError("multi-output XGBoost models are not supported")
+
+    trees = gbm["model"]["trees"]
+    best = learner.get("attributes", {}).get("best_iteration")
+    if best is not None:  # the sklearn wrapper predicts with trees up to best_iteration
+        indptr = gbm["model"].get("iteration_indptr")
+        trees = trees[:indptr[int(best) + 1]] if indptr else trees[:int(best) + 1]
+
+    base = np.float32(float(str(params["base_score"]).strip("[]")))
+    objective = learner["objective"]["name"]
+    if objective in _XGB_LOGISTIC:
+        if _EXPF is None or _LOGF is None:
+            raise NotImplementedError("XGBoost logistic objectives need the C library's expf / logf")
+        transform = "xgb_sigmoid"
+        base = np.float32(-_LOGF(np.float32(1.0) / base - np.float32(1.0)))  # ProbToMargin, in float32
+    elif objective in _XGB_IDENTITY:
+        transform = "identity"
+    else:
+        raise NotImplementedError(f"XGBoost objective '{objective}' is not supported")
+
+    flat = []
+    for t in trees:
+        if any(int(s) != 0 for s in t.get("split_type", [])):
+            raise NotImplementedError("categorical XGBoost splits are not supported")
+        left = np.asarray(t["left_children"], dtype=np.int64)
+        right = np.asarray(t["right_children"], dtype=np.int64)
+        is_leaf = left == -1
+        own = np.arange(len(left))
+        flat.append({
+            "feature": np.where(is_leaf, 0, np.asarray(t["split_indices"], dtype=np.int64)),
+            "threshold": np.asarray(t["split_conditions"], dtype=np.float64).astype(np.float32),
+            "left": np.where(is_leaf, own, left),
+            "right": np.where(is_leaf, own, right),
+            "default_left": np.asarray(t["default_left"], dtype=bool),
+            "missing": np.full(len(left), _MISSING_NAN, dtype=np.int8),
+            # leaf values live in split_conditions for leaf nodes
+            "value": np.where(is_leaf, np.asarray(t["split_conditions"], dtype=np.float64), 0.0).astype(np.float32),
+            "is_leaf": is_leaf,
+        })
+
+    return CompiledTreeEnsemble(model, "xgboost", flat, int(params["num_feature"]), base, transform)
+
+
+def _flatten_lgbm_tree(structure: dict) -> dict:
+    """Breadth-first node arrays for one dump_model() tree; leaves point at themselves."""
+    nodes = [structure]
+    feature, threshold, left, right, default_left, missing, value, is_leaf = [], [], [], [], [], [], [], []
+    i = 0
+    while i < len(nodes):
+        node = nodes[i]
+        if "split_feature" not in node:
+            feature.append(0); threshold.append(0.0); left.append(i); right.append(i)
+            default_left.append(False); missing.append(0)
+            value.append(node["leaf_value"]); is_leaf.append(True)
+        else:
+            if node.get("decision_type", "<=") != "<=":
+                raise NotImplementedError("categorical LightGBM splits are not supported")
+            feature.append(node["split_feature"]); threshold.append(node["threshold"])
+            left.append(len(nodes)); nodes.append(node["left_child"])
+            right.append(len(nodes)); nodes.append(node["right_child"])
+            default_left.append(bool(node.get("default_left", False)))
+            missing.append(_MISSING_TYPES[node.get("missing_type", "None")])
+            value.append(0.0); is_leaf.append(False)
+        i += 1
+
+    return {
+        "feature": np.asarray(feature, dtype=np.int64),
+        "threshold": np.asarray(threshold, dtype=np.float64),
+        "left": np.asarray(left, dtype=np.int64),
+        "right": np.asarray(right, dtype=np.int64),
+        "default_left": np.asarray(default_left, dtype=bool),
+        "missing": np.asarray(missing, dtype=np.int8),
+        "value": np.asarray(value, dtype=np.float64),
+        "is_leaf": np.asarray(is_leaf, dtype=bool),
+    }
+
+
+def _compile_lightgbm(model) -> CompiledTreeEnsemble:
+    booster = getattr(model, "booster_", model)
+    dump = booster.dump_model()  # defaults to best_iteration, as Booster.predict does
+    if dump.get("num_tree_per_iteration", 1) != 1:
+        raise NotImplementedError("multiclass LightGBM models are not supported")
+    if dump.get("average_output"):
+        raise NotImplementedError("LightGBM random-forest mode is not supported")
+
+    tokens = dump.get("objective", "").split()
+    name = tokens[0] if tokens else ""
+    sigmoid = 1.0
+    if name == "binary":
+        transform = "lgbm_sigmoid"
+        for tok in tokens[1:]:
+            if tok.startswith("sigmoid:"):
+                sigmoid = float(tok.split(":", 1)[1])
+    elif name in _LGBM_IDENTITY and "sqrt" not in tokens:
+        transform = "identity"
+    else:
+        raise NotImplementedError(f"LightGBM objective '{dump.get('objective')}' is not supported")
+
+    flat = []
+    for info in dump["tree_info"]:
+        if info.get("is_linear"):
+            raise NotImplementedError("linear LightGBM trees are not supported")
+        flat.append(_flatten_lgbm_tree(info["tree_structure"]))
+
+    return CompiledTreeEnsemble(model, "lightgbm", flat, int(dump["max_feature_idx"]) + 1,
+                                0.0, transform, sigmoid)
+
+
+def compile_tree_model(model, check=None) -> CompiledTreeEnsemble:
+    """
+    Compile a fitted XGBoost / LightGBM model (sklearn wrapper or booster).
+
+    If `check` rows are given, the compiled predictions are compared with the
+    native ones and ValueError is raised on any difference.
+    """
+    if hasattr(model, "get_booster") or type(model).__module__.startswith("xgboost"):
+        compiled = _compile_xgboost(model)
+    elif hasattr(model, "booster_") or hasattr(model, "dump_model"):
+        compiled = _compile_lightgbm(model)
+    else:
+        raise NotImplementedError(f"Cannot compile {type(model).__name__}")
+
+    if check is not None:
+        compiled.verify(check)
+    return compiled
+
+
+def select_tree_backend(model, backend: str = "native", check: Optional[np.ndarray] = None,
+                        max_rows: Optional[int] = COMPILED_MAX_ROWS):
+    """
+    Return `model` itself ('native') or its compiled evaluator ('compiled').
+
+    The compiled evaluator scores batches of up to max_rows (default
+    COMPILED_MAX_ROWS) rows and passes larger ones to `model`. It is
+    returned only if it reproduces the native predictions exactly on
+    `check` (standard-normal rows if not given); otherwise a warning is
+    printed and the native model is kept.
+    """
+    if backend not in TREE_BACKENDS:
+        raise ValueError(f"Unknown tree backend '{backend}' (expected one of {TREE_BACKENDS})")
+    if backend == "native" or model is None:
+        return model
+
+    try:
+        compiled = compile_tree_model(model)
+        if check is None:
+            check = np.random.default_rng(0).standard_normal((CHECK_ROWS, compiled.n_features))
+        compiled.verify(check)
+        compiled.max_rows = max_rows
+        return compiled
+    except (NotImplementedError, ValueError) as e:
+        print(f"[WARN] Compiled tree backend unavailable for {type(model).__name__}: {e}")
+        return model
@@ -16,6 +16,8 @@ Combined Conditional Coverage test:
 import numpy as np
 from scipy import stats
 
+from ..utils.metrics import timed
+
 
 def kupiec_test(
     returns: np.ndarray,
@@ -134,6 +136,7 @@ def christoffersen_test(
     }
 
 
+@timed("backtest")
 def run_backtest(
     returns: np.ndarray,
     var_series: np.ndarray,
@@ -14,9 +14,11 @@ from typing import List, Optional
 
 import numpy as np
 from scipy import stats
-from arch import arch_model
 
+from ..utils.metrics import timed
 
+
+@timed("forecast")
 def compute_var(
     returns: np.ndarray,
     confidence_levels: Optional[List[float]] = None,
@@ -92,6 +94,8 @@ def _garch_var(returns: np.ndarray, alpha: float):
     Uses the last conditional variance as the forecast,
     then applies normal quantile.
     """
+    from arch import arch_model  # deferred: only the GARCH method needs arch
+
     try:
         scaled = returns * 100.0
         am = arch_model(scaled, vol="Garch", p=1, q=1, dist="normal", mean="Constant")
@@ -118,6 +122,7 @@ def _garch_var(returns: np.ndarray, alpha: float):
         return max(-(mu + z * sigma), 0), max(-(mu - sigma * stats.norm.pdf(z) / alpha), 0)
 
 
+@timed("forecast")
 def compute_var_series(
     returns: np.ndarray,
     confidence: float = 0.99,
@@ -137,6 +142,8 @@ def compute_var_series(
     if n < window + 20:
         raise ValueError(f"Need at least {window + 20} observations, got {n}")
 
+    from arch import arch_model
+
     alpha = 1 - confidence
     z = stats.norm.ppf(alpha)
 
@@ -178,10 +185,10 @@ def compute_var_series(
             garch_var[t] = param_var[t]  # fallback
 
     return {
-        "actual_returns": actual[window:].tolist(),
-        "historical_var": hist_var[window:].tolist(),
-        "parametric_var": param_var[window:].tolist(),
-        "garch_var": garch_var[window:].tolist(),
+        "actual_returns": actual[window:],
+        "historical_var": hist_var[window:],
+        "parametric_var": param_var[window:],
+        "garch_var": garch_var[window:],
         "confidence": confidence,
         "window": window,
     }
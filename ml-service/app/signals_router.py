@@ -2,31 +2,64 @@
 FastAPI router for CNN signals, signal combiner, and walk-forward backtest.
 
 Endpoints:
-    POST /signals/cnn         — Train CNN and get current signals
+    POST /signals/cnn         — Train CNN, save it to the model store, get current signals
+                                (blocking; POST /jobs/cnn_train runs it in the background)
+    POST /signals/cnn/predict — Score latest windows with the stored CNN (no training)
+    GET  /signals/cnn/models  — List stored CNN versions
     POST /signals/combine     — Combine all signal sources
     POST /signals/backtest    — Walk-forward backtest on combined signals
+    POST /signals/simulate    — Trades of one ticker's signals under a batch of exit rules
 """
 
 import asyncio
+import importlib.util
+import os
 import traceback
 import numpy as np
+import pandas as pd
 from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional
 
-from .models.cnn_signal import train_cnn_model, HAS_TORCH
 from .models.signal_combiner import combine_portfolio_signals
 from .models.backtest import walkforward_backtest
-from .utils.data import fetch_returns
+from .models.trade_simulator import (
+    EXIT_REASONS, average_true_range, entry_rows, exit_rule, simulate_trades, trade_stats,
+)
+from .utils.data import fetch_returns, fetch_returns_matrix
+from .utils.jobs import register_job_kind
+from .utils.artifacts import ModelCache
+from .utils.metrics import register_cache
 
 router = APIRouter(prefix="/signals", tags=["signals"])
 
+# Loaded CNN models, keyed by (store version, backend) — one copy per worker process
+_cnn_cache = ModelCache(capacity=int(os.environ.get("CNN_CACHE_SIZE", "4")))
+register_cache("cnn_models", _cnn_cache)
+
+# Default inference backend: eager | torchscript | int8
+CNN_INFERENCE_BACKEND = os.environ.get("CNN_INFERENCE_BACKEND", "eager")
+
+# app.models.cnn_signal (and with it torch) is imported on first CNN use,
+# not when the router is mounted
+HAS_TORCH = importlib.util.find_spec("torch") is not None
+
 
 class CNNRequest(BaseModel):
     tickers: list[str]
     lookback_days: int = 1260
-    epochs: int = 30
+    epochs: int = 30  # maximum; early stopping usually ends sooner
     window: int = 60
+    patience: Optional[int] = 5  # None disables early stopping
+    time_budget_s: Optional[float] = None
+    num_threads: Optional[int] = None  # POST /jobs/cnn_train only (set per job process)
+    checkpoint: Optional[str] = Field(None, pattern=r"^[A-Za-z0-9_-]{1,64}$")  # resume key
+
+
+class CNNPredictRequest(BaseModel):
+    tickers: list[str]
+    version: Optional[str] = Field(None, pattern=r"^[A-Za-z0-9_-]{1,64}$")  # latest if not given
+    backend: Optional[str] = None  # eager | torchscript | int8 (default: CNN_INFERENCE_BACKEND)
 
 
 class CombineRequest(BaseModel):
@@ -46,48 +79,204 @@ class BacktestRequest(BaseModel):
     transaction_cost_bps: float = 10
 
 
-def _run_cnn_sync(tickers: list[str], lookback_days: int, window: int, epochs: int) -> dict:
-    """Synchronous CNN training — runs in thread pool to avoid blocking event loop."""
-    ticker_dfs = {}
-    for ticker in tickers:
-        try:
-            df = fetch_returns(ticker.upper(), limit=lookback_days)
-            ticker_dfs[ticker.upper()] = df
-        except ValueError:
-            pass
+SIMULATE_MAX_BARS = 5000   # bars / signals per /signals/simulate request
+SIMULATE_MAX_RULES = 50
+
+
+class SimulateRequest(BaseModel):
+    ticker: Optional[str] = None
+    lookback_days: int = Field(1260, ge=1, le=SIMULATE_MAX_BARS)
+    bars: Optional[list[dict]] = Field(None, max_length=SIMULATE_MAX_BARS)  # [{date, open, high, low, close}] instead of a ticker's prices_daily
+    predictions: Optional[dict[str, float]] = Field(None, max_length=SIMULATE_MAX_BARS)  # date -> prediction, held until the next date
+    entry_threshold: float = 0.0  # enter on bars with prediction >= this
+    exit_threshold: Optional[float] = None  # exit signal on bars with prediction <= this
+    entry_dates: Optional[list[str]] = Field(None, max_length=SIMULATE_MAX_BARS)  # explicit signal dates instead of predictions
+    entry_signal: Optional[list[bool]] = Field(None, max_length=SIMULATE_MAX_BARS)  # one flag per bar (bars only) instead of predictions
+    exit_signal: Optional[list[bool]] = Field(None, max_length=SIMULATE_MAX_BARS)  # one flag per bar (bars only) instead of exit_threshold
+    rules: list[dict] = Field(default_factory=lambda: [{}], max_length=SIMULATE_MAX_RULES)  # models.trade_simulator exit rules
+    include_trades: bool = True
+
+
+def _run_cnn_sync(params: dict, progress=None) -> dict:
+    """Synchronous CNN training — runs in thread pool or job process to avoid blocking event loop."""
+    request = CNNRequest(**params)
+    returns_matrix, valid_tickers, common_dates = fetch_returns_matrix(request.tickers, limit=request.lookback_days)
 
-    valid_tickers = list(ticker_dfs.keys())
     if len(valid_tickers) < 2:
         raise ValueError("Insufficient data for CNN — need at least 2 tickers with price history")
 
-    date_sets = [set(df["date"].dt.strftime("%Y-%m-%d").tolist()) for df in ticker_dfs.values()]
-    common_dates = sorted(set.intersection(*date_sets))
-
     if len(common_dates) < 200:
         raise ValueError(f"Only {len(common_dates)} common dates (need >= 200)")
 
-    returns_matrix = np.zeros((len(common_dates), len(valid_tickers)))
-    for j, ticker in enumerate(valid_tickers):
-        df = ticker_dfs[ticker]
-        df_indexed = df.set_index(df["date"].dt.strftime("%Y-%m-%d"))
-        for i, d in enumerate(common_dates):
-            if d in df_indexed.index:
-                returns_matrix[i, j] = df_indexed.loc[d, "log_return"]
+    from .models.cnn_signal import train_cnn_model, save_cnn_model, CNN_MODEL_DIR
+
+    checkpoint_path = None
+    if request.checkpoint:
+        checkpoint_path = os.path.join(CNN_MODEL_DIR, "checkpoints", f"{request.checkpoint}.pt")
 
     result = train_cnn_model(
         returns_matrix=returns_matrix,
         tickers=valid_tickers,
-        window=window,
-        epochs=epochs,
+        window=request.window,
+        epochs=request.epochs,
+        progress_callback=progress,
+        patience=request.patience,
+        time_budget=request.time_budget_s,
+        checkpoint_path=checkpoint_path,
+        num_threads=request.num_threads,
     )
 
+    version = save_cnn_model(result, valid_tickers, window=request.window, lookback_days=request.lookback_days)
+
     del result["model_state"]
-    return {"tickers": valid_tickers, **result}
+    return {"tickers": valid_tickers, "version": version, **result}
+
+
+def _cnn_train_job(params: dict, progress) -> dict:
+    """Job handler for kind 'cnn_train' (POST /jobs/cnn_train)."""
+    return _run_cnn_sync(params, progress=progress)
+
+
+register_job_kind("cnn_train", _cnn_train_job, CNNRequest)
+
+
+def _get_cnn_model(version: Optional[str] = None, backend: str = CNN_INFERENCE_BACKEND) -> tuple:
+    """Return (model, metadata) for a store version, loading it once per worker."""
+    from .models.cnn_signal import latest_cnn_version, load_cnn_model, build_cnn_model
+
+    version = version or latest_cnn_version()
+    if version is None:
+        raise FileNotFoundError("No trained CNN model in store — call POST /signals/cnn first")
+
+    key = (version, backend)
+    cached = _cnn_cache.get(key)
+    if cached is None:
+        model_state, metadata = load_cnn_model(version)
+        model = build_cnn_model(model_state, window=metadata["window"], backend=backend)
+        cached = (model, metadata)
+        _cnn_cache.put(key, cached)
+
+    return cached
+
+
+def _predict_cnn_sync(tickers: list[str], version: Optional[str], backend: str) -> dict:
+    """Score the latest return window of each ticker with a stored CNN."""
+    from .models.cnn_signal import score_cnn_windows, INFERENCE_BACKENDS
+
+    if backend not in INFERENCE_BACKENDS:
+        raise ValueError(f"backend must be one of {INFERENCE_BACKENDS}")
+
+    model, metadata = _get_cnn_model(version, backend)
+    window = metadata["window"]
+
+    signals = {}
+    windows = {}
+    for ticker in tickers:
+        ticker = ticker.upper()
+        try:
+            rets = fetch_returns(ticker, limit=window + 1)["log_return"].values
+        except ValueError:
+            continue
+        if len(rets) >= window:
+            windows[ticker] = rets[-window:]
+        else:
+            signals[ticker] = 0.0
+
+    if windows:
+        scored = list(windows.keys())
+        returns_matrix = np.column_stack([windows[t] for t in scored])
+        signals.update(score_cnn_windows(model, returns_matrix, scored, window=window))
+
+    return {
+        "version": metadata["version"],
+        "trained_at": metadata["trained_at"],
+        "window": window,
+        "backend": backend,
+        "tickers": list(signals.keys()),
+        "signals": signals,
+    }
+
+
+def _simulate_sync(params: dict) -> dict:
+    """Signals of one price series through simulate_trades — runs in thread pool (DB fetch + numpy)."""
+    request = SimulateRequest(**params)
+    order = None  # request position of each bar, for the per-bar signals
+    if request.bars:
+        df = pd.DataFrame(request.bars)
+        df["date"] = pd.to_datetime(df["date"])
+        df = df.sort_values("date", kind="stable")
+        order = df.index.to_numpy()
+        df = df.reset_index(drop=True)
+    elif request.ticker:
+        df = fetch_returns(request.ticker.upper(), limit=request.lookback_days)
+    else:
+        raise ValueError("Give a ticker or bars")
+
+    def per_bar(flags: list, name: str) -> np.ndarray:
+        if order is None or len(flags) != len(order):
+            raise ValueError(f"{name} needs bars and one flag per bar")
+        return np.asarray(flags, dtype=bool)[order]
+
+    dates = df["date"].values.astype("datetime64[D]")
+    prices = {col: df[col].to_numpy(dtype=np.float64) for col in ("open", "high", "low", "close") if col in df}
+    if "close" not in prices:
+        raise ValueError("Bars need a close")
+    if "high" in prices and "low" in prices:
+        prices["atr"] = average_true_range(prices["high"], prices["low"], prices["close"])
+
+    exit_signal = None
+    if request.entry_signal is not None:
+        signal_bars = np.flatnonzero(per_bar(request.entry_signal, "entry_signal"))
+    elif request.predictions:
+        pred = pd.Series(request.predictions, dtype=np.float64)
+        pred.index = pd.to_datetime(pred.index)
+        held = pred.sort_index().reindex(df["date"], method="ffill").to_numpy()
+        signal_bars = np.flatnonzero(held >= request.entry_threshold)
+        if request.exit_threshold is not None:
+            exit_signal = held <= request.exit_threshold
+    elif request.entry_dates:
+        rows = entry_rows(dates, pd.to_datetime(request.entry_dates).values)
+        signal_bars = np.unique(rows[rows >= 0])
+    else:
+        raise ValueError("Give predictions, entry_dates or entry_signal")
+    if request.exit_signal is not None:
+        exit_signal = per_bar(request.exit_signal, "exit_signal")
+
+    rules = [exit_rule(**rule) for rule in request.rules]
+    trades = simulate_trades(prices, signal_bars, rules, exit_signal)
+
+    results = []
+    for g, rule in enumerate(rules):
+        result = {"rule": rule, "stats": trade_stats(trades, g)}
+        if request.include_trades:
+            result["trades"] = [
+                {
+                    "signal_date": str(dates[signal_bars[k]]),
+                    "entry_date": str(dates[trades["entry_bar"][g, k]]),
+                    "exit_date": str(dates[trades["exit_bar"][g, k]]),
+                    "entry_price": float(trades["entry_price"][g, k]),
+                    "exit_price": float(trades["exit_price"][g, k]),
+                    "return": float(trades["net_return"][g, k]),
+                    "days_held": int(trades["hold"][g, k]),
+                    "exit_reason": EXIT_REASONS[int(trades["reason"][g, k])],
+                }
+                for k in np.flatnonzero(trades["taken"][g])
+            ]
+        results.append(result)
+
+    return {
+        "ticker": request.ticker.upper() if request.ticker else None,
+        "bars": len(dates),
+        "start_date": str(dates[0]) if len(dates) else None,
+        "end_date": str(dates[-1]) if len(dates) else None,
+        "signals": len(signal_bars),
+        "results": results,
+    }
 
 
 @router.post("/cnn")
 async def cnn_endpoint(request: CNNRequest):
-    """Train CNN model on portfolio returns and generate current signals."""
+    """Train CNN model on portfolio returns, save it to the store and generate current signals."""
     try:
         if not HAS_TORCH:
             raise HTTPException(status_code=501, detail="PyTorch not installed")
@@ -95,10 +284,13 @@ async def cnn_endpoint(request: CNNRequest):
         if len(request.tickers) < 2:
             raise HTTPException(status_code=400, detail="Need at least 2 tickers")
 
+        if request.num_threads is not None:
+            # torch.set_num_threads is process-wide: it would change every concurrent request's torch
+            raise HTTPException(status_code=400,
+                                detail="num_threads is only supported by POST /jobs/cnn_train (own process)")
+
         # Run CPU-heavy training in thread pool to avoid blocking the event loop
-        result = await asyncio.to_thread(
-            _run_cnn_sync, request.tickers, request.lookback_days, request.window, request.epochs
-        )
+        result = await asyncio.to_thread(_run_cnn_sync, request.model_dump())
         return result
 
     except HTTPException:
@@ -108,6 +300,38 @@ async def cnn_endpoint(request: CNNRequest):
         raise HTTPException(status_code=500, detail=f"CNN training failed: {str(e)}")
 
 
+@router.post("/cnn/predict")
+async def cnn_predict_endpoint(request: CNNPredictRequest):
+    """Generate current CNN signals from a stored model without retraining."""
+    try:
+        if not HAS_TORCH:
+            raise HTTPException(status_code=501, detail="PyTorch not installed")
+
+        if not request.tickers:
+            raise HTTPException(status_code=400, detail="Need at least 1 ticker")
+
+        backend = request.backend or CNN_INFERENCE_BACKEND
+        return await asyncio.to_thread(_predict_cnn_sync, request.tickers, request.version, backend)
+
+    except HTTPException:
+        raise
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"CNN prediction failed: {str(e)}")
+
+
+@router.get("/cnn/models")
+async def cnn_models_endpoint():
+    """List stored CNN model versions with their training metadata."""
+    from .models.cnn_signal import latest_cnn_version, list_cnn_models
+
+    return {"latest": latest_cnn_version(), "models": list_cnn_models()}
+
+
 @router.post("/combine")
 async def combine_endpoint(request: CombineRequest):
     """Combine all signal sources for portfolio tickers."""
@@ -195,3 +419,28 @@ async def backtest_endpoint(request: BacktestRequest):
     except Exception as e:
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Backtest failed: {str(e)}")
+
+
+@router.post("/simulate")
+async def simulate_endpoint(request: SimulateRequest):
+    """
+    Simulate trades on one ticker's signals for a batch of exit rules.
+
+    Signals come from predictions (entry / exit thresholds, each prediction
+    held until the next date), explicit entry_dates or per-bar entry_signal /
+    exit_signal flags aligned with `bars`; every rule — entry
+    lag, target / stop (pct or ATR), breakeven, trailing stop, min / max
+    hold, cooldown, costs — is evaluated in one vectorized pass.
+    """
+    try:
+        if not request.rules:
+            raise HTTPException(status_code=400, detail="Need at least 1 rule")
+        return await asyncio.to_thread(_simulate_sync, request.model_dump())
+
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"Simulation failed: {str(e)}")
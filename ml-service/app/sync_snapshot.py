@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Scheduled market-data snapshot sync.
+
+Mirrors prices_daily, commodity and FX prices, fundamentals and the other
+tables the trainers read (utils.snapshot.SNAPSHOT_TABLES) into the local
+Arrow snapshot under SNAPSHOT_DIR, pulling only rows newer than each
+table's stored watermark. Trainers run with --data-backend snapshot and
+services started with DATA_BACKEND=snapshot then read from it instead of
+Postgres.
+
+Usage (from ml-service/, or inside the container):
+  python -m app.sync_snapshot                            # incremental sync of every table
+  python -m app.sync_snapshot --tables prices_daily,fx_spot_rates
+  python -m app.sync_snapshot --full                     # recopy everything (after backfills)
+
+Cron example (weekdays, 23:30, after the daily price import):
+  30 23 * * 1-5  docker compose exec -T ml-service python -m app.sync_snapshot
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import psycopg2
+
+from .utils.snapshot import SNAPSHOT_DIR, SNAPSHOT_TABLES, Snapshot
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Sync the local Arrow snapshot of the market-data tables')
+    parser.add_argument('--tables', type=str, default=','.join(SNAPSHOT_TABLES),
+                        help='Comma-separated tables to sync')
+    parser.add_argument('--full', action='store_true', help='Recopy the tables instead of pulling new rows')
+    parser.add_argument('--dir', type=str, default=SNAPSHOT_DIR, help='Snapshot root directory')
+    args = parser.parse_args()
+
+    db_url = os.environ.get('DATABASE_URL')
+    if not db_url:
+        print("[ERROR] DATABASE_URL not set")
+        sys.exit(1)
+
+    tables = [t.strip() for t in args.tables.split(',') if t.strip()]
+    unknown = [t for t in tables if t not in SNAPSHOT_TABLES]
+    if unknown:
+        print(f"[ERROR] Not snapshot tables: {unknown} (available: {list(SNAPSHOT_TABLES)})")
+        sys.exit(1)
+
+    t0 = time.time()
+    print(f"Syncing {len(tables)} tables into {args.dir}{' (full copy)' if args.full else ''}...")
+    conn = psycopg2.connect(db_url)
+    try:
+        pulled = Snapshot(args.dir).sync(conn, tables, full=args.full)
+    finally:
+        conn.close()
+    print(f"Pulled {sum(pulled.values()):,} rows ({time.time() - t0:.0f}s)")
+
+
+if __name__ == '__main__':
+    main()
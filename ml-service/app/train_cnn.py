@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Scheduled CNN retraining job.
+
+Trains the return-window CNN on a ticker universe and saves a new version
+to the CNN model store (CNN_MODEL_DIR). Serving workers pick up the new
+version on their next POST /signals/cnn/predict call.
+
+Usage (from ml-service/, or inside the container):
+  python -m app.train_cnn                          # default liquid universe
+  python -m app.train_cnn --tickers EQNR,DNB,MOWI  # explicit universe
+  python -m app.train_cnn --epochs 50 --lookback-days 1260
+  python -m app.train_cnn --time-budget 300 --threads 4 --checkpoint /tmp/models/cnn/checkpoints/weekly.pt
+
+Cron example (weekly, Sunday 03:00):
+  0 3 * * 0  docker compose exec -T ml-service python -m app.train_cnn
+"""
+
+import argparse
+import sys
+import time
+
+from .models.cnn_signal import train_cnn_model, save_cnn_model, HAS_TORCH
+from .utils.data import fetch_returns_matrix
+
+DEFAULT_TICKERS = [
+    'EQNR', 'DNB', 'MOWI', 'TEL', 'YAR', 'NHY', 'ORK', 'SALM',
+    'FRO', 'AKRBP', 'LSG', 'SUBC', 'GSF', 'DNO', 'BAKKA',
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Retrain the CNN signal model and save it to the model store')
+    parser.add_argument('--tickers', type=str, default=','.join(DEFAULT_TICKERS),
+                        help='Comma-separated ticker universe')
+    parser.add_argument('--lookback-days', type=int, default=1260)
+    parser.add_argument('--epochs', type=int, default=30)
+    parser.add_argument('--window', type=int, default=60)
+    parser.add_argument('--patience', type=int, default=5, help='Early-stopping patience (0 = off)')
+    parser.add_argument('--time-budget', type=float, default=None, help='Stop training after N seconds')
+    parser.add_argument('--threads', type=int, default=None, help='torch.set_num_threads for training')
+    parser.add_argument('--checkpoint', type=str, default=None,
+                        help='Checkpoint file; an interrupted run with the same path resumes from it')
+    args = parser.parse_args()
+
+    if not HAS_TORCH:
+        print("[ERROR] PyTorch not installed")
+        sys.exit(1)
+
+    t0 = time.time()
+    tickers = [t.strip() for t in args.tickers.split(',') if t.strip()]
+    print(f"Loading returns for {len(tickers)} tickers ({args.lookback_days}d lookback)...")
+
+    returns_matrix, valid_tickers, common_dates = fetch_returns_matrix(tickers, limit=args.lookback_days)
+    if len(valid_tickers) < 2 or len(common_dates) < 200:
+        print(f"[ERROR] Insufficient data: {len(valid_tickers)} tickers, {len(common_dates)} common dates")
+        sys.exit(1)
+
+    print(f"Training CNN on {len(valid_tickers)} tickers x {len(common_dates)} dates, {args.epochs} epochs...")
+    result = train_cnn_model(
+        returns_matrix=returns_matrix,
+        tickers=valid_tickers,
+        window=args.window,
+        epochs=args.epochs,
+        patience=args.patience or None,
+        time_budget=args.time_budget,
+        checkpoint_path=args.checkpoint,
+        num_threads=args.threads,
+        progress_callback=lambda e: print(f"  epoch {e['epoch']:3d}/{e['epochs']}: "
+                                          f"train={e['train_loss']:.4f} val={e['val_loss'] or 0:.4f}"),
+    )
+
+    version = save_cnn_model(result, valid_tickers, window=args.window, lookback_days=args.lookback_days)
+    print(f"Stopped after {result['epochs_run']} epochs ({result['stop_reason']})")
+    print(f"Saved {version}: train_loss={result['train_loss_final']:.4f} "
+          f"test_loss={result['test_loss']:.4f} ({time.time() - t0:.0f}s)")
+
+
+if __name__ == '__main__':
+    main()
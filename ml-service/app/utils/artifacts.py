@@ -0,0 +1,221 @@
+"""
+Durable model artifact store for the XGBoost + LightGBM ensemble.
+
+Layout under MODEL_STORE_DIR (a local path or mounted volume):
+
+    {version}/xgb.ubj        — XGBoost model, native UBJSON
+    {version}/lgbm.txt       — LightGBM booster, native text format
+    {version}/scaler.json    — StandardScaler parameters
+    {version}/manifest.json  — feature list, formats, checksums, library versions
+
+Version names are single path components and may not be one of
+RESERVED_NAMES, the sibling stores that default to subdirectories of
+MODEL_STORE_DIR (CNN models, jobs, feature panels, data snapshot).
+
+Native formats load without unpickling and stay readable across library
+upgrades. Versions written by older releases (joblib pickles, no manifest)
+are still loaded through the legacy path.
+
+ModelCache keeps at most MODEL_CACHE_SIZE versions in memory, evicting the
+least recently used.
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import List, Optional
+
+import numpy as np
+
+MODEL_STORE_DIR = os.environ.get("MODEL_STORE_DIR", "/tmp/models")
+MODEL_CACHE_SIZE = int(os.environ.get("MODEL_CACHE_SIZE", "2"))
+
+MANIFEST_VERSION = 1
+
+RESERVED_NAMES = ("cnn", "jobs", "features", "snapshot")
+VERSION_PATTERN = re.compile(r"^[A-Za-z0-9][A-Za-z0-9._-]{0,63}$")
+
+
+class LGBMBoosterModel:
+    """Inference wrapper exposing the LGBMRegressor API used by the service."""
+
+    def __init__(self, booster):
+        self.booster_ = booster
+
+    def predict(self, X):
+        return self.booster_.predict(X)
+
+    @property
+    def feature_importances_(self):
+        return self.booster_.feature_importance(importance_type="split")
+
+
+def _sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def check_version(version: str) -> str:
+    """Return version if it is a usable ensemble version name, else raise ValueError."""
+    if not VERSION_PATTERN.match(version or ""):
+        raise ValueError(f"Invalid model version {version!r} (letters, digits, '.', '_', '-'; at most 64)")
+    if version.lower() in RESERVED_NAMES:
+        raise ValueError(f"Model version {version!r} is reserved for the {version.lower()}/ store under MODEL_STORE_DIR")
+    return version
+
+
+def version_dir(version: str, store_dir: str = MODEL_STORE_DIR) -> str:
+    return os.path.join(store_dir, version)
+
+
+def save_ensemble(version: str, xgb_model, lgbm_model, scaler, feature_cols: List[str],
+                  metadata: Optional[dict] = None, store_dir: str = MODEL_STORE_DIR) -> dict:
+    """Write an ensemble version in native formats and return its manifest."""
+    import xgboost
+    import lightgbm
+
+    out_dir = version_dir(check_version(version), store_dir)
+    os.makedirs(out_dir, exist_ok=True)
+
+    xgb_path = os.path.join(out_dir, "xgb.ubj")
+    lgbm_path = os.path.join(out_dir, "lgbm.txt")
+    scaler_path = os.path.join(out_dir, "scaler.json")
+
+    xgb_model.save_model(xgb_path)
+    lgbm_model.booster_.save_model(lgbm_path)
+    with open(scaler_path, "w") as f:
+        json.dump({
+            "mean": scaler.mean_.tolist(),
+            "scale": scaler.scale_.tolist(),
+            "var": scaler.var_.tolist(),
+            "n_samples_seen": int(np.max(scaler.n_samples_seen_)),
+        }, f)
+
+    manifest = {
+        "manifest_version": MANIFEST_VERSION,
+        "model_version": version,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "features": list(feature_cols),
+        "artifacts": {
+            "xgb": {"file": "xgb.ubj", "format": "xgboost-ubjson", "sha256": _sha256(xgb_path)},
+            "lgbm": {"file": "lgbm.txt", "format": "lightgbm-text", "sha256": _sha256(lgbm_path)},
+            "scaler": {"file": "scaler.json", "format": "json", "sha256": _sha256(scaler_path)},
+        },
+        "libraries": {"xgboost": xgboost.__version__, "lightgbm": lightgbm.__version__},
+        "metadata": metadata or {},
+    }
+    tmp = os.path.join(out_dir, "manifest.json.tmp")
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, os.path.join(out_dir, "manifest.json"))  # manifest last = version complete
+
+    return manifest
+
+
+def _load_native(in_dir: str, manifest: dict) -> dict:
+    import lightgbm
+    from xgboost import XGBRegressor
+    from sklearn.preprocessing import StandardScaler
+
+    artifacts = manifest["artifacts"]
+    for name, spec in artifacts.items():
+        path = os.path.join(in_dir, spec["file"])
+        if _sha256(path) != spec["sha256"]:
+            raise ValueError(f"Checksum mismatch for {name} artifact in {in_dir}")
+
+    xgb_model = XGBRegressor()
+    xgb_model.load_model(os.path.join(in_dir, artifacts["xgb"]["file"]))
+
+    lgbm_model = LGBMBoosterModel(
+        lightgbm.Booster(model_file=os.path.join(in_dir, artifacts["lgbm"]["file"]))
+    )
+
+    with open(os.path.join(in_dir, artifacts["scaler"]["file"])) as f:
+        params = json.load(f)
+    scaler = StandardScaler()
+    scaler.mean_ = np.array(params["mean"])
+    scaler.scale_ = np.array(params["scale"])
+    scaler.var_ = np.array(params["var"])
+    scaler.n_samples_seen_ = params["n_samples_seen"]
+    scaler.n_features_in_ = len(params["mean"])
+
+    return {"gb": xgb_model, "rf": lgbm_model, "scaler": scaler, "features": manifest["features"]}
+
+
+def _load_legacy(in_dir: str) -> dict:
+    import joblib
+
+    return {
+        "gb": joblib.load(f"{in_dir}/gb_model.joblib"),
+        "rf": joblib.load(f"{in_dir}/rf_model.joblib"),
+        "scaler": joblib.load(f"{in_dir}/scaler.joblib"),
+        "features": joblib.load(f"{in_dir}/features.joblib"),
+    }
+
+
+def load_ensemble(version: str, store_dir: str = MODEL_STORE_DIR) -> dict:
+    """
+    Load an ensemble version as {'gb', 'rf', 'scaler', 'features'}.
+
+    Raises FileNotFoundError if the version does not exist.
+    """
+    in_dir = version_dir(version, store_dir)
+    manifest_path = os.path.join(in_dir, "manifest.json")
+
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            return _load_native(in_dir, json.load(f))
+    if os.path.exists(os.path.join(in_dir, "gb_model.joblib")):
+        return _load_legacy(in_dir)
+
+    raise FileNotFoundError(f"Model {version} not found in {store_dir}")
+
+
+def read_manifest(version: str, store_dir: str = MODEL_STORE_DIR) -> Optional[dict]:
+    try:
+        with open(os.path.join(version_dir(version, store_dir), "manifest.json")) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+class ModelCache:
+    """Thread-safe LRU cache of loaded model versions."""
+
+    def __init__(self, capacity: int = MODEL_CACHE_SIZE):
+        self.capacity = max(1, capacity)
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, version: str):
+        with self._lock:
+            if version in self._items:
+                self._items.move_to_end(version)
+                self.hits += 1
+                return self._items[version]
+            self.misses += 1
+            return None
+
+    def put(self, version: str, models: dict):
+        with self._lock:
+            self._items[version] = models
+            self._items.move_to_end(version)
+            while len(self._items) > self.capacity:
+                self._items.popitem(last=False)
+
+    def __contains__(self, version: str) -> bool:
+        with self._lock:
+            return version in self._items
+
+    def keys(self) -> list:
+        with self._lock:
+            return list(self._items.keys())
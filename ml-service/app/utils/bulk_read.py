@@ -0,0 +1,177 @@
+"""
+Bulk table reads through COPY for the trainers' data loading.
+
+    load_table(conn, table, columns, since=..., tickers=..., filters=...)
+        one SELECT of the listed columns (projection), with the date range,
+        ticker list and (column, op, value) filters pushed into the WHERE
+        clause as bound parameters
+    copy_select(conn, query, params)
+        any SELECT (e.g. an aggregate) the same way
+
+Rows come back through COPY (...) TO STDOUT as one CSV buffer and are
+parsed straight into typed columns — by pyarrow's CSV reader when it is
+installed, else pandas' C parser. pd.read_sql instead builds a Python
+tuple per row and converts Decimals column by column.
+
+Column dtypes are explicit: 'date' and '*_date' columns datetime64[ns],
+TEXT_COLUMNS strings, everything else float64 (override with dtypes=).
+
+With DATA_BACKEND=snapshot, load_table reads tables synced to the local
+Arrow snapshot (utils.snapshot) instead, when the query only uses stored
+columns and structured filters; a raw SQL `where` always goes to Postgres.
+"""
+
+import importlib.util
+import io
+import re
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+try:
+    from .metrics import stage
+except ImportError:
+    from utils.metrics import stage
+
+HAS_PYARROW = importlib.util.find_spec("pyarrow") is not None
+
+TEXT_COLUMNS = {
+    "ticker", "symbol", "pair", "currency_pair", "name", "sector", "index_name", "rate_name",
+    "commodity_symbol", "model_id", "horizon",
+}
+
+# load_table filters: (column, op, value) tuples, ANDed; "not null" takes no value
+FILTER_OPS = ("=", "!=", "<", "<=", ">", ">=", "in", "not null")
+
+_ALIAS = re.compile(r"\s+AS\s+(\w+)\s*$", re.IGNORECASE)
+
+
+def _output_name(item: str) -> str:
+    """Result column name of a select-list item ('rate_date AS date' -> 'date')."""
+    m = _ALIAS.search(item)
+    return m.group(1) if m else item.strip().split(".")[-1]
+
+
+def _dtype(name: str, dtypes: Dict[str, str]) -> str:
+    if name in dtypes:
+        return dtypes[name]
+    if name == "date" or name.endswith("_date"):
+        return "datetime64[ns]"
+    return "object" if name in TEXT_COLUMNS else "float64"
+
+
+def _parse_csv(buf: bytes, names: List[str], types: Dict[str, str]) -> pd.DataFrame:
+    """COPY CSV output (no header, empty = NULL) as a typed frame."""
+    if not buf:
+        return pd.DataFrame({n: pd.Series(dtype=types[n]) for n in names})
+    if HAS_PYARROW:
+        import pyarrow as pa
+        import pyarrow.csv as pacsv
+
+        arrow_types = {"object": pa.string(), "float64": pa.float64(), "int64": pa.int64(),
+                       "datetime64[ns]": pa.timestamp("ns"), "bool": pa.bool_()}
+        table = pacsv.read_csv(
+            io.BytesIO(buf),
+            read_options=pacsv.ReadOptions(column_names=names),
+            convert_options=pacsv.ConvertOptions(
+                column_types={n: arrow_types[types[n]] for n in names if types[n] in arrow_types},
+                strings_can_be_null=True,
+            ),
+        )
+        return table.to_pandas()
+    dates = [n for n in names if types[n] == "datetime64[ns]"]
+    frame = pd.read_csv(io.BytesIO(buf), header=None, names=names,
+                        dtype={n: t for n, t in types.items() if n not in dates},
+                        keep_default_na=False, na_values=[""])
+    for n in dates:
+        frame[n] = pd.to_datetime(frame[n]).astype("datetime64[ns]")
+    return frame
+
+
+def copy_select(conn, query: str, params: Optional[Sequence] = None, columns: Optional[List[str]] = None,
+                dtypes: Optional[Dict[str, str]] = None) -> pd.DataFrame:
+    """
+    Rows of `query` (a SELECT, %s placeholders bound from params) as a DataFrame.
+
+    columns: the query's result column names in order (read from the
+    statement's description when not given).
+    """
+    dtypes = dtypes or {}
+    with stage("db_fetch", "copy_select"), conn.cursor() as cur:
+        sql = cur.mogrify(query, params).decode() if params is not None else query
+        if columns is None:
+            cur.execute(f"SELECT * FROM ({sql}) AS q LIMIT 0")
+            columns = [d[0] for d in cur.description]
+        out = io.BytesIO()
+        cur.copy_expert(f"COPY ({sql}) TO STDOUT WITH (FORMAT csv)", out)
+    return _parse_csv(out.getvalue(), list(columns), {n: _dtype(n, dtypes) for n in columns})
+
+
+def _filter_sql(filters: Sequence[tuple]) -> Tuple[List[str], list]:
+    """WHERE clauses and bound parameters of load_table filters."""
+    clauses, args = [], []
+    for col, op, *value in filters:
+        if op not in FILTER_OPS:
+            raise ValueError(f"Unknown filter op {op!r} (expected one of {FILTER_OPS})")
+        if op == "not null":
+            clauses.append(f"{col} IS NOT NULL")
+        elif op == "in":
+            clauses.append(f"{col} = ANY(%s)")
+            args.append(list(value[0]))
+        else:
+            clauses.append(f"{col} {'<>' if op == '!=' else op} %s")
+            args.append(value[0])
+    return clauses, args
+
+
+def _snapshot(table: str):
+    try:
+        from .snapshot import open_snapshot
+    except ImportError:
+        from utils.snapshot import open_snapshot
+    return open_snapshot(table)
+
+
+def load_table(conn, table: str, columns: Iterable[str], since=None, until=None, date_col: str = "date",
+               tickers: Optional[Iterable[str]] = None, ticker_col: str = "ticker",
+               filters: Sequence[tuple] = (), where: Optional[str] = None, params: Sequence = (),
+               order_by: Optional[str] = None, dtypes: Optional[Dict[str, str]] = None) -> pd.DataFrame:
+    """
+    SELECT `columns` FROM `table` with the filters pushed down to Postgres.
+
+    columns are select-list items ('symbol AS ticker' is fine); since /
+    until bound date_col (inclusive), tickers restricts ticker_col, filters
+    are (column, op, value) conditions (op in FILTER_OPS, e.g.
+    ('close', '>', 0), ('symbol', 'in', [...]), ('sector', 'not null')),
+    and where is an extra SQL condition with %s placeholders for params.
+    Rows are sorted by order_by (default: ticker_col, date_col when both
+    are selected).
+    """
+    columns = list(columns)
+    names = [_output_name(c) for c in columns]
+    filters = list(filters)
+    if since is not None:
+        filters.append((date_col, ">=", since))
+    if until is not None:
+        filters.append((date_col, "<=", until))
+    if tickers is not None:
+        filters.append((ticker_col, "in", list(tickers)))
+    if order_by is None:
+        sources = [c.split()[0] for c in columns]
+        order_by = ", ".join(c for c in (ticker_col, date_col) if c in sources)
+
+    if where is None:
+        snapshot = _snapshot(table)
+        if snapshot is not None and snapshot.covers(table, columns, filters, order_by):
+            return snapshot.read(table, columns, filters, order_by=order_by, dtypes=dtypes)
+
+    clauses, args = _filter_sql(filters)
+    if where:
+        clauses.append(f"({where})")
+        args.extend(params)
+    query = f"SELECT {', '.join(columns)} FROM {table}"
+    if clauses:
+        query += " WHERE " + " AND ".join(clauses)
+    if order_by:
+        query += f" ORDER BY {order_by}"
+    return copy_select(conn, query, args or None, columns=names, dtypes=dtypes)
@@ -0,0 +1,121 @@
+"""
+Bulk upserts through COPY for the trainers' signal and performance writes.
+
+    copy_upsert(conn, table, columns, rows, key)
+        streams rows with COPY ... FROM STDIN (CSV) into a temp staging
+        table shaped like `columns` of `table`, then merges them with one
+        INSERT ... SELECT ... ON CONFLICT (key) DO UPDATE; returns the
+        number of rows staged and prints rows/s
+
+Multi-row INSERT strings built with cur.mogrify cost one round trip and
+one parse per 500 rows, which dominates against a remote pooler; COPY is
+a single streamed statement. The merge runs in the caller's transaction
+(anything it already did, e.g. a DELETE of the model's old rows, commits
+with it) and is rolled back as a whole on error. Rows repeating a key keep
+the last one, as consecutive upsert batches did.
+"""
+
+import csv
+import io
+import json
+import time
+from typing import Iterable, Optional, Sequence
+
+try:
+    from .metrics import stage
+except ImportError:
+    from utils.metrics import stage
+
+COPY_NULL = r"\N"
+COPY_CHUNK_ROWS = 5000  # rows formatted per read() of the COPY stream
+
+
+def _copy_value(value):
+    """One value as COPY CSV text: \\N for NULL (None / NaT), JSON for dicts and lists (NaN stays NaN)."""
+    if value is None:
+        return COPY_NULL
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    if hasattr(value, "isoformat"):  # date, datetime, pd.Timestamp
+        return value.isoformat() if value == value else COPY_NULL
+    return value
+
+
+class _CopyStream:
+    """File-like CSV view of a row iterator for cursor.copy_expert (rows are formatted as they are read)."""
+
+    def __init__(self, rows: Iterable[Sequence]):
+        self._rows = iter(rows)
+        self._buf = io.StringIO()
+        self._writer = csv.writer(self._buf, lineterminator="\n")
+        self._pending = ""
+        self.rows = 0
+
+    def _fill(self) -> bool:
+        for _ in range(COPY_CHUNK_ROWS):
+            row = next(self._rows, None)
+            if row is None:
+                break
+            self._writer.writerow([_copy_value(v) for v in row])
+            self.rows += 1
+        chunk = self._buf.getvalue()
+        self._buf.seek(0)
+        self._buf.truncate()
+        self._pending += chunk
+        return bool(chunk)
+
+    def read(self, size: int = -1) -> str:
+        while (size < 0 or len(self._pending) < size) and self._fill():
+            pass
+        if size < 0:
+            size = len(self._pending)
+        out, self._pending = self._pending[:size], self._pending[size:]
+        return out
+
+    readline = read
+
+
+def copy_upsert(conn, table: str, columns: Sequence[str], rows: Iterable[Sequence], key: Sequence[str],
+                update: Optional[Sequence[str]] = None, commit: bool = True, label: str = "rows") -> int:
+    """
+    Upsert `rows` (tuples in `columns` order) into `table` on the unique `key` columns.
+
+    update: columns overwritten on conflict (default: every non-key column;
+    empty = DO NOTHING). commit=False leaves the transaction open for the
+    caller. Returns the number of rows streamed.
+    """
+    cols = ", ".join(columns)
+    keys = ", ".join(key)
+    update = [c for c in columns if c not in key] if update is None else list(update)
+    on_conflict = (f"DO UPDATE SET {', '.join(f'{c} = EXCLUDED.{c}' for c in update)}"
+                   if update else "DO NOTHING")
+    staging = f"_stage_{table}"
+
+    t0 = time.perf_counter()
+    stream = _CopyStream(rows)
+    cur = conn.cursor()
+    try:
+        with stage("db_write", "copy_upsert"):
+            cur.execute(f"DROP TABLE IF EXISTS {staging}")
+            cur.execute(f"CREATE TEMP TABLE {staging} AS SELECT {cols} FROM {table} WITH NO DATA")
+            cur.execute(f"ALTER TABLE {staging} ADD COLUMN _seq bigserial")  # arrival order for last-wins
+            cur.copy_expert(f"COPY {staging} ({cols}) FROM STDIN WITH (FORMAT csv, NULL '{COPY_NULL}')", stream)
+            cur.execute(f"""
+                INSERT INTO {table} ({cols})
+                SELECT DISTINCT ON ({keys}) {cols} FROM {staging}
+                ORDER BY {keys}, _seq DESC
+                ON CONFLICT ({keys}) {on_conflict}
+            """)
+            cur.execute(f"DROP TABLE {staging}")
+            if commit:
+                conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+    elapsed = time.perf_counter() - t0
+    print(f"  → {stream.rows:,} {label} into {table} in {elapsed:.1f}s "
+          f"({stream.rows / max(elapsed, 1e-9):,.0f} rows/s)")
+    return stream.rows
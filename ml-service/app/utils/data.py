@@ -2,6 +2,8 @@
 Shared database utilities for fetching price data.
 
 Provides log-return series aligned for volatility model consumption.
+With DATA_BACKEND=snapshot prices come from the local Arrow snapshot
+(utils.snapshot) once prices_daily has been synced, else from Postgres.
 """
 
 import os
@@ -10,6 +12,9 @@ import pandas as pd
 import psycopg2
 import psycopg2.extras
 
+from .metrics import stage
+from .snapshot import open_snapshot
+
 
 def get_db_connection():
     """Get a psycopg2 connection using DATABASE_URL."""
@@ -27,28 +32,48 @@ def fetch_returns(ticker: str, limit: int = 1260) -> pd.DataFrame:
         date, open, high, low, close, adj_close, volume, log_return
     Sorted ascending by date. NaN returns dropped.
     """
-    conn = get_db_connection()
-    try:
-        with conn.cursor() as cur:
-            cur.execute(
-                """
-                SELECT date, open, high, low, close, adj_close, volume
-                FROM prices_daily
-                WHERE ticker = %s
-                  AND close IS NOT NULL
-                  AND close > 0
-                ORDER BY date DESC
-                LIMIT %s
-                """,
-                (ticker, limit),
-            )
-            rows = cur.fetchall()
-    finally:
-        conn.close()
+    snapshot = open_snapshot("prices_daily")
+    if snapshot is not None:
+        rows = snapshot.read(
+            "prices_daily", ["date", "open", "high", "low", "close", "adj_close", "volume"],
+            filters=[("ticker", "=", ticker), ("close", ">", 0)], order_by="date", latest=limit,
+        )
+    else:
+        rows = _fetch_rows(ticker, limit)
 
     if len(rows) < 30:
         raise ValueError(f"Insufficient data for {ticker}: {len(rows)} rows (need >= 30)")
 
+    with stage("align", "fetch_returns"):
+        return _returns_frame(rows)
+
+
+def _fetch_rows(ticker: str, limit: int) -> list:
+    """The latest `limit` prices_daily rows of a ticker from Postgres."""
+    with stage("db_fetch", "fetch_returns"):
+        conn = get_db_connection()
+        try:
+            with conn.cursor() as cur:
+                cur.execute(
+                    """
+                    SELECT date, open, high, low, close, adj_close, volume
+                    FROM prices_daily
+                    WHERE ticker = %s
+                      AND close IS NOT NULL
+                      AND close > 0
+                    ORDER BY date DESC
+                    LIMIT %s
+                    """,
+                    (ticker, limit),
+                )
+                rows = cur.fetchall()
+        finally:
+            conn.close()
+    return rows
+
+
+def _returns_frame(rows) -> pd.DataFrame:
+    """Typed, date-sorted price frame with log returns from prices_daily rows."""
     df = pd.DataFrame(rows)
     df["date"] = pd.to_datetime(df["date"])
     for col in ["open", "high", "low", "close", "adj_close", "volume"]:
@@ -62,3 +87,36 @@ def fetch_returns(ticker: str, limit: int = 1260) -> pd.DataFrame:
     df = df.dropna(subset=["log_return"]).reset_index(drop=True)
 
     return df
+
+
+def fetch_returns_matrix(tickers: list, limit: int = 1260) -> tuple:
+    """
+    Fetch log returns for several tickers and align them on common dates.
+
+    Tickers with insufficient history are skipped.
+
+    Returns (returns_matrix, valid_tickers, common_dates) where
+    returns_matrix has shape (T, N) aligned with common_dates.
+    """
+    ticker_dfs = {}
+    for ticker in tickers:
+        try:
+            ticker_dfs[ticker.upper()] = fetch_returns(ticker.upper(), limit=limit)
+        except ValueError:
+            pass
+
+    valid_tickers = list(ticker_dfs.keys())
+    if not valid_tickers:
+        return np.zeros((0, 0)), [], []
+
+    with stage("align", "fetch_returns_matrix"):
+        date_sets = [set(df["date"].dt.strftime("%Y-%m-%d").tolist()) for df in ticker_dfs.values()]
+        common_dates = sorted(set.intersection(*date_sets))
+
+        returns_matrix = np.zeros((len(common_dates), len(valid_tickers)))
+        for j, ticker in enumerate(valid_tickers):
+            df = ticker_dfs[ticker]
+            series = df.set_index(df["date"].dt.strftime("%Y-%m-%d"))["log_return"]
+            returns_matrix[:, j] = series.reindex(common_dates).fillna(0.0).values
+
+    return returns_matrix, valid_tickers, common_dates
@@ -0,0 +1,108 @@
+"""
+Shape-preserving downsampling for chart series.
+
+    lttb    Largest-Triangle-Three-Buckets: one point per bucket, the one forming
+            the largest triangle with the previously kept point and the next
+            bucket's mean. Keeps spikes and turning points.
+    minmax  the minimum and maximum of every bucket (fully vectorized).
+
+chart_indices() returns the sorted row indices to keep. Indices passed as
+`keep` (VaR violations, jump dates, regime switches) are always included, so
+a chart never hides the events it exists to show; the first and last points
+are always kept too. Apply the same indices to every series that shares the
+x axis with take().
+"""
+
+from typing import Optional, Sequence
+
+import numpy as np
+
+DOWNSAMPLE_METHODS = ("lttb", "minmax")
+
+
+def lttb_indices(y: np.ndarray, n_out: int) -> np.ndarray:
+    """Indices of the n_out points LTTB keeps from y (x = position)."""
+    y = np.nan_to_num(np.asarray(y, dtype=np.float64))
+    n = len(y)
+    if n_out >= n:
+        return np.arange(n)
+    if n_out < 3:
+        return np.array([0, n - 1])[:max(n_out, 0)]
+
+    x = np.arange(n, dtype=np.float64)
+    # n_out - 2 buckets over the interior points 1 .. n-2
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    starts, ends = edges[:-1], edges[1:]
+
+    # Mean of each bucket from cumulative sums; the target for bucket b is
+    # the mean of bucket b + 1 (the last point for the final bucket)
+    csum = np.concatenate(([0.0], np.cumsum(y)))
+    sizes = ends - starts
+    mean_y = (csum[ends] - csum[starts]) / sizes
+    mean_x = (starts + ends - 1) / 2.0
+    next_x = np.append(mean_x[1:], x[-1])
+    next_y = np.append(mean_y[1:], y[-1])
+
+    out = np.empty(n_out, dtype=np.int64)
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    for b in range(n_out - 2):
+        s, e = starts[b], ends[b]
+        area = np.abs((x[a] - next_x[b]) * (y[s:e] - y[a]) - (x[a] - x[s:e]) * (next_y[b] - y[a]))
+        a = s + int(np.argmax(area))
+        out[b + 1] = a
+    return out
+
+
+def minmax_indices(y: np.ndarray, n_out: int) -> np.ndarray:
+    """Indices of the minimum and maximum of n_out // 2 equal buckets, plus both ends."""
+    y = np.nan_to_num(np.asarray(y, dtype=np.float64))
+    n = len(y)
+    if n_out >= n:
+        return np.arange(n)
+    n_buckets = max(n_out // 2, 1)
+    bucket = np.arange(n) * n_buckets // n
+    # Sorted by (bucket, y): first row of each bucket is its min, last its max
+    order = np.lexsort((y, bucket))
+    first = np.flatnonzero(np.r_[True, bucket[order][1:] != bucket[order][:-1]])
+    last = np.r_[first[1:] - 1, n - 1]
+    return np.unique(np.r_[0, order[first], order[last], n - 1])
+
+
+def chart_indices(
+    y: np.ndarray,
+    max_points: int,
+    keep: Optional[Sequence[int]] = None,
+    method: str = "lttb",
+) -> np.ndarray:
+    """
+    Sorted indices of the points to plot.
+
+    The shape is chosen from y; `keep` indices are added on top and take
+    priority over the budget, so the result only exceeds max_points when
+    there are more kept events than max_points.
+    """
+    if method not in DOWNSAMPLE_METHODS:
+        raise ValueError(f"Unknown downsampling method '{method}', expected one of {DOWNSAMPLE_METHODS}")
+    n = len(y)
+    keep = np.asarray(keep if keep is not None else [], dtype=np.int64)
+    keep = np.unique(keep[(keep >= 0) & (keep < n)])
+    if n <= max_points:
+        return np.arange(n)
+
+    budget = max(max_points - len(keep), 3)
+    pick = lttb_indices if method == "lttb" else minmax_indices
+    return np.union1d(pick(y, budget), keep)
+
+
+def take(values, idx: np.ndarray):
+    """values[idx] for arrays, a list for lists (dates)."""
+    if isinstance(values, np.ndarray):
+        return values[idx]
+    return [values[i] for i in idx]
+
+
+def date_indices(dates: Sequence[str], event_dates) -> np.ndarray:
+    """Positions in `dates` of the event dates that occur in it."""
+    pos = {d: i for i, d in enumerate(dates)}
+    return np.array(sorted(pos[d] for d in set(event_dates) if d in pos), dtype=np.int64)
@@ -0,0 +1,640 @@
+"""
+Incremental feature computation: one new bar in, one feature row out.
+
+The batch feature code (compute_features in v8, ticker_features in v6/v7)
+recomputes every rolling window over a ticker's full history. The trainers'
+*FeatureState classes carry the rolling state instead and turn the next bar
+into the next feature row in O(features) time.
+
+The primitives below replay the pandas 2.2 window kernels step by step —
+the same Kahan-compensated sums, Welford variance updates, repeated-value
+handling and adjust=True EWM weights — so a streamed row is bit-for-bit equal
+to the batch value, as long as the stream started at the same first row as
+the batch run (pandas' running sums carry rounding from the start of the
+series, so a state bootstrapped from a different start date drifts in the
+last bits).
+
+    RollingSum / RollingMean   Series.rolling(w, min_periods).sum() / .mean()
+    RollingVar                 .rolling(w).var() / .std()
+    RollingMax / RollingMin    .rolling(w).max() / .min()   (monotonic deque)
+    RollingCov                 .rolling(w).cov(other)
+    RollingApply               .rolling(w).apply(func, raw=True)
+    EWMMean                    .ewm(span=s).mean()
+    Lag                        .shift(k) / .diff() / .pct_change(k)
+
+Window functions applied with rolling().apply() are re-evaluated on the
+window buffer (O(window)); everything else is O(1) per bar.
+
+The kernels are pandas internals, not API: pandas 3 already rounds the
+rolling std differently. EXACT_PANDAS records whether the installed pandas is
+the 2.2 series the primitives replay; elsewhere advance() serves the batch
+rows instead of streamed ones (or raises without a batch function).
+
+Checkpoints: StateStore keeps one pickle of builtins per ticker under
+FEATURE_STATE_DIR/{group}/, tagged with the feature version hash, so a changed
+feature definition discards old state. advance() loads each ticker's
+checkpoint, replays the bars after it (the whole history on first use) and
+returns the latest row per ticker; given the batch function it first checks
+one ticker's streamed row against the batch row and falls back to the batch
+rows on any difference. pending_bars() loads only what the checkpoints still
+need — the bars after the oldest live checkpoint, plus the full history of
+tickers without one — and StateStore.save_rows() leaves the latest rows in
+{group}/latest.parquet for the scoring step. replay() and compare_frames()
+validate a state class against its batch function.
+"""
+
+import math
+import os
+import pickle
+from collections import deque
+from typing import Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from .feature_store import FEATURE_STORE_DIR, STALE_DAYS
+
+FEATURE_STATE_DIR = os.environ.get("FEATURE_STATE_DIR", os.path.join(FEATURE_STORE_DIR, "state"))
+
+STATE_FORMAT = 1
+NAN = float("nan")
+
+EXACT_PANDAS = tuple(pd.__version__.split(".")[:2]) == ("2", "2")  # the kernels replayed below
+
+
+def _prep(x) -> float:
+    """pandas' rolling input conversion: float64 with inf treated as missing."""
+    x = float(x)
+    return NAN if math.isinf(x) else x
+
+
+class Stateful:
+    """Object whose attributes are checkpointed as plain builtins.
+
+    Nested Stateful attributes (and dicts of them) are saved recursively,
+    deques and lists as copies; attributes listed in `transient` (functions) are rebuilt
+    by the constructor and not saved.
+    """
+
+    transient = ()
+
+    def state_dict(self) -> dict:
+        out = {}
+        for key, value in vars(self).items():
+            if key in self.transient:
+                continue
+            if isinstance(value, Stateful):
+                value = value.state_dict()
+            elif isinstance(value, dict) and value and all(isinstance(v, Stateful) for v in value.values()):
+                value = {k: v.state_dict() for k, v in value.items()}
+            elif isinstance(value, (deque, list)):
+                value = list(value)
+            out[key] = value
+        return out
+
+    def load_state_dict(self, state: dict):
+        for key, value in state.items():
+            current = getattr(self, key)
+            if isinstance(current, Stateful):
+                current.load_state_dict(value)
+            elif isinstance(current, dict) and current and all(isinstance(v, Stateful) for v in current.values()):
+                for k, v in value.items():
+                    current[k].load_state_dict(v)
+            elif isinstance(current, deque):
+                setattr(self, key, deque(value, maxlen=current.maxlen))
+            elif isinstance(current, list):
+                setattr(self, key, list(value))
+            else:
+                setattr(self, key, value)
+        return self
+
+
+class Lag(Stateful):
+    """The last `size` values: shift, diff and pct_change of a series."""
+
+    def __init__(self, size: int):
+        self.values = deque(maxlen=size + 1)
+
+    def push(self, x: float):
+        self.values.append(x)
+
+    def get(self, k: int) -> float:
+        """Value k steps back (0 = current), NaN before the series is that long."""
+        return np.float64(self.values[-1 - k] if k < len(self.values) else NAN)
+
+    def pct_change(self, k: int) -> float:
+        return self.get(0) / self.get(k) - 1
+
+    def window(self, n: int) -> np.ndarray:
+        """The last n values before the current one, oldest first (x[i - n:i])."""
+        return np.array(list(self.values)[-1 - n:-1], dtype=np.float64)
+
+
+class RollingSum(Stateful):
+    """Series.rolling(window, min_periods).sum() — pandas' roll_sum kernel."""
+
+    def __init__(self, window: int, min_periods: Optional[int] = None):
+        self.window = window
+        self.min_periods = window if min_periods is None else min_periods
+        self.values = deque(maxlen=window)
+        self.started = False
+        self.nobs = 0
+        self.sum_x = 0.0
+        self.compensation_add = 0.0
+        self.compensation_remove = 0.0
+        self.neg_ct = 0
+        self.same = 0
+        self.prev_value = NAN
+
+    def _add(self, val: float):
+        if val == val:
+            self.nobs += 1
+            y = val - self.compensation_add
+            t = self.sum_x + y
+            self.compensation_add = t - self.sum_x - y
+            self.sum_x = t
+            if math.copysign(1.0, val) < 0:
+                self.neg_ct += 1
+            if val == self.prev_value:
+                self.same += 1
+            else:
+                self.same = 1
+            self.prev_value = val
+
+    def _remove(self, val: float):
+        if val == val:
+            self.nobs -= 1
+            y = -val - self.compensation_remove
+            t = self.sum_x + y
+            self.compensation_remove = t - self.sum_x - y
+            self.sum_x = t
+            if math.copysign(1.0, val) < 0:
+                self.neg_ct -= 1
+
+    def push(self, x) -> None:
+        val = _prep(x)
+        if not self.started or self.window == 1:
+            # pandas' setup step for the first window (and every window of size 1)
+            self.started = True
+            self.prev_value = val
+            self.same = 0
+            self.sum_x = self.compensation_add = self.compensation_remove = 0.0
+            self.nobs = self.neg_ct = 0
+        elif len(self.values) == self.window:
+            self._remove(self.values[0])
+        self._add(val)
+        self.values.append(val)
+
+    def sum(self) -> float:
+        if self.nobs == 0 == self.min_periods:
+            return np.float64(0.0)
+        if self.nobs >= self.min_periods:
+            if self.same >= self.nobs:
+                return np.float64(self.prev_value * self.nobs)
+            return np.float64(self.sum_x)
+        return np.float64(NAN)
+
+    def mean(self) -> float:
+        if self.nobs >= self.min_periods and self.nobs > 0:
+            result = self.sum_x / self.nobs
+            if self.same >= self.nobs:
+                result = self.prev_value
+            elif self.neg_ct == 0 and result < 0:
+                result = 0.0
+            elif self.neg_ct == self.nobs and result > 0:
+                result = 0.0
+            return np.float64(result)
+        return np.float64(NAN)
+
+    def update(self, x) -> float:
+        self.push(x)
+        return self.sum()
+
+
+class RollingMean(RollingSum):
+    """Series.rolling(window, min_periods).mean() — pandas' roll_mean kernel."""
+
+    def update(self, x) -> float:
+        self.push(x)
+        return self.mean()
+
+
+class RollingVar(Stateful):
+    """Series.rolling(window, min_periods).var(ddof) / .std(ddof) — pandas' roll_var kernel."""
+
+    def __init__(self, window: int, min_periods: Optional[int] = None, ddof: int = 1):
+        self.window = window
+        self.min_periods = window if min_periods is None else min_periods
+        self.ddof = ddof
+        self.values = deque(maxlen=window)
+        self.started = False
+        self.nobs = 0.0
+        self.mean_x = 0.0
+        self.ssqdm_x = 0.0
+        self.compensation_add = 0.0
+        self.compensation_remove = 0.0
+        self.same = 0
+        self.prev_value = NAN
+
+    def _add(self, val: float):
+        if val != val:
+            return
+        self.nobs += 1
+        if val == self.prev_value:
+            self.same += 1
+        else:
+            self.same = 1
+        self.prev_value = val
+        prev_mean = self.mean_x - self.compensation_add
+        y = val - self.compensation_add
+        t = y - self.mean_x
+        self.compensation_add = t + self.mean_x - y
+        delta = t
+        if self.nobs:
+            self.mean_x = self.mean_x + delta / self.nobs
+        else:
+            self.mean_x = 0.0
+        self.ssqdm_x = self.ssqdm_x + (val - prev_mean) * (val - self.mean_x)
+
+    def _remove(self, val: float):
+        if val == val:
+            self.nobs -= 1
+            if self.nobs:
+                prev_mean = self.mean_x - self.compensation_remove
+                y = val - self.compensation_remove
+                t = y - self.mean_x
+                self.compensation_remove = t + self.mean_x - y
+                delta = t
+                self.mean_x = self.mean_x - delta / self.nobs
+                self.ssqdm_x = self.ssqdm_x - (val - prev_mean) * (val - self.mean_x)
+            else:
+                self.mean_x = 0.0
+                self.ssqdm_x = 0.0
+
+    def push(self, x) -> None:
+        val = _prep(x)
+        if not self.started or self.window == 1:
+            self.started = True
+            self.prev_value = val
+            self.same = 0
+            self.mean_x = self.ssqdm_x = self.nobs = 0.0
+            self.compensation_add = self.compensation_remove = 0.0
+        elif len(self.values) == self.window:
+            self._remove(self.values[0])
+        self._add(val)
+        self.values.append(val)
+
+    def var(self) -> float:
+        if self.nobs >= self.min_periods and self.nobs > self.ddof:
+            if self.nobs == 1 or self.same >= self.nobs:
+                return np.float64(0.0)
+            return np.float64(self.ssqdm_x / (self.nobs - self.ddof))
+        return np.float64(NAN)
+
+    def std(self) -> float:
+        v = self.var()
+        return np.float64(0.0) if v < 0 else np.sqrt(v)
+
+    def update(self, x) -> float:
+        self.push(x)
+        return self.std()
+
+
+class _RollingExtreme(Stateful):
+    """Monotonic-deque rolling max/min over the non-missing values of the window."""
+
+    sign = 1.0
+
+    def __init__(self, window: int, min_periods: Optional[int] = None):
+        self.window = window
+        self.min_periods = window if min_periods is None else min_periods
+        self.i = -1
+        self.candidates = deque()   # (position, value), values monotonic
+        self.valid = deque(maxlen=window)
+        self.nobs = 0
+
+    def update(self, x) -> float:
+        val = _prep(x)
+        self.i += 1
+        if len(self.valid) == self.window and self.valid[0]:
+            self.nobs -= 1
+        ok = val == val
+        self.valid.append(ok)
+        if ok:
+            self.nobs += 1
+            while self.candidates and self.sign * self.candidates[-1][1] <= self.sign * val:
+                self.candidates.pop()
+            self.candidates.append((self.i, val))
+        while self.candidates and self.candidates[0][0] <= self.i - self.window:
+            self.candidates.popleft()
+        if self.nobs >= self.min_periods and self.nobs > 0:
+            return np.float64(self.candidates[0][1])
+        return np.float64(NAN)
+
+
+class RollingMax(_RollingExtreme):
+    """Series.rolling(window, min_periods).max()"""
+
+    sign = 1.0
+
+
+class RollingMin(_RollingExtreme):
+    """Series.rolling(window, min_periods).min()"""
+
+    sign = -1.0
+
+
+class RollingCov(Stateful):
+    """x.rolling(window).cov(y) — pandas' mean(xy) - mean(x)·mean(y) formula."""
+
+    def __init__(self, window: int, min_periods: Optional[int] = None, ddof: int = 1):
+        self.ddof = ddof
+        self.mean_xy = RollingMean(window, min_periods)
+        self.mean_x = RollingMean(window, min_periods)
+        self.mean_y = RollingMean(window, min_periods)
+        self.count = RollingSum(window, 0)
+
+    def update(self, x, y) -> float:
+        # prep_binary: missing in either series masks both
+        x, y = float(x), float(y)
+        x, y = _prep(x + 0 * y), _prep(y + 0 * x)
+        mean_xy = self.mean_xy.update(x * y)
+        mean_x = self.mean_x.update(x)
+        mean_y = self.mean_y.update(y)
+        count = np.float64(self.count.update(1.0 if (x + y) == (x + y) else 0.0))
+        with np.errstate(all="ignore"):
+            return (mean_xy - mean_x * mean_y) * (count / (count - self.ddof))
+
+
+class RollingApply(Stateful):
+    """Series.rolling(window, min_periods).apply(func, raw=True)."""
+
+    transient = ("func",)
+
+    def __init__(self, window: int, func: Callable[[np.ndarray], float], min_periods: Optional[int] = None):
+        self.window = window
+        self.min_periods = window if min_periods is None else min_periods
+        self.func = func
+        self.values = deque(maxlen=window)
+        self.finite = 0
+
+    def update(self, x) -> float:
+        val = _prep(x)
+        if len(self.values) == self.window and self.values[0] == self.values[0]:
+            self.finite -= 1
+        self.values.append(val)
+        if val == val:
+            self.finite += 1
+        if self.finite >= self.min_periods:
+            return np.float64(self.func(np.array(self.values, dtype=np.float64)))
+        return np.float64(NAN)
+
+
+class EWMMean(Stateful):
+    """Series.ewm(span=span).mean() — pandas' ewm kernel (adjust=True, ignore_na=False)."""
+
+    def __init__(self, span: float, min_periods: int = 0):
+        com = (span - 1) / 2
+        self.alpha = 1.0 / (1.0 + com)
+        self.min_periods = max(int(min_periods), 1)
+        self.started = False
+        self.weighted = NAN
+        self.old_wt = 1.0
+        self.nobs = 0
+
+    def update(self, x) -> float:
+        cur = _prep(x)
+        is_observation = cur == cur
+        if not self.started:
+            self.started = True
+            self.weighted = cur
+            self.nobs = int(is_observation)
+        else:
+            self.nobs += is_observation
+            if self.weighted == self.weighted:
+                self.old_wt *= 1.0 - self.alpha
+                if is_observation:
+                    if self.weighted != cur:
+                        self.weighted = self.old_wt * self.weighted + 1.0 * cur
+                        self.weighted /= (self.old_wt + 1.0)
+                    self.old_wt += 1.0
+            elif is_observation:
+                self.weighted = cur
+        return np.float64(self.weighted if self.nobs >= self.min_periods else NAN)
+
+
+class FeatureState(Stateful):
+    """One ticker's carried feature state; subclasses implement update(bar) -> row dict.
+
+    A bar is a mapping with date, open, high, low, close, volume and whatever
+    market inputs the trainer's batch function joins on date.
+    """
+
+    def __init__(self):
+        self.n = 0
+        self.last_date = None
+
+    def step(self, bar) -> dict:
+        row = self.update(bar)
+        self.n += 1
+        self.last_date = pd.Timestamp(bar["date"])
+        return row
+
+    def update(self, bar) -> dict:
+        raise NotImplementedError
+
+
+def replay(state: FeatureState, bars: pd.DataFrame) -> pd.DataFrame:
+    """Stream bars (sorted by date) through state; one feature row per bar."""
+    rows = [state.step(bar) for bar in bars.to_dict("records")]
+    return pd.DataFrame(rows, index=bars.index)
+
+
+def compare_frames(batch: pd.DataFrame, streamed: pd.DataFrame,
+                   columns: Optional[Iterable[str]] = None) -> pd.DataFrame:
+    """Per column: rows, rows exactly equal (NaN == NaN), max absolute difference."""
+    columns = list(columns) if columns is not None else [c for c in batch.columns if c in streamed.columns]
+    report = []
+    for col in columns:
+        a = batch[col].to_numpy(dtype=np.float64)
+        b = streamed[col].to_numpy(dtype=np.float64)
+        both_nan = np.isnan(a) & np.isnan(b)
+        exact = (a == b) | both_nan
+        with np.errstate(invalid="ignore"):
+            diff = np.abs(a - b)
+        diff[both_nan] = 0.0
+        report.append({
+            "feature": col,
+            "rows": len(a),
+            "exact": int(exact.sum()),
+            "max_abs_diff": float(np.nanmax(diff)) if len(diff) and not np.isnan(diff).all() else 0.0,
+        })
+    return pd.DataFrame(report)
+
+
+class StateStore:
+    """Per-ticker FeatureState checkpoints: {root}/{group}/{ticker}.pkl"""
+
+    def __init__(self, root: str = FEATURE_STATE_DIR):
+        self.root = root
+
+    def _path(self, group: str, ticker: str) -> str:
+        return os.path.join(self.root, group, f"{ticker}.pkl")
+
+    def load(self, group: str, ticker: str, version: str, state: FeatureState) -> Optional[FeatureState]:
+        """Restore a checkpoint into a freshly constructed state; None if missing or stale."""
+        path = self._path(group, ticker)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "rb") as f:
+                saved = pickle.load(f)
+        except Exception as e:
+            print(f"  [WARN] Unreadable feature state {path}: {e}")
+            return None
+        if saved.get("format") != STATE_FORMAT or saved.get("version") != version:
+            return None
+        return state.load_state_dict(saved["state"])
+
+    def last_dates(self, group: str, version: str) -> Dict[str, pd.Timestamp]:
+        """Last streamed date of every current checkpoint in the group."""
+        gdir = os.path.join(self.root, group)
+        if not os.path.isdir(gdir):
+            return {}
+        out = {}
+        for name in sorted(os.listdir(gdir)):
+            if not name.endswith(".pkl"):
+                continue
+            try:
+                with open(os.path.join(gdir, name), "rb") as f:
+                    saved = pickle.load(f)
+            except Exception as e:
+                print(f"  [WARN] Unreadable feature state {name}: {e}")
+                continue
+            if saved.get("format") == STATE_FORMAT and saved.get("version") == version \
+                    and saved["state"].get("last_date") is not None:
+                out[name[:-len(".pkl")]] = pd.Timestamp(saved["state"]["last_date"])
+        return out
+
+    def save_rows(self, group: str, rows: pd.DataFrame) -> str:
+        """Write advance()'s latest rows to {group}/latest.parquet; returns the path."""
+        path = os.path.join(self.root, group, "latest.parquet")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        rows.to_parquet(f"{path}.tmp", index=False)
+        os.replace(f"{path}.tmp", path)
+        return path
+
+    def save(self, group: str, ticker: str, version: str, state: FeatureState):
+        path = self._path(group, ticker)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump({"format": STATE_FORMAT, "version": version, "state": state.state_dict()},
+                        f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+
+
+def pending_bars(store: StateStore, group: str, version: str,
+                 load: Callable[[str, Optional[List[str]]], pd.DataFrame], since: str,
+                 stale_days: int = STALE_DAYS) -> Dict[str, pd.DataFrame]:
+    """Price rows advance() needs, by ticker, without loading every full history.
+
+    load(start, tickers) returns price rows (ticker, date, ...) from start
+    onwards, for all tickers when tickers is None. One query covers the bars
+    after the oldest checkpoint that is at most stale_days older than the
+    newest; tickers in it without such a checkpoint (new, or last seen long
+    ago) are reloaded from since, the batch start date.
+    """
+    checkpoints = store.last_dates(group, version)
+    start = since
+    if checkpoints:
+        newest = max(checkpoints.values())
+        live = [d for d in checkpoints.values() if d >= newest - pd.Timedelta(days=stale_days)]
+        start = str((min(live) + pd.Timedelta(days=1)).date())
+    recent = load(start, None)
+    cutoff = pd.Timestamp(start) - pd.Timedelta(days=1)
+    reload = sorted(t for t in recent["ticker"].unique() if checkpoints.get(t, pd.Timestamp.min) < cutoff)
+    if reload and start != since:
+        recent = pd.concat([recent[~recent["ticker"].isin(reload)], load(since, reload)], ignore_index=True)
+    return {ticker: df_t.sort_values("date").reset_index(drop=True) for ticker, df_t in recent.groupby("ticker")}
+
+
+def _numeric(value) -> bool:
+    return isinstance(value, (int, float, np.number)) and not isinstance(value, bool)
+
+
+def _batch_row(ticker: str, bars: pd.DataFrame, frame: pd.DataFrame) -> dict:
+    last = frame.iloc[-1].to_dict()
+    last.pop("ticker", None)
+    last.pop("date", None)
+    return {"ticker": ticker, "date": pd.Timestamp(bars["date"].iloc[-1]), **last}
+
+
+def _batch_rows(batch: Callable[[str], pd.DataFrame], bars_by_ticker: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+    rows = []
+    for ticker, bars in bars_by_ticker.items():
+        frame = batch(ticker)
+        if len(bars) and len(frame):
+            rows.append(_batch_row(ticker, bars, frame))
+    return pd.DataFrame(rows)
+
+
+def _row_mismatches(streamed: dict, expected: pd.Series) -> List[str]:
+    """Numeric columns of the streamed row that differ from the batch row (NaN == NaN)."""
+    out = []
+    for col, value in streamed.items():
+        if col not in expected.index or not _numeric(value) or not _numeric(expected[col]):
+            continue
+        a, b = float(value), float(expected[col])
+        if a != b and not (math.isnan(a) and math.isnan(b)):
+            out.append(col)
+    return out
+
+
+def advance(store: StateStore, group: str, version: str,
+            make_state: Callable[[str], FeatureState],
+            bars_by_ticker: Dict[str, pd.DataFrame],
+            batch: Optional[Callable[[str], pd.DataFrame]] = None) -> pd.DataFrame:
+    """Bring every ticker's checkpoint up to its last bar.
+
+    bars_by_ticker holds each ticker's bars sorted by date — at least those
+    after its checkpoint, and the full history (from the batch start date)
+    for tickers without one. Returns the latest feature row of every ticker
+    that received a new bar, with ticker and date columns.
+
+    batch(ticker) is the batch feature frame of that ticker's full history.
+    When given, the first ticker with batch rows is spot-checked before its
+    checkpoint is saved, and on a difference (or a pandas other than 2.2)
+    the result is the last batch row of every ticker instead. Without it,
+    a pandas other than 2.2 raises RuntimeError.
+    """
+    if not EXACT_PANDAS:
+        if batch is None:
+            raise RuntimeError(f"incremental features replay pandas 2.2 kernels, found pandas {pd.__version__}")
+        print(f"  [WARN] pandas {pd.__version__} is not 2.2: using batch feature rows instead of the streamed state")
+        return _batch_rows(batch, bars_by_ticker)
+
+    rows: List[dict] = []
+    checked = batch is None
+    for ticker, bars in bars_by_ticker.items():
+        state = make_state(ticker)
+        restored = store.load(group, ticker, version, state)
+        if restored is not None and restored.last_date is not None:
+            bars = bars[bars["date"] > restored.last_date]
+        if bars.empty:
+            continue
+        row = None
+        for bar in bars.to_dict("records"):
+            row = state.step(bar)
+        if not checked:
+            frame = batch(ticker)
+            if len(frame):
+                checked = True
+                differ = _row_mismatches(row, frame.iloc[-1])
+                if differ:
+                    print(f"  [WARN] Streamed {group} features of {ticker} differ from the batch row "
+                          f"({', '.join(differ[:5])}{'...' if len(differ) > 5 else ''}): using batch rows")
+                    return _batch_rows(batch, bars_by_ticker)
+        store.save(group, ticker, version, state)
+        rows.append({"ticker": ticker, "date": state.last_date, **row})
+    return pd.DataFrame(rows)
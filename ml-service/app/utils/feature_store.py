@@ -0,0 +1,335 @@
+"""
+Columnar feature store shared by the alpha trainers.
+
+Each trainer's feature panel (ticker, date, features, targets) is a feature
+group under FEATURE_STORE_DIR, partitioned by calendar year:
+
+    {group}/manifest.json              — version hash, schema + schema hash, watermark
+    {group}/year={YYYY}/part.parquet   — panel rows of that year
+
+Groups are named after the trainer and universe ("v8", "v6-test", ...).
+FeatureStore.load() reads only the requested columns and years through
+memory-mapped Parquet; load_union() joins columns of several groups on
+(ticker, date).
+
+The version hash covers the source of the functions that load data and build
+the panel plus the constants they depend on, so changing a feature, a query
+or a horizon invalidates the group and the next run rebuilds it. Otherwise:
+
+  - stored watermark == latest price date: data load and feature stage are
+    skipped, the panel is read from disk;
+  - new prices: the panel is recomputed from `open_from` — the first date
+    whose targets were still unknown, over the tickers still trading — on
+    WARMUP_DAYS of history before it, and those rows replace the stored
+    tail. Rolling windows up to ~500 trading days see the same inputs as a
+    full build.
+
+Groups whose features depend on the start of the history are stored with
+incremental=False and rebuilt whenever the watermark moves: panel-wide
+transforms (v4/v5 winsorise with full-history quantiles) and cumulative
+levels (v8's OBV, which a warm-up slice would re-anchor).
+
+A ticker without a bar in the last STALE_DAYS of the panel (delisted,
+suspended) no longer moves open_from: its unknown targets stay unknown.
+"""
+
+import hashlib
+import importlib.util
+import inspect
+import json
+import os
+import shutil
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional
+
+import pandas as pd
+
+try:
+    from .snapshot import open_snapshot
+except ImportError:
+    from utils.snapshot import open_snapshot
+
+FEATURE_STORE_DIR = os.environ.get(
+    "FEATURE_STORE_DIR", os.path.join(os.environ.get("MODEL_STORE_DIR", "/tmp/models"), "features")
+)
+WARMUP_DAYS = int(os.environ.get("FEATURE_STORE_WARMUP_DAYS", "800"))  # calendar days
+STALE_DAYS = 30  # calendar days without a bar before a ticker stops holding open_from back
+
+STORE_FORMAT = 1
+KEY_COLS = ["ticker", "date"]
+
+HAS_PYARROW = importlib.util.find_spec("pyarrow") is not None
+
+
+def feature_version(*sources, **params) -> str:
+    """Hash of the given functions' source code and parameter values."""
+    h = hashlib.sha256(f"format={STORE_FORMAT}".encode())
+    for src in sources:
+        try:
+            text = inspect.getsource(src) if callable(src) else repr(src)
+        except (OSError, TypeError):
+            text = getattr(src, "__qualname__", repr(src))
+        h.update(text.encode())
+    for key in sorted(params):
+        h.update(f"{key}={params[key]!r}".encode())
+    return h.hexdigest()[:16]
+
+
+def feature_group(trainer: str, test_mode: bool = False) -> str:
+    return f"{trainer}-test" if test_mode else trainer
+
+
+def latest_price_date(conn) -> str:
+    """Most recent date in prices_daily — the watermark a stored panel is compared to."""
+    snapshot = open_snapshot("prices_daily")
+    if snapshot is not None:
+        return snapshot.watermark("prices_daily")
+    cur = conn.cursor()
+    cur.execute("SELECT MAX(date) FROM prices_daily WHERE close > 0")
+    (latest,) = cur.fetchone()
+    cur.close()
+    return str(latest)[:10]
+
+
+def slice_data(data: dict, start) -> dict:
+    """Trainer data dict restricted to rows on or after `start`."""
+    start = pd.Timestamp(start)
+    out = {}
+    for key, value in data.items():
+        if isinstance(value, pd.DataFrame) and "date" in value.columns:
+            value = value[value["date"] >= start]
+        elif isinstance(value, (pd.DataFrame, pd.Series)) and isinstance(value.index, pd.DatetimeIndex):
+            value = value[value.index >= start]
+        out[key] = value
+    return out
+
+
+def _schema(frame: pd.DataFrame) -> Dict[str, str]:
+    return {col: str(dtype) for col, dtype in frame.dtypes.items()}
+
+
+def _schema_hash(schema: Dict[str, str]) -> str:
+    return hashlib.sha256(json.dumps(schema, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def _open_from(frame: pd.DataFrame, targets: List[str], default: Optional[str] = None) -> Optional[str]:
+    """
+    First date still waiting on targets, else the day after the last row.
+
+    Per ticker that is the first row of its trailing run of unknown targets
+    (earlier gaps do not fill in); tickers without a bar in the last
+    STALE_DAYS are left out.
+    """
+    if frame.empty:
+        return default
+    last = frame["date"].max()
+    after_last = str(last + pd.Timedelta(days=1))[:10]
+    targets = [t for t in targets if t in frame.columns]
+    if not targets:
+        return after_last
+
+    rows = frame[["ticker", "date"]].assign(known=frame[targets].notna().all(axis=1).to_numpy())
+    rows = rows.sort_values(["ticker", "date"])
+    by_ticker = rows.groupby("ticker", sort=False)
+    live = by_ticker["date"].transform("max") >= last - pd.Timedelta(days=STALE_DAYS)
+    # rows after each ticker's last fully known row
+    tail = ~by_ticker["known"].transform(lambda k: k[::-1].cummax()[::-1]).astype(bool)
+    waiting = rows.loc[live & tail, "date"]
+    return str(waiting.min())[:10] if len(waiting) else after_last
+
+
+class FeatureStore:
+    """Parquet feature groups under one root directory."""
+
+    def __init__(self, root: str = FEATURE_STORE_DIR, warmup_days: int = WARMUP_DAYS):
+        if not HAS_PYARROW:
+            raise ImportError("pyarrow is required for the feature store")
+        self.root = root
+        self.warmup_days = warmup_days
+
+    def _group_dir(self, group: str) -> str:
+        return os.path.join(self.root, group)
+
+    def manifest(self, group: str) -> Optional[dict]:
+        try:
+            with open(os.path.join(self._group_dir(group), "manifest.json")) as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def _partitions(self, group: str, start=None, end=None) -> List[str]:
+        gdir = self._group_dir(group)
+        if not os.path.isdir(gdir):
+            return []
+        y0 = pd.Timestamp(start).year if start is not None else None
+        y1 = pd.Timestamp(end).year if end is not None else None
+        paths = []
+        for name in sorted(os.listdir(gdir)):
+            if not name.startswith("year="):
+                continue
+            year = int(name[5:])
+            if (y0 is None or year >= y0) and (y1 is None or year <= y1):
+                paths.append(os.path.join(gdir, name, "part.parquet"))
+        return paths
+
+    def load(self, group: str, columns: Optional[Iterable[str]] = None,
+             start=None, end=None) -> pd.DataFrame:
+        """Panel rows of a group, projected to `columns` (plus ticker and date)."""
+        import pyarrow.parquet as pq
+
+        cols = None if columns is None else list(dict.fromkeys(KEY_COLS + list(columns)))
+        frames = [pq.read_table(p, columns=cols, memory_map=True).to_pandas()
+                  for p in self._partitions(group, start, end) if os.path.exists(p)]
+        if not frames:
+            return pd.DataFrame(columns=cols or KEY_COLS)
+        frame = pd.concat(frames, ignore_index=True)
+        if start is not None:
+            frame = frame[frame["date"] >= pd.Timestamp(start)]
+        if end is not None:
+            frame = frame[frame["date"] <= pd.Timestamp(end)]
+        # Trainers build panels ticker by ticker in date order
+        return frame.sort_values(KEY_COLS, kind="mergesort", ignore_index=True)
+
+    def load_union(self, columns_by_group: Dict[str, Iterable[str]], start=None, end=None) -> pd.DataFrame:
+        """Columns from several groups joined on (ticker, date)."""
+        merged = None
+        for group, columns in columns_by_group.items():
+            frame = self.load(group, columns, start, end)
+            merged = frame if merged is None else merged.merge(frame, on=KEY_COLS, how="inner")
+        return merged if merged is not None else pd.DataFrame(columns=KEY_COLS)
+
+    def _write_partition(self, path: str, frame: pd.DataFrame):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + ".tmp"
+        pq.write_table(pa.Table.from_pandas(frame, preserve_index=False), tmp)
+        os.replace(tmp, path)
+
+    def _write_manifest(self, group: str, manifest: dict):
+        path = os.path.join(self._group_dir(group), "manifest.json")
+        with open(path + ".tmp", "w") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(path + ".tmp", path)
+
+    def write(self, group: str, frame: pd.DataFrame, version: str, watermark: str,
+              targets: List[str], feature_cols: Optional[List[str]] = None,
+              incremental: bool = True, open_from: Optional[str] = None):
+        """
+        Store a panel. With open_from set, rows on or after it replace the
+        stored tail; otherwise the group is rewritten from scratch.
+        """
+        frame = frame.reset_index(drop=True)
+        old = self.manifest(group) if open_from is not None else None
+
+        if old is None:
+            schema = _schema(frame)
+            gdir = self._group_dir(group)
+            tmp_dir = gdir + ".building"
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            years = {}
+            for year, rows in frame.groupby(frame["date"].dt.year, sort=True):
+                self._write_partition(os.path.join(tmp_dir, f"year={year}", "part.parquet"), rows)
+                years[str(year)] = len(rows)
+            if os.path.isdir(gdir):
+                shutil.rmtree(gdir)
+            os.makedirs(tmp_dir, exist_ok=True)
+            os.replace(tmp_dir, gdir)
+            created_at = datetime.now().isoformat(timespec="seconds")
+        else:
+            schema = old["columns"]
+            frame = self._align(frame, schema, feature_cols)
+            cutoff = pd.Timestamp(open_from)
+            years = dict(old["years"])
+            touched = sorted({y for y in map(int, years) if y >= cutoff.year} |
+                             set(frame["date"].dt.year.unique().tolist()))
+            for year in touched:
+                path = os.path.join(self._group_dir(group), f"year={year}", "part.parquet")
+                kept = self.load(group, start=f"{year}-01-01", end=f"{year}-12-31")
+                kept = kept[kept["date"] < cutoff]
+                rows = pd.concat([kept, frame[frame["date"].dt.year == year]], ignore_index=True)
+                if len(rows):
+                    self._write_partition(path, rows)
+                    years[str(year)] = len(rows)
+            created_at = old["created_at"]
+
+        # Rebuilt rows cover every date from open_from on
+        panel_open = _open_from(frame, targets, default=open_from)
+        self._write_manifest(group, {
+            "group": group,
+            "format": STORE_FORMAT,
+            "version": version,
+            "schema_hash": _schema_hash(schema),
+            "columns": schema,
+            "feature_cols": feature_cols,
+            "targets": targets,
+            "incremental": incremental,
+            "watermark": watermark,
+            "open_from": panel_open,
+            "rows": int(sum(years.values())),
+            "years": years,
+            "created_at": created_at,
+            "updated_at": datetime.now().isoformat(timespec="seconds"),
+        })
+
+    @staticmethod
+    def _align(frame: pd.DataFrame, schema: Dict[str, str], feature_cols: Optional[List[str]]) -> pd.DataFrame:
+        """Conform freshly built rows to the stored schema."""
+        extra = [c for c in frame.columns if c not in schema]
+        if extra:
+            print(f"  [WARN] Feature store: dropping columns not in stored schema: {extra[:10]}")
+        frame = frame.reindex(columns=list(schema))
+        fill = [c for c in (feature_cols or []) if c in frame.columns]
+        frame[fill] = frame[fill].fillna(0)  # trainers zero-fill selected features
+        for col, dtype in schema.items():
+            if str(frame[col].dtype) != dtype:
+                try:
+                    frame[col] = frame[col].astype(dtype)
+                except (TypeError, ValueError):
+                    print(f"  [WARN] Feature store: {col} stored as {dtype}, got {frame[col].dtype}")
+        return frame
+
+
+def cached_features(store: Optional[FeatureStore], group: str, version: str, watermark: str,
+                    load: Callable[[], dict], build: Callable, targets: List[str],
+                    rebuild: bool = False, incremental: bool = True):
+    """
+    A trainer's feature panel, through the store when one is given.
+
+    load() returns the trainer's data dict and build(data) its panel — a
+    DataFrame, or (DataFrame, feature_cols) — and the result has the same
+    shape as build's. Without a store this is build(load()).
+    """
+    if store is None:
+        return build(load())
+
+    manifest = None if rebuild else store.manifest(group)
+    current = manifest is not None and manifest["version"] == version and manifest["format"] == STORE_FORMAT
+
+    if current and manifest["watermark"] >= watermark:
+        print(f"  Feature store: {group} is current ({manifest['rows']:,} rows to {manifest['watermark']})")
+    elif current and manifest["incremental"]:
+        open_from = manifest["open_from"]
+        start = pd.Timestamp(open_from) - pd.Timedelta(days=store.warmup_days)
+        print(f"  Feature store: {group} updating from {open_from} (warm-up from {start.date()})")
+        result = build(slice_data(load(), start))
+        frame = result[0] if isinstance(result, tuple) else result
+        frame = frame[frame["date"] >= pd.Timestamp(open_from)]
+        store.write(group, frame, version, watermark, targets,
+                    feature_cols=manifest["feature_cols"], open_from=open_from)
+    else:
+        reason = "no stored panel" if manifest is None else (
+            "rebuild requested" if rebuild else
+            "feature code changed" if not current else "new prices, non-incremental group")
+        print(f"  Feature store: building {group} ({reason})")
+        result = build(load())
+        frame, feature_cols = result if isinstance(result, tuple) else (result, None)
+        store.write(group, frame, version, watermark, targets,
+                    feature_cols=feature_cols, incremental=incremental)
+
+    manifest = store.manifest(group)
+    frame = store.load(group)
+    if manifest["feature_cols"] is not None:
+        return frame, manifest["feature_cols"]
+    return frame
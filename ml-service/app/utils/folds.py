@@ -0,0 +1,113 @@
+"""
+Walk-forward fold scheduling for the trainers.
+
+    FOLD_JOBS              default worker count (env FOLD_JOBS, 1 = serial)
+    DateSlicer(dates)      the frame's dates sorted once; rows(start, end)
+                           gives the positions of rows with start <= date <= end
+                           from two searchsorted offsets instead of a boolean
+                           mask over the whole frame
+    BlockSlicer(...)       the same for a date-sorted panel (utils.panel),
+                           where rows(start, end) is a range of rows
+    take_rows(X, rows)     X[rows] in X's memory order; a view when rows is
+                           a BlockSlicer range
+    fold_threads(...)      per-worker thread budget for --fold-jobs
+    with_threads(...)      a model's params with that budget applied
+
+Folds only depend on their date boundaries, so the trainers describe each
+one as a small picklable spec and run them with utils.parallel.map_tasks.
+Everything order-dependent (printing, fold numbering, importance sums)
+happens in the parent in fold order, so the output of --fold-jobs N equals
+the serial run with the same --fold-threads byte for byte.
+"""
+
+import os
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+FOLD_JOBS = int(os.environ.get("FOLD_JOBS", "1"))  # default for the trainers' --fold-jobs
+
+
+class DateSlicer:
+    """
+    Row positions of a frame by date range.
+
+    Positions come back in frame order (not date order), so a fold sees its
+    rows in the same order a boolean mask would have given them — the
+    trainers take "last N% of training rows" as validation.
+    """
+
+    def __init__(self, dates):
+        dates = pd.to_datetime(pd.Series(dates)).to_numpy()
+        self.order = np.argsort(dates, kind='stable')
+        self.sorted_dates = dates[self.order]
+
+    def bound(self, date, side: str = 'left') -> int:
+        """Offset of `date` in the sorted dates (np.searchsorted)."""
+        return int(np.searchsorted(self.sorted_dates, np.datetime64(pd.Timestamp(date)), side=side))
+
+    def rows(self, start=None, end=None, end_inclusive: bool = True) -> np.ndarray:
+        """Positions of rows with start <= date <= end (date < end with end_inclusive=False)."""
+        lo = 0 if start is None else self.bound(start, 'left')
+        hi = len(self.order) if end is None else self.bound(end, 'right' if end_inclusive else 'left')
+        return np.sort(self.order[lo:max(lo, hi)])
+
+
+class BlockSlicer:
+    """
+    Row ranges of a date-sorted panel by date range.
+
+    Each date's rows are one contiguous block, so rows(start, end) is a
+    range (len() and slicing work as on DateSlicer positions) and
+    take_rows() of it is a view instead of a copy. Holds only the unique
+    dates and block offsets, so it is cheap to send to fold workers.
+    """
+
+    def __init__(self, dates, starts):
+        self.dates = np.asarray(dates, dtype='datetime64[ns]')  # unique, ascending
+        self.starts = np.asarray(starts, dtype=np.int64)  # first row of each date, then the row count
+
+    def bound(self, date, side: str = 'left') -> int:
+        """Offset of `date` in the unique dates (np.searchsorted)."""
+        return int(np.searchsorted(self.dates, np.datetime64(pd.Timestamp(date)), side=side))
+
+    def rows(self, start=None, end=None, end_inclusive: bool = True) -> range:
+        """Rows with start <= date <= end (date < end with end_inclusive=False)."""
+        lo = 0 if start is None else self.bound(start, 'left')
+        hi = len(self.dates) if end is None else self.bound(end, 'right' if end_inclusive else 'left')
+        return range(int(self.starts[lo]), int(self.starts[max(lo, hi)]))
+
+
+def take_rows(X: np.ndarray, rows, cols=None) -> np.ndarray:
+    """
+    X[rows] (X[rows][:, cols]) in the memory order of X.
+
+    A frame's .values is column-major; the per-fold `.loc[mask, cols].values`
+    slices were too, and BLAS-backed models (LogisticRegression, MLP,
+    StandardScaler) sum in a layout-dependent order, so keep it.
+
+    A contiguous range of rows (BlockSlicer) with cols None or a slice is
+    taken by basic slicing, i.e. as a view of X.
+    """
+    if isinstance(rows, range) and rows.step == 1:
+        rows = slice(rows.start, rows.stop)
+    if isinstance(rows, slice):
+        out = X[rows] if cols is None else X[rows, cols] if isinstance(cols, slice) else X[rows][:, cols]
+    else:
+        out = X[rows] if cols is None else X[np.ix_(rows, cols)]
+    return np.asfortranarray(out) if X.ndim == 2 and X.flags.f_contiguous else out
+
+
+def fold_threads(jobs: int, threads: Optional[int] = None) -> Optional[int]:
+    """Threads per fold: `threads` when given, else the CPUs split over the workers (None when serial)."""
+    if threads:
+        return threads
+    if jobs > 1:
+        return max(1, (os.cpu_count() or 1) // jobs)
+    return None
+
+
+def with_threads(params: dict, threads: Optional[int], key: str = 'n_jobs') -> dict:
+    """params with `key` set to the thread budget (unchanged when threads is None)."""
+    return params if threads is None else {**params, key: threads}
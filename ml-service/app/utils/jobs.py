@@ -0,0 +1,342 @@
+"""
+Background job queue for long-running training work.
+
+Jobs are submitted with a kind, a params dict and a priority (0 = most urgent).
+A dispatcher thread pulls jobs from a bounded priority queue and runs each in
+its own spawned worker process, so model fits never block the event loop or
+share the GIL with interactive endpoints.
+
+Handlers are plain module-level functions registered per kind:
+
+    def handler(params: dict, progress: Callable[[dict], None]) -> dict
+
+`progress(event)` forwards an event (epoch loss, fold metrics, stage name)
+to the parent and raises JobCancelled once the job has been cancelled.
+
+Job state is persisted to JOBS_DIR/{job_id}.json on every transition, so
+status and results survive restarts and are readable from any uvicorn worker.
+Each record carries the pid of the service process that owns it; a new
+JobManager marks queued or running records whose owner is gone as failed
+(interrupted), so they do not report "running" forever after a restart.
+
+Progress events get a `seq` that only grows, even after the list is trimmed
+to MAX_EVENTS, so event streams resume with `seq > last seen`.
+"""
+
+import heapq
+import itertools
+import json
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+import traceback
+import uuid
+from datetime import datetime
+from typing import Callable, Dict, Optional
+
+JOBS_DIR = os.environ.get(
+    "JOBS_DIR", os.path.join(os.environ.get("MODEL_STORE_DIR", "/tmp/models"), "jobs")
+)
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", "1"))
+JOB_QUEUE_SIZE = int(os.environ.get("JOB_QUEUE_SIZE", "16"))
+JOB_THREADS = int(os.environ.get("JOB_THREADS", "2"))  # torch/BLAS threads per job process
+JOB_CANCEL_GRACE = 10.0  # seconds before a cancelled job process is terminated
+MAX_EVENTS = 500         # progress events kept per job
+
+TERMINAL_STATES = ("succeeded", "failed", "cancelled")
+
+# kind -> (handler, pydantic params model or None)
+JOB_KINDS: Dict[str, tuple] = {}
+
+
+class JobCancelled(Exception):
+    """Raised inside a job process when its job has been cancelled."""
+
+
+class QueueFull(Exception):
+    """Raised when the pending-job queue is at capacity."""
+
+
+def register_job_kind(kind: str, handler: Callable, params_model=None):
+    """Register a handler for a job kind (call at module import time)."""
+    JOB_KINDS[kind] = (handler, params_model)
+
+
+def _now() -> str:
+    return datetime.now().isoformat(timespec="seconds")
+
+
+def _job_path(job_id: str) -> str:
+    return os.path.join(JOBS_DIR, f"{job_id}.json")
+
+
+def _cancel_path(job_id: str) -> str:
+    return os.path.join(JOBS_DIR, f"{job_id}.cancel")
+
+
+def _write_job(job: dict):
+    os.makedirs(JOBS_DIR, exist_ok=True)
+    tmp = _job_path(job["id"]) + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(job, f, default=str)
+    os.replace(tmp, _job_path(job["id"]))
+
+
+def _read_job(job_id: str) -> Optional[dict]:
+    try:
+        with open(_job_path(job_id)) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def _job_process_entry(handler, params: dict, events, cancel_path: str, n_threads: int):
+    """Entry point of a spawned job process."""
+    os.environ["OMP_NUM_THREADS"] = str(n_threads)
+    os.environ["MKL_NUM_THREADS"] = str(n_threads)
+    try:
+        os.nice(5)  # yield CPU to interactive request handling
+    except (AttributeError, OSError):
+        pass
+    try:
+        import torch
+        torch.set_num_threads(n_threads)
+    except ImportError:
+        pass
+
+    def progress(event: dict):
+        if os.path.exists(cancel_path):
+            raise JobCancelled()
+        events.put(("progress", event))
+
+    try:
+        result = handler(params, progress)
+        events.put(("done", result))
+    except JobCancelled:
+        events.put(("cancelled", None))
+    except Exception as e:
+        traceback.print_exc()
+        events.put(("error", str(e)))
+
+
+def _owner_alive(pid: Optional[int]) -> bool:
+    """True if pid is another live process (this process's own pid is a previous incarnation's)."""
+    if not pid or pid == os.getpid():
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class JobManager:
+    """Bounded priority queue + worker processes. One instance per service process."""
+
+    def __init__(self, max_workers: int = JOB_WORKERS, max_queue: int = JOB_QUEUE_SIZE,
+                 n_threads: int = JOB_THREADS):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.n_threads = n_threads
+        self._ctx = mp.get_context("spawn")
+        self._jobs: Dict[str, dict] = {}
+        self._pending = []  # heap of (priority, seq, job_id)
+        self._seq = itertools.count()
+        self._running = 0
+        self._cond = threading.Condition()
+        self._recover_interrupted()
+        self._dispatcher = threading.Thread(target=self._dispatch_loop, daemon=True)
+        self._dispatcher.start()
+
+    # -- public API ---------------------------------------------------------
+
+    def submit(self, kind: str, params: dict, priority: int = 5) -> dict:
+        if kind not in JOB_KINDS:
+            raise KeyError(f"Unknown job kind '{kind}'")
+
+        with self._cond:
+            if len(self._pending) >= self.max_queue:
+                raise QueueFull(f"Job queue full ({self.max_queue} pending)")
+
+            job = {
+                "id": uuid.uuid4().hex[:12],
+                "kind": kind,
+                "params": params,
+                "priority": priority,
+                "status": "queued",
+                "submitted_at": _now(),
+                "started_at": None,
+                "finished_at": None,
+                "events": [],
+                "event_seq": 0,
+                "owner_pid": os.getpid(),
+                "result": None,
+                "error": None,
+            }
+            self._jobs[job["id"]] = job
+            _write_job(job)
+            heapq.heappush(self._pending, (priority, next(self._seq), job["id"]))
+            self._cond.notify()
+
+        return job
+
+    def get(self, job_id: str) -> Optional[dict]:
+        """Job state from this process, falling back to the persisted record."""
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                return dict(job, events=list(job["events"]))
+        return _read_job(job_id)
+
+    def list_jobs(self, limit: int = 50) -> list:
+        if not os.path.isdir(JOBS_DIR):
+            return []
+        names = [n for n in os.listdir(JOBS_DIR) if n.endswith(".json")]
+        names.sort(key=lambda n: os.path.getmtime(os.path.join(JOBS_DIR, n)), reverse=True)
+        jobs = []
+        for name in names[:limit]:
+            job = self.get(name[:-5])
+            if job is not None:
+                job.pop("events", None)
+                job.pop("result", None)
+                jobs.append(job)
+        return jobs
+
+    def cancel(self, job_id: str) -> Optional[dict]:
+        job = self.get(job_id)
+        if job is None or job["status"] in TERMINAL_STATES:
+            return job
+
+        os.makedirs(JOBS_DIR, exist_ok=True)
+        with open(_cancel_path(job_id), "w") as f:
+            f.write(_now())
+
+        with self._cond:
+            local = self._jobs.get(job_id)
+            if local is not None and local["status"] == "queued":
+                self._pending = [p for p in self._pending if p[2] != job_id]
+                heapq.heapify(self._pending)
+                self._finish(local, "cancelled")
+        return self.get(job_id)
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "pending": len(self._pending),
+                "running": self._running,
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+            }
+
+    # -- internals ----------------------------------------------------------
+
+    def _recover_interrupted(self):
+        """Fail the queued / running records left behind by service processes that no longer exist."""
+        if not os.path.isdir(JOBS_DIR):
+            return
+        for name in os.listdir(JOBS_DIR):
+            if not name.endswith(".json"):
+                continue
+            job = _read_job(name[:-5])
+            if job is None or job["status"] in TERMINAL_STATES or _owner_alive(job.get("owner_pid")):
+                continue
+            job["error"] = f"interrupted: service process exited while the job was {job['status']}"
+            job["status"] = "failed"
+            job["finished_at"] = _now()
+            _write_job(job)
+            try:
+                os.remove(_cancel_path(job["id"]))
+            except FileNotFoundError:
+                pass
+
+    def _finish(self, job: dict, status: str, result=None, error: Optional[str] = None):
+        """Mark a job terminal. Caller must hold self._cond."""
+        job["status"] = status
+        job["result"] = result
+        job["error"] = error
+        job["finished_at"] = _now()
+        _write_job(job)
+        try:
+            os.remove(_cancel_path(job["id"]))
+        except FileNotFoundError:
+            pass
+
+    def _dispatch_loop(self):
+        while True:
+            with self._cond:
+                while not self._pending or self._running >= self.max_workers:
+                    self._cond.wait()
+                _, _, job_id = heapq.heappop(self._pending)
+                job = self._jobs[job_id]
+                if os.path.exists(_cancel_path(job_id)):
+                    self._finish(job, "cancelled")
+                    continue
+                self._running += 1
+                job["status"] = "running"
+                job["started_at"] = _now()
+                _write_job(job)
+
+            threading.Thread(target=self._run_job, args=(job,), daemon=True).start()
+
+    def _run_job(self, job: dict):
+        handler, _ = JOB_KINDS[job["kind"]]
+        events = self._ctx.Queue()
+        cancel_path = _cancel_path(job["id"])
+        proc = self._ctx.Process(
+            target=_job_process_entry,
+            args=(handler, job["params"], events, cancel_path, self.n_threads),
+            daemon=True,
+        )
+        proc.start()
+
+        outcome = None
+        while outcome is None:
+            try:
+                kind, payload = events.get(timeout=1.0)
+            except queue.Empty:
+                if os.path.exists(cancel_path) and \
+                        time.time() - os.path.getmtime(cancel_path) > JOB_CANCEL_GRACE:
+                    proc.terminate()
+                    outcome = ("cancelled", None)
+                elif not proc.is_alive():
+                    outcome = ("error", f"Job process exited with code {proc.exitcode}")
+                continue
+
+            if kind == "progress":
+                with self._cond:
+                    job["event_seq"] += 1
+                    job["events"].append(dict(payload, seq=job["event_seq"], at=_now()))
+                    del job["events"][:-MAX_EVENTS]
+                    _write_job(job)
+            else:
+                outcome = (kind, payload)
+
+        proc.join(timeout=5)
+
+        with self._cond:
+            kind, payload = outcome
+            if kind == "done":
+                self._finish(job, "succeeded", result=payload)
+            elif kind == "cancelled":
+                self._finish(job, "cancelled")
+            else:
+                self._finish(job, "failed", error=payload)
+            self._running -= 1
+            self._cond.notify()
+
+
+_manager: Optional[JobManager] = None
+_manager_lock = threading.Lock()
+
+
+def get_job_manager() -> JobManager:
+    """Process-wide JobManager, created on first use."""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = JobManager()
+        return _manager
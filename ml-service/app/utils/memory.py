@@ -0,0 +1,121 @@
+"""
+Resident memory of the trainers, per pipeline stage.
+
+    MEMORY_BUDGET_GB         default for the trainers' --memory-budget (env, 0 = off)
+    rss_mb()                 current resident set size of this process
+    peak_rss_mb()            its high-water mark
+    trim()                   hand freed heap pages back to the OS (glibc malloc_trim)
+    MemoryLog(budget_gb)     peak RSS of each `with log.stage(name):` block,
+                             printed as the stage ends and again by report()
+
+On Linux the high-water mark (VmHWM) is reset at the start of every stage
+(echo 5 > /proc/self/clear_refs), so each stage reports its own peak;
+elsewhere it falls back to ru_maxrss, which only grows over the run.
+Worker processes (--jobs, --fold-jobs) are not part of this process's RSS;
+report() adds the largest finished worker's peak (RUSAGE_CHILDREN). Pages
+of the shared-memory blocks the workers attach to count in both.
+
+Freed pandas blocks often stay in the process as malloc free lists (the
+per-ticker frames of a feature stage are small enough to come from the
+heap), so a stage's "now" figure is taken after trim().
+
+A MemoryLog with budget 0 measures nothing, so the trainers can wrap their
+stages unconditionally.
+"""
+
+import ctypes
+import os
+import resource
+import sys
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+MEMORY_BUDGET_GB = float(os.environ.get("MEMORY_BUDGET_GB", "0"))  # default for the trainers' --memory-budget
+
+_STATUS = "/proc/self/status"
+_CLEAR_REFS = "/proc/self/clear_refs"
+
+
+def _status_mb(field: str) -> Optional[float]:
+    try:
+        with open(_STATUS) as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def _maxrss_mb(who: int = resource.RUSAGE_SELF) -> float:
+    # ru_maxrss is in KiB on Linux, bytes on macOS
+    maxrss = resource.getrusage(who).ru_maxrss
+    return maxrss / (1024 * 1024) if sys.platform == "darwin" else maxrss / 1024
+
+
+def rss_mb() -> float:
+    """Current RSS in MiB (the high-water mark where /proc is unavailable)."""
+    current = _status_mb("VmRSS")
+    return current if current is not None else _maxrss_mb()
+
+
+def peak_rss_mb() -> float:
+    """Peak RSS in MiB since the process started or the last reset_peak()."""
+    peak = _status_mb("VmHWM")
+    return peak if peak is not None else _maxrss_mb()
+
+
+def reset_peak() -> bool:
+    """Restart the high-water mark at the current RSS (Linux only); False when unsupported."""
+    try:
+        with open(_CLEAR_REFS, "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def trim() -> bool:
+    """malloc_trim(0): return free heap memory to the OS; False where libc has no malloc_trim."""
+    try:
+        return bool(ctypes.CDLL(None).malloc_trim(0))  # the process's own symbols, libc included
+    except (OSError, AttributeError):
+        return False
+
+
+class MemoryLog:
+    """Peak RSS per stage against a budget in GB (0 = disabled)."""
+
+    def __init__(self, budget_gb: float = 0):
+        self.budget_mb = budget_gb * 1024
+        self.enabled = budget_gb > 0
+        self.peaks: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        if not self.enabled:
+            yield
+            return
+        per_stage = reset_peak()
+        try:
+            yield
+        finally:
+            peak = peak_rss_mb()
+            self.peaks[name] = max(peak, self.peaks.get(name, 0.0))
+            trim()
+            scope = "" if per_stage else " (since start)"
+            print(f"  [memory] {name}: peak RSS {peak:,.0f} MB{scope}, now {rss_mb():,.0f} MB"
+                  f"{self._over(peak)}")
+
+    def _over(self, mb: float) -> str:
+        return f"  ** over the {self.budget_mb / 1024:g} GB budget **" if mb > self.budget_mb else ""
+
+    def report(self):
+        if not self.enabled:
+            return
+        print(f"  Peak RSS per stage (budget {self.budget_mb / 1024:g} GB):")
+        for name, peak in self.peaks.items():
+            print(f"    {name:<14s} {peak:8,.0f} MB{self._over(peak)}")
+        workers = _maxrss_mb(resource.RUSAGE_CHILDREN)
+        if workers:
+            print(f"    {'worker (max)':<14s} {workers:8,.0f} MB")
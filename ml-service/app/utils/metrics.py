@@ -0,0 +1,163 @@
+"""
+Prometheus metrics and per-stage timing for the ML service.
+
+Exported on GET /metrics (Prometheus text format):
+
+    ml_request_duration_seconds{method, route, status}  — histogram per route template
+    ml_stage_duration_seconds{stage, op}                — histogram per pipeline stage
+    ml_cache_hits_total / ml_cache_misses_total / ml_cache_hit_ratio{cache}
+    ml_executor_queue_depth, ml_executor_threads, ml_jobs_pending, ml_jobs_running
+
+Stages are named db_fetch, db_write, align, fit, forecast, predict, backtest,
+load and serialize; `op` is the instrumented function. Model code marks stages with
+
+    @timed("fit")                      # whole function
+    with stage("forecast", "fit_garch"):  # part of a function
+
+Stage time spent while serving a request is also summed per stage into that
+request's Server-Timing response header. Only the outermost stage counts
+towards the header, so nested instrumented calls are not double counted.
+
+prometheus_client is optional: without it stage timing and Server-Timing
+still work and /metrics answers 501. With several uvicorn workers set
+PROMETHEUS_MULTIPROC_DIR so histograms aggregate across processes; cache
+and queue gauges always describe the worker that answered the scrape.
+"""
+
+import functools
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Optional
+
+try:
+    from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Histogram, generate_latest
+    from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+    HAS_PROMETHEUS = True
+except ImportError:
+    HAS_PROMETHEUS = False
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+# Per-request stage totals (seconds), set by the HTTP middleware. The dict is
+# shared with asyncio.to_thread workers, which run in a copy of the context.
+_request_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("ml_request_timings", default=None)
+_in_stage: ContextVar[bool] = ContextVar("ml_in_stage", default=False)
+
+# name -> object with .hits / .misses
+_caches: Dict[str, object] = {}
+# name -> (help, zero-arg callable)
+_gauges: Dict[str, tuple] = {}
+
+if HAS_PROMETHEUS:
+    REQUEST_SECONDS = Histogram(
+        "ml_request_duration_seconds", "HTTP request latency by route template",
+        ["method", "route", "status"], buckets=LATENCY_BUCKETS,
+    )
+    STAGE_SECONDS = Histogram(
+        "ml_stage_duration_seconds", "Time spent in a pipeline stage",
+        ["stage", "op"], buckets=LATENCY_BUCKETS,
+    )
+
+
+def register_cache(name: str, cache) -> None:
+    """Export hit/miss counters of a cache object exposing .hits and .misses."""
+    _caches[name] = cache
+
+
+def register_gauge(name: str, help_text: str, fn: Callable[[], float]) -> None:
+    """Export a gauge whose value is read from fn() at scrape time."""
+    _gauges[name] = (help_text, fn)
+
+
+@contextmanager
+def stage(name: str, op: str = ""):
+    """Time a block as pipeline stage `name`."""
+    outer = not _in_stage.get()
+    token = _in_stage.set(True)
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - t0
+        _in_stage.reset(token)
+        if HAS_PROMETHEUS:
+            STAGE_SECONDS.labels(name, op).observe(elapsed)
+        timings = _request_timings.get()
+        if outer and timings is not None:
+            timings[name] = timings.get(name, 0.0) + elapsed
+
+
+def timed(stage_name: str):
+    """Decorator: time every call of the function as `stage_name`."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with stage(stage_name, fn.__name__):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def begin_request() -> Dict[str, float]:
+    """Start collecting stage timings for the current request."""
+    timings: Dict[str, float] = {}
+    _request_timings.set(timings)
+    return timings
+
+
+def server_timing_header(timings: Dict[str, float], total: float) -> str:
+    parts = [f"{name};dur={secs * 1000:.1f}" for name, secs in timings.items()]
+    parts.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(parts)
+
+
+def observe_request(method: str, route: str, status: int, seconds: float) -> None:
+    if HAS_PROMETHEUS:
+        REQUEST_SECONDS.labels(method, route, str(status)).observe(seconds)
+
+
+class _StateCollector:
+    """Reads registered caches and gauges at scrape time."""
+
+    def describe(self):
+        return []
+
+    def collect(self):
+        hits = CounterMetricFamily("ml_cache_hits", "Cache lookups that hit", labels=["cache"])
+        misses = CounterMetricFamily("ml_cache_misses", "Cache lookups that missed", labels=["cache"])
+        ratio = GaugeMetricFamily("ml_cache_hit_ratio", "Cache hit ratio since start", labels=["cache"])
+        for name, cache in _caches.items():
+            h, m = cache.hits, cache.misses
+            hits.add_metric([name], h)
+            misses.add_metric([name], m)
+            ratio.add_metric([name], h / (h + m) if h + m else 0.0)
+        yield hits
+        yield misses
+        yield ratio
+
+        for name, (help_text, fn) in _gauges.items():
+            try:
+                value = float(fn())
+            except Exception:
+                continue
+            yield GaugeMetricFamily(name, help_text, value=value)
+
+
+if HAS_PROMETHEUS:
+    _state_collector = _StateCollector()
+    REGISTRY.register(_state_collector)
+
+
+def render_metrics() -> tuple:
+    """(body, content type) of the Prometheus exposition for this service."""
+    if not HAS_PROMETHEUS:
+        raise RuntimeError("prometheus_client not installed")
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        registry.register(_state_collector)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
@@ -0,0 +1,134 @@
+"""
+Compact float32 feature panels for the trainers' memory-budgeted mode.
+
+The DataFrame path keeps every feature as a float64 column beside string
+tickers and copies each fold's rows out of it. A Panel holds
+
+    X          the features as one C-contiguous float32 (rows x features) matrix
+    columns    their names
+    codes      int16 ticker codes into `tickers` (int32 past 32k tickers)
+    date_idx   int32 index into `dates` (unique, ascending)
+    meta       the other columns the trainer keeps (targets, regime), text as categoricals
+
+with rows sorted by (date, ticker), so every date range is one contiguous
+block: slicer() gives a folds.BlockSlicer whose ranges take_rows() turns
+into views of X. Because rows are date-major, a fold's "last N% of the
+training rows" validation tail is its latest dates, not its last tickers.
+
+    downcast(frame)                         float64 feature columns to float32 (prices stay float64)
+    Panel.from_frame(frame, feature_cols, keep)
+    panel.matrix(columns, rows)             X of those columns (X itself when they are all, in order)
+    panel.keep(columns)                     in place: X becomes those columns only
+    panel.frame(columns)                    ticker, date and meta columns as a DataFrame
+    plain(frame)                            categorical columns back to plain values
+"""
+
+from typing import Iterable, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+try:
+    from .folds import BlockSlicer
+except ImportError:
+    from utils.folds import BlockSlicer
+
+PRICE_COLUMNS = ("open", "high", "low", "close", "volume", "obx_close")
+
+
+def downcast(frame: pd.DataFrame, dtype=np.float32, exclude: Iterable[str] = PRICE_COLUMNS) -> pd.DataFrame:
+    """frame with its float64 columns (except `exclude`) cast to dtype."""
+    exclude = set(exclude)
+    cast = {c: dtype for c, t in frame.dtypes.items() if t == np.float64 and c not in exclude}
+    return frame.astype(cast) if cast else frame
+
+
+def plain(frame: pd.DataFrame) -> pd.DataFrame:
+    """frame with categorical columns converted back to their categories' dtype."""
+    for c in frame.columns:
+        if isinstance(frame[c].dtype, pd.CategoricalDtype):
+            frame[c] = frame[c].astype(frame[c].cat.categories.dtype)
+    return frame
+
+
+class Panel:
+    """A trainer's feature frame as a date-sorted float32 matrix plus compact row labels."""
+
+    def __init__(self, X: np.ndarray, columns: List[str], tickers: np.ndarray, codes: np.ndarray,
+                 dates: np.ndarray, date_idx: np.ndarray, meta: pd.DataFrame):
+        self.X = X
+        self.columns = list(columns)
+        self.tickers = tickers
+        self.codes = codes
+        self.dates = dates
+        self.date_idx = date_idx
+        self.meta = meta
+        self.starts = np.searchsorted(date_idx, np.arange(len(dates) + 1))
+
+    @classmethod
+    def from_frame(cls, frame: pd.DataFrame, feature_cols: Sequence[str], keep: Sequence[str] = (),
+                   dtype=np.float32) -> "Panel":
+        """
+        Panel of frame's feature_cols (X) and `keep` columns (meta).
+
+        X is filled one column at a time, so building it never holds more
+        than one float64 column beyond the frame itself.
+        """
+        tickers, codes = np.unique(frame["ticker"].to_numpy(), return_inverse=True)
+        dates, date_idx = np.unique(frame["date"].to_numpy(dtype="datetime64[ns]"), return_inverse=True)
+        order = np.lexsort((codes, date_idx))
+
+        X = np.empty((len(frame), len(feature_cols)), dtype=dtype)
+        for j, col in enumerate(feature_cols):
+            X[:, j] = frame[col].to_numpy()[order]
+
+        meta = frame[list(keep)].iloc[order].reset_index(drop=True)
+        for col in meta.columns:
+            if meta[col].dtype == object or pd.api.types.is_string_dtype(meta[col].dtype):
+                meta[col] = meta[col].astype("category")
+        code_type = np.int16 if len(tickers) <= np.iinfo(np.int16).max else np.int32
+        return cls(X, feature_cols, tickers, codes[order].astype(code_type),
+                   dates, date_idx[order].astype(np.int32), meta)
+
+    def __len__(self) -> int:
+        return len(self.X)
+
+    @property
+    def nbytes(self) -> int:
+        return (self.X.nbytes + self.codes.nbytes + self.date_idx.nbytes
+                + int(self.meta.memory_usage(deep=True).sum()))
+
+    def _positions(self, columns: Optional[Sequence[str]]) -> Optional[List[int]]:
+        """Column positions of `columns` in X, None when they are all of X in order."""
+        if columns is None or list(columns) == self.columns:
+            return None
+        position = {c: i for i, c in enumerate(self.columns)}
+        return [position[c] for c in columns]
+
+    def matrix(self, columns: Optional[Sequence[str]] = None, rows=None) -> np.ndarray:
+        """X restricted to `rows` (mask, positions or slice) and `columns`; no copy when neither narrows."""
+        idx = self._positions(columns)
+        if rows is None or isinstance(rows, slice):
+            X = self.X if rows is None else self.X[rows]
+            return X if idx is None else np.take(X, idx, axis=1)
+        return self.X[rows] if idx is None else self.X[np.ix_(rows, idx)]
+
+    def keep(self, columns: Sequence[str]) -> None:
+        """Narrow X to `columns` (repeats allowed) in place, releasing the full matrix."""
+        idx = self._positions(columns)
+        if idx is not None:
+            self.X = np.take(self.X, idx, axis=1)  # C-contiguous, unlike X[:, idx]
+            self.columns = list(columns)
+
+    def slicer(self) -> BlockSlicer:
+        return BlockSlicer(self.dates, self.starts)
+
+    def frame(self, columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        """ticker (categorical), date and the meta `columns` (default all) in row order."""
+        frame = pd.DataFrame({
+            "ticker": pd.Categorical.from_codes(self.codes, self.tickers),
+            "date": self.dates[self.date_idx],
+        })
+        for col in self.meta.columns if columns is None else columns:
+            frame[col] = self.meta[col].values
+        return frame
@@ -0,0 +1,292 @@
+"""
+Process pools for the trainers' per-ticker feature stages and walk-forward folds.
+
+    TickerFrames(prices)   rows grouped by ticker once (one stable sort and a
+                           row range per ticker), replacing a boolean
+                           `prices[prices.ticker == t]` scan per ticker
+    map_tickers(fn, ...)   fn(ticker, rows, **shared) for every ticker, in a
+                           process pool when jobs > 1, results in ticker order
+    map_tasks(fn, ...)     the same for any list of picklable tasks (the
+                           walk-forward folds), with a per-worker thread cap
+
+With jobs > 1 the grouped prices and every DataFrame / Series / TickerFrames
+/ ndarray in `shared` (OBX series, fundamentals, feature matrices) are
+copied once into shared memory (SharedFrame, SharedArray); workers attach to
+the blocks by name instead of receiving a pickled copy per task. Other
+shared values (dicts, scalars) are pickled once per worker. Each ticker's rows keep their original relative order, so fn
+sees exactly the frame the serial loop built and the concatenated output
+does not depend on the worker count.
+
+fn must be a module-level function (it is pickled by reference).
+"""
+
+import multiprocessing as mp
+import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from functools import partial
+from multiprocessing import shared_memory
+from typing import Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+FEATURE_JOBS = int(os.environ.get("FEATURE_JOBS", "1"))  # default for the trainers' --jobs
+
+_NATIVE_KINDS = "biufcmM"  # dtypes stored in shared memory as-is; others as factorized codes
+
+
+def resolve_jobs(jobs: Optional[int]) -> int:
+    """--jobs value to a worker count: 0 or less means one per CPU."""
+    if jobs is None:
+        jobs = FEATURE_JOBS
+    return jobs if jobs > 0 else (os.cpu_count() or 1)
+
+
+class SharedFrame:
+    """
+    A read-only DataFrame or Series whose columns live in one shared-memory block.
+
+    Created in the parent, which owns (and on close() unlinks) the block.
+    Pickling sends only the block name and column layout; the receiving
+    process attaches and rebuilds the frame with get(). Numeric, bool and
+    datetime64 columns are stored as-is; anything else (ticker strings) as
+    factorized codes, rebuilt as object arrays.
+    """
+
+    def __init__(self, data):
+        self.is_series = isinstance(data, pd.Series)
+        self.series_name = data.name if self.is_series else None
+        frame = data.to_frame(name="__values") if self.is_series else data
+        index = frame.index
+        default_index = isinstance(index, pd.RangeIndex) and index.start == 0 and index.step == 1
+        self.index_names = None if default_index else list(index.names)
+        if self.index_names is not None:
+            frame = frame.reset_index(names=[f"__index_{i}" for i in range(index.nlevels)])
+        self.columns = list(frame.columns)
+        self.n_rows = len(frame)
+
+        arrays, self.layout, offset = [], [], 0
+        for col in self.columns:
+            values = frame[col].to_numpy()
+            uniques = None
+            if values.dtype.kind not in _NATIVE_KINDS:
+                codes, uniques = pd.factorize(values, use_na_sentinel=True)
+                values = codes.astype(np.int64)
+                uniques = np.asarray(uniques, dtype=object)
+            values = np.ascontiguousarray(values)
+            self.layout.append((col, values.dtype.str, offset, uniques))
+            arrays.append((offset, values))
+            offset += -(-values.nbytes // 8) * 8
+
+        self._shm = shared_memory.SharedMemory(create=True, size=max(offset, 8))
+        self._owner = True
+        self._frame = None
+        for (col, dtype, start, _), (_, values) in zip(self.layout, arrays):
+            np.ndarray(len(values), dtype=dtype, buffer=self._shm.buf, offset=start)[:] = values
+
+    def __getstate__(self):
+        return {"name": self._shm.name, "is_series": self.is_series, "series_name": self.series_name,
+                "index_names": self.index_names, "columns": self.columns, "n_rows": self.n_rows,
+                "layout": self.layout}
+
+    def __setstate__(self, state):
+        self.__dict__.update({k: v for k, v in state.items() if k != "name"})
+        self._shm = shared_memory.SharedMemory(name=state["name"])
+        self._owner = False
+        self._frame = None
+
+    def get(self):
+        """The DataFrame / Series, rebuilt once per process."""
+        if self._frame is None:
+            data = {}
+            for col, dtype, start, uniques in self.layout:
+                values = np.ndarray(self.n_rows, dtype=dtype, buffer=self._shm.buf, offset=start)
+                values.flags.writeable = False
+                if uniques is not None:
+                    codes = values
+                    values = uniques.take(np.maximum(codes, 0)) if len(uniques) else \
+                        np.full(self.n_rows, np.nan, dtype=object)
+                    values[codes < 0] = np.nan
+                data[col] = values
+            frame = pd.DataFrame(data, columns=self.columns, copy=False)
+            if self.index_names is not None:
+                frame = frame.set_index([f"__index_{i}" for i in range(len(self.index_names))])
+                frame.index.names = self.index_names
+            self._frame = frame["__values"].rename(self.series_name) if self.is_series else frame
+        return self._frame
+
+    def close(self):
+        self._frame = None
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+
+
+class TickerFrames:
+    """
+    Rows of a frame grouped by its 'ticker' column once.
+
+    get(ticker) returns a copy of that ticker's rows in their original order
+    (an empty frame for unknown tickers) — the same rows, in the same order,
+    as `df[df.ticker == ticker]`.
+    """
+
+    def __init__(self, df: pd.DataFrame, ranges: Optional[Dict[str, Tuple[int, int]]] = None):
+        if ranges is not None:  # already grouped (attached in a worker)
+            self.frame, self.ranges = df, ranges
+            return
+        codes, uniques = pd.factorize(df["ticker"], use_na_sentinel=True)
+        order = np.argsort(codes, kind="stable")
+        sorted_codes = codes[order]
+        starts = np.searchsorted(sorted_codes, np.arange(len(uniques)), side="left")
+        stops = np.searchsorted(sorted_codes, np.arange(len(uniques)), side="right")
+        self.frame = df.take(order).reset_index(drop=True)
+        self.ranges = {t: (int(a), int(b)) for t, a, b in zip(uniques, starts, stops)}
+
+    def __contains__(self, ticker) -> bool:
+        return ticker in self.ranges
+
+    def __len__(self) -> int:
+        return len(self.ranges)
+
+    def get(self, ticker) -> pd.DataFrame:
+        start, stop = self.ranges.get(ticker, (0, 0))
+        return self.frame.iloc[start:stop].copy()
+
+
+class SharedArray:
+    """A read-only numeric / bool / datetime64 ndarray in a shared-memory block (see SharedFrame)."""
+
+    def __init__(self, array: np.ndarray):
+        # keep column-major arrays (a frame's .values) column-major
+        self.order = "F" if array.flags.f_contiguous and not array.flags.c_contiguous else "C"
+        array = np.asarray(array, order=self.order)
+        self.shape, self.dtype = array.shape, array.dtype.str
+        self._shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 8))
+        self._owner = True
+        self._array()[...] = array
+
+    def __getstate__(self):
+        return {"name": self._shm.name, "shape": self.shape, "dtype": self.dtype, "order": self.order}
+
+    def __setstate__(self, state):
+        self.shape, self.dtype, self.order = state["shape"], state["dtype"], state["order"]
+        self._shm = shared_memory.SharedMemory(name=state["name"])
+        self._owner = False
+
+    def _array(self) -> np.ndarray:
+        return np.ndarray(self.shape, dtype=self.dtype, buffer=self._shm.buf, order=self.order)
+
+    def get(self) -> np.ndarray:
+        array = self._array()
+        array.flags.writeable = False
+        return array
+
+    def close(self):
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+
+
+# ---- Pool plumbing ----
+
+_WORKER: dict = {}
+
+
+def _share(value, owned: list):
+    """Picklable handle for a shared input: shared memory for frames and arrays, the value otherwise."""
+    if isinstance(value, TickerFrames):
+        block = SharedFrame(value.frame)
+        owned.append(block)
+        return ("tickers", block, value.ranges)
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        block = SharedFrame(value)
+        owned.append(block)
+        return ("frame", block, None)
+    if isinstance(value, np.ndarray) and value.dtype.kind in _NATIVE_KINDS:
+        block = SharedArray(value)
+        owned.append(block)
+        return ("frame", block, None)
+    return ("value", value, None)
+
+
+def _attach(handle):
+    kind, value, ranges = handle
+    if kind == "tickers":
+        return TickerFrames(value.get(), ranges)
+    if kind == "frame":
+        return value.get()
+    return value
+
+
+def _thread_limit(threads: Optional[int]):
+    """Cap BLAS / OpenMP pools at `threads` (threadpoolctl, when installed)."""
+    if threads is None:
+        return nullcontext()
+    try:
+        from threadpoolctl import threadpool_limits
+    except ImportError:
+        return nullcontext()
+    return threadpool_limits(limits=threads)
+
+
+def _init_worker(fn, shared, threads):
+    _WORKER["limits"] = _thread_limit(threads)
+    _WORKER["fn"] = fn
+    _WORKER["shared"] = {key: _attach(handle) for key, handle in shared.items()}
+
+
+def _run_task(task):
+    return _WORKER["fn"](task, **_WORKER["shared"])
+
+
+def _mp_context():
+    # fork starts workers without re-importing the trainer; spawn elsewhere
+    methods = mp.get_all_start_methods()
+    return mp.get_context("fork" if "fork" in methods else "spawn")
+
+
+def map_tasks(fn: Callable, tasks: Iterable, jobs: int = 1, shared: Optional[dict] = None,
+              threads: Optional[int] = None) -> Iterator:
+    """
+    fn(task, **shared) for each task, yielded in `tasks` order.
+
+    jobs <= 1 runs in this process on the original objects; otherwise a pool
+    of `jobs` worker processes (never more than there are tasks). `threads`
+    caps the BLAS / OpenMP threads of each worker (of this process when
+    serial), so jobs x threads stays within the machine.
+    """
+    tasks = list(tasks)
+    shared = shared or {}
+    jobs = min(resolve_jobs(jobs), len(tasks))
+    if jobs <= 1:
+        with _thread_limit(threads):
+            for task in tasks:
+                yield fn(task, **shared)
+        return
+
+    owned: list = []
+    try:
+        handles = {key: _share(value, owned) for key, value in shared.items()}
+        with ProcessPoolExecutor(max_workers=jobs, mp_context=_mp_context(), initializer=_init_worker,
+                                 initargs=(fn, handles, threads)) as pool:
+            yield from pool.map(_run_task, tasks)
+    finally:
+        for block in owned:
+            block.close()
+
+
+def _ticker_task(fn, ticker, _frames, **shared):
+    return fn(ticker, _frames.get(ticker), **shared)
+
+
+def map_tickers(fn: Callable, frames: TickerFrames, tickers: Iterable[str], jobs: int = 1,
+                shared: Optional[dict] = None) -> Iterator:
+    """
+    fn(ticker, frames.get(ticker), **shared) for each ticker, yielded in `tickers` order.
+
+    The per-ticker form of map_tasks: the grouped frames are shared once and
+    each task carries only its ticker.
+    """
+    return map_tasks(partial(_ticker_task, fn), tickers, jobs, {**(shared or {}), "_frames": frames})
@@ -0,0 +1,203 @@
+"""
+Response encoding for large time-series payloads.
+
+Model code returns NumPy arrays as they are; they are serialized once, at the
+wire, instead of being turned into Python lists of floats and then walked again
+by FastAPI's jsonable_encoder.
+
+    application/json                     orjson, NumPy arrays serialized natively
+    application/msgpack                  MessagePack (msgpack installed)
+    application/vnd.apache.arrow.stream  Arrow IPC stream (pyarrow installed)
+
+encode_response(request, content) picks the format from the request's Accept
+header; JSON is the default and the fallback when the requested library is
+missing. Endpoints that return arrays must go through encode_response (or
+return a NumpyJSONResponse) because jsonable_encoder cannot handle them.
+
+The Arrow stream holds a single-row record batch: nested dicts are flattened
+to dot-separated column names ("garch.conditional_vol"), 1-D arrays become
+list columns and lists of records are carried as JSON strings.
+
+NaN and inf become null in JSON (starlette's JSONResponse rejected them outright).
+"""
+
+import importlib.util
+import json
+import math
+from datetime import date, datetime
+from typing import Optional
+
+import numpy as np
+from fastapi import Request, Response
+
+from .metrics import stage
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+try:
+    import msgpack
+    HAS_MSGPACK = True
+except ImportError:
+    HAS_MSGPACK = False
+
+# pyarrow takes a few hundred ms to import; only load it for Arrow requests
+HAS_PYARROW = importlib.util.find_spec("pyarrow") is not None
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+ARROW = "application/vnd.apache.arrow.stream"
+
+# Accept media type -> media type answered with
+_MEDIA_TYPES = {
+    "application/json": JSON,
+    "*/*": JSON,
+    "application/*": JSON,
+    "application/msgpack": MSGPACK,
+    "application/x-msgpack": MSGPACK,
+    "application/vnd.apache.arrow.stream": ARROW,
+}
+
+if HAS_ORJSON:
+    _ORJSON_OPTS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def _default(obj):
+    """orjson fallback for values it does not serialize natively."""
+    if isinstance(obj, np.ndarray):
+        # orjson only takes C-contiguous numeric arrays (strided slices are not)
+        if obj.dtype.kind in "biuf" and obj.dtype != np.float16 and not obj.flags.c_contiguous:
+            return np.ascontiguousarray(obj)
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if hasattr(obj, "model_dump"):
+        return obj.model_dump()
+    if hasattr(obj, "isoformat"):
+        return obj.isoformat()
+    return str(obj)
+
+
+def _plain(obj, nan_to_none: bool):
+    """Recursively convert to builtin types (stdlib json and msgpack paths)."""
+    if isinstance(obj, dict):
+        return {str(k): _plain(v, nan_to_none) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        return [_plain(v, nan_to_none) for v in obj]
+    if isinstance(obj, np.ndarray):
+        return obj.tolist() if obj.dtype.kind in "biu" else _plain(obj.tolist(), nan_to_none)
+    if isinstance(obj, np.generic):
+        obj = obj.item()
+    if isinstance(obj, float):
+        return None if nan_to_none and not math.isfinite(obj) else obj
+    if obj is None or isinstance(obj, (str, int, bool)):
+        return obj
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    return _default(obj)
+
+
+def dumps_json(content) -> bytes:
+    if HAS_ORJSON:
+        return orjson.dumps(content, default=_default, option=_ORJSON_OPTS)
+    return json.dumps(_plain(content, nan_to_none=True), separators=(",", ":")).encode("utf-8")
+
+
+def dumps_msgpack(content) -> bytes:
+    return msgpack.packb(_plain(content, nan_to_none=False), use_bin_type=True)
+
+
+def _flatten(obj, prefix: str, out: dict):
+    if isinstance(obj, dict):
+        for k, v in obj.items():
+            _flatten(v, f"{prefix}.{k}" if prefix else str(k), out)
+    else:
+        out[prefix] = obj
+
+
+def _arrow_column(pa, value):
+    if isinstance(value, np.ndarray) and value.ndim == 1 and value.dtype.kind in "biuf":
+        offsets = pa.array([0, len(value)], type=pa.int32())
+        return pa.ListArray.from_arrays(offsets, pa.array(value))
+    if isinstance(value, np.ndarray):
+        value = value.tolist()
+    elif isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, (list, tuple)) and any(isinstance(v, (dict, list, tuple)) for v in value):
+        value = dumps_json(value).decode("utf-8")
+    return pa.array([value])
+
+
+def dumps_arrow(content) -> bytes:
+    import pyarrow as pa
+
+    columns = {}
+    _flatten(content if isinstance(content, dict) else {"value": content}, "", columns)
+    table = pa.table({name: _arrow_column(pa, value) for name, value in columns.items()})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+_ENCODERS = {
+    JSON: ("json", dumps_json),
+    MSGPACK: ("msgpack", dumps_msgpack),
+    ARROW: ("arrow", dumps_arrow),
+}
+
+
+def _available(media_type: str) -> bool:
+    if media_type == MSGPACK:
+        return HAS_MSGPACK
+    if media_type == ARROW:
+        return HAS_PYARROW
+    return True
+
+
+def negotiate(accept: Optional[str]) -> str:
+    """Media type to answer with for an Accept header (highest q wins, then order)."""
+    if not accept:
+        return JSON
+    offers = []
+    for i, part in enumerate(accept.split(",")):
+        media, _, params = part.partition(";")
+        q = 1.0
+        for param in params.split(";"):
+            key, _, val = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(val)
+                except ValueError:
+                    q = 0.0
+        offers.append((-q, i, media.strip().lower()))
+    for neg_q, _, media in sorted(offers):
+        target = _MEDIA_TYPES.get(media)
+        if neg_q < 0 and target is not None and _available(target):
+            return target
+    return JSON
+
+
+def encode_response(request: Request, content, status_code: int = 200) -> Response:
+    """Serialize content in the format requested by the Accept header."""
+    media_type = negotiate(request.headers.get("accept"))
+    name, dumps = _ENCODERS[media_type]
+    with stage("serialize", name):
+        body = dumps(content)
+    return Response(content=body, status_code=status_code, media_type=media_type,
+                    headers={"Vary": "Accept"})
+
+
+class NumpyJSONResponse(Response):
+    """JSON response rendered with orjson; rendering is recorded as the 'serialize' stage."""
+
+    media_type = JSON
+
+    def render(self, content) -> bytes:
+        with stage("serialize", "json"):
+            return dumps_json(content)
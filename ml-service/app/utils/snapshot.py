@@ -0,0 +1,384 @@
+"""
+Local Arrow snapshot of the market-data tables read by the trainers and the
+service, synced incrementally from Postgres.
+
+Each table in SNAPSHOT_TABLES is a directory under SNAPSHOT_DIR:
+
+    {table}/manifest.json              — column dtypes, date column, watermark, rows per year
+    {table}/year={YYYY}/part.arrow     — rows of that year, sorted by the table's key
+    {table}/part.arrow                 — undated tables (stocks), rewritten by every sync
+
+Partitions are uncompressed Arrow IPC (Feather v2) files, so a read maps
+them into memory without decoding; the whole price history is tens of MB.
+
+Snapshot.sync() copies a table whole the first time. After that it pulls
+only rows dated on or after watermark - SYNC_OVERLAP_DAYS, so late
+corrections of recent bars are picked up, and those rows replace the
+stored tail. full=True (python -m app.sync_snapshot --full) recopies
+everything, e.g. after a backfill of old history. Postgres numeric columns
+are stored as float64, date/timestamp columns as datetime64[ns], and
+everything else as text.
+
+With DATA_BACKEND=snapshot (the trainers' --data-backend snapshot),
+bulk_read.load_table and data.fetch_returns read synced tables from here.
+Filters are applied with pyarrow compute, and date bounds skip whole year
+partitions. Reads the snapshot cannot answer still go to Postgres: raw SQL
+`where` clauses, computed columns, and tables that have not been synced.
+"""
+
+import importlib.util
+import json
+import os
+import re
+import shutil
+import time
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+try:
+    from .bulk_read import FILTER_OPS, copy_select
+    from .metrics import stage
+except ImportError:
+    from utils.bulk_read import FILTER_OPS, copy_select
+    from utils.metrics import stage
+
+SNAPSHOT_DIR = os.environ.get(
+    "SNAPSHOT_DIR", os.path.join(os.environ.get("MODEL_STORE_DIR", "/tmp/models"), "snapshot")
+)
+SYNC_OVERLAP_DAYS = int(os.environ.get("SNAPSHOT_OVERLAP_DAYS", "7"))
+
+DATA_BACKENDS = ("postgres", "snapshot")
+SNAPSHOT_FORMAT = 1
+
+# table -> (date column for partitions and the watermark, sort key)
+SNAPSHOT_TABLES: Dict[str, Tuple[Optional[str], List[str]]] = {
+    "prices_daily": ("date", ["ticker", "date"]),
+    "commodity_prices": ("date", ["symbol", "date"]),
+    "fx_spot_rates": ("date", ["currency_pair", "date"]),
+    "factor_fundamentals": ("date", ["ticker", "date"]),
+    "short_positions": ("date", ["ticker", "date"]),
+    "shipping_market_rates": ("rate_date", ["index_name", "rate_date"]),
+    "commodity_stock_sensitivity": ("as_of_date", ["ticker", "commodity_symbol", "as_of_date"]),
+    "stocks": (None, ["ticker"]),
+}
+
+# Postgres type OIDs (cursor.description type_code)
+NUMERIC_TYPES = {20, 21, 23, 700, 701, 1700}  # int8, int2, int4, float4, float8, numeric
+DATE_TYPES = {1082, 1114}  # date, timestamp
+SKIP_COLUMNS = {"id"}
+
+HAS_PYARROW = importlib.util.find_spec("pyarrow") is not None
+
+_COLUMN = re.compile(r"^\s*(\w+)(?:\s+AS\s+(\w+))?\s*$", re.IGNORECASE)
+
+
+def data_backend() -> str:
+    """Where load_table and fetch_returns read from: DATA_BACKEND, 'postgres' by default."""
+    backend = os.environ.get("DATA_BACKEND", "postgres")
+    if backend not in DATA_BACKENDS:
+        raise ValueError(f"Unknown DATA_BACKEND {backend!r} (expected one of {DATA_BACKENDS})")
+    return backend
+
+
+def set_data_backend(backend: str):
+    """Select the read backend for this process and the workers it starts."""
+    if backend not in DATA_BACKENDS:
+        raise ValueError(f"Unknown data backend {backend!r} (expected one of {DATA_BACKENDS})")
+    os.environ["DATA_BACKEND"] = backend
+
+
+def open_snapshot(table: str) -> Optional["Snapshot"]:
+    """The snapshot to read `table` from, or None (Postgres backend, or the table is not synced)."""
+    if data_backend() != "snapshot":
+        return None
+    snapshot = Snapshot()
+    return snapshot if snapshot.manifest(table) is not None else None
+
+
+def _source_columns(conn, table: str) -> Tuple[List[str], Dict[str, str]]:
+    """Select-list items and stored dtypes for every column of `table`."""
+    with conn.cursor() as cur:
+        cur.execute(f"SELECT * FROM {table} LIMIT 0")
+        description = [(d[0], d[1]) for d in cur.description]
+    items, dtypes = [], {}
+    for name, type_code in description:
+        if name in SKIP_COLUMNS:
+            continue
+        if type_code in NUMERIC_TYPES:
+            items.append(name)
+            dtypes[name] = "float64"
+        elif type_code in DATE_TYPES:
+            items.append(name)
+            dtypes[name] = "datetime64[ns]"
+        else:
+            items.append(f"{name}::text AS {name}")
+            dtypes[name] = "object"
+    return items, dtypes
+
+
+def _read_partition(path: str):
+    """A partition as an Arrow table backed by the memory-mapped file (no copy)."""
+    import pyarrow as pa
+
+    return pa.ipc.open_file(pa.memory_map(path)).read_all()
+
+
+class Snapshot:
+    """Arrow mirrors of SNAPSHOT_TABLES under one root directory."""
+
+    def __init__(self, root: str = SNAPSHOT_DIR, overlap_days: int = SYNC_OVERLAP_DAYS):
+        if not HAS_PYARROW:
+            raise ImportError("pyarrow is required for the data snapshot")
+        self.root = root
+        self.overlap_days = overlap_days
+
+    def _table_dir(self, table: str) -> str:
+        return os.path.join(self.root, table)
+
+    def manifest(self, table: str) -> Optional[dict]:
+        try:
+            with open(os.path.join(self._table_dir(table), "manifest.json")) as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def watermark(self, table: str) -> Optional[str]:
+        manifest = self.manifest(table)
+        return manifest["watermark"] if manifest else None
+
+    def _partitions(self, table: str, y0: Optional[int] = None, y1: Optional[int] = None) -> List[str]:
+        tdir = self._table_dir(table)
+        if not os.path.isdir(tdir):
+            return []
+        if os.path.exists(os.path.join(tdir, "part.arrow")):
+            return [os.path.join(tdir, "part.arrow")]
+        paths = []
+        for name in sorted(os.listdir(tdir)):
+            if not name.startswith("year="):
+                continue
+            year = int(name[5:])
+            if (y0 is None or year >= y0) and (y1 is None or year <= y1):
+                paths.append(os.path.join(tdir, name, "part.arrow"))
+        return paths
+
+    def _write_partition(self, path: str, frame: pd.DataFrame):
+        import pyarrow as pa
+        import pyarrow.feather as feather
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + ".tmp"
+        feather.write_feather(pa.Table.from_pandas(frame, preserve_index=False), tmp, compression="uncompressed")
+        os.replace(tmp, path)
+
+    def _write_manifest(self, table: str, manifest: dict):
+        path = os.path.join(self._table_dir(table), "manifest.json")
+        with open(path + ".tmp", "w") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(path + ".tmp", path)
+
+    # ------------------------------------------------------------------ sync
+
+    def sync(self, conn, tables: Optional[Iterable[str]] = None, full: bool = False) -> Dict[str, int]:
+        """Sync `tables` (default: all of SNAPSHOT_TABLES); returns rows pulled per table."""
+        return {table: self.sync_table(conn, table, full=full) for table in (tables or SNAPSHOT_TABLES)}
+
+    def sync_table(self, conn, table: str, full: bool = False) -> int:
+        """Pull `table`'s new rows from Postgres into the snapshot; returns the number of rows pulled."""
+        if table not in SNAPSHOT_TABLES:
+            raise ValueError(f"{table} is not a snapshot table (expected one of {list(SNAPSHOT_TABLES)})")
+        date_col, key = SNAPSHOT_TABLES[table]
+        items, dtypes = _source_columns(conn, table)
+        old = None if full else self.manifest(table)
+        if old is not None and old["columns"] != dtypes:
+            print(f"  Snapshot: {table} columns changed, copying it again")
+            old = None
+
+        cutoff = None
+        if old is not None and date_col and old["watermark"]:
+            cutoff = pd.Timestamp(old["watermark"]) - pd.Timedelta(days=self.overlap_days)
+
+        t0 = time.perf_counter()
+        query = f"SELECT {', '.join(items)} FROM {table}"
+        if cutoff is not None:
+            query += f" WHERE {date_col} >= %s"
+        query += f" ORDER BY {', '.join(key)}"
+        frame = copy_select(conn, query, [cutoff.date()] if cutoff is not None else None,
+                            columns=list(dtypes), dtypes=dtypes)
+
+        with stage("serialize", "snapshot_sync"):
+            if cutoff is None:
+                years = self._write_all(table, frame, date_col)
+                created_at = datetime.now().isoformat(timespec="seconds")
+            else:
+                years = self._write_tail(table, frame, date_col, key, cutoff, old["years"])
+                created_at = old["created_at"]
+
+        latest = frame[date_col].max() if date_col and len(frame) else None
+        watermark = old["watermark"] if old is not None else None
+        if latest is not None and not pd.isna(latest):
+            watermark = max(filter(None, [watermark, str(latest)[:10]]))
+        self._write_manifest(table, {
+            "table": table,
+            "format": SNAPSHOT_FORMAT,
+            "date_col": date_col,
+            "key": key,
+            "columns": dtypes,
+            "watermark": watermark,
+            "rows": int(sum(years.values())),
+            "years": years,
+            "created_at": created_at,
+            "synced_at": datetime.now().isoformat(timespec="seconds"),
+        })
+        since = f" from {cutoff.date()}" if cutoff is not None else ""
+        until = f" to {watermark}" if watermark else ""
+        print(f"  Snapshot: {table} pulled {len(frame):,} rows{since} in {time.perf_counter() - t0:.1f}s "
+              f"({sum(years.values()):,} rows{until})")
+        return len(frame)
+
+    def _write_all(self, table: str, frame: pd.DataFrame, date_col: Optional[str]) -> Dict[str, int]:
+        tdir = self._table_dir(table)
+        tmp_dir = tdir + ".building"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        if date_col is None:
+            self._write_partition(os.path.join(tmp_dir, "part.arrow"), frame)
+            years = {"all": len(frame)}
+        else:
+            years = {}
+            for year, rows in frame.groupby(frame[date_col].dt.year, sort=True):
+                self._write_partition(os.path.join(tmp_dir, f"year={year}", "part.arrow"), rows)
+                years[str(year)] = len(rows)
+        if os.path.isdir(tdir):
+            shutil.rmtree(tdir)
+        os.replace(tmp_dir, tdir)
+        return years
+
+    def _write_tail(self, table: str, frame: pd.DataFrame, date_col: str, key: List[str],
+                    cutoff: pd.Timestamp, stored_years: Dict[str, int]) -> Dict[str, int]:
+        """Replace the stored rows dated on or after cutoff with `frame`."""
+        years = dict(stored_years)
+        touched = sorted({y for y in map(int, years) if y >= cutoff.year} |
+                         set(frame[date_col].dt.year.unique().tolist()))
+        for year in touched:
+            path = os.path.join(self._table_dir(table), f"year={year}", "part.arrow")
+            kept = _read_partition(path).to_pandas() if os.path.exists(path) else frame.iloc[:0]
+            kept = kept[kept[date_col] < cutoff]
+            rows = pd.concat([kept, frame[frame[date_col].dt.year == year]], ignore_index=True)
+            rows = rows.sort_values(key, kind="mergesort", ignore_index=True)
+            if len(rows):
+                self._write_partition(path, rows)
+                years[str(year)] = len(rows)
+            elif os.path.exists(path):
+                shutil.rmtree(os.path.dirname(path))
+                years.pop(str(year), None)
+        return years
+
+    # ------------------------------------------------------------------ read
+
+    def covers(self, table: str, columns: Sequence[str], filters: Sequence[tuple] = (),
+               order_by: Optional[str] = None) -> bool:
+        """Whether read() can answer this query: plain (optionally aliased) stored columns only."""
+        manifest = self.manifest(table)
+        if manifest is None:
+            return False
+        matches = [_COLUMN.match(c) for c in columns]
+        if not all(matches):
+            return False
+        needed = [m.group(1) for m in matches] + [f[0] for f in filters]
+        if order_by:
+            needed += [c.strip() for c in order_by.split(",")]
+        return all(c in manifest["columns"] for c in needed)
+
+    def read(self, table: str, columns: Sequence[str], filters: Sequence[tuple] = (),
+             order_by: Optional[str] = None, dtypes: Optional[Dict[str, str]] = None,
+             latest: Optional[int] = None) -> pd.DataFrame:
+        """
+        Rows of a synced table, like bulk_read.load_table: columns are stored
+        column names, optionally 'col AS name'; filters are load_table's
+        (column, op[, value]) tuples; order_by lists stored column names.
+
+        latest=N keeps the N most recent matching rows (order_by should then
+        start with the date column): year partitions are read newest first
+        and the rest are skipped once N rows are in.
+        """
+        import pyarrow as pa
+
+        manifest = self.manifest(table)
+        stored = manifest["columns"]
+        pairs = [_COLUMN.match(c).groups() for c in columns]
+        pairs = [(src, name or src) for src, name in pairs]
+        order = [c.strip() for c in order_by.split(",")] if order_by else []
+        read_cols = list(dict.fromkeys([src for src, _ in pairs] + order))
+
+        expr = _filter_expr(filters, stored)
+        y0, y1 = _year_range(filters, manifest["date_col"])
+        with stage("db_fetch", "snapshot_read"):
+            paths = self._partitions(table, y0, y1)
+            tables, rows = [], 0
+            for path in (reversed(paths) if latest is not None else paths):
+                part = _read_partition(path)
+                part = (part.filter(expr) if expr is not None else part).select(read_cols)
+                if part.num_rows:
+                    tables.append(part)
+                    rows += part.num_rows
+                if latest is not None and rows >= latest:
+                    break
+            if tables:
+                frame = pa.concat_tables(tables).to_pandas()
+            else:
+                frame = pd.DataFrame({c: pd.Series(dtype=stored[c]) for c in read_cols})
+            if order:
+                frame = frame.sort_values(order, kind="mergesort", ignore_index=True)
+            if latest is not None:
+                frame = frame.tail(latest).reset_index(drop=True)
+
+        out = pd.DataFrame({name: frame[src] for src, name in pairs})
+        for name, dtype in (dtypes or {}).items():
+            if name in out.columns and str(out[name].dtype) != dtype:
+                out[name] = out[name].astype(dtype)
+        return out
+
+
+def _year_range(filters: Sequence[tuple], date_col: Optional[str]) -> Tuple[Optional[int], Optional[int]]:
+    """Partition years a query can touch, from its bounds on the table's date column."""
+    y0 = y1 = None
+    for col, op, *value in filters:
+        if col != date_col or not value:
+            continue
+        year = pd.Timestamp(value[0]).year
+        if op in (">", ">=", "="):
+            y0 = year if y0 is None else max(y0, year)
+        if op in ("<", "<=", "="):
+            y1 = year if y1 is None else min(y1, year)
+    return y0, y1
+
+
+def _filter_expr(filters: Sequence[tuple], stored: Dict[str, str]):
+    """load_table filters as one pyarrow dataset expression (None when there are none)."""
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    arrow_types = {"float64": pa.float64(), "datetime64[ns]": pa.timestamp("ns"), "object": pa.string()}
+
+    def scalar(col, value):
+        if stored[col] == "datetime64[ns]":
+            value = pd.Timestamp(value).to_pydatetime()
+        return pa.scalar(value, type=arrow_types[stored[col]])
+
+    expr = None
+    for col, op, *value in filters:
+        if op not in FILTER_OPS:
+            raise ValueError(f"Unknown filter op {op!r} (expected one of {FILTER_OPS})")
+        field = ds.field(col)
+        if op == "not null":
+            term = field.is_valid()
+        elif op == "in":
+            term = field.isin(pa.array([scalar(col, v).as_py() for v in value[0]], type=arrow_types[stored[col]]))
+        else:
+            v = scalar(col, value[0])
+            term = {"=": field == v, "!=": field != v, "<": field < v, "<=": field <= v,
+                    ">": field > v, ">=": field >= v}[op]
+        expr = term if expr is None else expr & term
+    return expr
@@ -0,0 +1,71 @@
+"""
+Warm-started boosting across expanding walk-forward folds (opt-in).
+
+    WARM_ROUNDS            default cap on the extra rounds of a warm fold
+    fold_chains(folds, k)  folds grouped into chains of k: the first fold of a
+                           chain trains from zero (the periodic full retrain),
+                           the others continue the previous fold's boosters;
+                           k=1 is the plain walk-forward
+    run_chain(fn, chain)   fn(spec, init=state) over a chain, threading each
+                           fold's returned 'state' into the next fold
+    xgb_init / lgb_init    a fitted model's booster cut at its best iteration,
+                           to pass as xgb_model= / init_model=
+
+Fold k+1's training rows are fold k's plus one step, so instead of another
+500 trees from zero a warm fold adds at most `warm_rounds` trees fitted to
+the expanded data. Chains are independent, so they are the unit of work for
+utils.parallel.map_tasks: --fold-jobs still parallelises across chains.
+"""
+
+import os
+from typing import Callable, List
+
+WARM_ROUNDS = int(os.environ.get("WARM_ROUNDS", "100"))  # default for the trainers' --warm-rounds
+
+
+def fold_chains(folds: list, retrain_every: int = 1) -> List[list]:
+    """Consecutive runs of `retrain_every` folds (every fold on its own when <= 1)."""
+    k = max(1, retrain_every)
+    return [folds[i:i + k] for i in range(0, len(folds), k)]
+
+
+def run_chain(fn: Callable, chain: list, **kwargs) -> list:
+    """
+    fn(spec, init=state, **kwargs) for each fold of a chain, in order.
+
+    fn returns None (nothing trained, the state carries over) or a dict
+    whose 'state' entry — the fitted models the next fold continues from —
+    is popped before the result is returned, so models never leave the
+    worker process.
+    """
+    results, state = [], None
+    for spec in chain:
+        result = fn(spec, init=state, **kwargs)
+        if result is not None and 'state' in result:
+            state = result.pop('state') or state
+        results.append(result)
+    return results
+
+
+def warm_params(params: dict, rounds: int, key: str = 'n_estimators') -> dict:
+    """params with the boosting rounds capped at `rounds` for a warm fold."""
+    return {**params, key: min(params.get(key, rounds), rounds)}
+
+
+def xgb_init(model):
+    """The model's XGBoost booster up to best_iteration (trees after it are early-stopping overshoot)."""
+    booster = model.get_booster() if hasattr(model, "get_booster") else model
+    best = booster.attr("best_iteration")
+    return booster[:int(best) + 1] if best is not None else booster
+
+
+def lgb_init(model):
+    """The model's LightGBM booster up to best_iteration."""
+    import lightgbm as lgb
+
+    booster = getattr(model, "booster_", model)
+    best = booster.best_iteration
+    if best and best < booster.current_iteration():
+        return lgb.Booster(model_str=booster.model_to_string(num_iteration=best))
+    return booster
+
@@ -9,13 +9,22 @@ Endpoints:
     GET /volatility/var-backtest/{ticker} — VaR backtesting
     GET /volatility/jumps/{ticker}      — Jump detection
     GET /volatility/full/{ticker}       — All models combined
+
+Results keep NumPy arrays and are encoded by utils.serialization: JSON by
+default, MessagePack or Arrow IPC when asked for in the Accept header.
+
+Chart series (regime probabilities, VaR backtest) are downsampled to
+`max_points` with LTTB or min-max buckets; VaR violations, jump days and
+regime switches are always kept.
 """
 
 import traceback
 import numpy as np
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Request
 
 from .utils.data import fetch_returns
+from .utils.serialization import encode_response
+from .utils.downsample import chart_indices, date_indices, take
 from .models.garch import fit_garch
 from .models.regime import fit_regime_model, fit_msgarch
 from .models.var_models import compute_var, compute_var_series
@@ -24,9 +33,13 @@ from .models.jump_detection import detect_jumps
 
 router = APIRouter(prefix="/volatility", tags=["volatility"])
 
+MAX_CHART_POINTS = 500
+VAR_METHODS = ["historical", "parametric", "garch"]
+
 
 @router.get("/garch/{ticker}")
 async def garch_endpoint(
+    request: Request,
     ticker: str,
     limit: int = Query(1260, ge=100, le=5000),
     dist: str = Query("normal", regex="^(normal|t|skewt)$"),
@@ -43,7 +56,7 @@ async def garch_endpoint(
         n_vol = len(result["conditional_vol"])
         result["dates"] = dates[-n_vol:]
 
-        return {"ticker": ticker.upper(), **result}
+        return encode_response(request, {"ticker": ticker.upper(), **result})
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
@@ -52,9 +65,12 @@ async def garch_endpoint(
 
 @router.get("/regime/{ticker}")
 async def regime_endpoint(
+    request: Request,
     ticker: str,
     limit: int = Query(1260, ge=100, le=5000),
     n_states: int = Query(2, ge=2, le=3),
+    max_points: int = Query(MAX_CHART_POINTS, ge=50, le=5000),
+    downsample: str = Query("lttb", regex="^(lttb|minmax)$"),
 ):
     """Fit HMM regime model and return state assignments + transition matrix."""
     try:
@@ -64,14 +80,9 @@ async def regime_endpoint(
 
         result = fit_regime_model(returns, dates=dates, n_states=n_states)
 
-        # Trim state_probs for response size (last 252 points)
-        if len(result["state_probs"]) > 252:
-            result["state_probs"] = result["state_probs"][-252:]
-            result["states"] = result["states"][-252:]
-            if "dates" in result:
-                result["dates"] = result["dates"][-252:]
+        _downsample_regime(result, max_points, downsample)
 
-        return {"ticker": ticker.upper(), **result}
+        return encode_response(request, {"ticker": ticker.upper(), **result})
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
@@ -80,9 +91,12 @@ async def regime_endpoint(
 
 @router.get("/msgarch/{ticker}")
 async def msgarch_endpoint(
+    request: Request,
     ticker: str,
     limit: int = Query(1260, ge=100, le=5000),
     n_states: int = Query(2, ge=2, le=3),
+    max_points: int = Query(MAX_CHART_POINTS, ge=50, le=5000),
+    downsample: str = Query("lttb", regex="^(lttb|minmax)$"),
 ):
     """
     Fit approximate MSGARCH: HMM regime detection + per-regime GARCH(1,1).
@@ -95,14 +109,9 @@ async def msgarch_endpoint(
 
         result = fit_msgarch(returns, dates=dates, n_states=n_states)
 
-        # Trim for response size
-        if len(result["state_probs"]) > 252:
-            result["state_probs"] = result["state_probs"][-252:]
-            result["states"] = result["states"][-252:]
-            if "dates" in result:
-                result["dates"] = result["dates"][-252:]
+        _downsample_regime(result, max_points, downsample)
 
-        return {"ticker": ticker.upper(), **result}
+        return encode_response(request, {"ticker": ticker.upper(), **result})
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
@@ -111,6 +120,7 @@ async def msgarch_endpoint(
 
 @router.get("/var/{ticker}")
 async def var_endpoint(
+    request: Request,
     ticker: str,
     limit: int = Query(1260, ge=100, le=5000),
     window: int = Query(252, ge=60, le=2520),
@@ -122,12 +132,12 @@ async def var_endpoint(
 
         result = compute_var(returns, confidence_levels=[0.95, 0.99], window=window)
 
-        return {
+        return encode_response(request, {
             "ticker": ticker.upper(),
             "n_observations": len(returns),
             "window": window,
             "var": result,
-        }
+        })
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
@@ -136,10 +146,13 @@ async def var_endpoint(
 
 @router.get("/var-backtest/{ticker}")
 async def var_backtest_endpoint(
+    request: Request,
     ticker: str,
     limit: int = Query(1260, ge=252, le=5000),
     confidence: float = Query(0.99, ge=0.9, le=0.999),
     window: int = Query(252, ge=60, le=2520),
+    max_points: int = Query(MAX_CHART_POINTS, ge=50, le=5000),
+    downsample: str = Query("lttb", regex="^(lttb|minmax)$"),
 ):
     """
     Backtest VaR models using Kupiec + Christoffersen tests.
@@ -156,11 +169,11 @@ async def var_backtest_endpoint(
         # Compute rolling VaR series
         var_series = compute_var_series(returns, confidence=confidence, window=window)
 
-        actual = np.array(var_series["actual_returns"])
+        actual = var_series["actual_returns"]
         results = {}
 
-        for method in ["historical", "parametric", "garch"]:
-            var_arr = np.array(var_series[f"{method}_var"])
+        for method in VAR_METHODS:
+            var_arr = var_series[f"{method}_var"]
             # Remove NaN pairs
             mask = ~(np.isnan(actual) | np.isnan(var_arr))
             results[method] = run_backtest(
@@ -169,24 +182,13 @@ async def var_backtest_endpoint(
                 method_name=method.title(),
             )
 
-        # Add the VaR series for charting (subsample for response size)
-        n_points = len(actual)
-        step = max(1, n_points // 500)
-        chart_dates = dates[window::step][:len(actual[::step])]
-
-        return {
+        return encode_response(request, {
             "ticker": ticker.upper(),
             "confidence": confidence,
             "window": window,
             "results": results,
-            "chart": {
-                "dates": chart_dates,
-                "actual_returns": actual[::step].tolist(),
-                "historical_var": np.array(var_series["historical_var"])[::step].tolist(),
-                "parametric_var": np.array(var_series["parametric_var"])[::step].tolist(),
-                "garch_var": np.array(var_series["garch_var"])[::step].tolist(),
-            },
-        }
+            "chart": _var_chart(var_series, dates[window:], max_points, downsample),
+        })
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
@@ -196,6 +198,7 @@ async def var_backtest_endpoint(
 
 @router.get("/jumps/{ticker}")
 async def jumps_endpoint(
+    request: Request,
     ticker: str,
     limit: int = Query(1260, ge=100, le=5000),
     threshold: float = Query(3.0, ge=2.0, le=6.0),
@@ -212,7 +215,7 @@ async def jumps_endpoint(
             threshold_sigma=threshold,
         )
 
-        return {"ticker": ticker.upper(), **result}
+        return encode_response(request, {"ticker": ticker.upper(), **result})
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
@@ -221,8 +224,11 @@ async def jumps_endpoint(
 
 @router.get("/full/{ticker}")
 async def full_endpoint(
+    request: Request,
     ticker: str,
     limit: int = Query(1260, ge=100, le=5000),
+    max_points: int = Query(MAX_CHART_POINTS, ge=50, le=5000),
+    downsample: str = Query("lttb", regex="^(lttb|minmax)$"),
 ):
     """
     Run all volatility models for a ticker. Returns combined results.
@@ -246,6 +252,8 @@ async def full_endpoint(
             lambda: detect_jumps(returns, dates, volumes=volumes), "jumps"
         )
 
+        jump_dates = [j["date"] for j in (jump_result or {}).get("jumps", [])]
+
         # VaR backtest (rolling VaR series + Kupiec/Christoffersen)
         backtest_result = None
         if len(returns) >= 302:  # need window(252) + 50
@@ -253,31 +261,21 @@ async def full_endpoint(
                 bt_confidence = 0.99
                 bt_window = 252
                 var_series = compute_var_series(returns, confidence=bt_confidence, window=bt_window)
-                actual = np.array(var_series["actual_returns"])
+                actual = var_series["actual_returns"]
                 results = {}
-                for method in ["historical", "parametric", "garch"]:
-                    var_arr = np.array(var_series["{}_var".format(method)])
+                for method in VAR_METHODS:
+                    var_arr = var_series["{}_var".format(method)]
                     mask = ~(np.isnan(actual) | np.isnan(var_arr))
                     results[method] = run_backtest(
                         actual[mask], var_arr[mask],
                         confidence=bt_confidence,
                         method_name=method.title(),
                     )
-                # Subsample chart for response size
-                n_pts = len(actual)
-                step = max(1, n_pts // 500)
-                chart_dates = dates[bt_window::step][:len(actual[::step])]
                 return {
                     "confidence": bt_confidence,
                     "window": bt_window,
                     "results": results,
-                    "chart": {
-                        "dates": chart_dates,
-                        "actual_returns": actual[::step].tolist(),
-                        "historical_var": np.array(var_series["historical_var"])[::step].tolist(),
-                        "parametric_var": np.array(var_series["parametric_var"])[::step].tolist(),
-                        "garch_var": np.array(var_series["garch_var"])[::step].tolist(),
-                    },
+                    "chart": _var_chart(var_series, dates[bt_window:], max_points, downsample, jump_dates),
                 }
             backtest_result = _safe_run(_run_backtest, "var_backtest")
 
@@ -286,13 +284,9 @@ async def full_endpoint(
             n_vol = len(garch_result["conditional_vol"])
             garch_result["dates"] = dates[-n_vol:]
         if regime_result and "state_probs" in regime_result:
-            if len(regime_result["state_probs"]) > 252:
-                regime_result["state_probs"] = regime_result["state_probs"][-252:]
-                regime_result["states"] = regime_result["states"][-252:]
-                if "dates" in regime_result:
-                    regime_result["dates"] = regime_result["dates"][-252:]
+            _downsample_regime(regime_result, max_points, downsample, jump_dates)
 
-        return {
+        return encode_response(request, {
             "ticker": ticker.upper(),
             "n_observations": len(returns),
             "garch": garch_result,
@@ -300,7 +294,7 @@ async def full_endpoint(
             "var": var_result,
             "var_backtest": backtest_result,
             "jumps": jump_result,
-        }
+        })
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
@@ -315,3 +309,32 @@ def _safe_run(fn, name: str):
     except Exception as e:
         print(f"[WARN] {name} model failed: {e}")
         return {"error": str(e)}
+
+
+def _var_chart(var_series: dict, dates: list, max_points: int, method: str, jump_dates=()) -> dict:
+    """VaR backtest chart series, downsampled; violations and jump days are always kept."""
+    actual = var_series["actual_returns"]
+    keep = [np.flatnonzero(actual < -var_series[f"{m}_var"]) for m in VAR_METHODS]
+    keep.append(date_indices(dates, jump_dates))
+    idx = chart_indices(actual, max_points, keep=np.concatenate(keep), method=method)
+
+    chart = {"dates": take(dates[:len(actual)], idx), "actual_returns": actual[idx]}
+    for m in VAR_METHODS:
+        chart[f"{m}_var"] = var_series[f"{m}_var"][idx]
+    return chart
+
+
+def _downsample_regime(result: dict, max_points: int, method: str, jump_dates=()):
+    """Downsample state series in place, keeping regime switches and jump days."""
+    states, probs = result["states"], result["state_probs"]
+    switches = np.flatnonzero(np.diff(states) != 0)
+    keep = [switches, switches + 1]
+    if "dates" in result:
+        keep.append(date_indices(result["dates"], jump_dates))
+    # Shape follows the probability of the highest-volatility state
+    idx = chart_indices(probs[:, -1], max_points, keep=np.concatenate(keep), method=method)
+
+    result["states"] = states[idx]
+    result["state_probs"] = probs[idx]
+    if "dates" in result:
+        result["dates"] = take(result["dates"], idx)
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+v8 Phase 2: ATR grid simulation (models.trade_simulator) vs a per-signal day loop.
+
+Builds a synthetic universe of random-walk OHLC series with random signal
+dates (weekends and dates before the ATR warm-up included), then
+
+  1. checks simulate_atr_trades against a plain day-by-day loop over every
+     signal and grid combo (returns must be equal, exit reasons identical)
+  2. times optimize_atr_per_stock over the whole universe
+
+Usage (from ml-service/):
+  python -m benchmarks.bench_atr_optimizer --tickers 200 --signals 60
+"""
+
+import argparse
+import contextlib
+import io
+import time
+
+import numpy as np
+import pandas as pd
+
+from app import alpha_trainer_v8 as v8
+from app.models.trade_simulator import EXIT_MAX_HOLD, EXIT_STOP, EXIT_TARGET
+
+
+def synthetic_universe(n_tickers, n_signals, seed=0):
+    rng = np.random.default_rng(seed)
+    prices, signals = {}, []
+    for t in range(n_tickers):
+        n = int(rng.integers(300, 2000))
+        dates = pd.bdate_range('2016-01-01', periods=n)
+        close = 50 * np.exp(np.cumsum(rng.normal(0, 0.02, n)))
+        frame = pd.DataFrame({
+            'high': close * (1 + np.abs(rng.normal(0, 0.015, n))),
+            'low': close * (1 - np.abs(rng.normal(0, 0.015, n))),
+            'open': close * (1 + rng.normal(0, 0.005, n)),
+            'close': close,
+        }, index=dates)
+        prices[f'T{t:03d}'] = v8.price_arrays(frame)
+        calendar = pd.date_range(dates[0], dates[-1])
+        picks = rng.choice(calendar, min(n_signals, len(calendar)), replace=False)
+        signals.append(pd.DataFrame({'ticker': f'T{t:03d}', 'date': pd.to_datetime(picks)}))
+    return prices, pd.concat(signals, ignore_index=True)
+
+
+def loop_trade(prices, row, target_mult, stop_mult, max_hold):
+    """One trade, day by day (the pre-vectorization algorithm)."""
+    entry, atr = prices['close'][row], prices['atr'][row]
+    if atr <= 0:
+        atr = entry * 0.02
+    target, stop = entry + atr * target_mult, entry - atr * stop_mult
+    n = len(prices['close'])
+    for i in range(row + 1, min(row + max_hold + 1, n)):
+        if prices['close'][i] > entry + atr and stop < entry:
+            stop = entry
+        if prices['low'][i] <= stop:
+            return stop / entry - 1 - 0.003, EXIT_STOP
+        if prices['high'][i] >= target:
+            return target / entry - 1 - 0.003, EXIT_TARGET
+    last = min(row + max_hold, n - 1)
+    return (prices['close'][last] - entry) / entry - 0.003, EXIT_MAX_HOLD
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Vectorized ATR grid simulation')
+    parser.add_argument('--tickers', type=int, default=100)
+    parser.add_argument('--signals', type=int, default=60, help='Signals per ticker')
+    args = parser.parse_args()
+
+    prices, signals = synthetic_universe(args.tickers, args.signals)
+    grid = v8.atr_grid()
+    print(f"{args.tickers} tickers, {len(signals):,} signals, {len(grid)} grid combos\n")
+
+    mismatches, checked = 0, 0
+    for ticker, group in signals.groupby('ticker'):
+        rows = v8.entry_rows(prices[ticker]['dates'], group['date'].values)
+        rows = rows[rows >= 0]
+        trades = v8.simulate_atr_trades(prices[ticker], rows, grid)
+        net, reason = trades['net_return'], trades['reason']
+        for g, params in enumerate(grid):
+            for k, row in enumerate(rows):
+                ref_net, ref_reason = loop_trade(prices[ticker], row, *params)
+                checked += 1
+                if not (np.isclose(ref_net, net[g, k], rtol=0, atol=1e-12) and ref_reason == reason[g, k]):
+                    mismatches += 1
+    print(f"  simulate_atr_trades vs day loop: {checked:,} trades, {mismatches} mismatches")
+
+    t0 = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = v8.optimize_atr_per_stock(signals, prices)
+    print(f"  optimize_atr_per_stock: {len(results)} stocks in {time.perf_counter() - t0:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+prices_daily loads: pd.read_sql vs utils.bulk_read.load_table.
+
+Fills a TEMP table named prices_daily (it shadows the real table for this
+session only, so the benchmark is safe to point at the production
+DATABASE_URL and measures the real network transfer) with synthetic daily
+bars, then loads it the way the trainers did — read_sql of an f-string
+query — and through load_table's COPY path. Prints rows/s of each and
+checks that both return the same values.
+
+Usage (from ml-service/):
+  DATABASE_URL=postgresql://... python -m benchmarks.bench_bulk_read --tickers 200 --days 2500
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import psycopg2
+
+from app.utils.bulk_read import load_table
+from app.utils.bulk_write import copy_upsert
+
+COLUMNS = ['ticker', 'date', 'open', 'high', 'low', 'close', 'volume']
+
+
+def fill(conn, n_tickers, n_days, seed=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range('2015-01-01', periods=n_days)
+    with conn.cursor() as cur:
+        cur.execute("DROP TABLE IF EXISTS pg_temp.prices_daily")
+        cur.execute("""
+            CREATE TEMP TABLE prices_daily (
+              ticker VARCHAR(20) NOT NULL,
+              date DATE NOT NULL,
+              open NUMERIC(12,4), high NUMERIC(12,4), low NUMERIC(12,4), close NUMERIC(12,4),
+              volume BIGINT,
+              PRIMARY KEY (ticker, date)
+            )
+        """)
+    rows = []
+    for t in range(n_tickers):
+        close = 50 * np.exp(np.cumsum(rng.normal(0, 0.02, n_days)))
+        volume = rng.integers(0, 1_000_000, n_days)
+        rows.extend((f'T{t:03d}', d.date(), round(c * 0.99, 4), round(c * 1.02, 4), round(c * 0.98, 4),
+                     round(c, 4), int(v)) for d, c, v in zip(dates, close, volume))
+    with contextlib.redirect_stdout(io.StringIO()):
+        copy_upsert(conn, 'prices_daily', COLUMNS, rows, ['ticker', 'date'])
+    return len(rows)
+
+
+def read_sql_prices(conn, tickers):
+    """The trainers' previous loader: read_sql of an f-string query."""
+    tickers_sql = ",".join(f"'{t}'" for t in tickers)
+    return pd.read_sql(f"""
+        SELECT ticker, date, open, high, low, close, volume
+        FROM prices_daily
+        WHERE close > 0 AND volume >= 0
+          AND date >= '2018-01-01'
+          AND ticker IN ({tickers_sql})
+        ORDER BY ticker, date
+    """, conn, parse_dates=['date'])
+
+
+def copy_prices(conn, tickers):
+    return load_table(conn, 'prices_daily', COLUMNS, since='2018-01-01', tickers=tickers,
+                      where="close > 0 AND volume >= 0")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='read_sql vs COPY loads of prices_daily')
+    parser.add_argument('--tickers', type=int, default=200)
+    parser.add_argument('--days', type=int, default=2500)
+    parser.add_argument('--dsn', default=os.environ.get('DATABASE_URL'))
+    args = parser.parse_args()
+    if not args.dsn:
+        parser.error('Set DATABASE_URL or pass --dsn')
+
+    conn = psycopg2.connect(args.dsn)
+    n = fill(conn, args.tickers, args.days)
+    tickers = [f'T{t:03d}' for t in range(args.tickers)]
+    print(f"{n:,} rows in prices_daily ({args.tickers} tickers x {args.days} days)\n")
+
+    frames = {}
+    for name, load in [('read_sql', read_sql_prices), ('copy', copy_prices)]:
+        t0 = time.perf_counter()
+        frames[name] = load(conn, tickers)
+        elapsed = time.perf_counter() - t0
+        print(f"  {name:<8s} {elapsed:7.2f}s {len(frames[name]) / elapsed:10,.0f} rows/s "
+              f"({len(frames[name]):,} rows)")
+
+    a, b = frames['read_sql'], frames['copy']
+    same = (a.shape == b.shape and (a['ticker'].values == b['ticker'].values).all()
+            and (a['date'].values == b['date'].values).all()
+            and np.allclose(a[COLUMNS[2:]].astype(float).values, b[COLUMNS[2:]].values))
+    print(f"\n  frames equal: {same}")
+    conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+alpha_signals upserts: 500-row mogrify INSERTs vs utils.bulk_write.copy_upsert.
+
+Writes the same synthetic walk-forward signals (ticker x date, JSON
+metadata, some repeated keys) both ways into a TEMP table named
+alpha_signals — it shadows the real table for this session only, so the
+benchmark is safe to point at the production DATABASE_URL and measures the
+real network round trips. Prints rows/s of each path and checks that both
+end with the same table contents.
+
+Usage (from ml-service/):
+  DATABASE_URL=postgresql://... python -m benchmarks.bench_bulk_write --rows 100000
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import psycopg2
+
+from app.utils.bulk_write import copy_upsert
+
+COLUMNS = ['ticker', 'signal_date', 'model_id', 'horizon', 'signal_value',
+           'predicted_return', 'confidence', 'feature_importance', 'metadata']
+KEY = ['ticker', 'signal_date', 'model_id', 'horizon']
+
+
+def synthetic_signals(n_rows, seed=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range('2010-01-01', periods=n_rows // 250 + 1)
+    rows = [
+        (f'T{i % 250:03d}', dates[i // 250].date(), 'bench_model', '21d',
+         round(float(rng.uniform(-1, 1)), 4), round(float(rng.normal(0, 0.05)), 4),
+         round(float(rng.uniform()), 4), '{}', json.dumps({'fold': int(i % 7)}))
+        for i in range(n_rows)
+    ]
+    # a later run's rewrite of some keys: the last row must win
+    return rows + [r[:4] + (0.5,) + r[5:] for r in rows[::97]]
+
+
+def reset(conn):
+    with conn.cursor() as cur:
+        cur.execute("DROP TABLE IF EXISTS pg_temp.alpha_signals")
+        cur.execute("""
+            CREATE TEMP TABLE alpha_signals (
+              id BIGSERIAL PRIMARY KEY,
+              ticker VARCHAR(20) NOT NULL,
+              signal_date DATE NOT NULL,
+              model_id VARCHAR(50) NOT NULL,
+              horizon VARCHAR(10) DEFAULT '20d',
+              signal_value NUMERIC(8,6) NOT NULL,
+              predicted_return NUMERIC(12,6),
+              confidence NUMERIC(5,4),
+              feature_importance JSONB,
+              metadata JSONB DEFAULT '{}',
+              UNIQUE (ticker, signal_date, model_id, horizon)
+            )
+        """)
+    conn.commit()
+
+
+def mogrify_upsert(conn, rows):
+    """The trainers' previous writer: one INSERT ... ON CONFLICT per 500 rows."""
+    cur = conn.cursor()
+    for i in range(0, len(rows), 500):
+        values = ','.join(cur.mogrify("(%s,%s,%s,%s,%s,%s,%s,%s::jsonb,%s::jsonb)", row).decode()
+                          for row in rows[i:i + 500])
+        cur.execute(f"""
+            INSERT INTO alpha_signals ({', '.join(COLUMNS)}) VALUES {values}
+            ON CONFLICT ({', '.join(KEY)}) DO UPDATE SET
+                signal_value = EXCLUDED.signal_value, predicted_return = EXCLUDED.predicted_return,
+                confidence = EXCLUDED.confidence, feature_importance = EXCLUDED.feature_importance,
+                metadata = EXCLUDED.metadata
+        """)
+    conn.commit()
+
+
+def contents(conn):
+    with conn.cursor() as cur:
+        cur.execute(f"SELECT {', '.join(COLUMNS)} FROM alpha_signals ORDER BY {', '.join(KEY)}")
+        return cur.fetchall()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='mogrify INSERT vs COPY upserts into alpha_signals')
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--dsn', default=os.environ.get('DATABASE_URL'))
+    args = parser.parse_args()
+    if not args.dsn:
+        parser.error('Set DATABASE_URL or pass --dsn')
+
+    rows = synthetic_signals(args.rows)
+    conn = psycopg2.connect(args.dsn)
+    print(f"{len(rows):,} rows ({args.rows:,} keys)\n")
+
+    results = {}
+    for name, write in [('mogrify', mogrify_upsert),
+                        ('copy', lambda c, r: copy_upsert(c, 'alpha_signals', COLUMNS, r, KEY))]:
+        reset(conn)
+        t0 = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            write(conn, rows)
+        elapsed = time.perf_counter() - t0
+        results[name] = contents(conn)
+        print(f"  {name:<8s} {elapsed:7.2f}s {len(rows) / elapsed:10,.0f} rows/s")
+
+    same = results['mogrify'] == results['copy']
+    print(f"\n  table contents identical: {same} ({len(results['copy']):,} rows)")
+    conn.close()
+
+
+if __name__ == '__main__':
+    main()
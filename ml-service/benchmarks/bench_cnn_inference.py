@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: CNN signal inference latency.
+
+Compares the old per-ticker loop (one 1x60x1 forward pass per asset)
+against the batched single-pass scorer for each inference backend.
+Uses random weights and synthetic returns — no database needed.
+
+Usage (from ml-service/):
+  python -m benchmarks.bench_cnn_inference
+  python -m benchmarks.bench_cnn_inference --tickers 250 --repeats 50
+"""
+
+import argparse
+import time
+
+import numpy as np
+import torch
+
+from app.models.cnn_signal import ReturnCNN, build_cnn_model, score_cnn_windows, INFERENCE_BACKENDS
+
+
+def _per_ticker_loop(model, returns_matrix, tickers, window):
+    """Baseline: the pre-batching scoring loop."""
+    signals = {}
+    for j, ticker in enumerate(tickers):
+        x = torch.FloatTensor(returns_matrix[-window:, j]).unsqueeze(0).unsqueeze(-1)
+        with torch.no_grad():
+            signals[ticker] = float(model(x).item())
+    return signals
+
+
+def _time(fn, repeats):
+    fn()  # warm-up
+    t0 = time.perf_counter()
+    for _ in range(repeats):
+        out = fn()
+    return (time.perf_counter() - t0) / repeats, out
+
+
+def main():
+    parser = argparse.ArgumentParser(description='CNN inference micro-benchmark')
+    parser.add_argument('--tickers', type=int, default=250)
+    parser.add_argument('--window', type=int, default=60)
+    parser.add_argument('--repeats', type=int, default=20)
+    parser.add_argument('--threads', type=int, default=1)
+    args = parser.parse_args()
+
+    torch.set_num_threads(args.threads)
+    torch.manual_seed(0)
+    rng = np.random.default_rng(0)
+
+    tickers = [f'T{i:03d}' for i in range(args.tickers)]
+    returns_matrix = rng.normal(0, 0.02, size=(args.window + 10, args.tickers))
+    state = ReturnCNN(window=args.window).state_dict()
+
+    eager = build_cnn_model(state, window=args.window)
+    base_s, base_sig = _time(lambda: _per_ticker_loop(eager, returns_matrix, tickers, args.window), args.repeats)
+    base = np.array([base_sig[t] for t in tickers])
+
+    print(f"{args.tickers} tickers, window={args.window}, threads={args.threads}")
+    print(f"{'mode':<24s} {'total ms':>10s} {'us/ticker':>10s} {'speedup':>8s} {'max |diff|':>11s}")
+    print(f"{'loop (eager)':<24s} {base_s * 1e3:10.2f} {base_s / args.tickers * 1e6:10.1f} {1.0:8.1f} {0.0:11.2e}")
+
+    for backend in INFERENCE_BACKENDS:
+        model = build_cnn_model(state, window=args.window, backend=backend)
+        secs, sig = _time(lambda: score_cnn_windows(model, returns_matrix, tickers, args.window), args.repeats)
+        diff = np.max(np.abs(np.array([sig[t] for t in tickers]) - base))
+        print(f"{'batched (' + backend + ')':<24s} {secs * 1e3:10.2f} {secs / args.tickers * 1e6:10.1f} "
+              f"{base_s / secs:8.1f} {diff:11.2e}")
+
+
+if __name__ == '__main__':
+    main()
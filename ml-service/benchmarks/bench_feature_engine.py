@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Incremental feature engine vs the batch feature pass, on synthetic prices.
+
+For each synthetic ticker the trainer's batch function (compute_features for
+v8, ticker_features for v6/v7) runs over the full history, and the trainer's
+feature state class replays the same bars one at a time. Reported:
+
+  batch s       full-history batch pass for one ticker
+  day ms        one new bar through a warm state (what the daily job pays)
+  day+ckpt ms   the same including checkpoint load and save (StateStore);
+                only under pandas 2.2, where advance() streams (EXACT_PANDAS)
+  exact         feature columns whose streamed values equal the batch values
+                bit for bit on every row (NaN == NaN)
+
+Each trainer module is imported on its own (they rebind sys.stdout), so run
+one trainer per invocation.
+
+Usage (from ml-service/):
+  python -m benchmarks.bench_feature_engine
+  python -m benchmarks.bench_feature_engine --trainer v6 --days 1000 --tickers 2
+"""
+
+import argparse
+import importlib
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.utils.feature_engine import EXACT_PANDAS, StateStore, advance, compare_frames, replay
+
+
+def synthetic_prices(n_days, seed):
+    """OHLCV random walk with a flat stretch and zero-volume days, plus an OBX close series."""
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range('2018-01-01', periods=n_days)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, n_days)))
+    close[n_days // 3:n_days // 3 + 10] = close[n_days // 3 - 1]
+    df = pd.DataFrame({
+        'ticker': f'SYN{seed}',
+        'date': dates,
+        'open': close * (1 + rng.normal(0, 0.005, n_days)),
+        'high': close * (1 + np.abs(rng.normal(0, 0.01, n_days))),
+        'low': close * (1 - np.abs(rng.normal(0, 0.01, n_days))),
+        'close': close,
+        'volume': rng.integers(0, 1_000_000, n_days).astype(float),
+    })
+    df.loc[n_days // 2:n_days // 2 + 4, 'volume'] = 0.0
+    listed = rng.random(n_days) > 0.03  # OBX missing on a few dates
+    obx = pd.DataFrame({'date': dates[listed],
+                        'obx_close': 1000 * np.exp(np.cumsum(rng.normal(0, 0.01, listed.sum())))})
+    return df, obx
+
+
+def _v8_case(mod, df, obx):
+    prices = df.set_index('date')
+    obx_returns = obx.set_index('date')['obx_close'].pct_change().dropna()
+    batch = lambda: mod.compute_features(prices, obx_returns=obx_returns)
+    bars = mod.feature_bars(prices, obx_returns)
+    return batch, bars, mod.V8FeatureState
+
+
+def _ticker_case(mod, df, obx):
+    batch = lambda: mod.ticker_features(df.copy(), obx, 'Energy')
+    bars = mod.feature_bars(df, obx)
+    return batch, bars, lambda: mod.TickerFeatureState('Energy')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Incremental vs batch feature computation')
+    parser.add_argument('--trainer', choices=['v8', 'v6', 'v7'], default='v8')
+    parser.add_argument('--days', type=int, default=1500)
+    parser.add_argument('--tickers', type=int, default=3)
+    parser.add_argument('--repeats', type=int, default=20)
+    args = parser.parse_args()
+
+    mod = importlib.import_module(f'app.alpha_trainer_{args.trainer}')
+    make_case = _v8_case if args.trainer == 'v8' else _ticker_case
+
+    print(f"{'ticker':<8s} {'batch s':>8s} {'day ms':>8s} {'day+ckpt ms':>12s} {'speedup':>8s} {'exact':>8s}")
+    if not EXACT_PANDAS:
+        print(f"pandas {pd.__version__} is not 2.2: advance() would serve batch rows, day+ckpt not timed\n")
+    mismatched = set()
+    for seed in range(args.tickers):
+        df, obx = synthetic_prices(args.days, seed)
+        batch_fn, bars, make_state = make_case(mod, df, obx)
+
+        t0 = time.perf_counter()
+        batch = batch_fn()
+        batch_s = time.perf_counter() - t0
+
+        state = make_state()
+        replay(state, bars.iloc[:-1])
+        snapshot = state.state_dict()
+        t0 = time.perf_counter()
+        for _ in range(args.repeats):
+            state.load_state_dict(snapshot)
+            state.step(bars.iloc[-1].to_dict())
+        day_s = (time.perf_counter() - t0) / args.repeats
+        streamed = replay(make_state(), bars)
+
+        ckpt_s = float('nan')
+        if EXACT_PANDAS:
+            store = StateStore(tempfile.mkdtemp())
+            advance(store, args.trainer, 'bench', lambda t: make_state(), {'SYN': bars.iloc[:-1]})
+            t0 = time.perf_counter()
+            advance(store, args.trainer, 'bench', lambda t: make_state(), {'SYN': bars})
+            ckpt_s = time.perf_counter() - t0
+
+        columns = [c for c in streamed.columns if c in batch.columns and c != 'sector']
+        report = compare_frames(batch, streamed, columns)
+        exact = report['exact'] == report['rows']
+        mismatched.update(report.loc[~exact, 'feature'])
+        print(f"SYN{seed:<5d} {batch_s:8.2f} {day_s * 1e3:8.2f} {ckpt_s * 1e3:12.2f} "
+              f"{batch_s / day_s:7.0f}x {int(exact.sum()):>3d}/{len(columns):<4d}")
+
+    if mismatched:
+        print(f"\nNot bit-identical: {', '.join(sorted(mismatched))}")
+    else:
+        print("\nAll streamed features equal the batch pass bit for bit.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Per-ticker feature stage: the old serial loop vs map_tickers at several worker counts.
+
+A synthetic panel (prices of every ticker interleaved by date, as
+prices_daily returns them, plus OBX and fundamentals) goes through the
+trainer's per-ticker unit three ways:
+
+  scan      the original loop: prices[prices.ticker == t] per ticker, serial
+  jobs=N    TickerFrames + map_tickers with N worker processes
+
+The concatenated outputs must be identical (DataFrame.equals, same column
+order and dtypes) to the serial run for every N.
+
+Each trainer module is imported on its own (they rebind sys.stdout), so run
+one trainer per invocation.
+
+Usage (from ml-service/):
+  python -m benchmarks.bench_feature_parallel --trainer v6 --tickers 40
+  python -m benchmarks.bench_feature_parallel --trainer v8 --tickers 120 --jobs 1 2 4 8
+"""
+
+import argparse
+import importlib
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.utils.parallel import TickerFrames, map_tickers
+from benchmarks.bench_feature_engine import synthetic_prices
+
+
+def synthetic_panel(n_tickers, n_days):
+    frames, obx = [], None
+    for seed in range(n_tickers):
+        df, obx_seed = synthetic_prices(n_days, seed)
+        df['ticker'] = f'T{seed:03d}'
+        frames.append(df)
+        obx = obx_seed if obx is None else obx
+    prices = pd.concat(frames).sort_values(['date', 'ticker'], kind='stable').reset_index(drop=True)
+    rng = np.random.default_rng(0)
+    quarters = pd.date_range(prices['date'].min(), prices['date'].max(), freq='QS')
+    fundamentals = pd.DataFrame([
+        {'ticker': t, 'date': d, 'ep': rng.normal(0.08, 0.03), 'bm': rng.normal(0.6, 0.2),
+         'dy': rng.normal(0.04, 0.01), 'sp': rng.normal(0.9, 0.3), 'ev_ebitda': rng.normal(8, 2),
+         'mktcap': rng.uniform(1e9, 1e11)}
+        for t in sorted(prices['ticker'].unique()) for d in quarters])
+    return prices, obx, fundamentals
+
+
+def _case(trainer, mod, prices, obx, fundamentals):
+    """(per-ticker fn, shared inputs, old serial loop) for a trainer."""
+    tickers = sorted(prices['ticker'].unique())
+    if trainer in ('v4', 'v5'):
+        def scan():
+            return [mod.ticker_features(t, prices[prices.ticker == t].copy()) for t in tickers]
+        return tickers, mod.ticker_features, {}, scan
+    if trainer in ('v6', 'v7'):
+        sector_map = {t: 'Energy' for t in tickers}
+
+        def scan():
+            out = []
+            for t in tickers:
+                df = prices[prices.ticker == t].copy().sort_values('date').reset_index(drop=True)
+                out.append(mod.ticker_features(df, obx, sector_map.get(t, 'Unknown'))
+                           if len(df) >= mod.MIN_TRAIN else None)
+            return out
+        return tickers, mod.engineer_ticker, {'obx': obx, 'sector_map': sector_map}, scan
+
+    obx_returns = obx.set_index('date')['obx_close'].pct_change().dropna()
+    shared = {'obx_returns': obx_returns, 'fundamentals': TickerFrames(fundamentals)}
+    return tickers, mod.ticker_panel, shared, \
+        lambda: [mod.ticker_panel(t, prices[prices['ticker'] == t].copy(), **shared) for t in tickers]
+
+
+def _concat(results):
+    return pd.concat([r for r in results if r is not None], ignore_index=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serial vs process-pool per-ticker features')
+    parser.add_argument('--trainer', choices=['v4', 'v5', 'v6', 'v7', 'v8'], default='v8')
+    parser.add_argument('--tickers', type=int, default=60)
+    parser.add_argument('--days', type=int, default=1500)
+    parser.add_argument('--jobs', type=int, nargs='+', default=[1, 2, 4])
+    args = parser.parse_args()
+
+    module = {'v4': 'alpha_trainer'}.get(args.trainer, f'alpha_trainer_{args.trainer}')
+    mod = importlib.import_module(f'app.{module}')
+    prices, obx, fundamentals = synthetic_panel(args.tickers, args.days)
+    tickers, fn, shared, scan = _case(args.trainer, mod, prices, obx, fundamentals)
+    print(f"{args.trainer}: {args.tickers} tickers x {args.days} days ({len(prices):,} price rows)\n")
+
+    t0 = time.perf_counter()
+    reference = _concat(scan())
+    t_scan = time.perf_counter() - t0
+    print(f"{'run':<10s} {'s':>8s} {'speedup':>8s} {'identical':>10s}")
+    print(f"{'scan':<10s} {t_scan:8.2f} {1:7.1f}x {'-':>10s}")
+
+    for jobs in args.jobs:
+        t0 = time.perf_counter()
+        frames = TickerFrames(prices)
+        out = _concat(map_tickers(fn, frames, tickers, jobs=jobs, shared=shared))
+        elapsed = time.perf_counter() - t0
+        print(f"{f'jobs={jobs}':<10s} {elapsed:8.2f} {t_scan / elapsed:7.1f}x {str(out.equals(reference)):>10s}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Trainer feature memory: float64 DataFrame vs the compact float32 Panel.
+
+Builds per-ticker feature frames the way engineer_ticker returns them
+(float64 columns, string tickers), concatenates them and walks v7-style
+expanding monthly folds over the result:
+
+  frame   pd.concat of the float64 frames; the fold matrix is
+          frame[cols].values and every fold takes its train / test rows
+          with DateSlicer + take_rows (copies)
+  panel   each ticker frame downcast to float32 before the concat, packed
+          into utils.panel.Panel; folds are BlockSlicer ranges, taken as
+          views of the panel's matrix
+
+Each mode runs in its own process so its peak RSS per stage (utils.memory)
+is its own. Also prints the bytes each mode copies per fold.
+
+Usage (from ml-service/):
+  python -m benchmarks.bench_panel --tickers 300 --days 2500 --features 100
+"""
+
+import argparse
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.utils.folds import DateSlicer, take_rows
+from app.utils.memory import MemoryLog
+from app.utils.panel import Panel, downcast
+
+MIN_TRAIN = 504
+STEP = 21
+
+
+def ticker_frames(n_tickers, n_days, n_features, seed=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range('2015-01-01', periods=n_days)
+    cols = [f'f{i:03d}' for i in range(n_features)]
+    for t in range(n_tickers):
+        start = int(rng.integers(0, n_days // 4))  # listings start at different dates
+        n = n_days - start
+        frame = pd.DataFrame(rng.normal(size=(n, n_features)), columns=cols)
+        frame.insert(0, 'ticker', f'T{t:03d}')
+        frame.insert(1, 'date', dates[start:])
+        frame['close'] = 50 * np.exp(np.cumsum(rng.normal(0, 0.02, n)))
+        frame['target'] = rng.random(n)
+        yield frame
+
+
+def folds(dates):
+    unique = np.unique(dates)
+    for i in range(MIN_TRAIN, len(unique) - STEP, STEP):
+        yield unique[i - 5], unique[i], unique[i + STEP - 1]
+
+
+def walk(X, slicer, dates):
+    """Take every fold's train and test rows; (folds, bytes copied, seconds)."""
+    n, copied, t0 = 0, 0, time.perf_counter()
+    for train_end, test_start, test_end in folds(dates):
+        for rows in (slicer.rows(end=train_end), slicer.rows(test_start, test_end)):
+            block = take_rows(X, rows)
+            copied += 0 if np.shares_memory(block, X) else block.nbytes
+        n += 1
+    return n, copied, time.perf_counter() - t0
+
+
+def run(mode, args):
+    mem = MemoryLog(budget_gb=args.budget)
+    cols = [f'f{i:03d}' for i in range(args.features)]
+    with mem.stage('features'):
+        frames = ticker_frames(args.tickers, args.days, args.features)
+        frame = pd.concat(frames if mode == 'frame' else (downcast(f) for f in frames), ignore_index=True)
+    if mode == 'frame':
+        with mem.stage('matrix'):
+            X, slicer, dates = frame[cols].values, DateSlicer(frame['date']), frame['date'].to_numpy()
+            held = frame.memory_usage(deep=True).sum()
+            held += 0 if np.shares_memory(X, frame[cols[0]].values) else X.nbytes
+    else:
+        with mem.stage('matrix'):
+            frame = Panel.from_frame(frame, cols, keep=['target'])
+            X, slicer, dates = frame.X, frame.slicer(), frame.dates
+            held = frame.nbytes
+    with mem.stage('folds'):
+        n, copied, elapsed = walk(X, slicer, dates)
+    print(f"  {mode:<6s} {len(X):,} rows x {len(cols)} features, {held / 2**20:8,.0f} MB held, "
+          f"{n} folds: {copied / max(n, 1) / 2**20:8,.1f} MB copied per fold, {elapsed:6.2f}s")
+    mem.report()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='float64 DataFrame vs compact float32 Panel')
+    parser.add_argument('--tickers', type=int, default=300)
+    parser.add_argument('--days', type=int, default=2500)
+    parser.add_argument('--features', type=int, default=100)
+    parser.add_argument('--budget', type=float, default=8, help='GB, for the over-budget markers')
+    parser.add_argument('--mode', choices=['frame', 'panel'], default=None,
+                        help='Run one mode in this process (default: each in a subprocess)')
+    args = parser.parse_args()
+    if args.mode:
+        run(args.mode, args)
+        return
+    for mode in ('frame', 'panel'):
+        print(f"\n[{mode}]", flush=True)
+        subprocess.run([sys.executable, '-m', 'benchmarks.bench_panel', '--mode', mode,
+                        '--tickers', str(args.tickers), '--days', str(args.days),
+                        '--features', str(args.features), '--budget', str(args.budget)], check=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+prices_daily reads: Postgres (COPY) vs the local Arrow snapshot.
+
+Fills a TEMP table named prices_daily (it shadows the real table for this
+session only, so the benchmark is safe to point at the production
+DATABASE_URL) with synthetic daily bars, syncs it into a snapshot in a
+temporary directory, then times through bulk_read.load_table with each
+DATA_BACKEND
+
+  1. the trainers' full-universe load (since 2018, close > 0)
+  2. the latest 1260 bars of single tickers, as utils.data.fetch_returns
+     reads them (Postgres timed on an open connection; fetch_returns also
+     connects per call)
+
+and checks that both backends return the same frames. Also times an
+incremental sync after one new day of bars.
+
+Usage (from ml-service/):
+  DATABASE_URL=postgresql://... python -m benchmarks.bench_snapshot --tickers 250 --days 5000
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+import psycopg2
+
+from app.utils.bulk_read import copy_select, load_table
+from app.utils.snapshot import Snapshot, set_data_backend
+
+from .bench_bulk_read import COLUMNS, fill
+
+
+def timed(fn, repeat=1):
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        out = fn()
+    return out, (time.perf_counter() - t0) / repeat
+
+
+def latest_bars(conn, ticker, from_snapshot, snapshot, limit=1260):
+    """fetch_returns' read of one ticker through either backend."""
+    if from_snapshot:
+        return snapshot.read('prices_daily', COLUMNS[1:], [('ticker', '=', ticker), ('close', '>', 0)],
+                             order_by='date', latest=limit)
+    frame = copy_select(conn, """
+        SELECT date, open, high, low, close, volume FROM prices_daily
+        WHERE ticker = %s AND close > 0 ORDER BY date DESC LIMIT %s
+    """, (ticker, limit), columns=COLUMNS[1:])
+    return frame.iloc[::-1].reset_index(drop=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Postgres vs local Arrow snapshot reads of prices_daily')
+    parser.add_argument('--tickers', type=int, default=250)
+    parser.add_argument('--days', type=int, default=5000)
+    parser.add_argument('--dsn', default=os.environ.get('DATABASE_URL'))
+    args = parser.parse_args()
+    if not args.dsn:
+        parser.error('Set DATABASE_URL or pass --dsn')
+
+    conn = psycopg2.connect(args.dsn)
+    n = fill(conn, args.tickers, args.days)
+    tickers = [f'T{t:03d}' for t in range(args.tickers)]
+    sample = tickers[::max(1, len(tickers) // 20)]
+    print(f"{n:,} rows in prices_daily ({args.tickers} tickers x {args.days} days)\n")
+
+    with tempfile.TemporaryDirectory() as root:
+        os.environ['SNAPSHOT_DIR'] = root
+        snapshot = Snapshot(root)
+        with contextlib.redirect_stdout(io.StringIO()):
+            _, t_sync = timed(lambda: snapshot.sync(conn, ['prices_daily']))
+        print(f"  initial sync       {t_sync:7.2f}s")
+
+        frames = {}
+        for backend in ('postgres', 'snapshot'):
+            set_data_backend(backend)
+            if backend == 'snapshot':
+                # open_snapshot() reads SNAPSHOT_DIR through the module default
+                Snapshot.__init__.__defaults__ = (root, snapshot.overlap_days)
+            universe, t_all = timed(lambda: load_table(conn, 'prices_daily', COLUMNS, since='2018-01-01',
+                                                       filters=[('close', '>', 0)]))
+            singles, t_one = timed(lambda: [latest_bars(conn, t, backend == 'snapshot', snapshot) for t in sample])
+            frames[backend] = (universe, singles)
+            print(f"  {backend:<9s} universe {t_all:7.3f}s ({len(universe) / t_all:12,.0f} rows/s)   "
+                  f"per ticker {t_one / len(sample) * 1e3:7.2f} ms")
+
+        _, t_conn = timed(lambda: psycopg2.connect(args.dsn).close(), repeat=5)
+        print(f"  postgres connect {t_conn * 1e3:7.2f} ms (paid by every fetch_returns call)")
+
+        (a, sa), (b, sb) = frames['postgres'], frames['snapshot']
+        same = a.equals(b) and all(x.equals(y) for x, y in zip(sa, sb))
+        print(f"\n  frames equal: {same}")
+
+        set_data_backend('postgres')
+        with conn.cursor() as cur:
+            cur.execute("""
+                INSERT INTO prices_daily (ticker, date, open, high, low, close, volume)
+                SELECT ticker, date + 1, open, high, low, close, volume FROM prices_daily
+                WHERE date = (SELECT MAX(date) FROM prices_daily)
+            """)
+        conn.commit()
+        with contextlib.redirect_stdout(io.StringIO()):
+            pulled, t_inc = timed(lambda: snapshot.sync_table(conn, 'prices_daily'))
+        print(f"  incremental sync   {t_inc:7.2f}s ({pulled:,} rows pulled)")
+    conn.close()
+
+
+if __name__ == '__main__':
+    main()
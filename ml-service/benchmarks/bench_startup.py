@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Cold-start benchmark and import-time profile for the ML service.
+
+Each scenario imports app.main in a fresh interpreter — what every uvicorn
+worker does at boot — and records import time, process wall time and peak RSS:
+
+  eager (before)     app.main plus the libraries the service used to import
+                     up front (torch, sklearn, xgboost, lightgbm, shap, arch, hmmlearn)
+  lazy, all routers  ML_ROUTERS=all
+  lazy, volatility   ML_ROUTERS=volatility
+
+--profile adds the slowest imports made by app.main, from `python -X importtime`.
+
+Usage (from ml-service/):
+  python -m benchmarks.bench_startup
+  python -m benchmarks.bench_startup --repeats 5 --profile
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+EAGER_IMPORTS = [
+    "torch", "sklearn.preprocessing", "sklearn.model_selection", "sklearn.cluster",
+    "xgboost", "lightgbm", "shap", "arch", "hmmlearn.hmm",
+]
+
+SCENARIOS = [
+    ("eager (before)", "all", EAGER_IMPORTS),
+    ("lazy, all routers", "all", []),
+    ("lazy, volatility", "volatility", []),
+]
+
+_CHILD = """
+import importlib, json, resource, sys, time
+t0 = time.perf_counter()
+for name in sys.argv[1:]:
+    try:
+        importlib.import_module(name)
+    except ImportError:
+        pass
+import app.main
+print(json.dumps({"seconds": time.perf_counter() - t0,
+                  "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}))
+"""
+
+
+def _env(routers: str) -> dict:
+    return dict(os.environ, ML_ROUTERS=routers, PYTHONDONTWRITEBYTECODE="1")
+
+
+def _cold_start(routers: str, preload: list) -> dict:
+    t0 = time.perf_counter()
+    out = subprocess.run([sys.executable, "-c", _CHILD, *preload], cwd=SERVICE_DIR,
+                         env=_env(routers), capture_output=True, text=True, check=True)
+    result = json.loads(out.stdout.strip().splitlines()[-1])
+    result["wall"] = time.perf_counter() - t0
+    return result
+
+
+def import_profile(routers: str = "all", top: int = 15) -> list:
+    """(module, cumulative ms) of the slowest imports made by app.main itself.
+
+    -X importtime prints a module after everything it imported, indented two
+    spaces per nesting level, so app.main's direct imports are the lines one
+    level deeper than it since the previous top-level import. Third-party
+    modules are summed per top-level package; the service's own modules are
+    listed by name.
+    """
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app.main"], cwd=SERVICE_DIR,
+                         env=_env(routers), capture_output=True, text=True, check=True)
+    pending = []
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth > 0:
+            pending.append((depth, name.strip(), int(cumulative)))
+        elif name.strip() == "app.main":
+            break
+        else:
+            pending = []
+    totals = defaultdict(float)
+    for depth, name, cumulative in pending:
+        if depth == 1:
+            totals[name if name.startswith("app.") else name.split(".")[0]] += cumulative / 1000
+    return sorted(totals.items(), key=lambda kv: -kv[1])[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='ML service cold-start benchmark')
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--profile', action='store_true', help='Print an import-time profile per router set')
+    args = parser.parse_args()
+
+    print(f"{'scenario':<20s} {'import s':>9s} {'wall s':>8s} {'peak RSS MB':>12s}")
+    baseline = None
+    for label, routers, preload in SCENARIOS:
+        runs = [_cold_start(routers, preload) for _ in range(args.repeats)]
+        imp = statistics.median(r["seconds"] for r in runs)
+        wall = statistics.median(r["wall"] for r in runs)
+        rss = statistics.median(r["rss_mb"] for r in runs)
+        baseline = baseline or wall
+        print(f"{label:<20s} {imp:9.2f} {wall:8.2f} {rss:12.0f}   ({baseline / wall:.1f}x)")
+
+    if args.profile:
+        for routers in ("all", "volatility"):
+            print(f"\nSlowest imports of app.main (ML_ROUTERS={routers}):")
+            for name, ms in import_profile(routers):
+                print(f"  {name:<28s} {ms:9.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+models.trade_simulator vs a bar-by-bar loop of the web ML simulator.
+
+Builds random-walk OHLC series with a step-held prediction per bar, then
+
+  1. checks simulate_trades against a port of the mlTradingEngine.ts loop
+     (close-based stop / take profit, exit threshold, min hold, max hold,
+     cooldown, one position at a time) over a grid of exit rules: the
+     trade lists must be equal
+  2. times simulate_trades for every bar as a signal x the whole grid
+
+Usage (from ml-service/):
+  python -m benchmarks.bench_trade_simulator --series 20 --bars 1500
+"""
+
+import argparse
+import itertools
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.models.trade_simulator import EXIT_MAX_HOLD, EXIT_SIGNAL, EXIT_STOP, EXIT_TARGET, simulate_trades
+
+
+def synthetic_series(n, rng):
+    close = 50 * np.exp(np.cumsum(rng.normal(0, 0.02, n)))
+    prices = {
+        'open': close * (1 + rng.normal(0, 0.005, n)),
+        'high': close * (1 + np.abs(rng.normal(0, 0.015, n))),
+        'low': close * (1 - np.abs(rng.normal(0, 0.015, n))),
+        'close': close,
+    }
+    # monthly predictions held for 21 bars, like the v7 signals on the web page
+    pred = np.repeat(rng.normal(1.0, 3.0, n // 21 + 1), 21)[:n]
+    return prices, pd.Series(pred)
+
+
+def loop_trades(close, pred, entry_threshold, exit_threshold, rule):
+    """Trades of the web simulator's bar loop: (entry_bar, exit_bar, net_return, reason)."""
+    trades, in_position, cooldown_until = [], False, -1
+    for i in range(len(close)):
+        if in_position:
+            held = i - entry_bar
+            ret = (close[i] - entry) / entry
+            reason = None
+            if ret <= -rule['stop_pct']:
+                reason = EXIT_STOP
+            elif held >= rule['min_hold']:
+                if ret >= rule['target_pct']:
+                    reason = EXIT_TARGET
+                elif pred[i] <= exit_threshold:
+                    reason = EXIT_SIGNAL
+                elif held >= rule['max_hold']:
+                    reason = EXIT_MAX_HOLD
+            if reason is not None:
+                trades.append((entry_bar, i, ret - rule['cost_bps'] / 1e4, reason))
+                in_position, cooldown_until = False, i + rule['cooldown']
+        if not in_position and i > cooldown_until and pred[i] >= entry_threshold:
+            in_position, entry_bar, entry = True, i, close[i]
+    if in_position:
+        i = len(close) - 1
+        trades.append((entry_bar, i, (close[i] - entry) / entry - rule['cost_bps'] / 1e4, EXIT_MAX_HOLD))
+    return trades
+
+
+def rule_grid():
+    return [
+        {'stop_pct': sl, 'target_pct': tp, 'min_hold': mh, 'max_hold': xh, 'cooldown': cd,
+         'cost_bps': 10, 'touch': 'close'}
+        for sl, tp, mh, xh, cd in itertools.product([0.03, 0.05, 0.08], [0.08, 0.15], [0, 3, 5],
+                                                    [21, 30], [0, 2, 5])
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Vectorized trade simulator vs the web bar loop')
+    parser.add_argument('--series', type=int, default=20)
+    parser.add_argument('--bars', type=int, default=1500)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    rules = rule_grid()
+    entry_threshold, exit_threshold = 2.0, 0.0
+    print(f"{args.series} series x {args.bars} bars, {len(rules)} exit rules\n")
+
+    mismatches, checked, sim_time, loop_time = 0, 0, 0.0, 0.0
+    for _ in range(args.series):
+        prices, pred = synthetic_series(args.bars, rng)
+        signal_bars = np.flatnonzero(pred.values >= entry_threshold)
+
+        t0 = time.perf_counter()
+        trades = simulate_trades(prices, signal_bars, rules, exit_signal=pred.values <= exit_threshold)
+        sim_time += time.perf_counter() - t0
+
+        for g, rule in enumerate(rules):
+            t0 = time.perf_counter()
+            ref = loop_trades(prices['close'], pred.values, entry_threshold, exit_threshold, rule)
+            loop_time += time.perf_counter() - t0
+            taken = np.flatnonzero(trades['taken'][g])
+            got = list(zip(trades['entry_bar'][g, taken], trades['exit_bar'][g, taken],
+                           trades['net_return'][g, taken], trades['reason'][g, taken]))
+            checked += 1
+            if len(got) != len(ref) or any(
+                (a[0], a[1], a[3]) != (b[0], b[1], b[3]) or not np.isclose(a[2], b[2], rtol=0, atol=1e-12)
+                for a, b in zip(got, ref)
+            ):
+                mismatches += 1
+    print(f"  simulate_trades vs bar loop: {checked:,} series x rule runs, {mismatches} mismatches")
+    print(f"  simulate_trades {sim_time:.2f}s, bar loop {loop_time:.2f}s ({loop_time / sim_time:.1f}x)")
+
+    prices, pred = synthetic_series(args.bars, rng)
+    every_bar = np.arange(args.bars)
+    t0 = time.perf_counter()
+    simulate_trades(prices, every_bar, [{**r, 'one_position': False} for r in rules])
+    print(f"  {args.bars:,} overlapping signals x {len(rules)} rules in {time.perf_counter() - t0:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: native vs compiled tree-ensemble scoring.
+
+Fits the /predict regressors (create_xgb_model / create_lgbm_model) and the
+v8 fold classifiers on synthetic standardised features, then times native
+predict / predict_proba against the flattened NumPy evaluator at batch sizes
+1 (one /predict row), 60 (one signal date) and 10k (one walk-forward fold).
+The `exact` column reports whether both paths returned identical arrays.
+The compiled column always runs the NumPy evaluator; the services use it
+through select_tree_backend(), which passes batches above
+COMPILED_MAX_ROWS (the crossover measured here) to the native model.
+
+Usage (from ml-service/):
+  python -m benchmarks.bench_tree_inference
+  python -m benchmarks.bench_tree_inference --features 40 --batches 1,60,10000 --repeats 50
+"""
+
+import argparse
+import time
+
+import numpy as np
+import xgboost as xgb
+import lightgbm as lgb
+
+from app.models.ml_models import create_xgb_model, create_lgbm_model
+from app.models.tree_inference import compile_tree_model
+from app.alpha_trainer_v8 import XGB_PARAMS, LGBM_PARAMS
+
+
+def _time(fn, repeats):
+    fn()  # warm-up
+    t0 = time.perf_counter()
+    for _ in range(repeats):
+        out = fn()
+    return (time.perf_counter() - t0) / repeats, out
+
+
+def _fit_models(X, y_reg, y_cls):
+    n_val = len(X) // 10
+    reg_xgb = create_xgb_model().fit(X, y_reg)
+    reg_lgbm = create_lgbm_model().fit(X, y_reg)
+    cls_xgb = xgb.XGBClassifier(**XGB_PARAMS).fit(
+        X[:-n_val], y_cls[:-n_val], eval_set=[(X[-n_val:], y_cls[-n_val:])], verbose=False)
+    cls_lgbm = lgb.LGBMClassifier(**LGBM_PARAMS).fit(X, y_cls)
+    return [
+        ('xgb regressor (/predict)', reg_xgb, 'predict'),
+        ('lgbm regressor (/predict)', reg_lgbm, 'predict'),
+        ('xgb classifier (v8)', cls_xgb, 'predict_proba'),
+        ('lgbm classifier (v8)', cls_lgbm, 'predict_proba'),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Tree-ensemble inference micro-benchmark')
+    parser.add_argument('--features', type=int, default=22)
+    parser.add_argument('--train-rows', type=int, default=20000)
+    parser.add_argument('--batches', type=str, default='1,16,60,10000')
+    parser.add_argument('--repeats', type=int, default=20)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    X = rng.standard_normal((args.train_rows, args.features))
+    y_reg = 0.02 * X[:, 0] - 0.01 * X[:, 1] * X[:, 2] + rng.normal(0, 0.05, args.train_rows)
+    y_cls = (y_reg > 0.03).astype(int)
+
+    batches = [int(b) for b in args.batches.split(',')]
+    pool = rng.standard_normal((max(batches), args.features))
+
+    print(f"{args.features} features, {args.train_rows} training rows, {args.repeats} repeats")
+    print(f"{'model':<28s} {'trees':>6s} {'batch':>6s} {'native ms':>10s} {'compiled ms':>12s} "
+          f"{'speedup':>8s} {'exact':>6s}")
+
+    for name, model, method in _fit_models(X, y_reg, y_cls):
+        compiled = compile_tree_model(model)
+        native_fn, compiled_fn = getattr(model, method), getattr(compiled, method)
+        for batch in batches:
+            Xb = pool[:batch]
+            native_s, expected = _time(lambda: native_fn(Xb), args.repeats)
+            compiled_s, got = _time(lambda: compiled_fn(Xb), args.repeats)
+            exact = expected.dtype == got.dtype and np.array_equal(expected, got)
+            print(f"{name:<28s} {compiled.n_trees:6d} {batch:6d} {native_s * 1e3:10.3f} "
+                  f"{compiled_s * 1e3:12.3f} {native_s / compiled_s:8.1f} {str(exact):>6s}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Per-feature timing of v8 compute_features: rolling.apply lambdas vs closed forms.
+
+For mom_quality, max_dd_21d, obv_slope and gk_vol the original per-window /
+per-element lambdas are timed against the vectorized expressions now used by
+compute_features, on synthetic prices. `exact` counts rows that are bit for
+bit equal (NaN == NaN); obv_slope replaces np.polyfit (an SVD least-squares
+solve per window) with the closed-form slope, so it is compared by its
+largest relative difference instead.
+
+Usage (from ml-service/):
+  python -m benchmarks.bench_v8_features
+  python -m benchmarks.bench_v8_features --days 2500 --repeats 5
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.alpha_trainer_v8 import compute_features, obv_slope
+
+
+def _legacy(close_s, ret_s, vol_s, gk_mean):
+    return {
+        'mom_quality': lambda: ret_s.rolling(63).apply(
+            lambda x: np.mean(x > 0) if len(x) > 0 else 0.5, raw=True).values,
+        'max_dd_21d': lambda: close_s.rolling(21).apply(
+            lambda x: (x[-1] / x.max() - 1) if len(x) > 0 and x.max() > 0 else 0, raw=True).values,
+        'obv_slope': lambda: (ret_s.apply(np.sign) * vol_s).cumsum().rolling(21).apply(
+            lambda x: np.polyfit(range(len(x)), x, 1)[0] / (np.mean(np.abs(x)) + 1) if len(x) > 1 else 0,
+            raw=True).values,
+        'gk_vol': lambda: gk_mean.apply(lambda x: np.sqrt(x * 252) if x > 0 else 0).values,
+    }
+
+
+def _vectorized(close_s, ret_s, vol_s, gk_mean):
+    def max_dd():
+        price_21h = close_s.rolling(21).max()
+        dd = close_s / price_21h - 1
+        dd[price_21h <= 0] = 0
+        return dd.values
+
+    def gk_vol():
+        with np.errstate(invalid='ignore'):
+            return np.where(gk_mean.values > 0, np.sqrt(gk_mean.values * 252), 0.0)
+
+    return {
+        'mom_quality': lambda: (ret_s > 0).astype(float).rolling(63).mean().values,
+        'max_dd_21d': max_dd,
+        'obv_slope': lambda: obv_slope((np.sign(ret_s.values) * vol_s.values).cumsum(), 21),
+        'gk_vol': gk_vol,
+    }
+
+
+def _time(fn, repeats):
+    t0 = time.perf_counter()
+    for _ in range(repeats):
+        out = fn()
+    return (time.perf_counter() - t0) / repeats, out
+
+
+def main():
+    parser = argparse.ArgumentParser(description='v8 compute_features per-feature timing')
+    parser.add_argument('--days', type=int, default=1500)
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    dates = pd.bdate_range('2018-01-01', periods=args.days)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, args.days)))
+    df = pd.DataFrame({
+        'open': close * (1 + rng.normal(0, 0.005, args.days)),
+        'high': close * (1 + np.abs(rng.normal(0, 0.01, args.days))),
+        'low': close * (1 - np.abs(rng.normal(0, 0.01, args.days))),
+        'close': close,
+        'volume': rng.integers(1, 1_000_000, args.days).astype(float),
+    }, index=dates)
+
+    close_s = df['close']
+    ret_s = pd.Series(np.r_[0.0, close[1:] / close[:-1] - 1], index=dates)
+    vol_s = df['volume']
+    gk_var = 0.5 * np.log(df['high'] / df['low']) ** 2 - (2 * np.log(2) - 1) * np.log(close / df['open']) ** 2
+    gk_mean = gk_var.rolling(21).mean()
+
+    legacy = _legacy(close_s, ret_s, vol_s, gk_mean)
+    vectorized = _vectorized(close_s, ret_s, vol_s, gk_mean)
+
+    print(f"{args.days} rows, 1 ticker\n")
+    print(f"{'feature':<14s} {'lambda ms':>10s} {'vector ms':>10s} {'speedup':>8s} {'exact':>12s} {'max rel diff':>13s}")
+    total_old = total_new = 0.0
+    for name in legacy:
+        t_old, old = _time(legacy[name], args.repeats)
+        t_new, new = _time(vectorized[name], args.repeats)
+        total_old += t_old
+        total_new += t_new
+        exact = int(((old == new) | (np.isnan(old) & np.isnan(new))).sum())
+        with np.errstate(invalid='ignore', divide='ignore'):
+            rel = np.nanmax(np.abs(new - old) / np.maximum(np.abs(old), 1e-300))
+        print(f"{name:<14s} {t_old * 1e3:10.2f} {t_new * 1e3:10.3f} {t_old / t_new:7.0f}x "
+              f"{exact:>5d}/{len(old):<6d} {rel:13.1e}")
+    print(f"{'total':<14s} {total_old * 1e3:10.2f} {total_new * 1e3:10.3f} {total_old / total_new:7.0f}x")
+
+    t_all, _ = _time(lambda: compute_features(df), args.repeats)
+    print(f"\ncompute_features now: {t_all * 1e3:.1f} ms per ticker "
+          f"(the four lambdas alone took {total_old * 1e3:.1f} ms)")
+
+
+if __name__ == '__main__':
+    main()
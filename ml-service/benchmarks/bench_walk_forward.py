@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Walk-forward folds: serial vs --fold-jobs worker processes.
+
+A synthetic feature panel (every ticker interleaved by date, noisy features
+with a weak signal in the targets) goes through a trainer's walk-forward
+function once serially and once per worker count, all with the same
+per-fold thread budget (--threads). The predictions must be identical
+(DataFrame.equals) and the printed fold log byte for byte the same.
+
+Each trainer module is imported on its own (they rebind sys.stdout), so run
+one trainer per invocation.
+
+Usage (from ml-service/):
+  python -m benchmarks.bench_walk_forward --trainer v8 --tickers 20
+  python -m benchmarks.bench_walk_forward --trainer v6 --days 700 --jobs 2 4 --threads 1
+"""
+
+import argparse
+import contextlib
+import importlib
+import io
+import time
+
+import numpy as np
+import pandas as pd
+
+
+def synthetic_features(trainer, n_tickers, n_days, n_features=20, seed=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range('2015-01-01', periods=n_days)
+    n = n_tickers * n_days
+    frame = pd.DataFrame({
+        'ticker': np.tile([f'T{i:03d}' for i in range(n_tickers)], n_days),
+        'date': np.repeat(dates, n_tickers),
+    })
+    feature_cols = [f'f{i:02d}' for i in range(n_features)]
+    X = rng.normal(size=(n, n_features))
+    for i, col in enumerate(feature_cols):
+        frame[col] = X[:, i]
+    signal = X[:, :3] @ np.array([0.3, -0.2, 0.1]) + rng.normal(size=n)
+    fwd = 0.02 * signal
+
+    if trainer == 'v8':
+        frame['forward_return'] = fwd
+        frame['target'] = (signal > 0).astype(int)
+        frame['above_200ma'] = (rng.random(n) > 0.3).astype(float)
+    elif trainer == 'v6':
+        frame['fwd_ret_21d'] = fwd
+        frame['target_dir_21d'] = (signal > 0).astype(int)
+    else:
+        frame['regime'] = rng.choice(['low_vol', 'normal', 'high_vol'], n)
+        for name in ('fast', 'medium', 'slow'):
+            frame[f'fwd_ret_{name}'] = fwd + rng.normal(0, 0.01, n)
+            frame[f'target_rank_{name}'] = frame.groupby('date')[f'fwd_ret_{name}'].rank(pct=True)
+    return frame, feature_cols
+
+
+def _run(trainer, mod, frame, feature_cols, jobs, threads):
+    """(predictions, printed log) of one walk-forward run."""
+    log = io.StringIO()
+    with contextlib.redirect_stdout(log):
+        if trainer == 'v8':
+            args = argparse.Namespace(tree_backend='native', fold_jobs=jobs, fold_threads=threads)
+            preds = pd.concat(mod.train_walk_forward(frame, frame['date'], feature_cols, args),
+                              ignore_index=True)
+        else:
+            preds, _, _ = mod.run_walk_forward(frame, feature_cols, jobs=jobs, threads=threads)
+    return preds, log.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serial vs parallel walk-forward folds')
+    parser.add_argument('--trainer', choices=['v6', 'v7', 'v8'], default='v8')
+    parser.add_argument('--tickers', type=int, default=12)
+    parser.add_argument('--days', type=int, default=1000)
+    parser.add_argument('--jobs', type=int, nargs='+', default=[2, 4])
+    parser.add_argument('--threads', type=int, default=1, help='Model threads per fold in every run')
+    args = parser.parse_args()
+
+    mod = importlib.import_module(f'app.alpha_trainer_{args.trainer}')
+    frame, feature_cols = synthetic_features(args.trainer, args.tickers, args.days)
+    print(f"{args.trainer}: {args.tickers} tickers x {args.days} days ({len(frame):,} rows), "
+          f"{args.threads} thread(s) per fold\n")
+
+    t0 = time.perf_counter()
+    reference, ref_log = _run(args.trainer, mod, frame, feature_cols, 1, args.threads)
+    t_serial = time.perf_counter() - t0
+    n_lines = len(ref_log.splitlines())
+    print(f"{'run':<10s} {'s':>8s} {'speedup':>8s} {'preds':>7s} {'log':>7s}")
+    print(f"{'serial':<10s} {t_serial:8.2f} {1:7.1f}x {len(reference):7d} {n_lines:7d}")
+
+    for jobs in args.jobs:
+        t0 = time.perf_counter()
+        preds, log = _run(args.trainer, mod, frame, feature_cols, jobs, args.threads)
+        elapsed = time.perf_counter() - t0
+        print(f"{f'jobs={jobs}':<10s} {elapsed:8.2f} {t_serial / elapsed:7.1f}x "
+              f"{str(preds.equals(reference)):>7s} {str(log == ref_log):>7s}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Walk-forward folds trained from zero vs warm-started from the previous fold.
+
+Runs a trainer's walk-forward on the synthetic panel of bench_walk_forward
+once with every fold trained from zero and once per --warm-rounds value
+with --warm-start, and prints the wall time next to the validation metric
+the trainer reports for each mode (v8: mean valAUC / testAUC, v7: mean
+validation IC per horizon) — the speed / quality trade of warm starts.
+
+Usage (from ml-service/):
+  python -m benchmarks.bench_warm_start --trainer v8 --tickers 20 --days 1500
+  python -m benchmarks.bench_warm_start --trainer v7 --rounds 50 100 --retrain-every 6
+"""
+
+import argparse
+import contextlib
+import importlib
+import io
+import time
+
+from benchmarks.bench_walk_forward import synthetic_features
+
+
+def _run(trainer, mod, frame, feature_cols, warm_rounds, retrain_every, threads):
+    """Printed summary lines of one walk-forward run."""
+    log = io.StringIO()
+    with contextlib.redirect_stdout(log):
+        if trainer == 'v8':
+            args = argparse.Namespace(tree_backend='native', fold_jobs=1, fold_threads=threads,
+                                      warm_start=warm_rounds > 0, warm_rounds=warm_rounds,
+                                      retrain_every=retrain_every)
+            mod.train_walk_forward(frame, frame['date'], feature_cols, args)
+        else:
+            mod.run_walk_forward(frame, feature_cols, jobs=1, threads=threads,
+                                 warm_rounds=warm_rounds, retrain_every=retrain_every)
+    return [line.strip() for line in log.getvalue().splitlines()
+            if 'full retrain:' in line or 'warm start:' in line]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Walk-forward from zero vs warm-started boosting')
+    parser.add_argument('--trainer', choices=['v7', 'v8'], default='v8')
+    parser.add_argument('--tickers', type=int, default=12)
+    parser.add_argument('--days', type=int, default=1500)
+    parser.add_argument('--rounds', type=int, nargs='+', default=[50, 100])
+    parser.add_argument('--retrain-every', type=int, default=None,
+                        help='Folds per full retrain (default: the trainer\'s RETRAIN_EVERY)')
+    parser.add_argument('--threads', type=int, default=None, help='Model threads per fold')
+    args = parser.parse_args()
+
+    mod = importlib.import_module(f'app.alpha_trainer_{args.trainer}')
+    retrain_every = args.retrain_every or mod.RETRAIN_EVERY
+    frame, feature_cols = synthetic_features(args.trainer, args.tickers, args.days)
+    print(f"{args.trainer}: {args.tickers} tickers x {args.days} days ({len(frame):,} rows), "
+          f"full retrain every {retrain_every} folds\n")
+
+    base = None
+    for rounds in [0] + args.rounds:
+        t0 = time.perf_counter()
+        summary = _run(args.trainer, mod, frame, feature_cols, rounds, retrain_every, args.threads)
+        elapsed = time.perf_counter() - t0
+        base = base or elapsed
+        label = 'from zero' if rounds == 0 else f'warm {rounds}'
+        print(f"{label:<10s} {elapsed:8.2f}s {base / elapsed:5.1f}x")
+        for line in summary:
+            print(f"    {line}")
+
+
+if __name__ == '__main__':
+    main()